@@ -80,7 +80,7 @@ llm_client = LLMClient(config)
 dataset_store = DatasetStore(config)
 experience_generator = ExperienceGenerator(config, llm_client, dataset_store)
 dialogue_simulator = DialogueSimulator(config, llm_client)
-quality_judge = QualityJudge(config, llm_client)
+quality_judge = QualityJudge(config, llm_client, simulator=dialogue_simulator, dataset_store=dataset_store)
 evaluator = Evaluator(config)
 generator = GoalConvoGenerator(config)
 
@@ -386,7 +386,7 @@ def run_pipeline():
                     generated_dialogues = dataset_store.load_dialogues(limit=num_dialogues * 2)
                 if generated_dialogues:
                     try:
-                        version_manager = DatasetVersionManager(config.data_dir)
+                        version_manager = DatasetVersionManager(config.data_dir, archive_format=config.version_archive_format)
                         tags = ["pipeline", "auto-generated"]
                         if experiment_tag and isinstance(experiment_tag, str) and experiment_tag.strip():
                             tags.append(experiment_tag.strip())
@@ -507,40 +507,30 @@ def run_evaluation():
                 })
                 # Decide which domains to load from:
                 # - if eval_domains provided: use those
-                # - else: load from all existing domain dirs under synthetic_dir
-                synthetic_dir = Path(config.synthetic_dir)
+                # - else: load from all domains present in the dataset store
                 if eval_domains and isinstance(eval_domains, list) and len(eval_domains) > 0:
                     all_domain_dirs = list(eval_domains)
                 else:
-                    all_domain_dirs = [p.name for p in synthetic_dir.iterdir() if p.is_dir()] if synthetic_dir.exists() else list(getattr(config, 'domains', ['hotel', 'restaurant', 'taxi', 'train', 'attraction']))
+                    all_domain_dirs = dataset_store.list_domains()
                     if not all_domain_dirs:
                         all_domain_dirs = getattr(config, 'domains', ['hotel', 'restaurant', 'taxi', 'train', 'attraction'])
-                pool_size = max(eval_limit * 20, 500)
-                all_dialogues = dataset_store.load_dialogues(limit=pool_size, domains_override=all_domain_dirs)
-                if not all_dialogues:
+                generated_dialogues = dataset_store.latest(eval_limit, domains=all_domain_dirs)
+                if not generated_dialogues:
                     emit_callback('evaluation_error', {
                         'message': 'No dialogues found. Run dialogue generation first.'
                     })
                     return
-                # Sort by timestamp (always string for comparable sort) and take latest N
-                def _dialogue_timestamp(d):
-                    meta = d.get("metadata", {}) or {}
-                    prov = d.get("provenance", {}) or {}
-                    raw = meta.get("generated_at") or prov.get("timestamp") or ""
-                    return str(raw) if raw is not None else ""
-                all_dialogues.sort(key=_dialogue_timestamp)
-                generated_dialogues = all_dialogues[-eval_limit:]  # latest N
                 emit_callback('log', {
                     'message': f'Evaluating latest {len(generated_dialogues)} dialogues...',
                     'step': 'evaluation'
                 })
-                multiwoz_file = Path(config.multiwoz_dir) / "processed_dialogues.json"
-                reference_dialogues = None
-                if multiwoz_file.exists():
-                    from goalconvo.utils import load_json
-                    reference_dialogues = load_json(str(multiwoz_file))
-                    if reference_dialogues:
-                        reference_dialogues = reference_dialogues[:min(100, len(reference_dialogues))]
+                # References from the evaluated domains, read from the indexed corpus; best-match
+                # metrics only score each dialogue's top-k nearest, so a large pool stays cheap
+                from goalconvo.reference_corpus import load_reference_dialogues
+                eval_reference_domains = sorted({d.get("domain", "unknown") for d in generated_dialogues})
+                reference_dialogues = load_reference_dialogues(
+                    config.multiwoz_dir, limit=config.eval_reference_limit or None, domains=eval_reference_domains
+                ) or None
                 use_llm_judge = os.getenv("EVAL_SKIP_LLM_JUDGE", "0") != "1"
                 comprehensive_evaluator = ComprehensiveDialogueEvaluator(config)
 
@@ -635,6 +625,18 @@ def health_check():
     })
 
 
+@app.route('/api/dataset/statistics', methods=['GET'])
+def get_dataset_statistics():
+    """Get dataset statistics (maintained incrementally; cheap enough to poll)."""
+    try:
+        if request.args.get('rebuild', '').lower() in ('1', 'true', 'yes'):
+            dataset_store.rebuild_statistics()
+        return jsonify(dataset_store.get_statistics())
+    except Exception as e:
+        logger.error(f"Error getting dataset statistics: {e}")
+        return jsonify({"error": str(e)}), 500
+
+
 # Dataset Versioning API Endpoints
 
 @app.route('/api/versions', methods=['GET'])
@@ -763,8 +765,8 @@ def export_version(version_id):
         format = data.get('format', 'json')
         output_path = data.get('output_path')
         
-        if format not in ['json', 'jsonl', 'hf', 'rasa']:
-            return jsonify({"error": "format must be 'json', 'jsonl', 'hf', or 'rasa'"}), 400
+        if format not in ['json', 'jsonl', 'hf', 'rasa', 'parquet', 'arrow']:
+            return jsonify({"error": "format must be 'json', 'jsonl', 'hf', 'rasa', 'parquet', or 'arrow'"}), 400
         
         version_manager = DatasetVersionManager(config.data_dir)
         
@@ -985,6 +987,7 @@ def api_schema():
                 "/api/run-pipeline": {"methods": ["POST"], "description": "Run dialogue generation pipeline (no evaluation)"},
                 "/api/run-evaluation": {"methods": ["POST"], "description": "Run comprehensive evaluation on current dataset"},
                 "/health": {"methods": ["GET"], "description": "Backend health check"},
+                "/api/dataset/statistics": {"methods": ["GET"], "description": "Dataset statistics (?rebuild=1 recomputes)"},
                 "/api/versions": {"methods": ["GET"], "description": "List dataset versions"},
                 "/api/versions/<version_id>": {"methods": ["GET"], "description": "Get version metadata"},
                 "/api/versions/<version_id>/dialogues": {"methods": ["GET"], "description": "Get dialogues for a version"},
@@ -1016,6 +1019,9 @@ def _openapi_spec(base_url: str = "") -> Dict[str, Any]:
             "/health": {
                 "get": {"summary": "Health check", "responses": {"200": {"description": "OK"}}}
             },
+            "/api/dataset/statistics": {
+                "get": {"summary": "Dataset statistics", "parameters": [{"name": "rebuild", "in": "query", "required": False, "schema": {"type": "boolean"}}], "responses": {"200": {"description": "Counts, turn/quality mean and std, histograms, day buckets"}}}
+            },
             "/api/run-pipeline": {
                 "post": {
                     "summary": "Run pipeline",
@@ -1066,7 +1072,7 @@ def _openapi_spec(base_url: str = "") -> Dict[str, Any]:
                 "post": {
                     "summary": "Export version",
                     "parameters": [{"name": "version_id", "in": "path", "required": True, "schema": {"type": "string"}}],
-                    "requestBody": {"content": {"application/json": {"schema": {"type": "object", "properties": {"format": {"type": "string", "enum": ["json", "jsonl", "hf", "rasa"]}}}}}}},
+                    "requestBody": {"content": {"application/json": {"schema": {"type": "object", "properties": {"format": {"type": "string", "enum": ["json", "jsonl", "hf", "rasa", "parquet", "arrow"]}}}}}}},
                     "responses": {"200": {"description": "Export path"}}
                 }
             },
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Judge Calibration Benchmark for GoalConvo
+
+Compares quality-judge modes (full, sampled, ...) on a frozen set of dialogues.
+LLM responses are recorded to a cassette on the first run (--record) and replayed
+afterwards, so results are reproducible and free to re-run.
+"""
+
+import json
+import logging
+import argparse
+from pathlib import Path
+
+# Add src to path for imports
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.config import Config
+from goalconvo.dataset_store import DatasetStore
+from goalconvo.human_evaluator import HumanEvaluator
+from goalconvo.judge_benchmark import JUDGE_MODES, JudgeBenchmark, RecordingLLMClient, load_benchmark_dialogues
+from goalconvo.utils import save_json
+
+logger = logging.getLogger(__name__)
+
+def main():
+    """Main function for the judge benchmark."""
+    parser = argparse.ArgumentParser(description="Benchmark quality-judge modes against recorded LLM responses")
+    parser.add_argument("--dialogues", type=str, help="Frozen benchmark set (JSON list or JSONL); default: synthetic store")
+    parser.add_argument("--limit", type=int, default=100, help="Dialogues to take from the store when --dialogues is not set")
+    parser.add_argument("--freeze", type=str, help="Write the dialogues used to this JSON file for later runs")
+    parser.add_argument("--cassette", type=str, default="data/judge_benchmark/cassette.json",
+                       help="Recorded LLM responses")
+    parser.add_argument("--record", action="store_true", help="Call the configured LLM for prompts missing from the cassette")
+    parser.add_argument("--modes", nargs="+", choices=sorted(JUDGE_MODES), help="Judge modes to compare (default: all)")
+    parser.add_argument("--reference", type=str, default="full", help="Mode used as the reference for agreement and drift")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", type=str, help="Write the report to this JSON file")
+    parser.add_argument("--log-level", type=str, default="INFO",
+                       choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = Config()
+
+    try:
+        if args.dialogues:
+            dialogues = load_benchmark_dialogues(args.dialogues)
+        else:
+            dialogues = DatasetStore(config).load_dialogues(limit=args.limit)
+        if args.freeze:
+            save_json(dialogues, args.freeze)
+            logger.info(f"Froze {len(dialogues)} benchmark dialogues to {args.freeze}")
+
+        live_client = None
+        tier_clients = {}
+        if args.record:
+            from goalconvo.llm_client import LLMClient
+            live_client = LLMClient(config)
+            for tier in ("fast", "strong"):
+                tier_config = config.get_judge_api_config(tier)
+                if tier_config is not None:
+                    tier_clients[tier] = LLMClient(config, api_config=tier_config)
+        llm_client = RecordingLLMClient(args.cassette, llm_client=live_client, tier_clients=tier_clients)
+
+        benchmark = JudgeBenchmark(
+            config,
+            llm_client,
+            dialogues,
+            human_evaluator=HumanEvaluator(config.data_dir),
+            seed=args.seed
+        )
+        try:
+            report = benchmark.run(args.modes, reference=args.reference)
+        finally:
+            if args.record:
+                llm_client.save()
+
+        print(json.dumps(report, indent=2))
+        if args.output:
+            save_json(report, args.output)
+            logger.info(f"Wrote judge benchmark report to {args.output}")
+
+        return 0
+
+    except Exception as e:
+        logger.error(f"Error in judge benchmark: {e}")
+        return 1
+
+if __name__ == "__main__":
+    exit(main())
@@ -14,9 +14,9 @@ Implements multiple evaluation metrics for GoalConvo-generated dialogues:
 import json
 import logging
 import argparse
-import re
+import time
 from pathlib import Path
-from typing import List, Dict, Any, Optional, Tuple, Callable
+from typing import List, Dict, Any, Iterable, Optional, Callable, Tuple
 from collections import Counter
 from datetime import datetime
 
@@ -99,18 +99,38 @@ except Exception as e:
 from goalconvo.config import Config
 from goalconvo.llm_client import LLMClient
 from goalconvo.dataset_store import DatasetStore
-from goalconvo.utils import load_json
+from goalconvo.reference_corpus import load_reference_dialogues
+from goalconvo.bertscore_engine import bertscore_available, best_match_f1
+from goalconvo.reference_retrieval import ReferenceRetriever
+from goalconvo.bleu_engine import BLEUEngine, best_match_bleu
+from goalconvo.dialogue_analysis import DialogueAnalyzer, DialogueAnalysis, distinct_ratios, mean_distinct
+from goalconvo.evaluation_store import EvaluationStore, fingerprint
+from goalconvo.sketches import HyperLogLog
+from goalconvo.metric_executor import MetricExecutor, MetricTask, processes_available
+from goalconvo.dialogue_judge import JUDGE_METRICS, DialogueJudge, JudgeScoreStore
+from goalconvo.keyword_matcher import (
+    COMMON_REQUESTABLES, CONFIRMATION_WINDOW, CONFIRMATION_WORDS, CONSTRAINT_PATTERNS, CONTRADICTION_PHRASES,
+    GENERAL_COMPLETION_WORDS, GOAL_COMPLETION_KEYWORDS, INTENT_CATEGORIES, SATISFACTION_WORDS, SLOT_TIME_WORDS,
+    TASK_INTENTS, DialogueScan, DialogueScanCache, scan_dialogue
+)
+from goalconvo.streaming_evaluation import GroupedStats, ReservoirSample, RunningStats, ScoreSpill, iter_chunks
 
 logger = logging.getLogger(__name__)
 
-# Import BERTScore for semantic similarity
-try:
-    from bert_score import score as bert_score
-    BERTSCORE_AVAILABLE = True
-except ImportError:
-    BERTSCORE_AVAILABLE = False
+# BERTScore for semantic similarity (shared engine: model loaded once per process)
+BERTSCORE_AVAILABLE = bertscore_available()
+if not BERTSCORE_AVAILABLE:
     logger.warning("BERTScore not available. Install with: pip install bert-score")
 
+# Response-time gaps below this are artifacts (e.g. injected turns with the same datetime.now())
+GAP_FLOOR_SECONDS = 0.1
+
+# Streaming evaluation: self-BLEU is computed on a uniform sample of this many dialogues
+STREAM_SELF_BLEU_POOL = 2000
+
+# BERTScore compares dialogue texts truncated to this many characters
+BERTSCORE_MAX_CHARS = 1000
+
 class ComprehensiveDialogueEvaluator:
     """Comprehensive evaluator for generated dialogues with multiple metrics."""
     
@@ -131,6 +151,38 @@ class ComprehensiveDialogueEvaluator:
         else:
             self.smoothing = None
         
+        # Per-dialogue text / token records shared by all metrics (rebuilt per evaluation)
+        self.analyzer = DialogueAnalyzer()
+        # Per-dialogue keyword scans shared by the heuristic GCR / TSR / advanced metrics
+        self.keyword_scans = DialogueScanCache()
+        # Per-dialogue metric contributions kept across runs (opened on first use)
+        self._evaluation_store: Optional[EvaluationStore] = None
+    
+    def __getstate__(self) -> Dict[str, Any]:
+        # Sent to metric worker processes: they only compute metrics, so API clients and caches stay here
+        state = dict(self.__dict__)
+        state["llm_client"] = None
+        state["dataset_store"] = None
+        state["analyzer"] = DialogueAnalyzer()
+        state["keyword_scans"] = DialogueScanCache()
+        state["_evaluation_store"] = None
+        return state
+    
+    def _contributions(
+        self,
+        metric: str,
+        dialogues: List[Dict[str, Any]],
+        compute: Callable[[List[Dict[str, Any]]], List[Any]],
+        context: str = ""
+    ) -> List[Any]:
+        """Per-dialogue values of a metric; with incremental evaluation only unseen dialogues are computed."""
+        path = self.config.evaluation_store_path()
+        if path is None:
+            return compute(dialogues)
+        if self._evaluation_store is None:
+            self._evaluation_store = EvaluationStore(path)
+        return self._evaluation_store.contributions(metric, context, dialogues, compute)
+        
     def evaluate_dialogues(
         self,
         dialogues: List[Dict[str, Any]],
@@ -157,23 +209,29 @@ class ComprehensiveDialogueEvaluator:
         Returns:
             Dictionary with all evaluation metrics
         """
-        def _yield() -> None:
-            if yield_callback:
-                try:
-                    yield_callback()
-                except Exception:
-                    pass
+        try:
+            return self._evaluate_dialogues(dialogues, reference_dialogues, use_llm_judge, emit_callback, yield_callback)
+        finally:
+            self._release_caches()
 
-        def _log(msg: str) -> None:
-            logger.info(msg)
-            if emit_callback:
-                try:
-                    emit_callback('log', {'message': msg, 'step': 'evaluation', 'level': 'info'})
-                except Exception:
-                    pass
-            _yield()
+    def _release_caches(self) -> None:
+        """Drop the per-evaluation analysis records and keyword scans (they reference the dialogues)."""
+        self.analyzer.clear()
+        self.keyword_scans.clear()
+
+    def _evaluate_dialogues(
+        self,
+        dialogues: List[Dict[str, Any]],
+        reference_dialogues: Optional[List[Dict[str, Any]]],
+        use_llm_judge: bool,
+        emit_callback: Optional[Callable[[str, Dict[str, Any]], None]],
+        yield_callback: Optional[Callable[[], None]]
+    ) -> Dict[str, Any]:
+        """evaluate_dialogues, without releasing the per-evaluation caches afterwards."""
+        _log, _yield = self._progress_callbacks(emit_callback, yield_callback)
 
         _log(f"Evaluating {len(dialogues)} dialogues...")
+        self._release_caches()
         
         results = {
             "evaluation_timestamp": datetime.now().isoformat(),
@@ -181,63 +239,488 @@ class ComprehensiveDialogueEvaluator:
             "metrics": {}
         }
         
-        # 1. Goal Completion Rate (GCR)
-        _log("Computing Goal Completion Rate...")
-        gcr_results = self._compute_goal_completion_rate(dialogues)
-        results["metrics"]["goal_completion_rate"] = gcr_results
+        # Metrics are independent: CPU-bound ones run in a process pool, the LLM judge in a
+        # thread pool and cheap heuristics inline, so the run takes about as long as the slowest
+        workers = max(1, self.config.eval_metric_workers)
+        # Callbacks cannot be sent to worker processes; in parallel runs this thread yields while waiting
+        yield_kwargs = {"yield_callback": yield_callback} if workers == 1 else {}
+        # Without worker processes (eventlet) cpu metrics run in this thread and must yield themselves
+        cpu_yield_kwargs = yield_kwargs if processes_available() else {"yield_callback": yield_callback}
+        tasks = [
+            MetricTask("goal_completion_rate", self._compute_goal_completion_rate, (dialogues,), kind="inline"),
+            MetricTask("task_success_rate", self._compute_task_success_rate, (dialogues,), kind="inline"),
+            MetricTask("lexical_diversity", self._compute_lexical_diversity, (dialogues, reference_dialogues)),
+        ]
+        if reference_dialogues:
+            tasks.append(MetricTask(
+                "bertscore_similarity", self._compute_bertscore_similarity,
+                (dialogues, reference_dialogues), dict(cpu_yield_kwargs)
+            ))
+            tasks.append(MetricTask("bleu_score", self._compute_bleu_scores, (dialogues, reference_dialogues)))
+        tasks += [
+            MetricTask("dialogue_length", self._compute_dialogue_length_metrics, (dialogues,), kind="inline"),
+            MetricTask("repetition_rate", self._compute_repetition_rate, (dialogues,), kind="inline"),
+            MetricTask("response_time", self._compute_response_time_metrics, (dialogues,), kind="inline"),
+        ]
+        if use_llm_judge:
+            tasks.append(MetricTask(
+                "llm_judge", self._compute_llm_judge_metrics, (dialogues,), dict(yield_kwargs), kind="io"
+            ))
+        tasks.append(
+            MetricTask("advanced_evaluation", self._compute_advanced_evaluation_metrics, (dialogues,), kind="inline")
+        )
+
+        labels = {
+            "goal_completion_rate": "Goal Completion Rate",
+            "task_success_rate": "Task Success Rate",
+            "lexical_diversity": "Lexical Diversity",
+            "bertscore_similarity": "BERTScore semantic similarity",
+            "bleu_score": "BLEU Scores",
+            "dialogue_length": "dialogue length and turns",
+            "repetition_rate": "repetition rate",
+            "response_time": "response time metrics",
+            "llm_judge": "LLM-as-a-Judge evaluation",
+            "advanced_evaluation": "advanced evaluation metrics (intent, slots, state tracking)",
+        }
+        started = time.perf_counter()
+        metric_results, timings = MetricExecutor(workers).run(
+            tasks,
+            on_start=lambda name: _log(f"Computing {labels[name]}..."),
+            on_done=lambda name, seconds: _log(f"Finished {labels[name]} in {seconds:.1f}s"),
+            on_wait=_yield
+        )
+        # Same metric order as the task list, whatever order they finished in
+        for task in tasks:
+            results["metrics"][task.name] = metric_results[task.name]
+        results["metric_timings"] = {name: round(timings[name], 3) for name in results["metrics"]}
+        results["evaluation_time"] = round(time.perf_counter() - started, 3)
         
-        # 2. Task Success Rate (TSR)
-        _log("Computing Task Success Rate...")
-        tsr_results = self._compute_task_success_rate(dialogues)
-        results["metrics"]["task_success_rate"] = tsr_results
+        # Generate summary table
+        results["summary_table"] = self._generate_summary_table(results["metrics"])
         
-        # 3. Lexical Diversity (can compute without reference)
-        _log("Computing Lexical Diversity...")
-        lexical_diversity_results = self._compute_lexical_diversity(dialogues, reference_dialogues)
-        results["metrics"]["lexical_diversity"] = lexical_diversity_results
+        return results
+
+    def evaluate_dialogue_stream(
+        self,
+        dialogues: Iterable[Dict[str, Any]],
+        reference_dialogues: Optional[List[Dict[str, Any]]] = None,
+        use_llm_judge: bool = True,
+        chunk_size: Optional[int] = None,
+        scores_file: Optional[str] = None,
+        emit_callback: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        yield_callback: Optional[Callable[[], None]] = None,
+        on_partial: Optional[Callable[[Dict[str, Any]], None]] = None
+    ) -> Dict[str, Any]:
+        """
+        Evaluate dialogues from an iterator in fixed-size chunks with bounded memory.
+
+        Every metric of evaluate_dialogues is folded chunk by chunk into mergeable state
+        (running mean / variance / min / max overall and per domain, counters, HyperLogLog
+        n-gram sketches), so memory depends on the chunk size, not the number of dialogues.
+        Results have the same metrics as evaluate_dialogues, with these differences in shape:
+
+        - bertscore_similarity and bleu_score have no individual_scores list; pass
+          scores_file to spill per-dialogue scores to a JSONL file instead (its path is
+          returned as individual_scores_file)
+        - lexical_diversity has self_bleu_sample, the number of dialogues self-BLEU was
+          computed on (a uniform sample of at most STREAM_SELF_BLEU_POOL dialogues)
+
+        Corpus Distinct-1/2 are HyperLogLog estimates. Metrics run one after another per chunk.
+
+        Args:
+            dialogues: Iterable of generated dialogues (e.g. DatasetStore.iter_dialogues())
+            reference_dialogues: Optional reference dialogues for BERTScore and BLEU; skipped if None
+            use_llm_judge: Whether to use LLM-as-a-Judge evaluation
+            chunk_size: Dialogues per chunk (default: config.eval_chunk_size)
+            scores_file: Optional JSONL path for per-dialogue scores
+            emit_callback: Optional (event_type, data) callback to emit log messages for frontend progress
+            yield_callback: Optional no-arg callback to yield to the event loop
+            on_partial: Optional callback receiving partial results after each chunk
+
+        Returns:
+            Dictionary with all evaluation metrics
+        """
+        _log, _yield = self._progress_callbacks(emit_callback, yield_callback)
+        chunk_size = max(1, chunk_size or self.config.eval_chunk_size)
+        started = time.perf_counter()
         
-        # 4. BERTScore Semantic Similarity (if reference dialogues provided)
+        ref_by_domain = self._group_by_domain(reference_dialogues or [])
+        contexts = {}
         if reference_dialogues:
-            _log("Computing BERTScore semantic similarity...")
-            bertscore_results = self._compute_bertscore_similarity(dialogues, reference_dialogues, yield_callback=yield_callback)
-            results["metrics"]["bertscore_similarity"] = bertscore_results
+            contexts["bleu"] = self._bleu_context(reference_dialogues)
+            if BERTSCORE_AVAILABLE:
+                contexts["bertscore"] = self._bertscore_context(reference_dialogues)
+            else:
+                logger.warning("BERTScore not available. Skipping semantic similarity computation.")
+        judge = self._dialogue_judge() if use_llm_judge else None
+        state = self._stream_state(reference_dialogues, use_llm_judge)
         
-        # 5. BLEU Score (if reference dialogues provided)
+        spill = ScoreSpill(scores_file) if scores_file else None
+        try:
+            for chunk in iter_chunks(dialogues, chunk_size):
+                self._fold_chunk(state, chunk, ref_by_domain, contexts, judge, spill, _yield)
+                # Analysis records are only needed while their chunk is evaluated (references stay cached)
+                self.analyzer.discard(chunk)
+                self.keyword_scans.discard(chunk)
+                _log(f"Evaluated {state['dialogues']} dialogues ({state['chunks']} chunks)")
+                if on_partial:
+                    on_partial({
+                        "dialogues_processed": state["dialogues"],
+                        "chunks": state["chunks"],
+                        "metrics": self._stream_metrics(state, final=False),
+                    })
+        finally:
+            if spill:
+                spill.close()
+            if judge is not None and judge.store is not None:
+                judge.store.close()
+            # Reference records stay cached for the whole run
+            self._release_caches()
+        
+        metrics = self._stream_metrics(state, final=True)
+        results = {
+            "evaluation_timestamp": datetime.now().isoformat(),
+            "total_dialogues": state["dialogues"],
+            "chunk_size": chunk_size,
+            "metrics": metrics,
+            "metric_timings": {name: round(seconds, 3) for name, seconds in state["timings"].items()},
+            "evaluation_time": round(time.perf_counter() - started, 3),
+            "summary_table": self._generate_summary_table(metrics),
+        }
+        if spill:
+            results["individual_scores_file"] = str(spill.path)
+        return results
+    
+    def _stream_state(
+        self,
+        reference_dialogues: Optional[List[Dict[str, Any]]],
+        use_llm_judge: bool
+    ) -> Dict[str, Any]:
+        """Empty mergeable aggregates for a streaming evaluation."""
+        state = {
+            "dialogues": 0,
+            "chunks": 0,
+            "timings": {},
+            "goal_completion": GroupedStats(),
+            "task_success": GroupedStats(),
+            "distinct_1": GroupedStats(),
+            "distinct_2": GroupedStats(),
+            "unigrams": HyperLogLog(),
+            "bigrams": HyperLogLog(),
+            "unigram_total": 0,
+            "bigram_total": 0,
+            "self_bleu_pool": ReservoirSample(STREAM_SELF_BLEU_POOL),
+            "turns": GroupedStats(),
+            "words": GroupedStats(),
+            "chars": GroupedStats(),
+            "repetition": GroupedStats(),
+            "response_gaps": GroupedStats(),
+            "advanced": self._advanced_counts(),
+            "real_diversity": None,
+            "references": bool(reference_dialogues),
+        }
         if reference_dialogues:
-            _log("Computing BLEU Scores...")
-            bleu_results = self._compute_bleu_scores(dialogues, reference_dialogues)
-            results["metrics"]["bleu_score"] = bleu_results
-        
-        # 6. Dialogue Length / Turns
-        _log("Computing dialogue length and turns...")
-        length_results = self._compute_dialogue_length_metrics(dialogues)
-        results["metrics"]["dialogue_length"] = length_results
-        
-        # 6. Repetition Rate
-        _log("Computing repetition rate...")
-        repetition_results = self._compute_repetition_rate(dialogues)
-        results["metrics"]["repetition_rate"] = repetition_results
-        
-        # 7. Response Time Tracking
-        _log("Computing response time metrics...")
-        response_time_results = self._compute_response_time_metrics(dialogues)
-        results["metrics"]["response_time"] = response_time_results
-        
-        # 8. LLM-as-a-Judge (if enabled)
+            # References are held in memory anyway: their diversity is computed once, up front
+            state["real_diversity"] = mean_distinct(
+                c["ratios"] for c in self._contributions(
+                    "lexical_diversity@1", reference_dialogues, self._diversity_contributions
+                )
+            )
+            state["bertscore"] = GroupedStats()
+            state["bleu"] = GroupedStats()
         if use_llm_judge:
-            _log("Running LLM-as-a-Judge evaluation...")
-            llm_judge_results = self._compute_llm_judge_metrics(dialogues, yield_callback=yield_callback)
-            results["metrics"]["llm_judge"] = llm_judge_results
-
-        # 9. Advanced evaluation metrics (intent, slots, state tracking)
-        _log("Computing advanced evaluation metrics (intent, slots, state tracking)...")
-        advanced_metrics = self._compute_advanced_evaluation_metrics(dialogues)
-        results["metrics"]["advanced_evaluation"] = advanced_metrics
+            state["llm_judge"] = {metric: GroupedStats() for metric in JUDGE_METRICS}
+        return state
+    
+    def _fold_chunk(
+        self,
+        state: Dict[str, Any],
+        chunk: List[Dict[str, Any]],
+        ref_by_domain: Dict[str, List[Dict[str, Any]]],
+        contexts: Dict[str, str],
+        judge: Optional[DialogueJudge],
+        spill: Optional[ScoreSpill],
+        on_wait: Callable[[], None]
+    ) -> None:
+        """Compute per-dialogue metric values of one chunk and fold them into the streaming state."""
+        timings = state["timings"]
+        
+        def timed(name: str, compute: Callable[[], Any]) -> Any:
+            start = time.perf_counter()
+            value = compute()
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+            on_wait()
+            return value
+        
+        completed = timed("goal_completion_rate", lambda: self._contributions(
+            "goal_completion@1", chunk, lambda batch: [self._is_goal_completed(d) for d in batch]
+        ))
+        successful = timed("task_success_rate", lambda: self._contributions(
+            "task_success@1", chunk,
+            lambda batch: [self._is_task_successful(d) for d in batch]
+        ))
+        diversity = timed("lexical_diversity", lambda: self._stream_diversity(state, chunk))
+        none = [None] * len(chunk)
+        bertscores = none
+        if "bertscore" in contexts:
+            bertscores = timed("bertscore_similarity", lambda: self._bertscore_best_matches(
+                chunk, ref_by_domain, contexts["bertscore"], yield_callback=on_wait
+            ))
+        bleus = none
+        if "bleu" in contexts:
+            bleus = timed("bleu_score", lambda: self._bleu_best_matches(chunk, ref_by_domain, contexts["bleu"]))
+        lengths = timed("dialogue_length", lambda: [self._dialogue_lengths(d) for d in chunk])
+        repetitions = timed("repetition_rate", lambda: self._contributions(
+            "repetition_rate@1", chunk, lambda batch: [self._dialogue_repetition_rate(d) for d in batch]
+        ))
+        gaps = timed("response_time", lambda: [self._response_gaps(d) for d in chunk])
+        judged = none
+        if judge is not None:
+            judged = timed("llm_judge", lambda: judge.judge_all(chunk, on_progress=lambda done, total: on_wait()))
+        timed("advanced_evaluation", lambda: [self._add_advanced_counts(state["advanced"], d) for d in chunk])
+        
+        rows = zip(chunk, completed, successful, diversity, bertscores, bleus, lengths, repetitions, gaps, judged)
+        for dialogue, is_completed, is_successful, ratios, bertscore, bleu, length, repetition, dialogue_gaps, scores in rows:
+            domain = dialogue.get("domain", "unknown")
+            state["goal_completion"].add(domain, 1.0 if is_completed else 0.0)
+            state["task_success"].add(domain, 1.0 if is_successful else 0.0)
+            if ratios is not None:
+                state["distinct_1"].add(domain, ratios[0])
+                state["distinct_2"].add(domain, ratios[1])
+            if bertscore is not None and bertscore > 0:
+                state["bertscore"].add(domain, bertscore)
+            if "bleu" in state and ref_by_domain.get(domain):
+                # Dialogues whose BLEU could not be computed count as 0.0
+                bleu = bleu if bleu is not None else 0.0
+                state["bleu"].add(domain, bleu)
+            for name, value in zip(("turns", "words", "chars"), length):
+                state[name].add(domain, value)
+            if repetition is not None:
+                state["repetition"].add(domain, repetition)
+            for gap in dialogue_gaps:
+                state["response_gaps"].add(domain, gap)
+            if scores:
+                for metric, score in scores.items():
+                    if metric in state["llm_judge"]:
+                        state["llm_judge"][metric].add(domain, score)
+            if spill:
+                spill.write({
+                    "dialogue_id": dialogue.get("dialogue_id"),
+                    "domain": domain,
+                    "goal_completed": bool(is_completed),
+                    "task_success": bool(is_successful),
+                    "distinct_1": ratios[0] if ratios is not None else None,
+                    "distinct_2": ratios[1] if ratios is not None else None,
+                    "bertscore": bertscore,
+                    "bleu": bleu,
+                    "turns": length[0],
+                    "words": length[1],
+                    "chars": length[2],
+                    "repetition_rate": repetition,
+                    "llm_judge": scores,
+                })
+        
+        state["dialogues"] += len(chunk)
+        state["chunks"] += 1
+    
+    def _stream_diversity(self, state: Dict[str, Any], chunk: List[Dict[str, Any]]) -> List[Optional[Tuple[float, float]]]:
+        """Fold a chunk's n-gram sketches and self-BLEU sample into the state; returns Distinct-1/2 per dialogue."""
+        contributions = self._contributions("lexical_diversity@1", chunk, self._diversity_contributions)
+        for contribution in contributions:
+            state["unigrams"].merge_sparse(contribution["unigrams"])
+            state["bigrams"].merge_sparse(contribution["bigrams"])
+            state["unigram_total"] += contribution["tokens"]
+            state["bigram_total"] += max(contribution["tokens"] - 1, 0)
+        if "self-bleu" in getattr(self.config, "diversity_metrics", []):
+            for record in self.analyzer.analyze_all(chunk):
+                state["self_bleu_pool"].add(self._bleu_tokens(record))
+        return [c["ratios"] for c in contributions]
+    
+    def _stream_metrics(self, state: Dict[str, Any], final: bool) -> Dict[str, Any]:
+        """Metrics (same layout as evaluate_dialogues, without per-dialogue lists) from the streaming state."""
+        metrics = {}
+        
+        def rate(stats: GroupedStats, done: str, pct: str) -> Dict[str, Any]:
+            def counts(s: RunningStats) -> Dict[str, Any]:
+                hits = int(round(s.total))
+                return {done: hits, "total": s.count, "percentage": (hits / s.count * 100) if s.count else 0.0}
+            overall = counts(stats.overall)
+            return {
+                f"overall_{pct}": overall["percentage"],
+                f"{done}_count": overall[done],
+                "total_count": overall["total"],
+                f"domain_{pct}": {domain: counts(s) for domain, s in stats.groups.items()},
+            }
         
-        # Generate summary table
-        results["summary_table"] = self._generate_summary_table(results["metrics"])
+        metrics["goal_completion_rate"] = rate(state["goal_completion"], "completed", "gcr")
+        metrics["task_success_rate"] = rate(state["task_success"], "successful", "tsr")
         
-        return results
+        def distinct(d1: RunningStats, d2: RunningStats) -> Dict[str, float]:
+            return {"distinct_1": d1.mean, "distinct_2": d2.mean, "combined": (d1.mean + d2.mean) / 2}
+        
+        synthetic_diversity = distinct(state["distinct_1"].overall, state["distinct_2"].overall)
+        real_diversity = state["real_diversity"]
+        diversity_ratio = None
+        if real_diversity and real_diversity["combined"] > 0:
+            diversity_ratio = synthetic_diversity["combined"] / real_diversity["combined"]
+        self_bleu = None
+        if final and "self-bleu" in getattr(self.config, "diversity_metrics", []):
+            engine = BLEUEngine()
+            self_bleu = engine.self_bleu(engine.table(state["self_bleu_pool"].items))
+        metrics["lexical_diversity"] = {
+            **synthetic_diversity,
+            "target_diversity": 0.46,  # From research paper
+            "real_diversity": real_diversity,
+            "diversity_ratio": diversity_ratio,
+            "domain_diversity": {
+                domain: distinct(d1, state["distinct_2"].groups[domain])
+                for domain, d1 in state["distinct_1"].groups.items()
+            },
+            "corpus_distinct_1": state["unigrams"].estimate() / state["unigram_total"] if state["unigram_total"] else 0.0,
+            "corpus_distinct_2": state["bigrams"].estimate() / state["bigram_total"] if state["bigram_total"] else 0.0,
+            "self_bleu": self_bleu,
+            "self_bleu_sample": len(state["self_bleu_pool"].items),
+            "note": "Measures lexical diversity using Distinct-1 (unique unigrams/total) and Distinct-2 (unique bigrams/total). Target: 0.46"
+        }
+        
+        def summary(stats: RunningStats, mean: str, std: str) -> Dict[str, Any]:
+            return {mean: stats.mean, std: stats.std(), "count": stats.count}
+        
+        if state["references"]:
+            if BERTSCORE_AVAILABLE:
+                bertscore = state["bertscore"]
+                metrics["bertscore_similarity"] = {
+                    "overall_bertscore": bertscore.overall.mean,
+                    "std_bertscore": bertscore.overall.std(),
+                    "domain_bertscores": {d: summary(s, "mean", "std") for d, s in bertscore.groups.items()},
+                    "target_score": 0.71,  # From research paper
+                    "note": "Measures semantic similarity to MultiWOZ reference dialogues. Target: 0.71"
+                }
+            else:
+                metrics["bertscore_similarity"] = {
+                    "overall_bertscore": 0.0,
+                    "std_bertscore": 0.0,
+                    "target_score": 0.71,
+                    "note": "BERTScore not installed. Install with: pip install bert-score"
+                }
+            bleu = state["bleu"]
+            metrics["bleu_score"] = {
+                "average_bleu": bleu.overall.mean,
+                "std_bleu": bleu.overall.std(),
+                "domain_bleu": {d: summary(s, "mean", "std") for d, s in bleu.groups.items()}
+            }
+        
+        turns, words, chars = state["turns"], state["words"], state["chars"]
+        metrics["dialogue_length"] = {
+            "avg_turns": turns.overall.mean,
+            "std_turns": turns.overall.std(ddof=1),
+            "avg_words": words.overall.mean,
+            "std_words": words.overall.std(ddof=1),
+            "avg_chars": chars.overall.mean,
+            "std_chars": chars.overall.std(ddof=1),
+            "min_turns": int(turns.overall.min or 0),
+            "max_turns": int(turns.overall.max or 0),
+            "num_dialogues": turns.overall.count,
+            "domain_metrics": {
+                domain: {
+                    "avg_turns": s.mean,
+                    "avg_words": words.groups[domain].mean,
+                    "avg_chars": chars.groups[domain].mean
+                }
+                for domain, s in turns.groups.items()
+            },
+            "note": "Std dev is 0.0 if all dialogues have identical turn counts, or if only 1 dialogue was evaluated"
+        }
+        
+        repetition = state["repetition"]
+        metrics["repetition_rate"] = {
+            "overall_repetition_rate": repetition.overall.mean,
+            "std_repetition_rate": repetition.overall.std(),
+            "domain_repetition": {
+                d: summary(s, "avg_repetition", "std_repetition") for d, s in repetition.groups.items()
+            }
+        }
+        
+        gaps = state["response_gaps"]
+        if not gaps.overall.count:
+            metrics["response_time"] = {
+                "overall_avg_seconds": 0.0,
+                "overall_std_seconds": 0.0,
+                "min_seconds": 0.0,
+                "max_seconds": 0.0,
+                "num_gaps": 0,
+                "domain_metrics": {},
+                "note": "No valid timestamps found; response time metrics default to 0."
+            }
+        else:
+            # Cap min at 0.1s: sub-second gaps are artifacts (e.g. injected turns with same datetime.now())
+            metrics["response_time"] = {
+                "overall_avg_seconds": gaps.overall.mean,
+                "overall_std_seconds": gaps.overall.std(),
+                "min_seconds": max(GAP_FLOOR_SECONDS, gaps.overall.min),
+                "max_seconds": gaps.overall.max,
+                "num_gaps": gaps.overall.count,
+                "domain_metrics": {
+                    domain: {
+                        "avg_seconds": s.mean,
+                        "std_seconds": s.std(),
+                        "min_seconds": max(GAP_FLOOR_SECONDS, s.min),
+                        "max_seconds": s.max,
+                        "num_gaps": s.count,
+                    }
+                    for domain, s in gaps.groups.items()
+                },
+                "note": "Inter-turn gaps from generation timestamps (not wall-clock). Min is floored at 0.1s to ignore artifact gaps."
+            }
+        
+        if "llm_judge" in state:
+            judge = state["llm_judge"]
+            domains = []
+            for stats in judge.values():
+                domains += [domain for domain in stats.groups if domain not in domains]
+            metrics["llm_judge"] = {
+                "overall_scores": {metric: summary(s.overall, "mean", "std") for metric, s in judge.items()},
+                "domain_scores": {
+                    domain: {
+                        metric: {
+                            "mean": s.groups[domain].mean if domain in s.groups else 0.0,
+                            "std": s.groups[domain].std() if domain in s.groups else 0.0
+                        }
+                        for metric, s in judge.items()
+                    }
+                    for domain in domains
+                }
+            }
+        
+        metrics["advanced_evaluation"] = (
+            self._advanced_result(state["advanced"]) if state["dialogues"] else
+            {"intent_consistency": {}, "slot_coverage": {}, "state_tracking": {}}
+        )
+        return metrics
+    
+    @staticmethod
+    def _progress_callbacks(
+        emit_callback: Optional[Callable[[str, Dict[str, Any]], None]],
+        yield_callback: Optional[Callable[[], None]]
+    ) -> Tuple[Callable[[str], None], Callable[[], None]]:
+        """(log, yield) functions that never raise: log also emits to the frontend and yields."""
+        def _yield() -> None:
+            if yield_callback:
+                try:
+                    yield_callback()
+                except Exception:
+                    pass
+
+        def _log(msg: str) -> None:
+            logger.info(msg)
+            if emit_callback:
+                try:
+                    emit_callback('log', {'message': msg, 'step': 'evaluation', 'level': 'info'})
+                except Exception:
+                    pass
+            _yield()
+
+        return _log, _yield
 
     def _compute_advanced_evaluation_metrics(
         self,
@@ -257,82 +740,71 @@ class ComprehensiveDialogueEvaluator:
                 "state_tracking": {},
             }
 
-        # Intent categories based on goal text
-        intent_categories = {
-            "booking": ["book", "reserve", "reservation", "ticket"],
-            "search": ["find", "search", "looking for", "look for"],
-            "info": ["information", "details", "tell me", "explain"],
-        }
-
-        intent_counts = {name: 0 for name in intent_categories.keys()}
-        intent_success = {name: 0 for name in intent_categories.keys()}
-
-        slot_hits = 0
-        slot_total = 0
-
-        state_consistent_count = 0
-        state_total = 0
-
+        counts = self._advanced_counts()
         for dialogue in dialogues:
-            goal = (dialogue.get("goal") or "").lower()
-            turns = dialogue.get("turns", [])
-            text = " ".join(t.get("text", "").lower() for t in turns)
+            self._add_advanced_counts(counts, dialogue)
+        return self._advanced_result(counts)
+    
+    @staticmethod
+    def _advanced_counts() -> Dict[str, Any]:
+        """Empty intent / slot / state-tracking counters for the advanced evaluation metrics."""
+        return {
+            "intent_counts": {name: 0 for name in INTENT_CATEGORIES},
+            "intent_success": {name: 0 for name in INTENT_CATEGORIES},
+            "slot_hits": 0,
+            "slot_total": 0,
+            "state_consistent": 0,
+            "state_total": 0,
+        }
+    
+    def _add_advanced_counts(self, counts: Dict[str, Any], dialogue: Dict[str, Any]) -> None:
+        """Fold one dialogue into the advanced evaluation counters."""
+        scan = self._keyword_scan(dialogue)
 
-            # --- Intent consistency ---
-            matched_intents = []
-            for name, keywords in intent_categories.items():
-                if any(k in goal for k in keywords):
-                    matched_intents.append(name)
-                    intent_counts[name] += 1
+        # --- Intent consistency ---
+        for name, keywords in INTENT_CATEGORIES.items():
+            if scan.goal.has_any(keywords):
+                counts["intent_counts"][name] += 1
 
-                    # Check if similar intent words appear in dialogue text
-                    if any(k in text for k in keywords):
-                        intent_success[name] += 1
+                # Check if similar intent words appear in dialogue text
+                if scan.dialogue.has_any(keywords):
+                    counts["intent_success"][name] += 1
 
-            # --- Slot coverage (very simple heuristic) ---
-            # Count how many constraint-like tokens from goal appear in dialogue
-            for token in goal.split():
-                if token.isdigit():
-                    slot_total += 1
-                    if token in text:
-                        slot_hits += 1
-                elif token in ["morning", "evening", "tonight", "today", "tomorrow"]:
-                    slot_total += 1
-                    if token in text:
-                        slot_hits += 1
-
-            # --- State tracking (consistency) ---
-            # Heuristic: penalize if obvious contradictions appear
-            if turns:
-                state_total += 1
-                lower_text = text
-                inconsistent = any(
-                    phrase in lower_text
-                    for phrase in [
-                        "i thought you said",
-                        "you already told me",
-                        "that contradicts",
-                        "earlier you said",
-                    ]
-                )
-                if not inconsistent:
-                    state_consistent_count += 1
+        # --- Slot coverage (very simple heuristic) ---
+        # Count how many constraint-like tokens from goal appear in dialogue
+        for token in scan.goal.text.split():
+            if token.isdigit() or token in SLOT_TIME_WORDS:
+                counts["slot_total"] += 1
+                if scan.dialogue.has(token):
+                    counts["slot_hits"] += 1
 
+        # --- State tracking (consistency) ---
+        # Heuristic: penalize if obvious contradictions appear
+        if scan.turn_texts:
+            counts["state_total"] += 1
+            if not scan.dialogue.has_any(CONTRADICTION_PHRASES):
+                counts["state_consistent"] += 1
+    
+    @staticmethod
+    def _advanced_result(counts: Dict[str, Any]) -> Dict[str, Any]:
+        """Advanced evaluation metrics from folded counters."""
         intent_metrics = {}
-        for name, total in intent_counts.items():
+        for name, total in counts["intent_counts"].items():
             if total > 0:
                 intent_metrics[name] = {
                     "count": total,
-                    "aligned": intent_success[name],
-                    "consistency": intent_success[name] / total,
+                    "aligned": counts["intent_success"][name],
+                    "consistency": counts["intent_success"][name] / total,
                 }
 
+        slot_hits, slot_total = counts["slot_hits"], counts["slot_total"]
         slot_coverage = {
             "hits": slot_hits,
             "total": slot_total,
             "coverage": (slot_hits / slot_total) if slot_total > 0 else 0.0,
         }
 
+        state_consistent_count, state_total = counts["state_consistent"], counts["state_total"]
         state_tracking = {
             "total_dialogues": state_total,
             "consistent": state_consistent_count,
@@ -354,18 +826,11 @@ class ComprehensiveDialogueEvaluator:
         completed_count = 0
         domain_stats = {}
         
-        for dialogue in dialogues:
+        verdicts = self._contributions(
+            "goal_completion@1", dialogues, lambda batch: [self._is_goal_completed(d) for d in batch]
+        )
+        for dialogue, is_completed in zip(dialogues, verdicts):
             domain = dialogue.get("domain", "unknown")
-            goal = dialogue.get("goal", "")
-            goal_data = dialogue.get("goal_data", {})
-            turns = dialogue.get("turns", [])
-            
-            # Extract goal constraints and requestables
-            constraints = self._extract_goal_constraints(goal, goal_data)
-            requestables = self._extract_goal_requestables(goal, goal_data)
-            
-            # Check if goal is completed
-            is_completed = self._check_goal_completion(turns, constraints, requestables)
             
             if is_completed:
                 completed_count += 1
@@ -395,6 +860,23 @@ class ComprehensiveDialogueEvaluator:
             "domain_gcr": domain_gcr
         }
     
+    def _is_goal_completed(self, dialogue: Dict[str, Any]) -> bool:
+        """Whether all goal constraints and requestables are fulfilled in the dialogue."""
+        goal = dialogue.get("goal", "")
+        goal_data = dialogue.get("goal_data", {})
+        
+        # Extract goal constraints and requestables
+        constraints = self._extract_goal_constraints(goal, goal_data)
+        requestables = self._extract_goal_requestables(goal, goal_data)
+        
+        return self._check_goal_completion(
+            dialogue.get("turns", []), constraints, requestables, scan=self._keyword_scan(dialogue)
+        )
+    
+    def _keyword_scan(self, dialogue: Dict[str, Any]) -> DialogueScan:
+        """Keyword scan of a dialogue, shared by GCR, TSR and the advanced metrics."""
+        return self.keyword_scans.scan(dialogue)
+    
     def _extract_goal_constraints(self, goal: str, goal_data: Dict[str, Any]) -> Dict[str, Any]:
         """Extract constraints from goal text or goal_data."""
         constraints = {}
@@ -408,15 +890,9 @@ class ComprehensiveDialogueEvaluator:
         # If not found, try to parse from goal text
         if not constraints:
             # Look for common constraint patterns
-            constraint_patterns = {
-                "area": r"(?:area|location|in|near)\s*(?:is|:|=)?\s*([a-z]+)",
-                "price": r"(?:price|price range|budget)\s*(?:is|:|=)?\s*([a-z]+)",
-                "type": r"(?:type|kind|style)\s*(?:is|:|=)?\s*([a-z]+)",
-            }
-            
             goal_lower = goal.lower()
-            for key, pattern in constraint_patterns.items():
-                match = re.search(pattern, goal_lower)
+            for key, pattern in CONSTRAINT_PATTERNS.items():
+                match = pattern.search(goal_lower)
                 if match:
                     if "domain" not in constraints:
                         constraints["domain"] = {}
@@ -437,11 +913,7 @@ class ComprehensiveDialogueEvaluator:
         # If not found, look for common requestable patterns
         if not requestables:
             goal_lower = goal.lower()
-            common_requestables = [
-                "phone", "address", "postcode", "reference number",
-                "price", "availability", "time", "date"
-            ]
-            for req in common_requestables:
+            for req in COMMON_REQUESTABLES:
                 if req in goal_lower:
                     requestables.append(req)
         
@@ -451,14 +923,15 @@ class ComprehensiveDialogueEvaluator:
         self,
         turns: List[Dict[str, str]],
         constraints: Dict[str, Any],
-        requestables: List[str]
+        requestables: List[str],
+        scan: Optional[DialogueScan] = None
     ) -> bool:
         """Check if goal constraints and requestables are satisfied in dialogue."""
         if not turns:
             return False
         
-        # Combine all dialogue text
-        dialogue_text = " ".join([turn.get("text", "").lower() for turn in turns])
+        # Lowercased dialogue text and its keyword hits
+        scan = scan or scan_dialogue("", turns)
         
         # Check constraints
         constraints_satisfied = True
@@ -466,9 +939,9 @@ class ComprehensiveDialogueEvaluator:
             if isinstance(domain_constraints, dict):
                 for key, value in domain_constraints.items():
                     # Check if constraint value appears in dialogue
-                    if value and value.lower() not in dialogue_text:
+                    if value and not scan.dialogue.has(value.lower()):
                         # Also check for synonyms
-                        if not self._check_synonym(value.lower(), dialogue_text):
+                        if not self._check_synonym(value.lower(), scan):
                             constraints_satisfied = False
                             break
         
@@ -477,7 +950,7 @@ class ComprehensiveDialogueEvaluator:
         if requestables:
             satisfied_count = 0
             for req in requestables:
-                if req.lower() in dialogue_text or self._check_synonym(req, dialogue_text):
+                if scan.dialogue.has(req.lower()) or self._check_synonym(req, scan):
                     satisfied_count += 1
             
             # Require at least 50% of requestables to be satisfied
@@ -485,38 +958,13 @@ class ComprehensiveDialogueEvaluator:
                 requestables_satisfied = (satisfied_count / len(requestables)) >= 0.5
         
         # Check for completion indicators
-        completion_keywords = [
-            "thank you", "thanks", "perfect", "great", "excellent",
-            "booked", "confirmed", "reserved", "done", "completed",
-            "that's exactly what I needed", "sounds good", "that works"
-        ]
-        has_completion = any(keyword in dialogue_text for keyword in completion_keywords)
+        has_completion = scan.dialogue.has_any(GOAL_COMPLETION_KEYWORDS)
         
         return constraints_satisfied and requestables_satisfied and has_completion
     
-    def _check_synonym(self, word: str, text: str) -> bool:
-        """Check if word or its synonyms appear in text."""
-        # Simple synonym mapping
-        synonyms = {
-            "centre": ["center", "central", "downtown"],
-            "cheap": ["inexpensive", "affordable", "budget"],
-            "expensive": ["pricey", "costly", "high-end"],
-            "north": ["northern"],
-            "south": ["southern"],
-            "east": ["eastern"],
-            "west": ["western"]
-        }
-        
-        if word in text:
-            return True
-        
-        for synonym_list in synonyms.values():
-            if word in synonym_list:
-                for syn in synonym_list:
-                    if syn in text:
-                        return True
-        
-        return False
+    def _check_synonym(self, word: str, scan: DialogueScan) -> bool:
+        """Check if word or its synonyms appear in the scanned dialogue."""
+        return scan.synonym_mentioned(word)
     
     def _compute_task_success_rate(self, dialogues: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
@@ -527,13 +975,13 @@ class ComprehensiveDialogueEvaluator:
         successful_count = 0
         domain_stats = {}
         
-        for dialogue in dialogues:
+        # Judge task success based on multiple factors
+        verdicts = self._contributions(
+            "task_success@1", dialogues,
+            lambda batch: [self._is_task_successful(d) for d in batch]
+        )
+        for dialogue, is_successful in zip(dialogues, verdicts):
             domain = dialogue.get("domain", "unknown")
-            goal = dialogue.get("goal", "")
-            turns = dialogue.get("turns", [])
-            
-            # Judge task success based on multiple factors
-            is_successful = self._judge_task_success(goal, turns)
             
             if is_successful:
                 successful_count += 1
@@ -563,65 +1011,62 @@ class ComprehensiveDialogueEvaluator:
             "domain_tsr": domain_tsr
         }
     
-    def _judge_task_success(self, goal: str, turns: List[Dict[str, str]]) -> bool:
+    def _is_task_successful(self, dialogue: Dict[str, Any]) -> bool:
+        """Judge task success of a dialogue from its shared keyword scan."""
+        return self._judge_task_success(
+            dialogue.get("goal", ""), dialogue.get("turns", []), scan=self._keyword_scan(dialogue)
+        )
+    
+    def _judge_task_success(
+        self,
+        goal: str,
+        turns: List[Dict[str, str]],
+        scan: Optional[DialogueScan] = None
+    ) -> bool:
         """Judge if task was successful based on goal and dialogue turns."""
         if not turns or not goal:
             return False
         
-        dialogue_text = " ".join([turn.get("text", "").lower() for turn in turns])
-        goal_lower = goal.lower()
+        scan = scan or scan_dialogue(goal, turns)
         
         # Extract key intent from goal
         intent_keywords = []
-        if "book" in goal_lower or "reserve" in goal_lower:
-            intent_keywords.extend(["book", "reserve", "booking", "reservation"])
-        if "find" in goal_lower or "search" in goal_lower:
-            intent_keywords.extend(["find", "search", "looking for"])
-        if "information" in goal_lower or "details" in goal_lower:
-            intent_keywords.extend(["information", "details", "tell me"])
+        for goal_words, keywords in TASK_INTENTS:
+            if scan.goal.has_any(goal_words):
+                intent_keywords.extend(keywords)
         
         # Check if intent appears to be fulfilled
         intent_fulfilled = False
         if intent_keywords:
             # Check if any intent keyword appears and is followed by completion
             for keyword in intent_keywords:
-                if keyword in dialogue_text:
-                    # Look for confirmation after intent
-                    idx = dialogue_text.find(keyword)
-                    subsequent_text = dialogue_text[idx:idx+200]  # Next 200 chars
-                    if any(word in subsequent_text for word in ["yes", "confirmed", "done", "booked", "found"]):
+                idx = scan.dialogue.first(keyword)
+                if idx is not None:
+                    # Look for confirmation in the next 200 chars after the intent
+                    if scan.dialogue.has_any_within(CONFIRMATION_WORDS, idx, idx + CONFIRMATION_WINDOW):
                         intent_fulfilled = True
                         break
         else:
             # If no specific intent, check for general completion
-            intent_fulfilled = any(word in dialogue_text for word in ["thank", "perfect", "great", "excellent"])
+            intent_fulfilled = scan.dialogue.has_any(GENERAL_COMPLETION_WORDS)
         
         # Check for sufficient dialogue length (at least 4 turns)
         has_sufficient_length = len(turns) >= 4
         
-        # Check for user satisfaction indicators (expanded for better task success rate)
-        user_turns = [t for t in turns if t.get("role", "").lower() == "user"]
-        last_user_turn = user_turns[-1] if user_turns else {}
-        last_user_text = last_user_turn.get("text", "").lower()
-        
-        has_satisfaction = any(word in last_user_text for word in [
-            "thank", "thanks", "perfect", "great", "excellent", "good", "sounds good",
-            "all set", "that works", "that'll work", "appreciate it", "that's great"
-        ])
+        # Check for user satisfaction indicators in the last user turn (expanded for better task success rate)
+        user_turns = [i for i, t in enumerate(turns) if t.get("role", "").lower() == "user"]
+        has_satisfaction = bool(user_turns) and scan.turn_has_any(user_turns[-1], SATISFACTION_WORDS)
         
         # Success if: (intent fulfilled and satisfaction) OR (sufficient length and clear satisfaction)
         return (intent_fulfilled and has_satisfaction) or (has_sufficient_length and has_satisfaction)
     
-    # Fallback BERTScore model when DeBERTa hits "int too big to convert" (tokenizer/config)
-    BERTSCORE_FALLBACK_MODEL = "bert-base-uncased"
-
     def _compute_bertscore_similarity(
         self,
         dialogues: List[Dict[str, Any]],
         reference_dialogues: List[Dict[str, Any]],
         yield_callback: Optional[Callable[[], None]] = None
     ) -> Dict[str, Any]:
-        """Compute BERTScore in one batched call so the model loads once (not per-pair)."""
+        """Compute best-match BERTScore per domain on the shared engine, over each dialogue's top-k nearest references."""
         if yield_callback:
             try:
                 yield_callback()
@@ -640,38 +1085,9 @@ class ComprehensiveDialogueEvaluator:
         bert_scores: List[float] = []
         domain_scores: Dict[str, List[float]] = {}
         
-        ref_by_domain: Dict[str, List[Dict[str, Any]]] = {}
-        for ref_dialogue in reference_dialogues:
-            domain = ref_dialogue.get("domain", "unknown")
-            if domain not in ref_by_domain:
-                ref_by_domain[domain] = []
-            ref_by_domain[domain].append(ref_dialogue)
-        
-        max_chars = 1000
-        model_type = self.config.bertscore_model if hasattr(self.config, 'bertscore_model') else 'microsoft/deberta-xlarge-mnli'
-        cands: List[str] = []
-        refs_list: List[str] = []
-        pair_dialogue_idx: List[int] = []
-        eligible: List[Tuple[str, int]] = []  # (domain, count of refs for this dialogue)
+        ref_by_domain = self._group_by_domain(reference_dialogues)
         
-        for dialogue in dialogues:
-            domain = dialogue.get("domain", "unknown")
-            if domain not in ref_by_domain or not ref_by_domain[domain]:
-                continue
-            gen_text = self._extract_dialogue_text(dialogue)
-            gen_trunc = gen_text[:max_chars] if len(gen_text) > max_chars else gen_text
-            local_idx = len(eligible)
-            n_refs = 0
-            for ref_dialogue in ref_by_domain[domain][:10]:
-                ref_text = self._extract_dialogue_text(ref_dialogue)
-                ref_trunc = ref_text[:max_chars] if len(ref_text) > max_chars else ref_text
-                cands.append(gen_trunc)
-                refs_list.append(ref_trunc)
-                pair_dialogue_idx.append(local_idx)
-                n_refs += 1
-            eligible.append((domain, n_refs))
-        
-        if not cands:
+        if not any(dialogue.get("domain", "unknown") in ref_by_domain for dialogue in dialogues):
             return {
                 "overall_bertscore": 0.0,
                 "std_bertscore": 0.0,
@@ -681,51 +1097,15 @@ class ComprehensiveDialogueEvaluator:
                 "note": "Measures semantic similarity to MultiWOZ reference dialogues. Target: 0.71"
             }
         
-        def run_batch(c_list: List[str], r_list: List[str], model: str):
-            P, R, F1 = bert_score(c_list, r_list, model_type=model, verbose=False, lang="en")
-            return F1
-        
-        f1_tensor = None
-        if yield_callback:
-            try:
-                yield_callback()
-            except Exception:
-                pass
-        try:
-            f1_tensor = run_batch(cands, refs_list, model_type)
-        except (OverflowError, ValueError, Exception) as e:
-            err_str = str(e).lower()
-            if "int too big to convert" in err_str or "overflow" in err_str:
-                for cap in [400, 200]:
-                    try:
-                        c = [s[:cap] if len(s) > cap else s for s in cands]
-                        r = [s[:cap] if len(s) > cap else s for s in refs_list]
-                        f1_tensor = run_batch(c, r, model_type)
-                        break
-                    except (OverflowError, ValueError, Exception):
-                        continue
-                if f1_tensor is None:
-                    try:
-                        c = [s[:512] if len(s) > 512 else s for s in cands]
-                        r = [s[:512] if len(s) > 512 else s for s in refs_list]
-                        f1_tensor = run_batch(c, r, self.BERTSCORE_FALLBACK_MODEL)
-                    except Exception as fe:
-                        logger.warning("Error computing BERTScore (fallback model): %s", fe)
-            elif "int too big to convert" not in err_str and "overflow" not in err_str:
-                logger.warning("Error computing BERTScore: %s", e)
-        
-        if f1_tensor is not None:
-            best_per_dialogue: Dict[int, float] = {}
-            for i, local_idx in enumerate(pair_dialogue_idx):
-                s = float(f1_tensor[i].item())
-                best_per_dialogue[local_idx] = max(best_per_dialogue.get(local_idx, 0.0), s)
-            for local_idx, (domain, _) in enumerate(eligible):
-                best = best_per_dialogue.get(local_idx, 0.0)
-                if best > 0:
-                    bert_scores.append(best)
-                    if domain not in domain_scores:
-                        domain_scores[domain] = []
-                    domain_scores[domain].append(best)
+        context = self._bertscore_context(reference_dialogues)
+        best_scores = self._bertscore_best_matches(dialogues, ref_by_domain, context, yield_callback=yield_callback)
+        for dialogue, best in zip(dialogues, best_scores):
+            if best is not None and best > 0:
+                domain = dialogue.get("domain", "unknown")
+                bert_scores.append(float(best))
+                if domain not in domain_scores:
+                    domain_scores[domain] = []
+                domain_scores[domain].append(float(best))
         
         avg_bertscore = np.mean(bert_scores) if bert_scores else 0.0
         std_bertscore = np.std(bert_scores) if bert_scores else 0.0
@@ -747,6 +1127,63 @@ class ComprehensiveDialogueEvaluator:
             "note": "Measures semantic similarity to MultiWOZ reference dialogues. Target: 0.71"
         }
     
+    @staticmethod
+    def _group_by_domain(dialogues: List[Dict[str, Any]]) -> Dict[str, List[Dict[str, Any]]]:
+        """Dialogues grouped by domain, in order."""
+        by_domain: Dict[str, List[Dict[str, Any]]] = {}
+        for dialogue in dialogues:
+            by_domain.setdefault(dialogue.get("domain", "unknown"), []).append(dialogue)
+        return by_domain
+    
+    def _bertscore_model(self) -> str:
+        return self.config.bertscore_model if hasattr(self.config, 'bertscore_model') else 'microsoft/deberta-xlarge-mnli'
+    
+    def _bertscore_context(self, reference_dialogues: List[Dict[str, Any]]) -> str:
+        """Stored best-match BERTScores stay valid while model, top-k, truncation and references are unchanged."""
+        return fingerprint(reference_dialogues, self._bertscore_model(), self.config.reference_top_k, BERTSCORE_MAX_CHARS)
+    
+    def _bertscore_best_matches(
+        self,
+        dialogues: List[Dict[str, Any]],
+        ref_by_domain: Dict[str, List[Dict[str, Any]]],
+        context: str,
+        yield_callback: Optional[Callable[[], None]] = None
+    ) -> List[Optional[float]]:
+        """Best F1 of each dialogue against its domain's top-k nearest references (None without references)."""
+        max_chars = BERTSCORE_MAX_CHARS
+        model_type = self._bertscore_model()
+        
+        def compute(batch: List[Dict[str, Any]]) -> List[Optional[float]]:
+            # None where the domain has no references or scoring is unavailable
+            best: List[Optional[float]] = [None] * len(batch)
+            rows_by_domain: Dict[str, List[int]] = {}
+            for i, dialogue in enumerate(batch):
+                domain = dialogue.get("domain", "unknown")
+                if ref_by_domain.get(domain):
+                    rows_by_domain.setdefault(domain, []).append(i)
+            for domain, rows in rows_by_domain.items():
+                if yield_callback:
+                    try:
+                        yield_callback()
+                    except Exception:
+                        pass
+                cands = [self._extract_dialogue_text(batch[i])[:max_chars] for i in rows]
+                refs = [self._extract_dialogue_text(d)[:max_chars] for d in ref_by_domain[domain]]
+                best_scores = best_match_f1(
+                    cands, refs, model_type,
+                    cache_dir=self.config.embedding_cache_dir(),
+                    cache_max_bytes=self.config.embedding_cache_max_mb * 1024 * 1024,
+                    top_k=self.config.reference_top_k
+                )
+                if best_scores is None:
+                    continue
+                for i, score in zip(rows, best_scores):
+                    best[i] = float(score)
+            return best
+        
+        # A dialogue's best match depends only on it and the references: reuse scores while both are unchanged
+        return self._contributions("bertscore_best@1", dialogues, compute, context)
+    
     def _compute_lexical_diversity(
         self,
         dialogues: List[Dict[str, Any]],
@@ -755,37 +1192,56 @@ class ComprehensiveDialogueEvaluator:
         """Compute lexical diversity metrics (Distinct-1 and Distinct-2)."""
         logger.info("Computing lexical diversity metrics...")
         
-        # Extract all dialogue texts
-        synthetic_texts = [self._extract_dialogue_text(d) for d in dialogues]
+        # Per-dialogue Distinct-1/2 ratios and n-gram sketches (stored, so only new dialogues are tokenized)
+        contributions = self._contributions("lexical_diversity@1", dialogues, self._diversity_contributions)
         
         # Compute diversity for synthetic dialogues
-        synthetic_diversity = self._compute_dialogue_diversity(synthetic_texts)
+        synthetic_diversity = mean_distinct(c["ratios"] for c in contributions)
+        
+        # Corpus-level Distinct-1/2: distinct n-grams of all dialogues (merged HyperLogLog sketches) / total n-grams
+        unigram_sketch, bigram_sketch = HyperLogLog(), HyperLogLog()
+        for contribution in contributions:
+            unigram_sketch.merge_sparse(contribution["unigrams"])
+            bigram_sketch.merge_sparse(contribution["bigrams"])
+        total_unigrams = sum(c["tokens"] for c in contributions)
+        total_bigrams = sum(max(c["tokens"] - 1, 0) for c in contributions)
+        corpus_distinct_1 = unigram_sketch.estimate() / total_unigrams if total_unigrams else 0.0
+        corpus_distinct_2 = bigram_sketch.estimate() / total_bigrams if total_bigrams else 0.0
         
         # Compute diversity for reference dialogues if available
         real_diversity = None
         if reference_dialogues:
-            real_texts = [self._extract_dialogue_text(d) for d in reference_dialogues]
-            real_diversity = self._compute_dialogue_diversity(real_texts)
+            real_diversity = mean_distinct(
+                c["ratios"] for c in self._contributions(
+                    "lexical_diversity@1", reference_dialogues, self._diversity_contributions
+                )
+            )
         
         # Compute domain-wise diversity
         domain_diversity = {}
-        dialogues_by_domain = {}
+        ratios_by_domain = {}
         
-        for dialogue in dialogues:
+        for dialogue, contribution in zip(dialogues, contributions):
             domain = dialogue.get("domain", "unknown")
-            if domain not in dialogues_by_domain:
-                dialogues_by_domain[domain] = []
-            dialogues_by_domain[domain].append(dialogue)
+            if domain not in ratios_by_domain:
+                ratios_by_domain[domain] = []
+            ratios_by_domain[domain].append(contribution["ratios"])
         
-        for domain, domain_dialogues in dialogues_by_domain.items():
-            domain_texts = [self._extract_dialogue_text(d) for d in domain_dialogues]
-            domain_diversity[domain] = self._compute_dialogue_diversity(domain_texts)
+        for domain, ratios in ratios_by_domain.items():
+            domain_diversity[domain] = mean_distinct(ratios)
         
         # Calculate diversity ratio if reference available
         diversity_ratio = None
         if real_diversity and real_diversity["combined"] > 0:
             diversity_ratio = synthetic_diversity["combined"] / real_diversity["combined"]
         
+        # Self-BLEU (sampled): BLEU of each dialogue against the others; lower = more diverse
+        self_bleu = None
+        if "self-bleu" in getattr(self.config, "diversity_metrics", []):
+            engine = BLEUEngine()
+            synthetic_records = self.analyzer.analyze_all(dialogues)
+            self_bleu = engine.self_bleu(engine.table([self._bleu_tokens(record) for record in synthetic_records]))
+        
         return {
             "distinct_1": synthetic_diversity["distinct_1"],
             "distinct_2": synthetic_diversity["distinct_2"],
@@ -794,121 +1250,58 @@ class ComprehensiveDialogueEvaluator:
             "real_diversity": real_diversity,
             "diversity_ratio": diversity_ratio,
             "domain_diversity": domain_diversity,
+            "corpus_distinct_1": corpus_distinct_1,
+            "corpus_distinct_2": corpus_distinct_2,
+            "self_bleu": self_bleu,
             "note": "Measures lexical diversity using Distinct-1 (unique unigrams/total) and Distinct-2 (unique bigrams/total). Target: 0.46"
         }
     
-    def _compute_dialogue_diversity(self, texts: List[str]) -> Dict[str, float]:
-        """Compute diversity (Distinct-1, Distinct-2). Uses per-dialogue average so small corpora are not unfairly low."""
-        if not texts:
-            return {"distinct_1": 0.0, "distinct_2": 0.0, "combined": 0.0}
-
-        def tokenize(text: str) -> List[str]:
-            return re.findall(r'\b\w+\b', text.lower())
-
-        def distinct_for_tokens(tokens: List[str]) -> Tuple[float, float]:
-            if not tokens:
-                return 0.0, 0.0
-            uniq_1 = len(set(tokens)) / len(tokens)
-            bigrams = [f"{tokens[i]} {tokens[i+1]}" for i in range(len(tokens) - 1)]
-            uniq_2 = len(set(bigrams)) / len(bigrams) if bigrams else 0.0
-            return uniq_1, uniq_2
-
-        # Per-dialogue distinct then average (standard in dialogue metrics; avoids corpus-level dilution)
-        per_d1, per_d2 = [], []
-        for text in texts:
-            tokens = tokenize(text)
-            d1, d2 = distinct_for_tokens(tokens)
-            if tokens:
-                per_d1.append(d1)
-                per_d2.append(d2)
-
-        if not per_d1:
-            return {"distinct_1": 0.0, "distinct_2": 0.0, "combined": 0.0}
-
-        distinct_1 = float(np.mean(per_d1))
-        distinct_2 = float(np.mean(per_d2))
-        combined = (distinct_1 + distinct_2) / 2
-        return {
-            "distinct_1": distinct_1,
-            "distinct_2": distinct_2,
-            "combined": combined
-        }
+    def _diversity_contributions(self, dialogues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Per dialogue: (Distinct-1, Distinct-2) or None, word count and sparse unigram / bigram sketches."""
+        contributions = []
+        for record in self.analyzer.analyze_all(dialogues):
+            words = [self.analyzer.words[i] for i in record.token_ids]
+            unigrams, bigrams = HyperLogLog(), HyperLogLog()
+            unigrams.add(set(words))
+            bigrams.add({f"{a} {b}" for a, b in zip(words, words[1:])})
+            contributions.append({
+                "ratios": distinct_ratios(record),
+                "tokens": len(words),
+                "unigrams": unigrams.to_sparse(),
+                "bigrams": bigrams.to_sparse(),
+            })
+        return contributions
+    
+    def _bleu_tokens(self, record: DialogueAnalysis) -> List[str]:
+        """Lowercased BLEU tokens of a dialogue (NLTK word_tokenize, simple split if it fails), tokenized once."""
+        def tokenize(lower_text: str) -> List[str]:
+            try:
+                return word_tokenize(lower_text)
+            except (LookupError, Exception) as token_error:
+                logger.debug(f"Tokenization error, using fallback: {token_error}")
+                return simple_word_tokenize(lower_text)
+        return record.tokens("bleu", tokenize)
     
     def _compute_bleu_scores(
         self,
         dialogues: List[Dict[str, Any]],
         reference_dialogues: List[Dict[str, Any]]
     ) -> Dict[str, Any]:
-        """Compute BLEU scores by comparing generated dialogues to reference dialogues."""
+        """Compute BLEU scores by comparing generated dialogues to their top-k nearest reference dialogues."""
         bleu_scores = []
         domain_scores = {}
         
-        # Group reference dialogues by domain
-        ref_by_domain = {}
-        for ref_dialogue in reference_dialogues:
-            domain = ref_dialogue.get("domain", "unknown")
-            if domain not in ref_by_domain:
-                ref_by_domain[domain] = []
-            ref_by_domain[domain].append(ref_dialogue)
+        ref_by_domain = self._group_by_domain(reference_dialogues)
         
-        for dialogue in dialogues:
+        best_scores = self._bleu_best_matches(dialogues, ref_by_domain, self._bleu_context(reference_dialogues))
+        for dialogue, best_bleu in zip(dialogues, best_scores):
             domain = dialogue.get("domain", "unknown")
             
-            if domain not in ref_by_domain or not ref_by_domain[domain]:
+            if not ref_by_domain.get(domain):
                 continue
             
-            # Extract dialogue text
-            gen_text = self._extract_dialogue_text(dialogue)
-            
-            # Tokenize with error handling
-            try:
-                gen_tokens = word_tokenize(gen_text.lower())
-            except (LookupError, Exception) as token_error:
-                # Fallback to simple tokenization if NLTK tokenizer fails
-                logger.warning(f"Tokenization error, using fallback: {token_error}")
-                gen_tokens = simple_word_tokenize(gen_text.lower())
-            
-            # Find best matching reference dialogue
-            best_bleu = 0.0
-            
-            for ref_dialogue in ref_by_domain[domain][:10]:  # Limit to 10 references for speed
-                ref_text = self._extract_dialogue_text(ref_dialogue)
-                
-                # Tokenize with error handling
-                try:
-                    ref_tokens = word_tokenize(ref_text.lower())
-                except (LookupError, Exception) as token_error:
-                    # Fallback to simple tokenization if NLTK tokenizer fails
-                    ref_tokens = simple_word_tokenize(ref_text.lower())
-                
-                try:
-                    # Compute BLEU score with smoothing
-                    if NLTK_AVAILABLE and self.smoothing:
-                        try:
-                            bleu = sentence_bleu(
-                                [ref_tokens],
-                                gen_tokens,
-                                smoothing_function=self.smoothing
-                            )
-                        except Exception:
-                            # Fallback BLEU if smoothing fails
-                            bleu = sentence_bleu(
-                                ref_tokens,
-                                gen_tokens,
-                                smoothing_function=None
-                            )
-                    else:
-                        # Use fallback BLEU
-                        bleu = sentence_bleu(
-                            ref_tokens,
-                            gen_tokens,
-                            smoothing_function=None
-                        )
-                    best_bleu = max(best_bleu, bleu)
-                except Exception as e:
-                    logger.warning(f"Error computing BLEU: {e}")
-                    continue
-            
+            # Dialogues whose BLEU could not be computed count as 0.0
+            best_bleu = best_bleu if best_bleu is not None else 0.0
             bleu_scores.append(best_bleu)
             
             # Track by domain
@@ -935,6 +1328,48 @@ class ComprehensiveDialogueEvaluator:
             "domain_bleu": domain_bleu
         }
     
+    def _bleu_context(self, reference_dialogues: List[Dict[str, Any]]) -> str:
+        """Stored best-match BLEU scores stay valid while top-k and references are unchanged."""
+        return fingerprint(reference_dialogues, "bleu", self.config.reference_top_k)
+    
+    def _bleu_best_matches(
+        self,
+        dialogues: List[Dict[str, Any]],
+        ref_by_domain: Dict[str, List[Dict[str, Any]]],
+        context: str
+    ) -> List[Optional[float]]:
+        """Best BLEU of each dialogue against its domain's top-k nearest references (None without references)."""
+        top_k = self.config.reference_top_k
+        
+        def compute(batch: List[Dict[str, Any]]) -> List[Optional[float]]:
+            # Best BLEU per dialogue; None where its domain has no references or scoring failed
+            best: List[Optional[float]] = [None] * len(batch)
+            rows_by_domain: Dict[str, List[int]] = {}
+            for i, dialogue in enumerate(batch):
+                domain = dialogue.get("domain", "unknown")
+                if ref_by_domain.get(domain):
+                    rows_by_domain.setdefault(domain, []).append(i)
+            for domain, rows in rows_by_domain.items():
+                # Reference analysis records (texts and BLEU tokens) and a TF-IDF index for candidate retrieval
+                ref_records = self.analyzer.analyze_all(ref_by_domain[domain])
+                gen_records = self.analyzer.analyze_all([batch[i] for i in rows])
+                neighbours = ReferenceRetriever([r.text for r in ref_records]).top_k([g.text for g in gen_records], top_k)
+                try:
+                    # Same BLEU as NLTK sentence_bleu with method1 smoothing, counted in bulk
+                    scores = best_match_bleu(
+                        [self._bleu_tokens(record) for record in gen_records],
+                        [self._bleu_tokens(record) for record in ref_records],
+                        neighbours
+                    )
+                except Exception as e:
+                    logger.warning(f"Error computing BLEU: {e}")
+                    continue
+                for i, score in zip(rows, scores):
+                    best[i] = float(score)
+            return best
+        
+        return self._contributions("bleu_best@1", dialogues, compute, context)
+    
     def _compute_dialogue_length_metrics(self, dialogues: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Compute dialogue length and turn count metrics."""
         turn_counts = []
@@ -944,12 +1379,7 @@ class ComprehensiveDialogueEvaluator:
         
         for dialogue in dialogues:
             domain = dialogue.get("domain", "unknown")
-            turns = dialogue.get("turns", [])
-            
-            turn_count = len(turns)
-            dialogue_text = self._extract_dialogue_text(dialogue)
-            word_count = len(dialogue_text.split())
-            char_count = len(dialogue_text)
+            turn_count, word_count, char_count = self._dialogue_lengths(dialogue)
             
             turn_counts.append(turn_count)
             word_counts.append(word_count)
@@ -1003,29 +1433,25 @@ class ComprehensiveDialogueEvaluator:
             "note": "Std dev is 0.0 if all dialogues have identical turn counts, or if only 1 dialogue was evaluated"
         }
     
+    def _dialogue_lengths(self, dialogue: Dict[str, Any]) -> Tuple[int, int, int]:
+        """Turn, whitespace-word and character counts of a dialogue."""
+        record = self.analyzer.analyze(dialogue)
+        return len(dialogue.get("turns", [])), record.whitespace_words, len(record.text)
+    
     def _compute_repetition_rate(self, dialogues: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Compute repetition rate across dialogues."""
         repetition_rates = []
         domain_rates = {}
         
-        for dialogue in dialogues:
+        rates = self._contributions(
+            "repetition_rate@1", dialogues, lambda batch: [self._dialogue_repetition_rate(d) for d in batch]
+        )
+        for dialogue, repetition_rate in zip(dialogues, rates):
             domain = dialogue.get("domain", "unknown")
-            turns = dialogue.get("turns", [])
-            
-            if not turns:
-                continue
             
-            # Extract turn texts
-            turn_texts = [turn.get("text", "").strip() for turn in turns]
-            turn_texts = [t for t in turn_texts if t]  # Remove empty
-            
-            if len(turn_texts) < 2:
+            if repetition_rate is None:
                 continue
             
-            # Count unique turns
-            unique_turns = set(turn_texts)
-            repetition_rate = 1 - (len(unique_turns) / len(turn_texts))
-            
             repetition_rates.append(repetition_rate)
             
             # Track by domain
@@ -1048,6 +1474,18 @@ class ComprehensiveDialogueEvaluator:
             "domain_repetition": domain_stats
         }
 
+    def _dialogue_repetition_rate(self, dialogue: Dict[str, Any]) -> Optional[float]:
+        """Share of repeated (non-empty) turns in a dialogue, or None with fewer than two turns."""
+        # Extract turn texts
+        turn_texts = [turn.get("text", "").strip() for turn in dialogue.get("turns", [])]
+        turn_texts = [t for t in turn_texts if t]  # Remove empty
+        
+        if len(turn_texts) < 2:
+            return None
+        
+        # Count unique turns
+        return 1 - (len(set(turn_texts)) / len(turn_texts))
+    
     def _compute_response_time_metrics(self, dialogues: List[Dict[str, Any]]) -> Dict[str, Any]:
         """
         Compute simple response time metrics based on turn timestamps.
@@ -1060,29 +1498,10 @@ class ComprehensiveDialogueEvaluator:
 
         for dialogue in dialogues:
             domain = dialogue.get("domain", "unknown")
-            turns = dialogue.get("turns", [])
-            if not turns:
-                continue
-
-            prev_ts = None
-            for turn in turns:
-                ts_str = turn.get("timestamp")
-                if not ts_str:
-                    continue
-                try:
-                    ts = datetime.fromisoformat(ts_str)
-                except Exception:
-                    continue
-
-                if prev_ts is not None:
-                    gap = (ts - prev_ts).total_seconds()
-                    # Ignore negative or extremely large gaps as artifacts
-                    if gap >= 0 and gap < 24 * 3600:
-                        all_gaps.append(gap)
-                        if domain not in domain_gaps:
-                            domain_gaps[domain] = []
-                        domain_gaps[domain].append(gap)
-                prev_ts = ts
+            gaps = self._response_gaps(dialogue)
+            if gaps:
+                all_gaps.extend(gaps)
+                domain_gaps.setdefault(domain, []).extend(gaps)
 
         if not all_gaps:
             return {
@@ -1096,7 +1515,6 @@ class ComprehensiveDialogueEvaluator:
             }
 
         # Cap min at 0.1s: sub-second gaps are artifacts (e.g. injected turns with same datetime.now())
-        GAP_FLOOR_SECONDS = 0.1
         raw_min = float(min(all_gaps))
         min_seconds = max(GAP_FLOOR_SECONDS, raw_min) if raw_min < GAP_FLOOR_SECONDS else raw_min
 
@@ -1122,6 +1540,28 @@ class ComprehensiveDialogueEvaluator:
             "note": "Inter-turn gaps from generation timestamps (not wall-clock). Min is floored at 0.1s to ignore artifact gaps."
         }
     
+    @staticmethod
+    def _response_gaps(dialogue: Dict[str, Any]) -> List[float]:
+        """Seconds between consecutive timestamped turns of a dialogue."""
+        gaps = []
+        prev_ts = None
+        for turn in dialogue.get("turns", []):
+            ts_str = turn.get("timestamp")
+            if not ts_str:
+                continue
+            try:
+                ts = datetime.fromisoformat(ts_str)
+            except Exception:
+                continue
+
+            if prev_ts is not None:
+                gap = (ts - prev_ts).total_seconds()
+                # Ignore negative or extremely large gaps as artifacts
+                if gap >= 0 and gap < 24 * 3600:
+                    gaps.append(gap)
+            prev_ts = ts
+        return gaps
+    
     def _compute_llm_judge_metrics(
         self,
         dialogues: List[Dict[str, Any]],
@@ -1147,20 +1587,26 @@ class ComprehensiveDialogueEvaluator:
         
         domain_scores = {}
         
-        for i, dialogue in enumerate(dialogues):
+        judge = self._dialogue_judge()
+        
+        def on_progress(done: int, total: int) -> None:
+            logger.info(f"LLM judge: {done}/{total} dialogues scored")
             if yield_callback:
                 try:
                     yield_callback()
                 except Exception:
                     pass
+        
+        # Concurrent, rate-limited judge calls; previously judged dialogues come from the score store
+        try:
+            all_dialogue_scores = judge.judge_all(dialogues, on_progress=on_progress)
+        finally:
+            if judge.store is not None:
+                judge.store.close()
+        logger.info(f"LLM judge made {judge.calls} calls for {len(dialogues)} dialogues")
+        
+        for dialogue, scores in zip(dialogues, all_dialogue_scores):
             domain = dialogue.get("domain", "unknown")
-            goal = dialogue.get("goal", "")
-            turns = dialogue.get("turns", [])
-            
-            logger.info(f"Evaluating dialogue {i+1}/{len(dialogues)} with LLM judge...")
-            
-            # Get LLM evaluation
-            scores = self._llm_judge_dialogue(goal, turns)
             
             if scores:
                 for metric, score in scores.items():
@@ -1205,62 +1651,29 @@ class ComprehensiveDialogueEvaluator:
             "domain_scores": domain_avg_scores
         }
     
+    def _dialogue_judge(self) -> DialogueJudge:
+        """Concurrent, rate-limited judge as configured, with the persistent score store if enabled."""
+        cache_path = self.config.judge_cache_path()
+        return DialogueJudge(
+            self.llm_client,
+            workers=self.config.judge_workers,
+            requests_per_minute=self.config.judge_requests_per_minute,
+            batch_size=self.config.judge_batch_size,
+            batch_max_words=self.config.judge_batch_max_words,
+            store=JudgeScoreStore(cache_path) if cache_path else None
+        )
+    
     def _llm_judge_dialogue(
         self,
         goal: str,
         turns: List[Dict[str, str]]
     ) -> Optional[Dict[str, int]]:
-        """Use LLM to judge a dialogue on multiple metrics."""
-        # Format dialogue
-        dialogue_text = "\n".join([
-            f"{turn.get('role', 'Unknown')}: {turn.get('text', '')}"
-            for turn in turns
-        ])
-        
-        prompt = f"""You are an expert dialogue evaluator. Score this conversation 0–100 for each metric. Use 85–95 for good quality (goal achieved, coherent, varied wording, fluent, grounded). Use 70–84 for acceptable, 50–69 for moderate issues, 0–49 only for poor/failed.
-
-1. **Task Success** – Was the user goal fulfilled? Score 85+ if the user got what they needed or expressed satisfaction.
-2. **Coherence** – Are turns logical and context-aware? Score 85+ if the conversation flows naturally.
-3. **Diversity** – Is phrasing varied and non-repetitive? Score 85+ if different words and structures are used across turns.
-4. **Fluency** – Is grammar and language natural? Score 85+ if there are no obvious errors.
-5. **Groundedness** – Are answers based on context/domain (no obvious fabrication)? Score 85+ if responses stay on topic.
-
-Goal: {goal}
-
-Dialogue:
-{dialogue_text}
-
-Return ONLY a JSON object with integer scores (0-100), e.g.:
-{{ "task_success": 88, "coherence": 90, "diversity": 85, "fluency": 92, "groundedness": 87 }}
-No other text."""
-        
-        try:
-            response = self.llm_client.generate_completion(
-                prompt,
-                temperature=0.1,  # Low temperature for consistent evaluation
-                max_tokens=200
-            )
-            
-            # Extract JSON from response
-            json_match = re.search(r'\{[^}]+\}', response, re.DOTALL)
-            if json_match:
-                scores = json.loads(json_match.group())
-                return scores
-            else:
-                logger.warning(f"Could not parse LLM response: {response}")
-                return None
-                
-        except Exception as e:
-            logger.error(f"Error in LLM judge evaluation: {e}")
-            return None
+        """Use LLM to judge a dialogue on multiple metrics (schema-validated, one repair retry)."""
+        return DialogueJudge(self.llm_client).judge_dialogue({"goal": goal, "turns": turns})
     
     def _extract_dialogue_text(self, dialogue: Dict[str, Any]) -> str:
-        """Extract text content from a dialogue."""
-        turns = dialogue.get("turns", [])
-        texts = []
-        for turn in turns:
-            texts.append(turn.get("text", ""))
-        return " ".join(texts)
+        """Extract text content from a dialogue (from its cached analysis record)."""
+        return self.analyzer.analyze(dialogue).text
     
     def _generate_summary_table(self, metrics: Dict[str, Any]) -> Dict[str, Any]:
         """Generate a summary table of all metrics."""
@@ -1381,6 +1794,21 @@ def main():
         action="store_true",
         help="Skip LLM-as-a-Judge evaluation (faster)"
     )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Stream dialogues from the store and evaluate them in chunks (bounded memory for large corpora)"
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        help="Dialogues per chunk in --stream mode (default: EVAL_CHUNK_SIZE)"
+    )
+    parser.add_argument(
+        "--scores-file",
+        type=str,
+        help="JSONL file for per-dialogue scores in --stream mode"
+    )
     parser.add_argument(
         "--output-file",
         type=str,
@@ -1412,34 +1840,48 @@ def main():
     evaluator = ComprehensiveDialogueEvaluator(config)
     
     try:
-        # Load synthetic dialogues
-        logger.info("Loading synthetic dialogues...")
-        synthetic_dialogues = evaluator.dataset_store.load_dialogues(limit=args.synthetic_limit)
-        
-        if not synthetic_dialogues:
-            logger.error("No synthetic dialogues found. Please generate dialogues first.")
-            return 1
-        
-        logger.info(f"Loaded {len(synthetic_dialogues)} synthetic dialogues")
+        # Load synthetic dialogues (streamed from the store in --stream mode)
+        synthetic_dialogues = None
+        if not args.stream:
+            logger.info("Loading synthetic dialogues...")
+            synthetic_dialogues = evaluator.dataset_store.load_dialogues(limit=args.synthetic_limit)
+            
+            if not synthetic_dialogues:
+                logger.error("No synthetic dialogues found. Please generate dialogues first.")
+                return 1
+            
+            logger.info(f"Loaded {len(synthetic_dialogues)} synthetic dialogues")
         
         # Load reference dialogues (for BLEU)
         reference_dialogues = None
         multiwoz_file = Path(config.data_dir) / "multiwoz" / "processed_dialogues.json"
         if multiwoz_file.exists():
             logger.info("Loading MultiWOZ reference dialogues...")
-            reference_dialogues = load_json(str(multiwoz_file))
-            if args.reference_limit:
-                reference_dialogues = reference_dialogues[:args.reference_limit]
+            reference_dialogues = load_reference_dialogues(
+                str(multiwoz_file.parent), limit=args.reference_limit or None
+            )
             logger.info(f"Loaded {len(reference_dialogues)} reference dialogues")
         else:
             logger.warning("MultiWOZ reference dialogues not found. BLEU scores will be skipped.")
         
         # Run evaluation
-        results = evaluator.evaluate_dialogues(
-            synthetic_dialogues,
-            reference_dialogues=reference_dialogues,
-            use_llm_judge=not args.skip_llm_judge
-        )
+        if args.stream:
+            results = evaluator.evaluate_dialogue_stream(
+                evaluator.dataset_store.iter_dialogues(limit=args.synthetic_limit),
+                reference_dialogues=reference_dialogues,
+                use_llm_judge=not args.skip_llm_judge,
+                chunk_size=args.chunk_size,
+                scores_file=args.scores_file
+            )
+            if not results["total_dialogues"]:
+                logger.error("No synthetic dialogues found. Please generate dialogues first.")
+                return 1
+        else:
+            results = evaluator.evaluate_dialogues(
+                synthetic_dialogues,
+                reference_dialogues=reference_dialogues,
+                use_llm_judge=not args.skip_llm_judge
+            )
         
         # Save results
         output_path = evaluator.save_results(results, args.output_file)
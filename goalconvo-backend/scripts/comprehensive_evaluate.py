@@ -20,7 +20,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
 from goalconvo.config import Config
 from goalconvo.evaluator import Evaluator
 from goalconvo.dataset_store import DatasetStore
-from goalconvo.utils import load_json
+from goalconvo.reference_corpus import ReferenceCorpus
 
 logger = logging.getLogger(__name__)
 
@@ -51,7 +51,7 @@ class ComprehensiveEvaluator:
         
         all_hub_dialogues = []
         for domain in self.config.domains:
-            hub_dialogues = self.dataset_store.load_few_shot_examples(domain, num_examples=1000)
+            hub_dialogues = self.dataset_store.load_few_shot_examples(domain, num_examples=1000, strategy="top_k")
             all_hub_dialogues.extend(hub_dialogues)
         
         if limit:
@@ -72,9 +72,12 @@ class ComprehensiveEvaluator:
             return []
         
         try:
-            dialogues = load_json(str(multiwoz_file))
-            if limit:
-                dialogues = dialogues[:limit]
+            # Indexed, memory-mapped corpus: only the first `limit` dialogues are parsed
+            corpus = ReferenceCorpus.open(self.config.multiwoz_dir)
+            try:
+                dialogues = corpus.load(limit=limit)
+            finally:
+                corpus.close()
             
             logger.info(f"Loaded {len(dialogues)} MultiWOZ dialogues")
             return dialogues
@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Removal for GoalConvo Synthetic Corpora
+
+Finds near-duplicate dialogues across the whole synthetic store with MinHash/LSH
+(one O(n) pass per domain) and optionally deletes them. Also rebuilds the
+persistent near-duplicate index used at save time.
+"""
+
+import logging
+import argparse
+from pathlib import Path
+
+# Add src to path for imports
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.config import Config
+from goalconvo.dataset_store import DatasetStore
+from goalconvo.utils import save_json
+
+logger = logging.getLogger(__name__)
+
+def main():
+    """Main function for corpus deduplication."""
+    parser = argparse.ArgumentParser(description="Find and remove near-duplicate synthetic dialogues")
+    parser.add_argument("--domains", nargs="+", help="Domains to deduplicate (default: config domains)")
+    parser.add_argument("--threshold", type=float, help="Minimum estimated Jaccard similarity (default: NEAR_DUPLICATE_THRESHOLD)")
+    parser.add_argument("--delete", action="store_true", help="Delete duplicates instead of only reporting them")
+    parser.add_argument("--report", type=str, help="Write the duplicate list to this JSON file")
+    parser.add_argument("--log-level", type=str, default="INFO",
+                       choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = Config()
+    dataset_store = DatasetStore(config)
+
+    try:
+        report = {}
+        for domain in args.domains or config.domains:
+            duplicates = dataset_store.deduplicate_domain(domain, threshold=args.threshold, delete=args.delete)
+            report[domain] = duplicates
+            logger.info(f"Domain {domain}: {len(duplicates)} near-duplicates{' deleted' if args.delete else ''}")
+
+        if args.report:
+            save_json(report, args.report)
+            logger.info(f"Wrote duplicate report to {args.report}")
+
+        return 0
+
+    except Exception as e:
+        logger.error(f"Error in deduplication: {e}")
+        return 1
+
+if __name__ == "__main__":
+    exit(main())
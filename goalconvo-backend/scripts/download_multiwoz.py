@@ -8,8 +8,10 @@ Downloads MultiWOZ 2.2 dataset and extracts seed goals for GoalConvo framework.
 import json
 import logging
 import argparse
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator, Set
 import requests
 import zipfile
 import os
@@ -20,10 +22,31 @@ import sys
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
 from goalconvo.config import Config
-from goalconvo.utils import save_json, load_json, ensure_dir
+from goalconvo.utils import save_json, load_json, ensure_dir, iter_json_items
+from goalconvo.reference_corpus import PROCESSED_DIALOGUES_FILE, REFERENCE_DIR, ReferenceCorpus
 
 logger = logging.getLogger(__name__)
 
+INGEST_VERSION = 1  # bump when parsing changes, to invalidate cached ingestion results
+MAX_SEED_GOALS_PER_DOMAIN = 100
+
+_worker_downloader = None
+
+def _parse_file_worker(config: Config, file_path: str) -> List[Dict[str, Any]]:
+    """Process-pool entry point: parse one MultiWOZ data file."""
+    global _worker_downloader
+    if _worker_downloader is None:
+        _worker_downloader = MultiWOZDownloader(config)
+    return _worker_downloader._parse_data_file(Path(file_path))
+
+def file_checksum(file_path: Path) -> str:
+    """sha256 of a file, read in chunks."""
+    hasher = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
 class MultiWOZDownloader:
     """Downloads and processes MultiWOZ dataset."""
     
@@ -48,7 +71,7 @@ class MultiWOZDownloader:
         try:
             # Clone the repository if it doesn't exist
             if not self.repo_dir.exists():
-                result = subprocess.run(s
+                result = subprocess.run(
                     ["git", "clone", "--depth", "1", self.multiwoz_repo_url, str(self.repo_dir)],
                     capture_output=True,
                     text=True,
@@ -86,48 +109,70 @@ class MultiWOZDownloader:
         logger.info(f"Dataset available at {self.extracted_dir}")
         return True
     
-    def parse_dialogues(self) -> List[Dict[str, Any]]:
-        """Parse MultiWOZ dialogues into standardized format."""
-        logger.info("Parsing MultiWOZ dialogues...")
-        
-        dialogues = []
-        
-        # Process dialogues from train, test, and val directories
+    def data_files(self) -> List[Path]:
+        """MultiWOZ dialogue files of the train, test and val splits, in a stable order."""
+        files = []
         for split in ["train", "test", "val"]:
             split_dir = self.extracted_dir / split
             if split_dir.exists():
-                logger.info(f"Processing {split} split...")
                 # Find all dialogue JSON files in this split
-                dialogue_files = list(split_dir.glob("dialogues_*.json"))
+                dialogue_files = sorted(split_dir.glob("dialogues_*.json"))
                 logger.info(f"Found {len(dialogue_files)} dialogue files in {split}")
-                
-                for dialogue_file in dialogue_files:
-                    file_dialogues = self._parse_data_file(dialogue_file)
-                    dialogues.extend(file_dialogues)
+                files.extend(dialogue_files)
+        return files
+    
+    def iter_parsed_dialogues(self, workers: Optional[int] = None) -> Iterator[Dict[str, Any]]:
+        """
+        Parse MultiWOZ dialogues file by file, fanning files out across a process pool.
+        
+        Dialogues are yielded in file order; at most 2 * workers parsed files are held
+        in memory at once.
         
+        Args:
+            workers: Worker processes (None: one per CPU; 1 parses in this process)
+        """
+        files = self.data_files()
+        workers = workers or os.cpu_count() or 1
+        if workers <= 1 or len(files) <= 1:
+            for file_path in files:
+                yield from self._parse_data_file(file_path)
+            return
+        
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = []
+            remaining = iter(files)
+            for file_path in remaining:
+                pending.append(executor.submit(_parse_file_worker, self.config, str(file_path)))
+                if len(pending) >= 2 * workers:
+                    break
+            while pending:
+                file_dialogues = pending.pop(0).result()
+                next_file = next(remaining, None)
+                if next_file is not None:
+                    pending.append(executor.submit(_parse_file_worker, self.config, str(next_file)))
+                yield from file_dialogues
+    
+    def parse_dialogues(self, workers: Optional[int] = 1) -> List[Dict[str, Any]]:
+        """Parse MultiWOZ dialogues into standardized format."""
+        logger.info("Parsing MultiWOZ dialogues...")
+        dialogues = list(self.iter_parsed_dialogues(workers=workers))
         logger.info(f"Parsed {len(dialogues)} dialogues from MultiWOZ")
         return dialogues
     
     def _parse_data_file(self, file_path: Path) -> List[Dict[str, Any]]:
-        """Parse a single MultiWOZ data file."""
+        """Parse a single MultiWOZ data file (streamed, one raw dialogue in memory at a time)."""
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
             dialogues = []
             
             # Handle both list format (MultiWOZ 2.2) and dict format (older versions)
-            if isinstance(data, list):
-                for dialogue_data in data:
+            for key, dialogue_data in iter_json_items(str(file_path)):
+                if isinstance(key, int):
                     dialogue_id = dialogue_data.get("dialogue_id", "")
                     parsed_dialogue = self._parse_single_dialogue_v2(dialogue_id, dialogue_data)
-                    if parsed_dialogue:
-                        dialogues.append(parsed_dialogue)
-            elif isinstance(data, dict):
-                for dialogue_id, dialogue_data in data.items():
-                    parsed_dialogue = self._parse_single_dialogue(dialogue_id, dialogue_data)
-                    if parsed_dialogue:
-                        dialogues.append(parsed_dialogue)
+                else:
+                    parsed_dialogue = self._parse_single_dialogue(key, dialogue_data)
+                if parsed_dialogue:
+                    dialogues.append(parsed_dialogue)
             
             return dialogues
             
@@ -293,27 +338,31 @@ class MultiWOZDownloader:
         """Extract seed goals from MultiWOZ dialogues."""
         logger.info("Extracting seed goals from MultiWOZ dialogues...")
         
-        domain_goals = {}
-        
+        domain_goals: Dict[str, List[str]] = {}
+        seen: Dict[str, Set[str]] = {}
         for dialogue in dialogues:
-            domain = dialogue.get("domain", "unknown")
-            goal = dialogue.get("goal", "")
-            
-            if domain not in domain_goals:
-                domain_goals[domain] = []
-            
-            # Clean and add goal if not already present
-            clean_goal = self._clean_goal_text(goal)
-            if clean_goal and clean_goal not in domain_goals[domain]:
-                domain_goals[domain].append(clean_goal)
-        
-        # Limit to reasonable number per domain
-        for domain in domain_goals:
-            domain_goals[domain] = domain_goals[domain][:100]  # Max 100 per domain
+            self._add_seed_goal(dialogue, domain_goals, seen)
         
         logger.info(f"Extracted seed goals for {len(domain_goals)} domains")
         return domain_goals
     
+    def _add_seed_goal(
+        self,
+        dialogue: Dict[str, Any],
+        domain_goals: Dict[str, List[str]],
+        seen: Dict[str, Set[str]]
+    ) -> None:
+        """Add a dialogue's cleaned goal to its domain (first MAX_SEED_GOALS_PER_DOMAIN unique goals)."""
+        domain = dialogue.get("domain", "unknown")
+        goals = domain_goals.setdefault(domain, [])
+        domain_seen = seen.setdefault(domain, set())
+        
+        # Clean and add goal if not already present (hash-set membership)
+        clean_goal = self._clean_goal_text(dialogue.get("goal", ""))
+        if clean_goal and clean_goal not in domain_seen and len(goals) < MAX_SEED_GOALS_PER_DOMAIN:
+            domain_seen.add(clean_goal)
+            goals.append(clean_goal)
+    
     def _clean_goal_text(self, goal_text: str) -> str:
         """Clean goal text for use as seed."""
         if not goal_text:
@@ -335,6 +384,12 @@ class MultiWOZDownloader:
         save_json(dialogues, str(dialogues_file))
         logger.info(f"Saved {len(dialogues)} dialogues to {dialogues_file}")
         
+        # Indexed, memory-mapped copy used by evaluation (see reference_corpus)
+        ReferenceCorpus.build(dialogues, str(self.multiwoz_dir / REFERENCE_DIR), source=str(dialogues_file)).close()
+        
+        self._save_seed_goals_and_stats(len(dialogues), seed_goals)
+    
+    def _save_seed_goals_and_stats(self, total_dialogues: int, seed_goals: Dict[str, List[str]]) -> Dict[str, Any]:
         # Save seed goals
         seed_goals_file = Path(self.config.data_dir) / "seed_goals.json"
         save_json(seed_goals, str(seed_goals_file))
@@ -342,13 +397,77 @@ class MultiWOZDownloader:
         
         # Save statistics
         stats = {
-            "total_dialogues": len(dialogues),
+            "total_dialogues": total_dialogues,
             "domains": list(seed_goals.keys()),
             "goals_per_domain": {domain: len(goals) for domain, goals in seed_goals.items()}
         }
         stats_file = self.multiwoz_dir / "processing_stats.json"
         save_json(stats, str(stats_file))
         logger.info(f"Saved processing statistics to {stats_file}")
+        return stats
+    
+    def ingest(self, workers: Optional[int] = None, force: bool = False) -> Dict[str, Any]:
+        """
+        Parse, deduplicate and store MultiWOZ in one streaming pass.
+        
+        Files are parsed in parallel (see iter_parsed_dialogues) and each dialogue is
+        written straight to processed_dialogues.json and the indexed reference corpus
+        while seed goals are collected, so the full corpus is never held in memory.
+        Results are cached under the source files' checksums: re-running on unchanged
+        sources with the outputs in place does nothing.
+        
+        Args:
+            workers: Worker processes (None: one per CPU)
+            force: Re-ingest even if the cache is valid
+            
+        Returns:
+            Processing statistics (with "cached": True when the run was skipped)
+        """
+        files = self.data_files()
+        checksums = {str(p.relative_to(self.extracted_dir)): file_checksum(p) for p in files}
+        manifest_file = self.multiwoz_dir / "ingest_manifest.json"
+        stats_file = self.multiwoz_dir / "processing_stats.json"
+        dialogues_file = self.multiwoz_dir / PROCESSED_DIALOGUES_FILE
+        outputs = [
+            dialogues_file, stats_file,
+            self.multiwoz_dir / REFERENCE_DIR / "index.json",
+            Path(self.config.data_dir) / "seed_goals.json",
+        ]
+        manifest = {"version": INGEST_VERSION, "files": checksums}
+        if not force and manifest_file.exists() and load_json(str(manifest_file)) == manifest \
+                and all(p.exists() for p in outputs):
+            logger.info("MultiWOZ sources unchanged since the last ingestion; nothing to do")
+            return {**load_json(str(stats_file)), "cached": True}
+        
+        domain_goals: Dict[str, List[str]] = {}
+        seen: Dict[str, Set[str]] = {}
+        
+        def _written(dialogues: Iterator[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+            # Mirrors each dialogue into processed_dialogues.json (same layout as save_json);
+            # the file is complete and closed before the reference corpus records its signature
+            ensure_dir(str(self.multiwoz_dir))
+            with open(dialogues_file, "w", encoding="utf-8") as f:
+                f.write("[")
+                count = 0
+                for dialogue in dialogues:
+                    self._add_seed_goal(dialogue, domain_goals, seen)
+                    f.write(("," if count else "") + "\n  ")
+                    f.write(json.dumps(dialogue, indent=2, ensure_ascii=False).replace("\n", "\n  "))
+                    count += 1
+                    yield dialogue
+                f.write("\n]" if count else "]")
+        
+        corpus = ReferenceCorpus.build(
+            _written(self.iter_parsed_dialogues(workers=workers)),
+            str(self.multiwoz_dir / REFERENCE_DIR),
+            source=str(dialogues_file)
+        )
+        total = len(corpus)
+        corpus.close()
+        stats = self._save_seed_goals_and_stats(total, domain_goals)
+        save_json(manifest, str(manifest_file))
+        logger.info(f"Ingested {total} MultiWOZ dialogues from {len(files)} files")
+        return {**stats, "cached": False}
 
 def main():
     """Main function for MultiWOZ downloader."""
@@ -357,6 +476,8 @@ def main():
     parser.add_argument("--skip-download", action="store_true", help="Skip download if file exists")
     parser.add_argument("--skip-extract", action="store_true", help="Skip extraction if directory exists")
     parser.add_argument("--output-dir", type=str, help="Output directory for processed data")
+    parser.add_argument("--workers", type=int, help="Parser processes (default: one per CPU; 1 disables the pool)")
+    parser.add_argument("--force", action="store_true", help="Re-ingest even if the sources are unchanged")
     
     args = parser.parse_args()
     
@@ -387,18 +508,12 @@ def main():
                 logger.error("Failed to extract dataset")
                 return 1
         
-        # Parse dialogues
-        dialogues = downloader.parse_dialogues()
-        if not dialogues:
+        # Parse, extract seed goals and save in one streaming pass (cached by source checksums)
+        stats = downloader.ingest(workers=args.workers, force=args.force)
+        if not stats.get("total_dialogues"):
             logger.error("No dialogues parsed")
             return 1
         
-        # Extract seed goals
-        seed_goals = downloader.extract_seed_goals(dialogues)
-        
-        # Save processed data
-        downloader.save_processed_data(dialogues, seed_goals)
-        
         logger.info("MultiWOZ processing completed successfully!")
         return 0
         
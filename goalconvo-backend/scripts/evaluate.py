@@ -18,7 +18,7 @@ sys.path.append(str(Path(__file__).parent.parent / "src"))
 from goalconvo.config import Config
 from goalconvo.evaluator import Evaluator
 from goalconvo.dataset_store import DatasetStore
-from goalconvo.utils import load_json
+from goalconvo.reference_corpus import ReferenceCorpus
 
 logger = logging.getLogger(__name__)
 
@@ -55,9 +55,12 @@ class GoalConvoEvaluator:
             return []
         
         try:
-            dialogues = load_json(str(multiwoz_file))
-            if limit:
-                dialogues = dialogues[:limit]
+            # Indexed, memory-mapped corpus: only the first `limit` dialogues are parsed
+            corpus = ReferenceCorpus.open(self.config.multiwoz_dir)
+            try:
+                dialogues = corpus.load(limit=limit)
+            finally:
+                corpus.close()
             
             logger.info(f"Loaded {len(dialogues)} MultiWOZ dialogues")
             return dialogues
@@ -40,7 +40,9 @@ class GoalConvoGenerator:
         self.dataset_store = DatasetStore(config)
         self.experience_generator = ExperienceGenerator(config, self.llm_client, self.dataset_store)
         self.dialogue_simulator = DialogueSimulator(config, self.llm_client)
-        self.quality_judge = QualityJudge(config, self.llm_client)
+        self.quality_judge = QualityJudge(
+            config, self.llm_client, simulator=self.dialogue_simulator, dataset_store=self.dataset_store
+        )
         
         # Generation statistics
         self.stats = {
@@ -74,6 +76,7 @@ class GoalConvoGenerator:
         """
         logger.info(f"Starting generation of {num_dialogues} dialogues")
         self.stats["start_time"] = datetime.now()
+        self.quality_judge.reset_tier_stats()
         
         # Emit start event
         if emit_callback:
@@ -147,11 +150,13 @@ class GoalConvoGenerator:
                 })
             
             # Process dialogues through quality filter (or accept all if ablation)
+            sampling_report = None
             if use_quality_judge:
                 improve_on_fail = (overrides or {}).get("quality_improve_on_fail")
                 accepted, rejected = self.quality_judge.filter_dialogues(
                     domain_dialogues, improve_on_fail=improve_on_fail
                 )
+                sampling_report = self.quality_judge.last_sampling_report
             else:
                 accepted, rejected = list(domain_dialogues), []
             
@@ -204,11 +209,17 @@ class GoalConvoGenerator:
             # Accumulate this run's accepted dialogues for evaluation (so backend evaluates this run, not arbitrary load from disk)
             run_accepted_dialogues.extend(accepted)
 
-            # Save accepted dialogues
-            for dialogue in accepted:
+            # Save accepted dialogues as one group commit; on failure fall back to
+            # per-dialogue saves so a single bad dialogue does not drop the batch
+            try:
+                saved_ids = self.dataset_store.save_dialogues(accepted)
+            except Exception as e:
+                logger.warning(f"Batch save failed ({e}); saving dialogues individually")
+                saved_ids = None
+            for idx, dialogue in enumerate(accepted):
                 dialogue_id = dialogue.get('dialogue_id', 'unknown')
                 try:
-                    saved_id = self.dataset_store.save_dialogue(dialogue)
+                    saved_id = saved_ids[idx] if saved_ids is not None else self.dataset_store.save_dialogue(dialogue)
                     logger.info(f"  ✓ Saved dialogue: {saved_id}")
                     accepted_count += 1
                     
@@ -234,25 +245,35 @@ class GoalConvoGenerator:
                 "accepted": len(accepted),
                 "rejected": len(rejected)
             }
+            if sampling_report:
+                self.stats["by_domain"][domain]["quality_sampling"] = sampling_report
+                logger.info(
+                    f"Sampled quality judging: estimated acceptance {sampling_report['estimated_acceptance_rate']:.1%} "
+                    f"(95% CI {sampling_report['acceptance_rate_ci95'][0]:.1%}-{sampling_report['acceptance_rate_ci95'][1]:.1%}), "
+                    f"LLM-judged {sampling_report['llm_judged_fraction']:.0%} of dialogues"
+                )
             
             logger.info(f"Domain {domain}: {len(accepted)}/{len(domain_dialogues)} dialogues accepted")
-            
-            # Update few-shot hub periodically
-            if generated_count % 100 == 0:
-                self._update_few_shot_hub()
         
         # Final statistics
         self.stats["total_generated"] = generated_count
         self.stats["total_accepted"] = accepted_count
         self.stats["total_rejected"] = generated_count - accepted_count
         self.stats["end_time"] = datetime.now()
+        tier_stats = self.quality_judge.get_tier_stats()
+        if tier_stats["enabled"]:
+            self.stats["judge_tiers"] = tier_stats
+            logger.info(
+                f"Tiered judging: {tier_stats['escalation_rate']:.1%} escalated to the strong tier; "
+                f"fast {tier_stats['fast']['avg_latency_s']:.2f}s/dialogue (cost {tier_stats['fast']['cost']:.4f}), "
+                f"strong {tier_stats['strong']['avg_latency_s']:.2f}s/dialogue (cost {tier_stats['strong']['cost']:.4f})"
+            )
         
-        # Update few-shot hub with final high-quality dialogues
+        # The few-shot hub is kept current as dialogues are saved; just report it
         logger.info(f"\n{'='*80}")
-        logger.info("STEP 5: Updating Few-Shot Hub")
+        logger.info("STEP 5: Few-Shot Hub")
         logger.info(f"{'='*80}")
-        logger.info("Updating few-shot hub with final high-quality dialogues...")
-        self._update_few_shot_hub()
+        self._report_few_shot_hub()
         
         # Save final progress
         logger.info(f"\n{'='*80}")
@@ -429,15 +450,13 @@ class GoalConvoGenerator:
         logger.info(f"{'='*80}\n")
         return dialogues
     
-    def _update_few_shot_hub(self) -> None:
-        """Update the few-shot hub with high-quality examples."""
+    def _report_few_shot_hub(self) -> None:
+        """Log the size of each domain's few-shot hub (maintained incrementally on save)."""
         try:
-            added_count = self.dataset_store.update_few_shot_hub()
-            logger.info(f"✓ Added {added_count} examples to few-shot hub")
+            for domain, domain_stats in sorted(self.dataset_store.statistics.domains.items()):
+                logger.info(f"✓ Few-shot hub {domain}: {domain_stats.get('hub_count', 0)} examples")
         except Exception as e:
-            logger.error(f"✗ Error updating few-shot hub: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            logger.error(f"✗ Error reading few-shot hub statistics: {e}")
     
     def _load_generation_progress(self) -> None:
         """Load generation progress from file."""
@@ -684,13 +703,14 @@ def main():
         
         # Create dataset version snapshot with config
         try:
-            all_dialogues = generator.dataset_store.load_dialogues(domain=None, limit=None)
-            if all_dialogues:
-                version_manager = DatasetVersionManager(config.data_dir)
+            # Count with an id-only projection, then stream the snapshot (flat memory on any corpus size)
+            total_dialogues = sum(1 for _ in generator.dataset_store.iter_dialogues(fields=["dialogue_id"]))
+            if total_dialogues:
+                version_manager = DatasetVersionManager(config.data_dir, archive_format=config.version_archive_format)
                 api_config = config.get_api_config()
                 version_id = version_manager.create_version(
-                    dialogues=all_dialogues,
-                    description=f"Script run: {len(all_dialogues)} dialogues, domains: {args.domains or config.domains}",
+                    dialogues=generator.dataset_store.iter_dialogues(),
+                    description=f"Script run: {total_dialogues} dialogues, domains: {args.domains or config.domains}",
                     generation_config={
                         "num_dialogues": args.num_dialogues,
                         "domains": args.domains or config.domains,
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Storage Migration for GoalConvo Synthetic Dialogues
+
+Imports the one-JSON-file-per-dialogue layout (data/synthetic/<domain>/*.json)
+into the SQLite dialogue index, or exports the index back to that layout.
+"""
+
+import logging
+import argparse
+from pathlib import Path
+
+# Add src to path for imports
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.config import Config
+from goalconvo.dialogue_storage import JSONDirectoryStorage, SQLiteDialogueStorage
+
+logger = logging.getLogger(__name__)
+
+def main():
+    """Main function for storage migration."""
+    parser = argparse.ArgumentParser(description="Migrate synthetic dialogues between the JSON layout and the SQLite index")
+    parser.add_argument("--source", type=str, help="JSON layout directory (default: SYNTHETIC_DIR)")
+    parser.add_argument("--database", type=str, help="SQLite index path (default: DATA_DIR/indexes/dialogues.sqlite)")
+    parser.add_argument("--replace", action="store_true", help="Overwrite dialogues already in the index")
+    parser.add_argument("--export-json", action="store_true", help="Write the index back to the JSON layout instead")
+    parser.add_argument("--log-level", type=str, default="INFO",
+                       choices=["DEBUG", "INFO", "WARNING", "ERROR"])
+
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=getattr(logging, args.log_level),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = Config()
+    source = args.source or config.synthetic_dir
+    database = args.database or str(Path(config.data_dir) / "indexes" / "dialogues.sqlite")
+
+    try:
+        storage = SQLiteDialogueStorage(database)
+        if args.export_json:
+            json_storage = JSONDirectoryStorage(source)
+            exported = 0
+            for domain in storage.domains():
+                for dialogue in storage.iter([domain]):
+                    json_storage.put(dialogue)
+                    exported += 1
+            logger.info(f"Exported {exported} dialogues from {database} to {source}")
+        else:
+            imported = storage.import_directory(source, replace=args.replace)
+            logger.info(f"Index {database} now holds {storage.count()} dialogues ({imported} imported)")
+        storage.close()
+        return 0
+
+    except Exception as e:
+        logger.error(f"Error in storage migration: {e}")
+        return 1
+
+if __name__ == "__main__":
+    exit(main())
@@ -32,6 +32,9 @@ setup(
             "goalconvo-generate=scripts.generate_dialogues:main",
             "goalconvo-evaluate=scripts.evaluate:main",
             "goalconvo-download-multiwoz=scripts.download_multiwoz:main",
+            "goalconvo-dedup=scripts.dedup_corpus:main",
+            "goalconvo-benchmark-judge=scripts.benchmark_judge:main",
+            "goalconvo-migrate-storage=scripts.migrate_storage:main",
         ],
     },
 )
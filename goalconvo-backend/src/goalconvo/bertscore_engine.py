@@ -0,0 +1,323 @@
+"""
+Shared BERTScore engine.
+
+bert_score.score() reloads its model on every call and scores candidate /
+reference pairs one-to-one, so scoring every synthetic dialogue against every
+reference of its domain meant S x R model loads and forward passes. The
+engine instead loads each model once per process (lazily, thread-safe),
+embeds every distinct text once (length-sorted batches, LRU-cached) and
+computes the whole S x R matrix of greedy-matching F1 scores with tensor
+operations. Scores match bert_score.score (no idf weighting, no baseline
+rescaling). With a cache directory, embeddings also persist across runs in an
+EmbeddingStore (float16), so repeat evaluations only embed new texts.
+"""
+
+# torch is optional: annotations naming torch types must not be evaluated at import time
+from __future__ import annotations
+
+import logging
+import re
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .embedding_store import EmbeddingStore, DEFAULT_MAX_BYTES
+from .reference_retrieval import ReferenceRetriever
+
+try:
+    import torch
+    from bert_score.utils import get_model, get_tokenizer, model2layers, sent_encode
+except ImportError:  # optional: semantic similarity metrics
+    torch = None
+
+logger = logging.getLogger(__name__)
+
+# Used when the configured model fails (e.g. DeBERTa tokenizer overflows on some setups)
+BERTSCORE_FALLBACK_MODEL = "bert-base-uncased"
+MAX_SEQUENCE_LENGTH = 512
+SIMILARITY_BLOCK_ELEMENTS = 1 << 25  # candidate-block size bound for the S x R x Lc x Lr similarity tensor
+
+
+def bertscore_available() -> bool:
+    """Whether torch and bert-score are installed."""
+    return torch is not None
+
+
+class BERTScoreEngine:
+    """One BERTScore model with cached token embeddings and batched S x R scoring."""
+
+    def __init__(
+        self,
+        model_type: str,
+        num_layers: Optional[int] = None,
+        batch_size: int = 32,
+        cache_size: int = 512,
+        device: Optional[str] = None,
+        store: Optional[EmbeddingStore] = None
+    ):
+        """
+        Initialize the engine (the model is loaded on first use).
+
+        Args:
+            model_type: HuggingFace model name or local path
+            num_layers: Layer whose output is used (default: bert_score's choice for the model)
+            batch_size: Texts per forward pass
+            cache_size: Number of text embeddings kept in memory
+            device: Torch device (default: cuda if available, else cpu)
+            store: Persistent embedding store consulted before embedding (and filled after)
+        """
+        if torch is None:
+            raise ImportError("BERTScore requires torch and bert-score (pip install bert-score)")
+        if num_layers is None:
+            if model_type not in model2layers:
+                raise ValueError(f"num_layers is required for model {model_type}")
+            num_layers = model2layers[model_type]
+        self.model_type = model_type
+        self.num_layers = num_layers
+        self.batch_size = batch_size
+        self.cache_size = cache_size
+        self.device = device or ("cuda" if torch.cuda.is_available() else "cpu")
+        self.store = store
+        self._model = None
+        self._tokenizer = None
+        self._load_lock = threading.Lock()
+        self._cache_lock = threading.Lock()
+        self._cache: "OrderedDict[str, Tuple[torch.Tensor, torch.Tensor]]" = OrderedDict()
+
+    def _ensure_loaded(self) -> None:
+        if self._model is not None:
+            return
+        with self._load_lock:
+            if self._model is not None:
+                return
+            logger.info(f"Loading BERTScore model {self.model_type} (layer {self.num_layers}) on {self.device}")
+            tokenizer = get_tokenizer(self.model_type)
+            # Some tokenizers report a huge model_max_length ("int too big to convert")
+            tokenizer.model_max_length = min(tokenizer.model_max_length, MAX_SEQUENCE_LENGTH)
+            model = get_model(self.model_type, self.num_layers)
+            model.to(self.device)
+            self._tokenizer = tokenizer
+            self._model = model
+
+    def _special_ids(self) -> set:
+        return {self._tokenizer.cls_token_id, self._tokenizer.sep_token_id}
+
+    def _token_ids(self, text: str) -> List[int]:
+        if not text.strip():
+            # bert_score encodes empty text as just the special tokens
+            return [t for t in (self._tokenizer.cls_token_id, self._tokenizer.sep_token_id) if t is not None]
+        return sent_encode(self._tokenizer, text)
+
+    def _encode_batch(self, token_ids: List[List[int]]) -> List[torch.Tensor]:
+        lengths = [len(ids) for ids in token_ids]
+        longest = max(lengths)
+        pad_id = self._tokenizer.pad_token_id or 0
+        input_ids = torch.full((len(token_ids), longest), pad_id, dtype=torch.long)
+        attention_mask = torch.zeros((len(token_ids), longest), dtype=torch.long)
+        for i, ids in enumerate(token_ids):
+            input_ids[i, :len(ids)] = torch.tensor(ids, dtype=torch.long)
+            attention_mask[i, :len(ids)] = 1
+        with torch.no_grad():
+            output = self._model(input_ids.to(self.device), attention_mask=attention_mask.to(self.device))[0]
+        output = output.float().cpu()
+        return [output[i, :length] for i, length in enumerate(lengths)]
+
+    def embed(self, texts: Sequence[str]) -> List[Tuple[torch.Tensor, torch.Tensor]]:
+        """
+        Unit-normalized token embeddings and token weights for each text.
+
+        Texts in neither the in-memory cache nor the persistent store are
+        embedded in batches of similar length, so padding (and wasted compute)
+        stays small.
+
+        Returns:
+            One (embeddings [L, H], weights [L]) pair per text; weights are 0 for
+            [CLS]/[SEP], 1 otherwise
+        """
+        with self._cache_lock:
+            cached = {}
+            for text in set(texts):
+                if text in self._cache:
+                    self._cache.move_to_end(text)
+                    cached[text] = self._cache[text]
+        missing = [text for text in dict.fromkeys(texts) if text not in cached]
+        loaded = []
+        if missing and self.store is not None:
+            for text, (embedding, weights) in self.store.get_many(missing).items():
+                embedding = torch.from_numpy(np.asarray(embedding, dtype=np.float32))
+                cached[text] = (embedding / embedding.norm(dim=-1, keepdim=True), torch.from_numpy(weights))
+                loaded.append(text)
+            missing = [text for text in missing if text not in cached]
+
+        if missing:
+            self._ensure_loaded()
+            special = self._special_ids()
+            token_ids = [self._token_ids(text) for text in missing]
+            order = sorted(range(len(missing)), key=lambda i: len(token_ids[i]))
+            for start in range(0, len(order), self.batch_size):
+                batch = order[start:start + self.batch_size]
+                embeddings = self._encode_batch([token_ids[i] for i in batch])
+                for i, embedding in zip(batch, embeddings):
+                    embedding = embedding / embedding.norm(dim=-1, keepdim=True)
+                    weights = torch.tensor([0.0 if t in special else 1.0 for t in token_ids[i]])
+                    cached[missing[i]] = (embedding, weights)
+            if self.store is not None:
+                self.store.put_many({text: (cached[text][0].numpy(), cached[text][1].numpy()) for text in missing})
+        if self.store is not None and (missing or loaded):
+            self.store.flush()
+
+        if missing or loaded:
+            with self._cache_lock:
+                for text in missing + loaded:
+                    self._cache[text] = cached[text]
+                    self._cache.move_to_end(text)
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+
+        return [cached[text] for text in texts]
+
+    @staticmethod
+    def _pad(entries: List[Tuple[torch.Tensor, torch.Tensor]]) -> Tuple[torch.Tensor, torch.Tensor]:
+        longest = max(embedding.shape[0] for embedding, _ in entries)
+        hidden = entries[0][0].shape[1]
+        embeddings = torch.zeros((len(entries), longest, hidden))
+        weights = torch.zeros((len(entries), longest))
+        for i, (embedding, weight) in enumerate(entries):
+            embeddings[i, :embedding.shape[0]] = embedding
+            total = weight.sum()
+            if total > 0:
+                weights[i, :weight.shape[0]] = weight / total
+        return embeddings, weights
+
+    def f1_matrix(self, candidates: Sequence[str], references: Sequence[str]) -> np.ndarray:
+        """
+        BERTScore F1 of every candidate against every reference.
+
+        Returns:
+            Array of shape (len(candidates), len(references))
+        """
+        if not candidates or not references:
+            return np.zeros((len(candidates), len(references)))
+        cand_embeddings, cand_weights = self._pad(self.embed(candidates))
+        ref_embeddings, ref_weights = self._pad(self.embed(references))
+        # Padding positions are zero vectors: their similarity is 0, as with bert_score's masks
+        cand_len, ref_len = cand_embeddings.shape[1], ref_embeddings.shape[1]
+        block = max(1, SIMILARITY_BLOCK_ELEMENTS // (len(references) * cand_len * ref_len))
+
+        scores = []
+        for start in range(0, len(candidates), block):
+            similarity = torch.einsum(
+                "cih,rjh->crij", cand_embeddings[start:start + block], ref_embeddings
+            )
+            precision = (similarity.max(dim=3).values * cand_weights[start:start + block, None, :]).sum(-1)
+            recall = (similarity.max(dim=2).values * ref_weights[None, :, :]).sum(-1)
+            f1 = 2 * precision * recall / (precision + recall)
+            scores.append(torch.nan_to_num(f1, nan=0.0))
+        return torch.cat(scores).numpy().astype(np.float64)
+
+    def f1_pairs(self, candidates: Sequence[str], references: Sequence[str], neighbours: np.ndarray) -> np.ndarray:
+        """
+        BERTScore F1 of each candidate against its own subset of references.
+
+        Only the references listed in neighbours are embedded.
+
+        Args:
+            candidates: Candidate texts
+            references: Reference texts
+            neighbours: Integer array (len(candidates), k) of reference indices per candidate
+
+        Returns:
+            Array of shape (len(candidates), k)
+        """
+        neighbours = np.asarray(neighbours, dtype=np.int64)
+        if not candidates or neighbours.size == 0:
+            return np.zeros(neighbours.shape if neighbours.ndim == 2 else (len(candidates), 0))
+        used, positions = np.unique(neighbours, return_inverse=True)
+        positions = torch.from_numpy(positions.reshape(neighbours.shape))
+        cand_embeddings, cand_weights = self._pad(self.embed(candidates))
+        ref_embeddings, ref_weights = self._pad(self.embed([references[i] for i in used]))
+        cand_len, ref_len = cand_embeddings.shape[1], ref_embeddings.shape[1]
+        block = max(1, SIMILARITY_BLOCK_ELEMENTS // (neighbours.shape[1] * cand_len * ref_len))
+
+        scores = []
+        for start in range(0, len(candidates), block):
+            block_positions = positions[start:start + block]
+            similarity = torch.einsum(
+                "cih,ckjh->ckij", cand_embeddings[start:start + block], ref_embeddings[block_positions]
+            )
+            precision = (similarity.max(dim=3).values * cand_weights[start:start + block, None, :]).sum(-1)
+            recall = (similarity.max(dim=2).values * ref_weights[block_positions]).sum(-1)
+            f1 = 2 * precision * recall / (precision + recall)
+            scores.append(torch.nan_to_num(f1, nan=0.0))
+        return torch.cat(scores).numpy().astype(np.float64)
+
+    def clear_cache(self) -> None:
+        """Drop cached text embeddings."""
+        with self._cache_lock:
+            self._cache.clear()
+
+
+_engines: Dict[str, BERTScoreEngine] = {}
+_engines_lock = threading.Lock()
+
+
+def get_bertscore_engine(
+    model_type: str,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES
+) -> BERTScoreEngine:
+    """
+    Process-wide engine for a model (created on first request, model loaded on first use).
+
+    Args:
+        model_type: HuggingFace model name
+        cache_dir: Root of the persistent embedding cache (one store per model); attached
+            the first time it is given
+        cache_max_bytes: Size bound of the model's store
+    """
+    with _engines_lock:
+        if model_type not in _engines:
+            _engines[model_type] = BERTScoreEngine(model_type)
+        engine = _engines[model_type]
+        if cache_dir and engine.store is None:
+            slug = re.sub(r"[^A-Za-z0-9._-]+", "--", model_type)
+            engine.store = EmbeddingStore(str(Path(cache_dir) / f"{slug}-L{engine.num_layers}"), cache_max_bytes)
+        return engine
+
+
+def best_match_f1(
+    candidates: Sequence[str],
+    references: Sequence[str],
+    model_type: str,
+    cache_dir: Optional[str] = None,
+    cache_max_bytes: int = DEFAULT_MAX_BYTES,
+    top_k: Optional[int] = None
+) -> Optional[np.ndarray]:
+    """
+    Highest BERTScore F1 of each candidate over the references.
+
+    With top_k, each candidate is only scored against its top_k nearest references
+    (TF-IDF retrieval), so the cost stays bounded however many references there are.
+    Falls back to BERTSCORE_FALLBACK_MODEL if the configured model fails.
+    cache_dir / cache_max_bytes configure the persistent embedding cache.
+
+    Returns:
+        Array of len(candidates) scores, or None if scoring failed with both models
+    """
+    if not candidates or not references:
+        return np.zeros(len(candidates))
+    neighbours = None
+    if top_k and top_k < len(references):
+        neighbours = ReferenceRetriever(references).top_k(candidates, top_k)
+    for model in dict.fromkeys([model_type, BERTSCORE_FALLBACK_MODEL]):
+        try:
+            engine = get_bertscore_engine(model, cache_dir, cache_max_bytes)
+            if neighbours is not None:
+                return engine.f1_pairs(candidates, references, neighbours).max(axis=1)
+            return engine.f1_matrix(candidates, references).max(axis=1)
+        except Exception as e:
+            logger.warning("Error computing BERTScore with %s: %s", model, e)
+    return None
@@ -0,0 +1,239 @@
+"""
+Vectorized sentence BLEU and self-BLEU.
+
+Scores are identical to NLTK's sentence_bleu with uniform 4-gram weights and
+SmoothingFunction().method1 (epsilon 0.1), but each text is tokenized and
+counted once: an NGramTable maps every n-gram to an integer id and stores a
+text's counts as one row of a sparse matrix per order, so the clipped counts of
+many candidate/reference pairs come from a single sparse element-wise minimum.
+Only the final combination (brevity penalty, log-average) is done per pair,
+with the same float operations NLTK uses.
+"""
+
+import logging
+import math
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+MAX_ORDER = 4
+SMOOTHING_EPSILON = 0.1  # NLTK SmoothingFunction.epsilon (method1)
+SELF_BLEU_SAMPLE_SIZE = 200
+
+
+class NGramVocabulary:
+    """Integer ids of n-grams, one id space per order."""
+
+    def __init__(self, max_order: int = MAX_ORDER):
+        self.max_order = max_order
+        self.ids: List[Dict[Tuple[str, ...], int]] = [{} for _ in range(max_order)]
+
+    def size(self, n: int) -> int:
+        """Number of distinct n-grams seen."""
+        return len(self.ids[n - 1])
+
+
+class NGramTable:
+    """Token counts of a list of texts: lengths plus one sparse count matrix per n-gram order."""
+
+    def __init__(self, token_lists: Sequence[Sequence[str]], vocabulary: NGramVocabulary):
+        """
+        Count the n-grams of tokenized texts.
+
+        Args:
+            token_lists: One token list per text
+            vocabulary: N-gram ids, shared by every table that is compared
+        """
+        self.vocabulary = vocabulary
+        self.lengths = np.array([len(tokens) for tokens in token_lists], dtype=np.int64)
+        self._parts = []
+        for n in range(1, vocabulary.max_order + 1):
+            ids = vocabulary.ids[n - 1]
+            indptr, indices, data = [0], [], []
+            for tokens in token_lists:
+                counts: Dict[int, int] = {}
+                for i in range(len(tokens) - n + 1):
+                    ngram = tuple(tokens[i:i + n])
+                    ngram_id = ids.setdefault(ngram, len(ids))
+                    counts[ngram_id] = counts.get(ngram_id, 0) + 1
+                indices.extend(counts.keys())
+                data.extend(counts.values())
+                indptr.append(len(indices))
+            self._parts.append((np.array(data, dtype=np.int64), np.array(indices, dtype=np.int64), np.array(indptr)))
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    def counts(self, n: int) -> sparse.csr_matrix:
+        """Count matrix of order n, sized to the current vocabulary."""
+        data, indices, indptr = self._parts[n - 1]
+        return sparse.csr_matrix((data, indices, indptr), shape=(len(self), self.vocabulary.size(n)))
+
+
+def _combine(numerators: Sequence[int], denominators: Sequence[int], hyp_len: int, ref_len: int) -> float:
+    # NLTK sentence_bleu: no unigram match -> 0; method1 smoothing; brevity penalty; log-average
+    if numerators[0] == 0:
+        return 0.0
+    if hyp_len > ref_len:
+        bp = 1
+    elif hyp_len == 0:
+        bp = 0
+    else:
+        bp = math.exp(1 - ref_len / hyp_len)
+    weight = 1 / len(numerators)
+    precisions = [
+        (SMOOTHING_EPSILON / d) if num == 0 else num / d
+        for num, d in zip(numerators, denominators)
+    ]
+    return bp * math.exp(math.fsum(weight * math.log(p) for p in precisions if p > 0))
+
+
+def _top_two_per_column(counts: sparse.csr_matrix) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per column: largest value, the row holding it, and the second largest value (0 if none)."""
+    coo = counts.tocoo()
+    order = np.lexsort((-coo.data, coo.col))
+    columns, values, rows = coo.col[order], coo.data[order], coo.row[order]
+    first = np.zeros(counts.shape[1], dtype=np.int64)
+    first_row = np.full(counts.shape[1], -1, dtype=np.int64)
+    second = np.zeros(counts.shape[1], dtype=np.int64)
+    if len(columns):
+        starts = np.flatnonzero(np.r_[True, columns[1:] != columns[:-1]])
+        first[columns[starts]] = values[starts]
+        first_row[columns[starts]] = rows[starts]
+        has_second = starts + 1 < len(columns)
+        has_second[has_second] &= columns[starts[has_second] + 1] == columns[starts[has_second]]
+        second[columns[starts[has_second]]] = values[starts[has_second] + 1]
+    return first, first_row, second
+
+
+def _closest_length(lengths: np.ndarray, hyp_len: int) -> int:
+    distance = np.abs(lengths - hyp_len)
+    return int(lengths[distance == distance.min()].min())
+
+
+class BLEUEngine:
+    """Sentence BLEU over pre-counted token tables (NLTK-identical, method1 smoothing)."""
+
+    def __init__(self, max_order: int = MAX_ORDER):
+        self.vocabulary = NGramVocabulary(max_order)
+
+    def table(self, token_lists: Sequence[Sequence[str]]) -> NGramTable:
+        """Count tokenized texts (do this once per text set and reuse the table)."""
+        return NGramTable(token_lists, self.vocabulary)
+
+    def pair_bleu(self, hypotheses: NGramTable, references: NGramTable, pairs: np.ndarray) -> np.ndarray:
+        """
+        BLEU of hypothesis rows against single reference rows, for many pairs at once.
+
+        Args:
+            hypotheses: Hypothesis table
+            references: Reference table
+            pairs: Integer array (P, 2) of (hypothesis row, reference row)
+
+        Returns:
+            Array of P scores, each equal to sentence_bleu([reference], hypothesis)
+        """
+        pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+        if len(pairs) == 0:
+            return np.zeros(0)
+        numerators, denominators = [], []
+        for n in range(1, self.vocabulary.max_order + 1):
+            hyp_counts = hypotheses.counts(n)[pairs[:, 0]]
+            ref_counts = references.counts(n)[pairs[:, 1]]
+            numerators.append(np.asarray(hyp_counts.minimum(ref_counts).sum(axis=1)).ravel())
+            denominators.append(np.maximum(1, np.asarray(hyp_counts.sum(axis=1)).ravel()))
+        numerators = np.stack(numerators, axis=1).tolist()
+        denominators = np.stack(denominators, axis=1).tolist()
+        hyp_lengths = hypotheses.lengths[pairs[:, 0]].tolist()
+        ref_lengths = references.lengths[pairs[:, 1]].tolist()
+        return np.array([
+            _combine(numerators[i], denominators[i], hyp_lengths[i], ref_lengths[i]) for i in range(len(pairs))
+        ])
+
+    def sentence_bleu(self, hypotheses: NGramTable, row: int, references: NGramTable, ref_rows: Sequence[int]) -> float:
+        """BLEU of one hypothesis row against several references (NLTK multi-reference clipping)."""
+        ref_rows = np.asarray(ref_rows, dtype=np.int64)
+        if len(ref_rows) == 0:
+            return 0.0
+        numerators, denominators = [], []
+        for n in range(1, self.vocabulary.max_order + 1):
+            hyp_counts = hypotheses.counts(n)[row]
+            max_ref_counts = references.counts(n)[ref_rows].max(axis=0)
+            numerators.append(int(hyp_counts.minimum(max_ref_counts).sum()))
+            denominators.append(max(1, int(hyp_counts.sum())))
+        hyp_len = int(hypotheses.lengths[row])
+        return _combine(numerators, denominators, hyp_len, _closest_length(references.lengths[ref_rows], hyp_len))
+
+    def self_bleu(
+        self,
+        table: NGramTable,
+        sample_size: int = SELF_BLEU_SAMPLE_SIZE,
+        seed: Optional[int] = 0
+    ) -> float:
+        """
+        Self-BLEU of a corpus: mean BLEU of sampled texts against all other texts.
+
+        Higher values mean more repetitive (less diverse) texts.
+
+        Args:
+            table: Counted corpus
+            sample_size: Number of texts scored as hypotheses (all if the corpus is smaller)
+            seed: Sampling seed (None for random)
+        """
+        if len(table) < 2:
+            return 0.0
+        rows = list(range(len(table)))
+        if len(rows) > sample_size:
+            rows = sorted(random.Random(seed).sample(rows, sample_size))
+
+        # Clipping against "all other texts" needs, per n-gram, the largest count in any
+        # other row: the column maximum, or the runner-up where the row itself holds it
+        orders = []
+        for n in range(1, self.vocabulary.max_order + 1):
+            counts = table.counts(n)
+            orders.append((counts,) + _top_two_per_column(counts))
+        numerators = np.zeros((len(rows), len(orders)), dtype=np.int64)
+        denominators = np.zeros((len(rows), len(orders)), dtype=np.int64)
+        for i, row in enumerate(rows):
+            for j, (counts, first, first_row, second) in enumerate(orders):
+                start, end = counts.indptr[row], counts.indptr[row + 1]
+                columns, hyp_counts = counts.indices[start:end], counts.data[start:end]
+                max_ref = np.where(first_row[columns] == row, second[columns], first[columns])
+                numerators[i, j] = np.minimum(hyp_counts, max_ref).sum()
+                denominators[i, j] = max(1, hyp_counts.sum())
+
+        scores = []
+        for i, row in enumerate(rows):
+            hyp_len = int(table.lengths[row])
+            ref_len = _closest_length(np.delete(table.lengths, row), hyp_len)
+            scores.append(_combine(numerators[i].tolist(), denominators[i].tolist(), hyp_len, ref_len))
+        return float(np.mean(scores))
+
+
+def best_match_bleu(
+    hypotheses: Sequence[Sequence[str]],
+    references: Sequence[Sequence[str]],
+    neighbours: Optional[np.ndarray] = None
+) -> np.ndarray:
+    """
+    Highest single-reference BLEU of each tokenized hypothesis.
+
+    Args:
+        hypotheses: Token lists of the hypotheses
+        references: Token lists of the references
+        neighbours: Optional (len(hypotheses), k) reference indices to consider per
+            hypothesis (default: every reference)
+    """
+    if not hypotheses or not references:
+        return np.zeros(len(hypotheses))
+    engine = BLEUEngine()
+    hyp_table, ref_table = engine.table(hypotheses), engine.table(references)
+    if neighbours is None:
+        neighbours = np.tile(np.arange(len(references)), (len(hypotheses), 1))
+    neighbours = np.asarray(neighbours, dtype=np.int64)
+    pairs = np.stack([np.repeat(np.arange(len(hypotheses)), neighbours.shape[1]), neighbours.ravel()], axis=1)
+    return engine.pair_bleu(hyp_table, ref_table, pairs).reshape(neighbours.shape).max(axis=1)
@@ -6,7 +6,7 @@ Contains all hyperparameters and settings from the research paper.
 
 import os
 from dataclasses import dataclass, field
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -66,12 +66,63 @@ class Config:
     
     # Few-shot settings (use 3-5 for better patterns; seed hub has strong examples)
     few_shot_examples: int = int(os.getenv("FEW_SHOT_EXAMPLES", "4"))
+    # Hub retrieval: "mmr" (quality- and goal-relevant, diverse) or "top_k" (highest quality)
+    few_shot_retrieval: str = os.getenv("FEW_SHOT_RETRIEVAL", "mmr").lower()
+    few_shot_mmr_diversity: float = float(os.getenv("FEW_SHOT_MMR_DIVERSITY", "0.3"))
+    # Ranking score of hub examples without hub_metadata.quality_score (the curated seed dialogues)
+    few_shot_seed_quality: float = float(os.getenv("FEW_SHOT_SEED_QUALITY", "0.8"))
+    # Incremental hub: each domain keeps its top FEW_SHOT_HUB_TOP_PERCENTAGE of scored dialogues
+    # (at least 1, at most FEW_SHOT_HUB_MAX_EXAMPLES), updated as dialogues are saved
+    few_shot_hub_top_percentage: float = float(os.getenv("FEW_SHOT_HUB_TOP_PERCENTAGE", "0.1"))
+    few_shot_hub_max_examples: int = int(os.getenv("FEW_SHOT_HUB_MAX_EXAMPLES", "100"))
     
     # Quality filtering
     quality_threshold: float = float(os.getenv("QUALITY_THRESHOLD", "0.7"))
     discard_rate: float = float(os.getenv("DISCARD_RATE", "0.1"))
     # When True, rejected dialogues get one LLM improvement attempt and re-judged (improves acceptance quality)
     quality_improve_on_fail: bool = os.getenv("QUALITY_IMPROVE_ON_FAIL", "true").lower() in ("true", "1", "yes")
+    # When True, local failures (empty/profane/repeated turns, role breaks, missing confirmation) are fixed by
+    # regenerating only the affected turns via the simulator before falling back to a full LLM rewrite
+    quality_targeted_repair: bool = os.getenv("QUALITY_TARGETED_REPAIR", "true").lower() in ("true", "1", "yes")
+    # Above this fraction of turns needing regeneration, skip targeted repair and rewrite the whole dialogue
+    max_repair_fraction: float = float(os.getenv("MAX_REPAIR_FRACTION", "0.5"))
+    # Statistical quality sampling for large batches: heuristics run on every dialogue, the LLM judge on a
+    # stratified sample (domain/persona/style), and a predictor calibrated on that sample scores the rest.
+    # Dialogues the heuristics do not accept are LLM-judged when their predicted pass probability is within
+    # quality_sampling_margin of 0.5.
+    quality_sampling: bool = os.getenv("QUALITY_SAMPLING", "false").lower() in ("true", "1", "yes")
+    quality_sampling_min_batch: int = int(os.getenv("QUALITY_SAMPLING_MIN_BATCH", "200"))
+    quality_sample_rate: float = float(os.getenv("QUALITY_SAMPLE_RATE", "0.1"))
+    quality_sample_min_per_stratum: int = int(os.getenv("QUALITY_SAMPLE_MIN_PER_STRATUM", "3"))
+    quality_sampling_margin: float = float(os.getenv("QUALITY_SAMPLING_MARGIN", "0.2"))
+    # Near-duplicate detection (MinHash/LSH over all saved dialogues): "off", "flag" (mark in metadata) or "reject"
+    near_duplicate_action: str = os.getenv("NEAR_DUPLICATE_ACTION", "flag").lower()
+    near_duplicate_threshold: float = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+    # Tiered LLM judging, configured independently of the generation provider. The fast tier scores every
+    # dialogue; only dialogues whose verdict would flip if the fast coherence / overall scores were
+    # judge_escalation_margin points (1-5 scale) away are re-judged by the strong tier (generation model when
+    # JUDGE_STRONG_PROVIDER is empty). Empty JUDGE_FAST_PROVIDER disables tiering.
+    judge_fast_provider: str = os.getenv("JUDGE_FAST_PROVIDER", "").lower()
+    judge_fast_model: str = os.getenv("JUDGE_FAST_MODEL", "")
+    judge_fast_api_base: str = os.getenv("JUDGE_FAST_API_BASE", "")
+    judge_fast_api_key: str = os.getenv("JUDGE_FAST_API_KEY", "")
+    judge_strong_provider: str = os.getenv("JUDGE_STRONG_PROVIDER", "").lower()
+    judge_strong_model: str = os.getenv("JUDGE_STRONG_MODEL", "")
+    judge_strong_api_base: str = os.getenv("JUDGE_STRONG_API_BASE", "")
+    judge_strong_api_key: str = os.getenv("JUDGE_STRONG_API_KEY", "")
+    judge_escalation_margin: float = float(os.getenv("JUDGE_ESCALATION_MARGIN", "1.0"))
+    # Cost per 1k (estimated) tokens per tier, for judge cost reporting only
+    judge_fast_cost_per_1k_tokens: float = float(os.getenv("JUDGE_FAST_COST_PER_1K_TOKENS", "0.0"))
+    judge_strong_cost_per_1k_tokens: float = float(os.getenv("JUDGE_STRONG_COST_PER_1K_TOKENS", "0.0"))
+    
+    # Dialogue storage backend: "sqlite" (single indexed database under data/indexes, default) or "json"
+    # (one file per dialogue). With sqlite, STORAGE_JSON_MIRROR also writes the per-dialogue JSON files
+    # on every save (off by default; scripts/migrate_storage.py --export-json writes the layout on demand).
+    storage_backend: str = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+    storage_json_mirror: bool = os.getenv("STORAGE_JSON_MIRROR", "false").lower() in ("true", "1", "yes")
+    # Columnar archive ("parquet" or "arrow", needs pyarrow) written next to each dataset version's
+    # dialogues.json; empty disables it
+    version_archive_format: str = os.getenv("VERSION_ARCHIVE_FORMAT", "").lower()
     
     # Generation settings
     max_dialogues: int = int(os.getenv("MAX_DIALOGUES", "20000"))
@@ -105,6 +156,28 @@ class Config:
 
     # Evaluation settings
     bertscore_model: str = "microsoft/deberta-xlarge-mnli"
+    # Persistent BERTScore embedding cache under <data_dir>/embedding_cache (EMBEDDING_CACHE=false disables)
+    embedding_cache_enabled: bool = os.getenv("EMBEDDING_CACHE", "true").lower() == "true"
+    embedding_cache_max_mb: int = int(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024"))
+    # Best-match BERTScore / BLEU score each dialogue against its REFERENCE_TOP_K nearest (TF-IDF) references
+    reference_top_k: int = int(os.getenv("REFERENCE_TOP_K", "10"))
+    # References the backend evaluates against per run, from the evaluated domains (0 = all)
+    eval_reference_limit: int = int(os.getenv("EVAL_REFERENCE_LIMIT", "1000"))
+    # Metrics run in parallel: CPU-bound ones in a process pool, the LLM judge in a thread pool (1 = sequential)
+    eval_metric_workers: int = int(os.getenv("EVAL_METRIC_WORKERS", "4"))
+    # LLM-as-a-Judge evaluation: concurrent judge calls under a shared rate cap (0 = unlimited); with
+    # JUDGE_BATCH_SIZE > 1, dialogues of at most JUDGE_BATCH_MAX_WORDS words are packed into one prompt.
+    # Scores persist per dialogue in <data_dir>/evaluation_store.sqlite (JUDGE_CACHE=false disables)
+    judge_workers: int = int(os.getenv("JUDGE_WORKERS", "4"))
+    judge_requests_per_minute: float = float(os.getenv("JUDGE_REQUESTS_PER_MINUTE", "0"))
+    judge_batch_size: int = int(os.getenv("JUDGE_BATCH_SIZE", "1"))
+    judge_batch_max_words: int = int(os.getenv("JUDGE_BATCH_MAX_WORDS", "150"))
+    judge_cache_enabled: bool = os.getenv("JUDGE_CACHE", "true").lower() == "true"
+    # Incremental evaluation: per-dialogue metric contributions persist in <data_dir>/evaluation_store.sqlite
+    # and are reused while a dialogue (and, for reference-based metrics, the reference set) is unchanged
+    eval_incremental: bool = os.getenv("EVAL_INCREMENTAL", "true").lower() == "true"
+    # Streaming evaluation (--stream): dialogues are read and evaluated EVAL_CHUNK_SIZE at a time
+    eval_chunk_size: int = int(os.getenv("EVAL_CHUNK_SIZE", "1000"))
     diversity_metrics: List[str] = field(default_factory=lambda: ["distinct-1", "distinct-2", "self-bleu"])
     
     def __post_init__(self):
@@ -131,6 +204,18 @@ class Config:
         if self.top_p < 0 or self.top_p > 1:
             raise ValueError("Top-p must be between 0 and 1")
     
+    def embedding_cache_dir(self) -> Optional[str]:
+        """Root of the persistent BERTScore embedding cache, or None when disabled."""
+        return str(Path(self.data_dir) / "embedding_cache") if self.embedding_cache_enabled else None
+    
+    def judge_cache_path(self) -> Optional[str]:
+        """SQLite store holding persistent LLM judge scores, or None when disabled."""
+        return str(Path(self.data_dir) / "evaluation_store.sqlite") if self.judge_cache_enabled else None
+    
+    def evaluation_store_path(self) -> Optional[str]:
+        """SQLite store of per-dialogue evaluation contributions, or None when incremental evaluation is off."""
+        return str(Path(self.data_dir) / "evaluation_store.sqlite") if self.eval_incremental else None
+    
     def get_api_config(self) -> Dict[str, Any]:
         """Get API configuration for the selected provider.
         
@@ -202,6 +287,24 @@ class Config:
         else:
             raise ValueError("No valid API configuration found. Set OPENROUTER_API_KEY, GROQ_API_KEY, DEEPSEEK_API_KEY, GEMINI_API_KEY, OLLAMA_ENABLED=true, MISTRAL_API_KEY, or OPENAI_API_KEY")
     
+    def get_judge_api_config(self, tier: str) -> Optional[Dict[str, Any]]:
+        """Get API configuration for a judge tier ("fast" or "strong").
+        
+        Model, API base and key default to the provider's own settings above.
+        Returns None when the tier has no provider, i.e. the generation model is used.
+        """
+        provider = getattr(self, f"judge_{tier}_provider", "")
+        if not provider:
+            return None
+        if provider not in ("openrouter", "groq", "deepseek", "ollama", "gemini", "openai", "mistral"):
+            raise ValueError(f"Unsupported judge provider for {tier} tier: {provider}")
+        return {
+            "api_key": getattr(self, f"judge_{tier}_api_key") or getattr(self, f"{provider}_api_key", ""),
+            "api_base": getattr(self, f"judge_{tier}_api_base") or getattr(self, f"{provider}_api_base"),
+            "model": getattr(self, f"judge_{tier}_model") or getattr(self, f"{provider}_model"),
+            "provider": provider
+        }
+    
     def get_generation_params(self) -> Dict[str, Any]:
         """Get parameters for text generation."""
         return {
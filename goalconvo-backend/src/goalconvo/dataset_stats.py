@@ -0,0 +1,233 @@
+"""
+Incrementally maintained dataset statistics for GoalConvo.
+
+DatasetStore keeps this view up to date as dialogues are saved, replaced,
+deleted or cleared and as the few-shot hub changes, so statistics are read
+in O(1) instead of parsing the corpus. Per domain it tracks counts, sums and
+sums of squares (running mean and variance, which also support removals),
+a quality-score histogram, per-day buckets, the few-shot hub size and a
+bounded sample of the most recent quality scores and creation dates. The view
+is persisted as JSON and can be rebuilt from the store at any time.
+
+Several DatasetStore instances (in one or several processes) can share the
+view: reads reload the file when it changed on disk, and updates reload,
+apply and save while holding an inter-process lock, so no instance serves or
+writes back stale counters.
+"""
+
+import logging
+import math
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Iterator, Tuple
+
+from .utils import file_lock, load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+QUALITY_HISTOGRAM_BINS = 10  # equal-width bins over [0, 1]
+STATS_SAMPLE_SIZE = 200  # most recent quality scores / creation dates kept per domain
+
+# Indexed fields the view needs from each dialogue (see dialogue_storage.dialogue_fields)
+STATS_FIELDS = ["domain", "num_turns", "quality_score", "created_at", "generated_at"]
+
+
+def _empty_domain() -> Dict[str, Any]:
+    return {
+        "count": 0,
+        "turns_sum": 0,
+        "turns_sumsq": 0,
+        "quality_count": 0,
+        "quality_sum": 0.0,
+        "quality_sumsq": 0.0,
+        "quality_histogram": [0] * QUALITY_HISTOGRAM_BINS,
+        "by_day": {},
+        "hub_count": 0,
+        "recent_quality_scores": [],
+        "recent_creation_dates": [],
+    }
+
+
+def _mean_std(count: int, total: float, total_sq: float) -> Dict[str, float]:
+    if not count:
+        return {"mean": 0.0, "std": 0.0}
+    mean = total / count
+    return {"mean": mean, "std": math.sqrt(max(0.0, total_sq / count - mean * mean))}
+
+
+def _histogram_bin(score: float) -> int:
+    return min(QUALITY_HISTOGRAM_BINS - 1, max(0, int(score * QUALITY_HISTOGRAM_BINS)))
+
+
+class DatasetStatistics:
+    """Persisted, incrementally updated statistics view over the dataset store."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self.domains: Dict[str, Dict[str, Any]] = {}
+        # (inode, mtime, size) of the file the counters were loaded from or saved to
+        self._loaded: Optional[Tuple[int, int, int]] = None
+        self.refresh()
+
+    def _file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        # Saves replace the file, so the inode changes even within one mtime tick
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> None:
+        """Reload the counters if another instance or process saved the file since they were read."""
+        with self._lock:
+            stamp = self._file_stamp()
+            if stamp is None or stamp == self._loaded:
+                return
+            data = load_json(str(self.path))
+            self.domains = {domain: {**_empty_domain(), **stats} for domain, stats in data.get("domains", {}).items()}
+            self._loaded = stamp
+
+    @contextmanager
+    def _updating(self) -> Iterator[None]:
+        # Read-modify-write under the inter-process lock, starting from the latest saved counters
+        with self._lock, file_lock(str(self.path) + ".lock"):
+            self.refresh()
+            yield
+            self.save()
+
+    def total(self) -> int:
+        """Number of dialogues counted across all domains."""
+        with self._lock:
+            self.refresh()
+            return sum(stats["count"] for stats in self.domains.values())
+
+    def domain_stats(self, domain: str) -> Dict[str, Any]:
+        """Current counters of one domain (empty counters for an unknown domain)."""
+        with self._lock:
+            self.refresh()
+            return dict(self.domains.get(domain) or _empty_domain())
+
+    def _domain(self, domain: str) -> Dict[str, Any]:
+        if domain not in self.domains:
+            self.domains[domain] = _empty_domain()
+        return self.domains[domain]
+
+    def _apply(self, fields: Dict[str, Any], sign: int) -> None:
+        stats = self._domain(fields.get("domain") or "unknown")
+        turns = fields.get("num_turns") or 0
+        stats["count"] += sign
+        stats["turns_sum"] += sign * turns
+        stats["turns_sumsq"] += sign * turns * turns
+
+        quality_score = fields.get("quality_score")
+        if quality_score is not None:
+            stats["quality_count"] += sign
+            stats["quality_sum"] += sign * quality_score
+            stats["quality_sumsq"] += sign * quality_score * quality_score
+            stats["quality_histogram"][_histogram_bin(quality_score)] += sign
+
+        timestamp = fields.get("created_at") or fields.get("generated_at")
+        if timestamp:
+            day = str(timestamp)[:10]
+            stats["by_day"][day] = stats["by_day"].get(day, 0) + sign
+            if stats["by_day"][day] <= 0:
+                del stats["by_day"][day]
+
+        # Bounded samples: append on add, drop one matching value on remove
+        for key, value in (("recent_quality_scores", quality_score), ("recent_creation_dates", fields.get("created_at"))):
+            if value is None:
+                continue
+            if sign > 0:
+                stats[key].append(value)
+                del stats[key][:-STATS_SAMPLE_SIZE]
+            elif value in stats[key]:
+                stats[key].remove(value)
+
+    def update(
+        self,
+        added: Iterable[Dict[str, Any]] = (),
+        removed: Iterable[Dict[str, Any]] = (),
+        hub_changes: Optional[Dict[str, int]] = None
+    ) -> None:
+        """Remove then add dialogue field records (see STATS_FIELDS), apply per-domain hub size changes and persist once."""
+        with self._updating():
+            for fields in removed:
+                self._apply(fields, -1)
+            for fields in added:
+                self._apply(fields, +1)
+            for domain, count in (hub_changes or {}).items():
+                if count:
+                    self._domain(domain)["hub_count"] += count
+
+    def clear_domain(self, domain: str) -> None:
+        """Reset a domain's dialogue statistics (its few-shot hub count is kept)."""
+        with self._updating():
+            hub_count = self._domain(domain)["hub_count"]
+            self.domains[domain] = _empty_domain()
+            self.domains[domain]["hub_count"] = hub_count
+
+    def add_hub_examples(self, domain: str, count: int = 1) -> None:
+        """Record new few-shot hub examples for a domain."""
+        with self._updating():
+            self._domain(domain)["hub_count"] += count
+
+    def rebuild(self, records: Iterable[Dict[str, Any]], hub_counts: Dict[str, int]) -> None:
+        """Recompute the whole view from dialogue field records and hub sizes."""
+        with self._updating():
+            self.domains = {}
+            for fields in records:
+                self._apply(fields, +1)
+            for domain, count in hub_counts.items():
+                self._domain(domain)["hub_count"] = count
+        logger.info(f"Rebuilt dataset statistics ({self.total()} dialogues)")
+
+    def save(self) -> None:
+        """Persist the view (atomic replace)."""
+        with self._lock:
+            tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+            save_json({"domains": self.domains}, str(tmp_path))
+            os.replace(tmp_path, self.path)
+            self._loaded = self._file_stamp()
+
+    def summary(self, domains: List[str]) -> Dict[str, Any]:
+        """
+        Statistics over the given domains, computed from the maintained counters only.
+
+        Returns:
+            Dictionary with totals, per-domain counts, turn and quality mean/std, the
+            quality histogram, per-day counts, hub sizes and bounded recent samples
+        """
+        with self._lock:
+            self.refresh()
+            selected = {domain: self.domains.get(domain) or _empty_domain() for domain in domains}
+            count = sum(s["count"] for s in selected.values())
+            turns = _mean_std(count, sum(s["turns_sum"] for s in selected.values()),
+                              sum(s["turns_sumsq"] for s in selected.values()))
+            quality_count = sum(s["quality_count"] for s in selected.values())
+            quality = _mean_std(quality_count, sum(s["quality_sum"] for s in selected.values()),
+                                sum(s["quality_sumsq"] for s in selected.values()))
+            by_day: Dict[str, int] = {}
+            for s in selected.values():
+                for day, n in s["by_day"].items():
+                    by_day[day] = by_day.get(day, 0) + n
+            return {
+                "total_dialogues": count,
+                "by_domain": {domain: s["count"] for domain, s in selected.items()},
+                "avg_turns": turns["mean"],
+                "turns_std": turns["std"],
+                "quality": {
+                    "count": quality_count,
+                    "mean": quality["mean"],
+                    "std": quality["std"],
+                    "histogram": [sum(s["quality_histogram"][i] for s in selected.values())
+                                  for i in range(QUALITY_HISTOGRAM_BINS)],
+                    "bin_edges": [i / QUALITY_HISTOGRAM_BINS for i in range(QUALITY_HISTOGRAM_BINS + 1)],
+                },
+                "by_day": dict(sorted(by_day.items())),
+                "few_shot_hub": {domain: s["hub_count"] for domain, s in selected.items()},
+                "quality_scores": [v for s in selected.values() for v in s["recent_quality_scores"]],
+                "creation_dates": [v for s in selected.values() for v in s["recent_creation_dates"]],
+            }
@@ -1,27 +1,41 @@
 """
 Dataset Store for managing synthetic dialogues and metadata.
 
-Handles JSON storage, loading, and few-shot hub management.
+Handles dialogue storage (SQLite index or JSON files, see dialogue_storage),
+loading, and few-shot hub management.
 """
 
 import json
 import os
+import heapq
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Iterator
 from datetime import datetime
 from pathlib import Path
 
 from .config import Config
 from .utils import (
-    generate_dialogue_id, save_json, load_json, ensure_dir,
+    generate_dialogue_id, save_json, load_json, ensure_dir, write_json_array,
     validate_dialogue_format, create_metadata, update_metadata_turns
 )
+from .near_duplicates import NearDuplicateIndex
+from .dialogue_storage import STORAGE_BACKENDS, JSONDirectoryStorage, SQLiteDialogueStorage, dialogue_fields
+from .dataset_stats import DatasetStatistics, STATS_FIELDS
+from .dialogue_archive import write_archive
 from .seed_few_shot_hub import get_seed_dialogues_by_domain
+from .few_shot_index import RETRIEVAL_STRATEGIES, FewShotHubIndex
 
 logger = logging.getLogger(__name__)
 
 MIN_HUB_EXAMPLES_BEFORE_SEED = 5  # Seed hub if a domain has fewer than this many examples
 
+
+def _save_hub_file(data: Dict[str, Any], file_path: Path) -> None:
+    """Write a hub example atomically, so the change also updates the hub directory's mtime."""
+    tmp_path = file_path.with_name(file_path.name + ".tmp")
+    save_json(data, str(tmp_path))
+    os.replace(tmp_path, file_path)
+
 class DatasetStore:
     """Manages storage and retrieval of synthetic dialogues."""
     
@@ -30,6 +44,18 @@ class DatasetStore:
         self.config = config
         self.synthetic_dir = Path(config.synthetic_dir)
         self.few_shot_hub_dir = Path(config.few_shot_hub_dir)
+        self.index_dir = Path(config.data_dir) / "indexes"
+        
+        # Per-domain MinHash/LSH indexes, loaded on first use
+        self._near_duplicate_indexes: Dict[str, NearDuplicateIndex] = {}
+        
+        # In-memory few-shot hub index (domains loaded on first use, kept current on hub writes)
+        self.few_shot_index = FewShotHubIndex(
+            str(self.few_shot_hub_dir), default_quality=getattr(config, "few_shot_seed_quality", 0.8)
+        )
+        self._seed_checked_domains = set()
+        # Per-domain min-heaps of (quality, dialogue_id) over synthetic hub members, built on first use
+        self._hub_heaps: Dict[str, List[Tuple[float, str]]] = {}
         
         # Ensure directories exist
         ensure_dir(str(self.synthetic_dir))
@@ -39,6 +65,27 @@ class DatasetStore:
         for domain in config.domains:
             ensure_dir(str(self.synthetic_dir / domain))
             ensure_dir(str(self.few_shot_hub_dir / domain))
+        
+        # Storage backend; the JSON layout is only kept as a mirror of the SQLite index when enabled
+        backend = getattr(config, "storage_backend", "sqlite")
+        if backend not in STORAGE_BACKENDS:
+            raise ValueError(f"Unsupported storage backend: {backend}")
+        self.json_storage = JSONDirectoryStorage(str(self.synthetic_dir))
+        self.sqlite_storage: Optional[SQLiteDialogueStorage] = None
+        if backend == "sqlite":
+            self.sqlite_storage = SQLiteDialogueStorage(str(self.index_dir / "dialogues.sqlite"))
+            if self.sqlite_storage.count() == 0:
+                # First start on an existing directory layout: build the index from it
+                self.sqlite_storage.import_directory(str(self.synthetic_dir))
+        self.storage = self.sqlite_storage or self.json_storage
+        self.json_mirror = self.sqlite_storage is None or getattr(config, "storage_json_mirror", False)
+        
+        # Statistics view kept up to date on every write; rebuilt when missing or out of step with the store
+        # (e.g. after another process wrote to it)
+        ensure_dir(str(self.index_dir))
+        self.statistics = DatasetStatistics(str(self.index_dir / f"statistics_{backend}.json"))
+        if self.statistics.total() != self.storage.count() or not self.statistics.path.exists():
+            self.rebuild_statistics()
     
     def save_dialogue(self, dialogue_data: Dict[str, Any]) -> str:
         """
@@ -53,28 +100,182 @@ class DatasetStore:
         Raises:
             ValueError: If dialogue format is invalid
         """
-        if not validate_dialogue_format(dialogue_data):
-            raise ValueError("Invalid dialogue format")
+        return self.save_dialogues([dialogue_data])[0]
+    
+    def save_dialogues(self, dialogues: List[Dict[str, Any]]) -> List[str]:
+        """
+        Save a batch of dialogues with a single group commit.
         
-        # Generate a dialogue_id if not already present
-        dialogue_id = dialogue_data.get("dialogue_id", generate_dialogue_id())
-        domain = dialogue_data.get("domain", "unknown")
+        The whole batch is validated before anything is written, then stored in one
+        SQLite transaction, and the statistics view (few-shot hub changes included)
+        and near-duplicate indexes are updated once for the batch. A dialogue_id
+        repeated within the batch keeps its last version.
+        
+        Args:
+            dialogues: Dialogue data with required fields
+            
+        Returns:
+            Dialogue IDs of the saved dialogues, in input order
+            
+        Raises:
+            ValueError: If any dialogue format is invalid (nothing is saved)
+        """
+        invalid = [i for i, dialogue_data in enumerate(dialogues) if not validate_dialogue_format(dialogue_data)]
+        if invalid:
+            raise ValueError(f"Invalid dialogue format (batch positions {invalid})")
+        
+        batch: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        dialogue_ids = []
+        for dialogue_data in dialogues:
+            # Generate a dialogue_id if not already present
+            dialogue_id = dialogue_data.get("dialogue_id", generate_dialogue_id())
+            domain = dialogue_data.get("domain", "unknown")
+            
+            # Update metadata with turn count
+            if "metadata" in dialogue_data:
+                dialogue_data["metadata"] = update_metadata_turns(
+                    dialogue_data["metadata"], 
+                    len(dialogue_data["turns"])
+                )
+            
+            dialogue_data["dialogue_id"] = dialogue_id
+            batch.pop((domain, dialogue_id), None)
+            batch[(domain, dialogue_id)] = dialogue_data
+            dialogue_ids.append(dialogue_id)
+        if not batch:
+            return []
         
-        # Update metadata with turn count
-        if "metadata" in dialogue_data:
-            dialogue_data["metadata"] = update_metadata_turns(
-                dialogue_data["metadata"], 
-                len(dialogue_data["turns"])
+        previous = [self.storage.get_fields(domain, dialogue_id) for domain, dialogue_id in batch]
+        to_write = list(batch.values())
+        if self.sqlite_storage is not None:
+            self.sqlite_storage.put_many(to_write)
+        if self.json_mirror:
+            self.json_storage.put_many(to_write)
+        added = [dialogue_fields(dialogue_data) for dialogue_data in to_write]
+        removed = [fields for fields in previous if fields]
+        
+        # Scored dialogues the batch adds per domain, not yet in the statistics view
+        pending_scored: Dict[str, int] = {}
+        for sign, records in ((-1, removed), (1, added)):
+            for fields in records:
+                if fields.get("quality_score") is not None:
+                    domain = fields.get("domain") or "unknown"
+                    pending_scored[domain] = pending_scored.get(domain, 0) + sign
+        
+        # Hub membership changes are collected and counted with the batch's single statistics update
+        hub_changes: Dict[str, int] = {}
+        by_domain: Dict[str, List[Dict[str, Any]]] = {}
+        for (domain, _), dialogue_data in batch.items():
+            by_domain.setdefault(domain, []).append(dialogue_data)
+        for domain, domain_dialogues in by_domain.items():
+            try:
+                index = self.near_duplicate_index(domain)
+                index.add_many([(d["dialogue_id"], index.signature(d)) for d in domain_dialogues])
+            except Exception as e:
+                logger.error(f"Error updating near-duplicate index for domain {domain}: {e}")
+            capacity = self._hub_capacity(domain, pending_scored=pending_scored.get(domain, 0))
+            for dialogue_data in domain_dialogues:
+                try:
+                    self._offer_to_hub(dialogue_data, capacity, hub_changes)
+                except Exception as e:
+                    logger.error(f"Error updating few-shot hub for {dialogue_data['dialogue_id']}: {e}")
+        self.statistics.update(added=added, removed=removed, hub_changes=hub_changes)
+        
+        for domain, dialogue_id in batch:
+            logger.info(f"Saved dialogue {dialogue_id} to domain {domain}")
+        return dialogue_ids
+    
+    def list_domains(self) -> List[str]:
+        """Domains that currently hold stored dialogues (or, for the JSON layout, a domain directory)."""
+        return self.storage.domains()
+    
+    def near_duplicate_index(self, domain: str) -> NearDuplicateIndex:
+        """Get the persistent MinHash/LSH index of saved dialogues for a domain."""
+        if domain not in self._near_duplicate_indexes:
+            self._near_duplicate_indexes[domain] = NearDuplicateIndex(
+                path=str(self.index_dir / "near_duplicates" / f"{domain}.minhash"),
+                threshold=self.config.near_duplicate_threshold,
             )
+        return self._near_duplicate_indexes[domain]
+    
+    def find_near_duplicates(
+        self,
+        dialogue_data: Dict[str, Any],
+        threshold: Optional[float] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Find saved dialogues in the same domain that are near-duplicates of a dialogue.
+        
+        Args:
+            dialogue_data: Candidate dialogue
+            threshold: Minimum estimated Jaccard similarity (defaults to config.near_duplicate_threshold)
+            
+        Returns:
+            List of (dialogue_id, similarity), most similar first
+        """
+        index = self.near_duplicate_index(dialogue_data.get("domain", "unknown"))
+        return index.query(
+            index.signature(dialogue_data),
+            threshold=threshold,
+            exclude=dialogue_data.get("dialogue_id"),
+        )
+    
+    def delete_dialogue(self, dialogue_id: str, domain: str) -> bool:
+        """
+        Delete a dialogue from the store.
         
-        # Save to domain-specific file
-        domain_dir = self.synthetic_dir / domain
-        file_path = domain_dir / f"{dialogue_id}.json"
+        Returns:
+            True if the dialogue existed and was removed
+        """
+        previous = self.storage.get_fields(domain, dialogue_id)
+        removed = self.storage.delete(domain, dialogue_id)
+        if self.storage is not self.json_storage and self.json_mirror:
+            self.json_storage.delete(domain, dialogue_id)
+        if removed and previous:
+            self.statistics.update(removed=[previous])
+        return removed
+    
+    def deduplicate_domain(
+        self,
+        domain: str,
+        threshold: Optional[float] = None,
+        delete: bool = False
+    ) -> List[Dict[str, Any]]:
+        """
+        Find near-duplicates across all saved dialogues of a domain in one O(n) LSH pass.
         
-        save_json(dialogue_data, str(file_path))
+        The first dialogue seen in each near-duplicate group is kept. The domain's index is
+        rebuilt from the kept dialogues.
         
-        logger.info(f"Saved dialogue {dialogue_id} to {file_path}")
-        return dialogue_id
+        Args:
+            domain: Domain to deduplicate
+            threshold: Minimum estimated Jaccard similarity (defaults to config.near_duplicate_threshold)
+            delete: If True, delete the duplicates from the store
+            
+        Returns:
+            List of {"dialogue_id", "duplicate_of", "similarity"} records
+        """
+        index = self.near_duplicate_index(domain)
+        index.clear()
+        duplicates = []
+        for dialogue in self.iter_dialogues(domain=domain, fields=["dialogue_id", "turns"]):
+            dialogue_id = dialogue.get("dialogue_id")
+            signature = index.signature(dialogue)
+            matches = index.query(signature, threshold=threshold, exclude=dialogue_id)
+            if matches:
+                duplicates.append({
+                    "dialogue_id": dialogue_id,
+                    "duplicate_of": matches[0][0],
+                    "similarity": round(matches[0][1], 4)
+                })
+                if delete:
+                    self.delete_dialogue(dialogue_id, domain)
+                continue
+            index.add(dialogue_id, signature, persist=False)
+        index.rewrite()
+        
+        logger.info(f"Found {len(duplicates)} near-duplicates in domain {domain}" + (" (deleted)" if delete else ""))
+        return duplicates
     
     def load_dialogue(self, dialogue_id: str, domain: str) -> Optional[Dict[str, Any]]:
         """
@@ -87,13 +288,10 @@ class DatasetStore:
         Returns:
             Dialogue data or None if not found
         """
-        file_path = self.synthetic_dir / domain / f"{dialogue_id}.json"
-        
-        if not file_path.exists():
+        dialogue_data = self.storage.get(domain, dialogue_id)
+        if dialogue_data is None:
             logger.warning(f"Dialogue {dialogue_id} not found in domain {domain}")
-            return None
-        
-        return load_json(str(file_path))
+        return dialogue_data
     
     def load_dialogues(
         self,
@@ -115,149 +313,227 @@ class DatasetStore:
         Returns:
             List of dialogue data
         """
-        dialogues = []
-
+        # Dialogues without a quality score count as 0.0, so only a positive threshold filters
+        where = {"quality_score": (">=", quality_threshold)} if quality_threshold is not None and quality_threshold > 0 else None
+        dialogues = list(self.iter_dialogues(domain=domain, where=where, limit=limit, domains=domains_override))
+        
+        logger.info(f"Loaded {len(dialogues)} dialogues")
+        return dialogues
+    
+    def iter_dialogues(
+        self,
+        domain: Optional[str] = None,
+        where: Optional[Dict[str, Any]] = None,
+        order_by: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        limit: Optional[int] = None,
+        domains: Optional[List[str]] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream dialogues from the dataset store with bounded memory.
+        
+        Args:
+            domain: Filter by domain (None for all domains)
+            where: Filters on indexed fields, e.g. {"quality_score": (">=", 0.8), "tags": ["pilot"]}
+                   (see dialogue_storage.parse_where)
+            order_by: Indexed field to sort by, "-" prefix for descending (e.g. "-generated_at")
+            fields: Project each record onto these fields; indexed-only projections
+                    (e.g. ["dialogue_id", "goal", "num_turns"]) never parse turn texts
+            limit: Maximum number of dialogues to yield
+            domains: If set and domain is None, search these domains instead of config.domains
+            
+        Yields:
+            Dialogue data (or projected records)
+        """
         if domain:
             domains_to_search = [domain]
-        elif domains_override:
-            domains_to_search = list(domains_override)
+        elif domains:
+            domains_to_search = list(domains)
         else:
-            domains_to_search = self.config.domains
+            domains_to_search = list(self.config.domains)
+        return self.storage.iter(domains_to_search, where=where, order_by=order_by, fields=fields, limit=limit)
+    
+    def latest(self, n: int, domains: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Get the n most recently generated dialogues.
         
-        for search_domain in domains_to_search:
-            domain_dir = self.synthetic_dir / search_domain
-            
-            if not domain_dir.exists():
-                continue
-            
-            for file_path in domain_dir.glob("*.json"):
-                try:
-                    dialogue_data = load_json(str(file_path))
-                    
-                    # Apply quality filter if specified
-                    if quality_threshold is not None:
-                        metadata = dialogue_data.get("metadata", {})
-                        quality_score = metadata.get("quality_score", 0.0)
-                        if quality_score < quality_threshold:
-                            continue
-                    
-                    dialogues.append(dialogue_data)
-                    
-                    # Apply limit if specified
-                    if limit and len(dialogues) >= limit:
-                        break
-                        
-                except Exception as e:
-                    logger.error(f"Error loading dialogue from {file_path}: {e}")
-                    continue
-            
-            if limit and len(dialogues) >= limit:
-                break
+        Ordered by metadata.generated_at (falling back to provenance.timestamp);
+        the SQLite backend reads this from a time index instead of scanning.
         
-        logger.info(f"Loaded {len(dialogues)} dialogues")
-        return dialogues
+        Args:
+            n: Number of dialogues to return
+            domains: Domains to search (default: config.domains)
+            
+        Returns:
+            Up to n dialogues, oldest first
+        """
+        domains_to_search = list(domains) if domains else list(self.config.domains)
+        return list(reversed(self.storage.latest(n, domains_to_search)))
     
     def get_statistics(self) -> Dict[str, Any]:
         """
         Get statistics about the stored dialogues.
         
+        Served from the incrementally maintained statistics view (O(1) in corpus size);
+        quality_scores and creation_dates are bounded samples of the most recent values.
+        
         Returns:
             Dictionary with statistics
         """
-        stats = {
-            "total_dialogues": 0,
-            "by_domain": {},
-            "avg_turns": 0.0,
-            "quality_scores": [],
-            "creation_dates": []
-        }
+        return self.statistics.summary(list(self.config.domains))
+    
+    def rebuild_statistics(self) -> None:
+        """Recompute the statistics view from the store (indexed fields only) and the few-shot hub."""
+        hub_counts = {
+            p.name: sum(1 for _ in p.glob("*.json"))
+            for p in self.few_shot_hub_dir.iterdir() if p.is_dir()
+        } if self.few_shot_hub_dir.exists() else {}
+        self.statistics.rebuild(
+            self.storage.iter(self.storage.domains(), fields=STATS_FIELDS),
+            hub_counts
+        )
+    
+    def _hub_heap(self, domain: str) -> List[Tuple[float, str]]:
+        if domain not in self._hub_heaps:
+            heap = self.few_shot_index.synthetic_members(domain)
+            heapq.heapify(heap)
+            self._hub_heaps[domain] = heap
+        return self._hub_heaps[domain]
+    
+    def _hub_capacity(
+        self,
+        domain: str,
+        top_percentage: Optional[float] = None,
+        pending_scored: int = 0
+    ) -> int:
+        """Hub size target for a domain: top percentage of its scored dialogues (plus pending ones), clamped."""
+        # domain_stats re-reads the statistics file if other stores or processes saved since
+        scored = self.statistics.domain_stats(domain)["quality_count"] + pending_scored
+        if top_percentage is None:
+            top_percentage = getattr(self.config, "few_shot_hub_top_percentage", 0.1)
+        max_examples = getattr(self.config, "few_shot_hub_max_examples", 100)
+        return max(1, min(max_examples, int(scored * top_percentage)))
+    
+    def _write_hub_example(
+        self,
+        dialogue_data: Dict[str, Any],
+        quality_score: float,
+        hub_changes: Dict[str, int]
+    ) -> bool:
+        """
+        Write a dialogue to the hub with hub metadata; True if it was not in the hub yet.
         
-        total_turns = 0
+        New examples are counted in hub_changes (per domain) for the caller's statistics update.
+        """
+        domain = dialogue_data.get("domain", "unknown")
+        hub_file_path = self.few_shot_hub_dir / domain / f"{dialogue_data['dialogue_id']}.json"
+        
+        # Add hub metadata
+        hub_dialogue = dialogue_data.copy()
+        hub_dialogue["hub_metadata"] = {
+            "added_to_hub_at": datetime.now().isoformat(),
+            "quality_score": quality_score,
+            "source": "synthetic"
+        }
         
-        for domain in self.config.domains:
-            domain_dir = self.synthetic_dir / domain
-            domain_count = 0
-            domain_turns = 0
-            
-            if domain_dir.exists():
-                for file_path in domain_dir.glob("*.json"):
-                    try:
-                        dialogue_data = load_json(str(file_path))
-                        domain_count += 1
-                        domain_turns += len(dialogue_data.get("turns", []))
-                        
-                        # Collect quality scores
-                        metadata = dialogue_data.get("metadata", {})
-                        quality_score = metadata.get("quality_score")
-                        if quality_score is not None:
-                            stats["quality_scores"].append(quality_score)
-                        
-                        # Collect creation dates
-                        created_at = metadata.get("created_at")
-                        if created_at:
-                            stats["creation_dates"].append(created_at)
-                            
-                    except Exception as e:
-                        logger.error(f"Error processing {file_path}: {e}")
-                        continue
-            
-            stats["by_domain"][domain] = domain_count
-            total_turns += domain_turns
+        is_new = not hub_file_path.exists()
+        _save_hub_file(hub_dialogue, hub_file_path)
+        self.few_shot_index.put(domain, hub_file_path.stem, hub_dialogue)
+        if is_new:
+            hub_changes[domain] = hub_changes.get(domain, 0) + 1
+        return is_new
+    
+    def _remove_hub_example(self, domain: str, dialogue_id: str, hub_changes: Dict[str, int]) -> None:
+        hub_file_path = self.few_shot_hub_dir / domain / f"{dialogue_id}.json"
+        if hub_file_path.exists():
+            hub_file_path.unlink()
+            hub_changes[domain] = hub_changes.get(domain, 0) - 1
+        self.few_shot_index.remove(domain, dialogue_id)
+    
+    def _trim_hub(self, domain: str, capacity: int, hub_changes: Dict[str, int]) -> int:
+        """Evict a domain's weakest synthetic hub examples (files included) down to capacity."""
+        self._hub_heaps.pop(domain, None)
+        heap = self._hub_heap(domain)
+        evicted = 0
+        while len(heap) > capacity:
+            _, evicted_id = heapq.heappop(heap)
+            self._remove_hub_example(domain, evicted_id, hub_changes)
+            evicted += 1
+        if evicted:
+            logger.info(f"Evicted {evicted} few-shot hub examples for domain {domain} (capacity {capacity})")
+        return evicted
+    
+    def _offer_to_hub(self, dialogue_data: Dict[str, Any], capacity: int, hub_changes: Dict[str, int]) -> bool:
+        """
+        Offer a saved dialogue to its domain's bounded hub heap (O(log K)).
         
-        stats["total_dialogues"] = sum(stats["by_domain"].values())
-        stats["avg_turns"] = total_turns / stats["total_dialogues"] if stats["total_dialogues"] > 0 else 0.0
+        The dialogue enters the hub if the heap has fewer than capacity members or
+        it beats the weakest member, which is then evicted; hub files are only
+        written or deleted when membership changes (or a member's score changes).
+        Membership changes are counted in hub_changes rather than saved to the
+        statistics view one by one.
         
-        return stats
+        Returns:
+            True if the dialogue is in the hub afterwards
+        """
+        quality_score = (dialogue_data.get("metadata") or {}).get("quality_score")
+        if not quality_score or quality_score <= 0:
+            return False
+        domain = dialogue_data.get("domain", "unknown")
+        dialogue_id = dialogue_data["dialogue_id"]
+        heap = self._hub_heap(domain)
+        
+        if any(key == dialogue_id for _, key in heap):
+            # Re-saved member: refresh its score (rare, O(K))
+            heap[:] = [(q, key) for q, key in heap if key != dialogue_id]
+            heapq.heapify(heap)
+            self._remove_hub_example(domain, dialogue_id, hub_changes)
+        
+        if len(heap) >= capacity:
+            if quality_score <= heap[0][0]:
+                return False
+            _, evicted_id = heapq.heappushpop(heap, (float(quality_score), dialogue_id))
+            self._remove_hub_example(domain, evicted_id, hub_changes)
+        else:
+            heapq.heappush(heap, (float(quality_score), dialogue_id))
+        self._write_hub_example(dialogue_data, float(quality_score), hub_changes)
+        return True
     
     def update_few_shot_hub(self, top_percentage: float = 0.1) -> int:
         """
         Update the few-shot hub with high-quality dialogues.
         
+        Full rescan of the store; the hub is otherwise maintained incrementally as
+        dialogues are saved (see _offer_to_hub). Afterwards each updated domain is
+        trimmed to its capacity for top_percentage, evicting its weakest examples.
+        
         Args:
             top_percentage: Percentage of top-quality dialogues to add to hub
             
         Returns:
             Number of dialogues added to hub
         """
-        # Load all dialogues with quality scores
-        all_dialogues = []
-        for domain in self.config.domains:
-            domain_dialogues = self.load_dialogues(domain=domain)
-            for dialogue in domain_dialogues:
-                metadata = dialogue.get("metadata", {})
-                quality_score = metadata.get("quality_score", 0.0)
-                if quality_score > 0:
-                    all_dialogues.append((dialogue, quality_score))
-        
-        if not all_dialogues:
+        # Top percentage of dialogues with quality scores, best first
+        top_dialogues = self.storage.top_by_quality(list(self.config.domains), top_percentage)
+        
+        if not top_dialogues:
             logger.warning("No dialogues with quality scores found")
             return 0
         
-        # Sort by quality score and select top percentage
-        all_dialogues.sort(key=lambda x: x[1], reverse=True)
-        num_to_select = max(1, int(len(all_dialogues) * top_percentage))
-        top_dialogues = all_dialogues[:num_to_select]
-        
         added_count = 0
+        updated_domains = set()
+        hub_changes: Dict[str, int] = {}
         
         for dialogue_data, quality_score in top_dialogues:
-            domain = dialogue_data.get("domain", "unknown")
-            dialogue_id = dialogue_data.get("dialogue_id", generate_dialogue_id())
-            
-            # Save to few-shot hub
-            hub_file_path = self.few_shot_hub_dir / domain / f"{dialogue_id}.json"
-            
-            # Add hub metadata
-            hub_dialogue = dialogue_data.copy()
-            hub_dialogue["hub_metadata"] = {
-                "added_to_hub_at": datetime.now().isoformat(),
-                "quality_score": quality_score,
-                "source": "synthetic"
-            }
-            
-            save_json(hub_dialogue, str(hub_file_path))
+            dialogue_data.setdefault("dialogue_id", generate_dialogue_id())
+            self._write_hub_example(dialogue_data, quality_score, hub_changes)
+            updated_domains.add(dialogue_data.get("domain", "unknown"))
             added_count += 1
         
+        for domain in updated_domains:
+            self._trim_hub(domain, self._hub_capacity(domain, top_percentage), hub_changes)
+        self.statistics.update(hub_changes=hub_changes)
+        
         logger.info(f"Added {added_count} dialogues to few-shot hub")
         return added_count
     
@@ -275,6 +551,7 @@ class DatasetStore:
         if not seed_dialogues:
             return
         written = 0
+        seeded_new = 0
         for i, dialogue in enumerate(seed_dialogues):
             if written >= MIN_HUB_EXAMPLES_BEFORE_SEED:
                 break
@@ -282,50 +559,61 @@ class DatasetStore:
             dialogue["dialogue_id"] = dialogue_id
             file_path = hub_domain_dir / f"seed_{i}_{dialogue_id}.json"
             try:
-                save_json(dialogue, str(file_path))
+                is_new = not file_path.exists()
+                _save_hub_file(dialogue, file_path)
+                self.few_shot_index.put(domain, file_path.stem, dialogue)
+                if is_new:
+                    seeded_new += 1
                 written += 1
             except Exception as e:
                 logger.warning(f"Failed to write seed example for {domain}: {e}")
+        if seeded_new:
+            self.statistics.add_hub_examples(domain, seeded_new)
         if written:
             logger.info(f"Seeded {written} few-shot examples for domain {domain}")
 
     def load_few_shot_examples(
         self, 
         domain: str, 
-        num_examples: int = 3
+        num_examples: int = 3,
+        query: Optional[str] = None,
+        strategy: Optional[str] = None
     ) -> List[Dict[str, Any]]:
         """
         Load few-shot examples from the hub for a specific domain.
         Seeds the hub with strong examples if the domain has fewer than 5.
         
+        Served from the in-memory hub index (reloaded when another process changed the
+        domain's hub); the returned dialogues are copies.
+        
         Args:
             domain: Target domain
             num_examples: Number of examples to retrieve
+            query: Text to match for relevance, e.g. the goal being expanded (mmr only)
+            strategy: "mmr" or "top_k" (default: config.few_shot_retrieval)
             
         Returns:
             List of example dialogues
         """
-        self.ensure_seed_few_shot_hub(domain)
-        hub_domain_dir = self.few_shot_hub_dir / domain
-        
-        if not hub_domain_dir.exists():
+        strategy = strategy or getattr(self.config, "few_shot_retrieval", "mmr")
+        if strategy not in RETRIEVAL_STRATEGIES:
+            raise ValueError(f"Unknown few-shot retrieval strategy: {strategy}")
+        if domain not in self._seed_checked_domains:
+            if self.few_shot_index.size(domain) < MIN_HUB_EXAMPLES_BEFORE_SEED:
+                self.ensure_seed_few_shot_hub(domain)
+            self._seed_checked_domains.add(domain)
+        
+        if strategy == "top_k":
+            examples = self.few_shot_index.top_k(domain, num_examples)
+        else:
+            examples = self.few_shot_index.mmr(
+                domain, num_examples, query=query,
+                diversity=getattr(self.config, "few_shot_mmr_diversity", 0.3)
+            )
+        if not examples:
             logger.warning(f"No few-shot examples found for domain {domain}")
-            return []
-        
-        examples = []
-        for file_path in hub_domain_dir.glob("*.json"):
-            try:
-                example_data = load_json(str(file_path))
-                examples.append(example_data)
-                
-                if len(examples) >= num_examples:
-                    break
-                    
-            except Exception as e:
-                logger.error(f"Error loading example from {file_path}: {e}")
-                continue
-        
-        logger.info(f"Loaded {len(examples)} few-shot examples for domain {domain}")
+        else:
+            logger.debug(f"Retrieved {len(examples)} few-shot examples for domain {domain} ({strategy})")
         return examples
     
     def clear_domain(self, domain: str) -> int:
@@ -338,16 +626,11 @@ class DatasetStore:
         Returns:
             Number of dialogues removed
         """
-        domain_dir = self.synthetic_dir / domain
-        removed_count = 0
-        
-        if domain_dir.exists():
-            for file_path in domain_dir.glob("*.json"):
-                try:
-                    file_path.unlink()
-                    removed_count += 1
-                except Exception as e:
-                    logger.error(f"Error removing {file_path}: {e}")
+        removed_count = self.storage.clear(domain)
+        if self.storage is not self.json_storage and self.json_mirror:
+            self.json_storage.clear(domain)
+        self.near_duplicate_index(domain).clear()
+        self.statistics.clear_domain(domain)
         
         logger.info(f"Removed {removed_count} dialogues from domain {domain}")
         return removed_count
@@ -364,19 +647,45 @@ class DatasetStore:
             True if successful, False otherwise
         """
         try:
-            dialogues = self.load_dialogues(domain=domain)
-            
-            export_data = {
+            # Dialogues are streamed into the file; the count comes from an id-only pass
+            total = sum(1 for _ in self.iter_dialogues(domain=domain, fields=["dialogue_id"]))
+            header = json.dumps({
                 "domain": domain,
-                "total_dialogues": len(dialogues),
-                "exported_at": datetime.now().isoformat(),
-                "dialogues": dialogues
-            }
+                "total_dialogues": total,
+                "exported_at": datetime.now().isoformat()
+            }, indent=2, ensure_ascii=False)
             
-            save_json(export_data, output_path)
-            logger.info(f"Exported {len(dialogues)} dialogues from domain {domain} to {output_path}")
+            ensure_dir(os.path.dirname(output_path))
+            with open(output_path, "w", encoding="utf-8") as f:
+                f.write(header[:-2] + ',\n  "dialogues": ')
+                written = write_json_array(self.iter_dialogues(domain=domain), f, level=1, ensure_ascii=False)
+                f.write("\n}")
+            logger.info(f"Exported {written} dialogues from domain {domain} to {output_path}")
             return True
             
         except Exception as e:
             logger.error(f"Error exporting domain {domain}: {e}")
             return False
+    
+    def export_archive(
+        self,
+        output_path: str,
+        domains: Optional[List[str]] = None,
+        format: str = "parquet"
+    ) -> int:
+        """
+        Export stored dialogues to a columnar archive (see dialogue_archive; needs pyarrow).
+        
+        Args:
+            output_path: Archive directory
+            domains: Domains to export (default: all stored domains)
+            format: "parquet" or "arrow"
+            
+        Returns:
+            Number of dialogues written
+        """
+        written = write_archive(
+            self.iter_dialogues(domains=domains or self.list_domains()), output_path, format=format
+        )
+        logger.info(f"Exported {written} dialogues to {format} archive {output_path}")
+        return written
@@ -8,10 +8,13 @@ import json
 import logging
 import hashlib
 from pathlib import Path
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterable
 from datetime import datetime
 from dataclasses import dataclass, asdict
 
+from .utils import write_json_array
+from .dialogue_archive import ARCHIVE_FORMATS, ArchiveWriter, read_archive_table, write_archive
+
 logger = logging.getLogger(__name__)
 
 @dataclass
@@ -36,9 +39,17 @@ class DatasetVersion:
 class DatasetVersionManager:
     """Manages dataset versions, snapshots, and comparisons."""
     
-    def __init__(self, data_dir: str):
-        """Initialize version manager."""
+    def __init__(self, data_dir: str, archive_format: Optional[str] = None):
+        """
+        Initialize version manager.
+        
+        Args:
+            data_dir: Data directory (versions live under <data_dir>/versions)
+            archive_format: Also write each new version as a columnar archive
+                            ("parquet" or "arrow", see dialogue_archive); None disables it
+        """
         self.data_dir = Path(data_dir)
+        self.archive_format = archive_format or None
         self.versions_dir = self.data_dir / "versions"
         self.versions_dir.mkdir(parents=True, exist_ok=True)
         self.metadata_file = self.versions_dir / "version_metadata.json"
@@ -71,7 +82,7 @@ class DatasetVersionManager:
     
     def create_version(
         self,
-        dialogues: List[Dict[str, Any]],
+        dialogues: Iterable[Dict[str, Any]],
         description: str = "",
         generation_config: Optional[Dict[str, Any]] = None,
         parent_version: Optional[str] = None,
@@ -80,8 +91,11 @@ class DatasetVersionManager:
         """
         Create a new dataset version snapshot.
         
+        Dialogues are streamed to the snapshot file one at a time, so an iterator
+        (e.g. DatasetStore.iter_dialogues()) snapshots any corpus size in flat memory.
+        
         Args:
-            dialogues: List of dialogue dictionaries
+            dialogues: Dialogue dictionaries (list or iterator)
             description: Human-readable description
             generation_config: Configuration used for generation
             parent_version: Parent version ID (for branching)
@@ -93,15 +107,36 @@ class DatasetVersionManager:
         # Generate version ID (timestamp-based)
         version_id = datetime.now().strftime("%Y%m%d_%H%M%S")
         
-        # Calculate checksum
-        dialogue_json = json.dumps(dialogues, sort_keys=True)
-        checksum = hashlib.sha256(dialogue_json.encode()).hexdigest()[:16]
+        # Save dialogues to version directory, computing the checksum (sha256 of the
+        # sort_keys JSON array) and statistics on the way
+        version_dir = self.versions_dir / version_id
+        version_dir.mkdir(exist_ok=True)
         
-        # Calculate statistics
+        hasher = hashlib.sha256(b"[")
         domain_distribution = {}
-        for dialogue in dialogues:
-            domain = dialogue.get("domain", "unknown")
-            domain_distribution[domain] = domain_distribution.get(domain, 0) + 1
+        total_turns = 0
+        archive = ArchiveWriter(str(version_dir / "archive"), format=self.archive_format) if self.archive_format else None
+        
+        def _tracked(items):
+            nonlocal total_turns
+            for index, dialogue in enumerate(items):
+                hasher.update(((", " if index else "") + json.dumps(dialogue, sort_keys=True)).encode())
+                domain = dialogue.get("domain", "unknown")
+                domain_distribution[domain] = domain_distribution.get(domain, 0) + 1
+                total_turns += len(dialogue.get("turns", []))
+                if archive is not None:
+                    archive.write(dialogue)
+                yield dialogue
+        
+        dialogues_file = version_dir / "dialogues.json"
+        try:
+            with open(dialogues_file, 'w') as f:
+                dialogue_count = write_json_array(_tracked(dialogues), f, indent=2)
+        finally:
+            if archive is not None:
+                archive.close()
+        hasher.update(b"]")
+        checksum = hasher.hexdigest()[:16]
         
         # Create version metadata
         version = DatasetVersion(
@@ -109,11 +144,11 @@ class DatasetVersionManager:
             timestamp=datetime.now().isoformat(),
             description=description,
             metadata={
-                "total_dialogues": len(dialogues),
-                "avg_turns": sum(len(d.get("turns", [])) for d in dialogues) / len(dialogues) if dialogues else 0,
+                "total_dialogues": dialogue_count,
+                "avg_turns": total_turns / dialogue_count if dialogue_count else 0,
                 "domains": list(domain_distribution.keys())
             },
-            dialogue_count=len(dialogues),
+            dialogue_count=dialogue_count,
             domain_distribution=domain_distribution,
             generation_config=generation_config or {},
             checksum=checksum,
@@ -121,19 +156,11 @@ class DatasetVersionManager:
             tags=tags or []
         )
         
-        # Save dialogues to version directory
-        version_dir = self.versions_dir / version_id
-        version_dir.mkdir(exist_ok=True)
-        
-        dialogues_file = version_dir / "dialogues.json"
-        with open(dialogues_file, 'w') as f:
-            json.dump(dialogues, f, indent=2)
-        
         # Save version metadata
         self.versions[version_id] = version
         self._save_versions()
         
-        logger.info(f"Created dataset version {version_id} with {len(dialogues)} dialogues")
+        logger.info(f"Created dataset version {version_id} with {dialogue_count} dialogues")
         return version_id
     
     def get_version(self, version_id: str) -> Optional[DatasetVersion]:
@@ -156,6 +183,25 @@ class DatasetVersionManager:
             logger.error(f"Error loading version {version_id}: {e}")
             return []
     
+    def load_version_table(
+        self,
+        version_id: str,
+        table: str = "dialogues",
+        columns: Optional[List[str]] = None
+    ):
+        """
+        Read a version's columnar archive table (memory-mapped, only the given columns).
+        
+        Args:
+            version_id: Version with an archive (created with archive_format set)
+            table: "dialogues" (one row per dialogue) or "turns" (one row per turn)
+            columns: Columns to read (default all)
+            
+        Returns:
+            pyarrow Table
+        """
+        return read_archive_table(str(self.versions_dir / version_id / "archive"), table, columns)
+    
     def list_versions(self, tags: Optional[List[str]] = None) -> List[DatasetVersion]:
         """List all versions, optionally filtered by tags."""
         versions = list(self.versions.values())
@@ -264,6 +310,7 @@ class DatasetVersionManager:
             - jsonl  : JSON Lines (one dialogue per line)
             - hf     : HuggingFace-style dataset (directory: train.jsonl + dataset_info.json)
             - rasa   : Rasa-style stories YAML (one story per dialogue, user/bot steps)
+            - parquet / arrow : Columnar archive directory (see dialogue_archive; needs pyarrow)
         """
         dialogues = self.load_version_dialogues(version_id)
         version = self.get_version(version_id)
@@ -317,8 +364,10 @@ class DatasetVersionManager:
             info_file = output_dir / "dataset_info.json"
             with open(info_file, 'w') as f:
                 json.dump(info, f, indent=2)
+        elif format in ARCHIVE_FORMATS:
+            write_archive(dialogues, output_path, format=format)
         else:
-            raise ValueError(f"Unsupported format: {format}. Use json, jsonl, hf, or rasa.")
+            raise ValueError(f"Unsupported format: {format}. Use json, jsonl, hf, rasa, parquet, or arrow.")
 
         logger.info(f"Exported version {version_id} to {output_path} (format={format})")
 
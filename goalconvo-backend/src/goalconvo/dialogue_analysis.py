@@ -0,0 +1,139 @@
+"""
+Shared per-dialogue preprocessing for evaluation metrics.
+
+Diversity, BERTScore, BLEU, length and domain metrics all start from the same
+joined turn text and word tokens. A DialogueAnalyzer builds one
+DialogueAnalysis record per dialogue (joined and lowercased text, per-turn
+word-id arrays over a shared vocabulary, distinct unigram / bigram sets) the
+first time any metric asks for it, and every metric reads from that record.
+"""
+
+import re
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"\b\w+\b")
+
+
+@dataclass
+class DialogueAnalysis:
+    """Preprocessed text views of one dialogue."""
+
+    text: str  # turn texts joined by spaces
+    lower: str
+    turn_texts: List[str]
+    turn_token_ids: List[np.ndarray]  # per turn, ids of its lowercase \w+ words
+    token_ids: np.ndarray  # all turns' word ids, in order
+    unigrams: np.ndarray  # distinct word ids
+    bigrams: np.ndarray  # distinct adjacent word-id pairs, packed as int64
+    whitespace_words: int  # len(text.split())
+    _tokens: Dict[str, List[str]] = field(default_factory=dict, repr=False)
+
+    @property
+    def num_tokens(self) -> int:
+        return len(self.token_ids)
+
+    def tokens(self, name: str, tokenize: Callable[[str], List[str]]) -> List[str]:
+        """Tokens of the lowercase text from a metric-specific tokenizer, computed once per name."""
+        if name not in self._tokens:
+            self._tokens[name] = tokenize(self.lower)
+        return self._tokens[name]
+
+
+class DialogueAnalyzer:
+    """Builds and caches DialogueAnalysis records (by dialogue object) over a shared word vocabulary."""
+
+    def __init__(self):
+        self.vocabulary: Dict[str, int] = {}
+        self.words: List[str] = []
+        self._records: Dict[int, Tuple[Dict[str, Any], DialogueAnalysis]] = {}
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def _ids(self, words: List[str]) -> np.ndarray:
+        ids = []
+        for word in words:
+            word_id = self.vocabulary.get(word)
+            if word_id is None:
+                word_id = self.vocabulary[word] = len(self.words)
+                self.words.append(word)
+            ids.append(word_id)
+        return np.array(ids, dtype=np.int64)
+
+    def analyze(self, dialogue: Dict[str, Any]) -> DialogueAnalysis:
+        """Analysis record of a dialogue (built on first request)."""
+        cached = self._records.get(id(dialogue))
+        if cached is not None and cached[0] is dialogue:
+            return cached[1]
+
+        turn_texts = [turn.get("text", "") for turn in dialogue.get("turns", [])]
+        text = " ".join(turn_texts)
+        lower = text.lower()
+        turn_token_ids = [self._ids(WORD_PATTERN.findall(turn_text.lower())) for turn_text in turn_texts]
+        # Word tokens of the joined text: turn boundaries never merge words, since turns are space-joined
+        token_ids = np.concatenate(turn_token_ids) if turn_token_ids else np.zeros(0, dtype=np.int64)
+        record = DialogueAnalysis(
+            text=text,
+            lower=lower,
+            turn_texts=turn_texts,
+            turn_token_ids=turn_token_ids,
+            token_ids=token_ids,
+            unigrams=np.unique(token_ids),
+            bigrams=np.unique((token_ids[:-1] << 32) | token_ids[1:]),
+            whitespace_words=len(text.split()),
+        )
+        # Keep the dialogue referenced so its id() is not reused while cached
+        self._records[id(dialogue)] = (dialogue, record)
+        return record
+
+    def analyze_all(self, dialogues: List[Dict[str, Any]]) -> List[DialogueAnalysis]:
+        """Analysis records of several dialogues."""
+        return [self.analyze(dialogue) for dialogue in dialogues]
+
+    def clear(self) -> None:
+        """Drop cached records (the vocabulary is kept)."""
+        self._records.clear()
+
+    def discard(self, dialogues: Iterable[Dict[str, Any]]) -> None:
+        """Drop the cached records of some dialogues (e.g. a finished evaluation chunk)."""
+        for dialogue in dialogues:
+            cached = self._records.get(id(dialogue))
+            if cached is not None and cached[0] is dialogue:
+                del self._records[id(dialogue)]
+
+
+def distinct_ratios(record: DialogueAnalysis) -> Optional[Tuple[float, float]]:
+    """Distinct-1 / Distinct-2 of one dialogue, or None when it has no words."""
+    if not record.num_tokens:
+        return None
+    distinct_1 = len(record.unigrams) / record.num_tokens
+    distinct_2 = len(record.bigrams) / (record.num_tokens - 1) if record.num_tokens > 1 else 0.0
+    return distinct_1, distinct_2
+
+
+def mean_distinct(ratios: Iterable[Optional[Sequence[float]]]) -> Dict[str, float]:
+    """
+    Average per-dialogue (Distinct-1, Distinct-2) pairs (None entries are skipped).
+
+    Returns:
+        Dictionary with distinct_1, distinct_2 and their mean as combined
+    """
+    ratios = [pair for pair in ratios if pair is not None]
+    if not ratios:
+        return {"distinct_1": 0.0, "distinct_2": 0.0, "combined": 0.0}
+
+    distinct_1 = float(np.mean([pair[0] for pair in ratios]))
+    distinct_2 = float(np.mean([pair[1] for pair in ratios]))
+    return {
+        "distinct_1": distinct_1,
+        "distinct_2": distinct_2,
+        "combined": (distinct_1 + distinct_2) / 2
+    }
+
+
+def distinct_diversity(records: List[DialogueAnalysis]) -> Dict[str, float]:
+    """Distinct-1 / Distinct-2, averaged per dialogue (dialogues without words are skipped)."""
+    return mean_distinct(distinct_ratios(record) for record in records)
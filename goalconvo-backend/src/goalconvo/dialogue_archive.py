@@ -0,0 +1,284 @@
+"""
+Columnar archive format for dialogue corpora.
+
+An archive is a directory with two tables, written as Parquet or Arrow IPC
+(Feather v2) files with zstd compression:
+
+- dialogues.<ext>: one row per dialogue with the indexed fields as columns
+  (dialogue_id, domain, goal, quality_score, created_at, generated_at,
+  num_turns) and the remaining top-level keys (metadata, provenance, ...) as
+  a compact JSON "extra" column.
+- turns.<ext>: one row per turn (dialogue_index, turn_index, role, text and a
+  JSON "extra" column for any other turn keys), so turn texts can be scanned
+  without touching dialogue-level data.
+
+Domains and roles are dictionary-encoded. Reads memory-map the files and only
+materialize the requested columns, so analytics over large corpora never parse
+JSON. Requires the optional pyarrow dependency.
+"""
+
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Iterator
+
+import numpy as np
+
+from .dialogue_storage import dialogue_fields
+from .utils import dumps_compact, ensure_dir
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as pa_ipc
+    import pyarrow.parquet as pq
+except ImportError:  # optional: columnar archives
+    pa = None
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+ARCHIVE_TABLES = ("dialogues", "turns")
+ARCHIVE_COMPRESSION = "zstd"
+ARCHIVE_BATCH_SIZE = 1024  # dialogues per record batch / row group
+
+# Top-level keys stored as their own columns; everything else goes to "extra"
+_DIALOGUE_KEYS = ("dialogue_id", "domain", "goal", "turns")
+_TURN_KEYS = ("role", "text")
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("Dialogue archives require pyarrow (pip install pyarrow)")
+
+
+def _schemas() -> Dict[str, Any]:
+    dictionary = pa.dictionary(pa.int32(), pa.string())
+    return {
+        "dialogues": pa.schema([
+            ("dialogue_id", pa.string()),
+            ("domain", dictionary),
+            ("goal", pa.string()),
+            ("quality_score", pa.float64()),
+            ("created_at", pa.string()),
+            ("generated_at", pa.string()),
+            ("num_turns", pa.int32()),
+            ("extra", pa.string()),
+        ]),
+        "turns": pa.schema([
+            ("dialogue_index", pa.int32()),
+            ("turn_index", pa.int32()),
+            ("role", dictionary),
+            ("text", pa.string()),
+            ("extra", pa.string()),
+        ]),
+    }
+
+
+def _extra(data: Dict[str, Any], promoted: Iterable[str]) -> Optional[str]:
+    rest = {key: value for key, value in data.items() if key not in promoted}
+    return dumps_compact(rest) if rest else None
+
+
+class _Dictionary:
+    """Append-only string dictionary, so every batch extends the previous one (IPC deltas)."""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self.codes: Dict[str, int] = {}
+
+    def encode(self, values: List[Optional[str]]) -> Any:
+        indices = []
+        for value in values:
+            if value is None:
+                indices.append(None)
+                continue
+            if value not in self.codes:
+                self.codes[value] = len(self.values)
+                self.values.append(value)
+            indices.append(self.codes[value])
+        return pa.DictionaryArray.from_arrays(
+            pa.array(indices, type=pa.int32()), pa.array(self.values, type=pa.string())
+        )
+
+
+class ArchiveWriter:
+    """
+    Streams dialogues into an archive directory, one record batch at a time.
+
+    Use as a context manager (or call close()); write() may be called per dialogue.
+    """
+
+    def __init__(self, path: str, format: str = "parquet", batch_size: int = ARCHIVE_BATCH_SIZE):
+        _require_pyarrow()
+        if format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Unsupported archive format: {format} (use {', '.join(ARCHIVE_FORMATS)})")
+        self.path = Path(path)
+        self.format = format
+        self.batch_size = batch_size
+        self.count = 0
+        self._schemas = _schemas()
+        self._dictionaries = {"domain": _Dictionary(), "role": _Dictionary()}
+        self._pending: List[Dict[str, Any]] = []
+        self._writers: Dict[str, Any] = {}
+        self._sinks: List[Any] = []
+        ensure_dir(str(self.path))
+        for table in ARCHIVE_TABLES:
+            file_path = str(self.path / f"{table}{ARCHIVE_FORMATS[format]}")
+            if format == "parquet":
+                self._writers[table] = pq.ParquetWriter(file_path, self._schemas[table], compression=ARCHIVE_COMPRESSION)
+            else:
+                sink = pa.OSFile(file_path, "wb")
+                self._sinks.append(sink)
+                self._writers[table] = pa_ipc.new_file(
+                    sink,
+                    self._schemas[table],
+                    options=pa_ipc.IpcWriteOptions(compression=ARCHIVE_COMPRESSION, emit_dictionary_deltas=True),
+                )
+
+    def __enter__(self) -> "ArchiveWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+    def write(self, dialogue: Dict[str, Any]) -> None:
+        """Add one dialogue to the archive."""
+        self._pending.append(dialogue)
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+
+    def write_all(self, dialogues: Iterable[Dict[str, Any]]) -> int:
+        """Add dialogues from an iterable and return how many were written."""
+        before = self.count + len(self._pending)
+        for dialogue in dialogues:
+            self.write(dialogue)
+        return self.count + len(self._pending) - before
+
+    def _flush(self) -> None:
+        if not self._pending:
+            return
+        fields = [dialogue_fields(dialogue) for dialogue in self._pending]
+        dialogues = {
+            "dialogue_id": [dialogue.get("dialogue_id") for dialogue in self._pending],
+            "domain": self._dictionaries["domain"].encode([dialogue.get("domain") for dialogue in self._pending]),
+            "goal": [dialogue.get("goal") for dialogue in self._pending],
+            "quality_score": [f["quality_score"] for f in fields],
+            "created_at": [str(f["created_at"]) if f["created_at"] is not None else None for f in fields],
+            "generated_at": [str(f["generated_at"]) if f["generated_at"] is not None else None for f in fields],
+            "num_turns": [f["num_turns"] for f in fields],
+            "extra": [_extra(dialogue, _DIALOGUE_KEYS) for dialogue in self._pending],
+        }
+        turns: Dict[str, List[Any]] = {name: [] for name in ("dialogue_index", "turn_index", "role", "text", "extra")}
+        for offset, dialogue in enumerate(self._pending):
+            for turn_index, turn in enumerate(dialogue.get("turns", [])):
+                turns["dialogue_index"].append(self.count + offset)
+                turns["turn_index"].append(turn_index)
+                turns["role"].append(turn.get("role"))
+                turns["text"].append(turn.get("text"))
+                turns["extra"].append(_extra(turn, _TURN_KEYS))
+        turns["role"] = self._dictionaries["role"].encode(turns["role"])
+
+        for table, columns in (("dialogues", dialogues), ("turns", turns)):
+            schema = self._schemas[table]
+            batch = pa.RecordBatch.from_arrays(
+                [pa.array(columns[f.name], type=f.type) if isinstance(columns[f.name], list) else columns[f.name]
+                 for f in schema],
+                schema=schema,
+            )
+            self._writers[table].write_batch(batch)
+        self.count += len(self._pending)
+        self._pending = []
+
+    def close(self) -> None:
+        """Flush pending dialogues and close the archive files."""
+        if not self._writers:
+            return
+        self._flush()
+        for writer in self._writers.values():
+            writer.close()
+        for sink in self._sinks:
+            sink.close()
+        self._writers = {}
+        self._sinks = []
+        logger.info(f"Wrote {self.count} dialogues to {self.format} archive {self.path}")
+
+
+def write_archive(
+    dialogues: Iterable[Dict[str, Any]],
+    path: str,
+    format: str = "parquet",
+    batch_size: int = ARCHIVE_BATCH_SIZE
+) -> int:
+    """
+    Write dialogues (list or iterator, streamed in batches) to an archive directory.
+
+    Returns:
+        Number of dialogues written
+    """
+    with ArchiveWriter(path, format=format, batch_size=batch_size) as writer:
+        writer.write_all(dialogues)
+    return writer.count
+
+
+def archive_format(path: str) -> Optional[str]:
+    """Format of the archive at path, or None if there is none."""
+    for format, suffix in ARCHIVE_FORMATS.items():
+        if (Path(path) / f"dialogues{suffix}").exists():
+            return format
+    return None
+
+
+def read_archive_table(path: str, table: str = "dialogues", columns: Optional[List[str]] = None) -> Any:
+    """
+    Read one archive table as a pyarrow Table, memory-mapped.
+
+    Args:
+        path: Archive directory
+        table: "dialogues" or "turns"
+        columns: Columns to read (projection pushdown; default all)
+    """
+    _require_pyarrow()
+    if table not in ARCHIVE_TABLES:
+        raise ValueError(f"Unknown archive table: {table} (use {', '.join(ARCHIVE_TABLES)})")
+    format = archive_format(path)
+    if format is None:
+        raise FileNotFoundError(f"No dialogue archive at {path}")
+    file_path = str(Path(path) / f"{table}{ARCHIVE_FORMATS[format]}")
+    if format == "parquet":
+        return pq.read_table(file_path, columns=columns, memory_map=True)
+    # Buffers reference the mapping, so column reads below are zero-copy
+    result = pa_ipc.open_file(pa.memory_map(file_path, "r")).read_all()
+    return result.select(columns) if columns else result
+
+
+def iter_archive_dialogues(path: str, batch_size: int = ARCHIVE_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+    """Reconstruct the archived dialogues (as written) in archive order."""
+    dialogues = read_archive_table(path, "dialogues")
+    turns = read_archive_table(path, "turns")
+    turn_owner = turns.column("dialogue_index").to_numpy()
+    turn_columns = {name: turns.column(name) for name in ("role", "text", "extra")}
+
+    turn_start = 0
+    for start in range(0, dialogues.num_rows, batch_size):
+        rows = dialogues.slice(start, batch_size).to_pylist()
+        end = start + len(rows)
+        turn_end = int(np.searchsorted(turn_owner, end, side="left"))
+        batch_turns = {name: column.slice(turn_start, turn_end - turn_start).to_pylist()
+                       for name, column in turn_columns.items()}
+        owners = turn_owner[turn_start:turn_end]
+
+        position = 0
+        for offset, row in enumerate(rows):
+            dialogue = {key: row[key] for key in ("dialogue_id", "domain", "goal") if row[key] is not None}
+            dialogue_turns = []
+            while position < len(owners) and owners[position] == start + offset:
+                turn = {"role": batch_turns["role"][position], "text": batch_turns["text"][position]}
+                if batch_turns["extra"][position]:
+                    turn.update(json.loads(batch_turns["extra"][position]))
+                dialogue_turns.append(turn)
+                position += 1
+            dialogue["turns"] = dialogue_turns
+            if row["extra"]:
+                dialogue.update(json.loads(row["extra"]))
+            yield dialogue
+        turn_start = turn_end
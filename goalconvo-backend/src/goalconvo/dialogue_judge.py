@@ -0,0 +1,347 @@
+"""
+Concurrent LLM-as-a-Judge scoring of dialogues.
+
+DialogueJudge scores dialogues on task success, coherence, diversity, fluency
+and groundedness (0-100 each):
+
+- calls run on a bounded thread pool behind a shared RateLimiter
+- responses are parsed as JSON and validated against the score schema; an
+  invalid response gets one repair request before the dialogue is given up
+- optionally, several short dialogues are packed into one judge prompt that
+  returns a JSON array (batches that fail to parse are re-judged one by one)
+- scores are persisted per dialogue content and judge model in the SQLite
+  evaluation store (JudgeScoreStore), so re-evaluating an unchanged dialogue
+  costs no call; each run only queries and writes the keys it judges
+"""
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from .evaluation_store import EvaluationStore
+
+logger = logging.getLogger(__name__)
+
+JUDGE_METRICS = ("task_success", "coherence", "diversity", "fluency", "groundedness")
+# Bump when the rubric changes so persisted scores are not reused across rubrics
+JUDGE_PROMPT_VERSION = "1"
+JUDGE_MAX_TOKENS = 200
+
+JUDGE_RUBRIC = """0–100 for each metric. Use 85–95 for good quality (goal achieved, coherent, varied wording, fluent, grounded). Use 70–84 for acceptable, 50–69 for moderate issues, 0–49 only for poor/failed.
+
+1. **Task Success** – Was the user goal fulfilled? Score 85+ if the user got what they needed or expressed satisfaction.
+2. **Coherence** – Are turns logical and context-aware? Score 85+ if the conversation flows naturally.
+3. **Diversity** – Is phrasing varied and non-repetitive? Score 85+ if different words and structures are used across turns.
+4. **Fluency** – Is grammar and language natural? Score 85+ if there are no obvious errors.
+5. **Groundedness** – Are answers based on context/domain (no obvious fabrication)? Score 85+ if responses stay on topic."""
+
+SCORE_EXAMPLE = '{ "task_success": 88, "coherence": 90, "diversity": 85, "fluency": 92, "groundedness": 87 }'
+
+
+def format_dialogue(turns: List[Dict[str, str]]) -> str:
+    """Dialogue turns as "Role: text" lines."""
+    return "\n".join(f"{turn.get('role', 'Unknown')}: {turn.get('text', '')}" for turn in turns)
+
+
+def build_judge_prompt(goal: str, turns: List[Dict[str, str]]) -> str:
+    """Judge prompt for one dialogue."""
+    return f"""You are an expert dialogue evaluator. Score this conversation {JUDGE_RUBRIC}
+
+Goal: {goal}
+
+Dialogue:
+{format_dialogue(turns)}
+
+Return ONLY a JSON object with integer scores (0-100), e.g.:
+{SCORE_EXAMPLE}
+No other text."""
+
+
+def build_batch_judge_prompt(dialogues: Sequence[Dict[str, Any]]) -> str:
+    """Judge prompt scoring several dialogues at once (one JSON object per dialogue, in order)."""
+    sections = "\n\n".join(
+        f"### Dialogue {i + 1}\nGoal: {d.get('goal', '')}\n{format_dialogue(d.get('turns', []))}"
+        for i, d in enumerate(dialogues)
+    )
+    return f"""You are an expert dialogue evaluator. Score each of the {len(dialogues)} conversations below independently, {JUDGE_RUBRIC}
+
+{sections}
+
+Return ONLY a JSON array with exactly {len(dialogues)} objects, one per dialogue in order, each with integer scores (0-100), e.g.:
+[{SCORE_EXAMPLE}, ...]
+No other text."""
+
+
+def build_repair_prompt(previous_response: str, expected: str) -> str:
+    """Follow-up asking the judge to restate an unparseable answer as valid JSON."""
+    return f"""Your previous answer could not be parsed:
+{previous_response[:2000]}
+
+Restate the same scores as {expected} with the integer keys {', '.join(JUDGE_METRICS)} (0-100). Return ONLY the JSON, no other text."""
+
+
+def validate_scores(value: Any) -> Optional[Dict[str, int]]:
+    """Scores dict if value has every judge metric as a number in 0-100 (rounded to int), else None."""
+    if not isinstance(value, dict):
+        return None
+    scores = {}
+    for metric in JUDGE_METRICS:
+        score = value.get(metric)
+        if isinstance(score, str):
+            try:
+                score = float(score.strip().rstrip("%"))
+            except ValueError:
+                return None
+        if isinstance(score, bool) or not isinstance(score, (int, float)) or not 0 <= score <= 100:
+            return None
+        scores[metric] = int(round(score))
+    return scores
+
+
+def _json_values(text: str) -> List[Any]:
+    """Every top-level JSON object or array embedded in text, in order."""
+    decoder = json.JSONDecoder()
+    values, i = [], 0
+    while i < len(text):
+        if text[i] not in "{[":
+            i += 1
+            continue
+        try:
+            value, end = decoder.raw_decode(text, i)
+        except ValueError:
+            i += 1
+            continue
+        values.append(value)
+        i = end
+    return values
+
+
+def parse_judge_scores(response: str) -> Optional[Dict[str, int]]:
+    """First schema-valid score object in a judge response, or None."""
+    for value in _json_values(response or ""):
+        scores = validate_scores(value)
+        if scores is not None:
+            return scores
+    return None
+
+
+def parse_batch_judge_scores(response: str, count: int) -> Optional[List[Dict[str, int]]]:
+    """Scores of count dialogues from a batch response (JSON array, or objects in order), or None."""
+    values = _json_values(response or "")
+    for value in values:
+        if isinstance(value, list) and len(value) == count:
+            scores = [validate_scores(item) for item in value]
+            if all(s is not None for s in scores):
+                return scores
+    objects = [validate_scores(value) for value in values if isinstance(value, dict)]
+    if len(objects) == count and all(s is not None for s in objects):
+        return objects
+    return None
+
+
+class RateLimiter:
+    """Thread-safe limiter spacing calls evenly at a maximum rate."""
+
+    def __init__(self, requests_per_minute: float):
+        """
+        Args:
+            requests_per_minute: Maximum call rate (0 or less: unlimited)
+        """
+        self.interval = 60.0 / requests_per_minute if requests_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_time = 0.0
+
+    def wait(self) -> None:
+        """Block until the next call slot."""
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_time)
+            self._next_time = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+class JudgeScoreStore:
+    """
+    Judge scores in the SQLite evaluation store.
+
+    Scores are stored as the JUDGE_SCORE_METRIC contribution, with the rubric
+    version and judge model as context and the judged content (goal and turns)
+    as dialogue key. Lookups and writes touch only the given keys, so memory
+    and I/O grow with the dialogues being judged, not with the store.
+    """
+
+    JUDGE_SCORE_METRIC = "llm_judge_scores"
+
+    def __init__(self, path: str):
+        self.store = EvaluationStore(path)
+
+    def __len__(self) -> int:
+        return self.store.count(self.JUDGE_SCORE_METRIC)
+
+    def close(self) -> None:
+        """Close the database connection."""
+        self.store.close()
+
+    @staticmethod
+    def context(model: str = "") -> str:
+        """Store context of a judge: rubric version and model."""
+        return f"v{JUDGE_PROMPT_VERSION}/{model}"
+
+    @staticmethod
+    def key(dialogue: Dict[str, Any]) -> str:
+        """Store key of a dialogue: its goal and turns as judged."""
+        payload = json.dumps([
+            dialogue.get("goal", ""),
+            [[turn.get("role", "Unknown"), turn.get("text", "")] for turn in dialogue.get("turns", [])],
+        ])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, keys: Sequence[str]) -> Dict[str, Dict[str, int]]:
+        """Stored scores of a judge model for the given keys (missing keys are absent)."""
+        return self.store.get_many(self.JUDGE_SCORE_METRIC, self.context(model), keys)
+
+    def put_many(self, model: str, scores: Dict[str, Dict[str, int]]) -> None:
+        """Store scores of a judge model, keyed by dialogue key, in one transaction."""
+        if scores:
+            self.store.put_many(self.JUDGE_SCORE_METRIC, self.context(model), scores)
+
+
+class DialogueJudge:
+    """Concurrent, rate-limited, cached LLM judge for dialogues."""
+
+    def __init__(
+        self,
+        llm_client: Any,
+        workers: int = 4,
+        requests_per_minute: float = 0,
+        batch_size: int = 1,
+        batch_max_words: int = 150,
+        store: Optional[JudgeScoreStore] = None
+    ):
+        """
+        Args:
+            llm_client: Client with generate_completion(prompt, temperature=..., max_tokens=...)
+            workers: Concurrent judge calls
+            requests_per_minute: Call rate cap shared by all workers (0: unlimited)
+            batch_size: Dialogues packed per judge prompt (1: one prompt per dialogue)
+            batch_max_words: Only dialogues up to this many words are packed
+            store: Persistent score store (None: no persistence)
+        """
+        self.llm_client = llm_client
+        self.workers = max(1, workers)
+        self.rate_limiter = RateLimiter(requests_per_minute)
+        self.batch_size = max(1, batch_size)
+        self.batch_max_words = batch_max_words
+        self.store = store
+        api_config = getattr(llm_client, "api_config", None) or {}
+        self.model = f"{api_config.get('provider', '')}/{api_config.get('model', '')}"
+        self.calls = 0
+        self._calls_lock = threading.Lock()
+
+    def _complete(self, prompt: str, max_tokens: int) -> str:
+        self.rate_limiter.wait()
+        with self._calls_lock:
+            self.calls += 1
+        return self.llm_client.generate_completion(prompt, temperature=0.1, max_tokens=max_tokens)
+
+    def judge_dialogue(self, dialogue: Dict[str, Any]) -> Optional[Dict[str, int]]:
+        """Scores of one dialogue (one repair request if the first answer is invalid), or None."""
+        try:
+            response = self._complete(build_judge_prompt(dialogue.get("goal", ""), dialogue.get("turns", [])), JUDGE_MAX_TOKENS)
+            scores = parse_judge_scores(response)
+            if scores is None:
+                logger.debug(f"Invalid judge response, asking for a repair: {response!r}")
+                response = self._complete(build_repair_prompt(response, "one JSON object"), JUDGE_MAX_TOKENS)
+                scores = parse_judge_scores(response)
+            if scores is None:
+                logger.warning(f"Could not parse LLM response: {response}")
+            return scores
+        except Exception as e:
+            logger.error(f"Error in LLM judge evaluation: {e}")
+            return None
+
+    def _judge_batch(self, dialogues: List[Dict[str, Any]]) -> List[Optional[Dict[str, int]]]:
+        if len(dialogues) == 1:
+            return [self.judge_dialogue(dialogues[0])]
+        max_tokens = JUDGE_MAX_TOKENS * len(dialogues)
+        expected = f"one JSON array of {len(dialogues)} objects"
+        try:
+            response = self._complete(build_batch_judge_prompt(dialogues), max_tokens)
+            scores = parse_batch_judge_scores(response, len(dialogues))
+            if scores is None:
+                response = self._complete(build_repair_prompt(response, expected), max_tokens)
+                scores = parse_batch_judge_scores(response, len(dialogues))
+            if scores is not None:
+                return scores
+            logger.warning(f"Could not parse batch judge response for {len(dialogues)} dialogues; judging them one by one")
+        except Exception as e:
+            logger.warning(f"Batch judge call failed ({e}); judging {len(dialogues)} dialogues one by one")
+        return [self.judge_dialogue(dialogue) for dialogue in dialogues]
+
+    def _groups(self, indices: List[int], dialogues: Sequence[Dict[str, Any]]) -> List[List[int]]:
+        if self.batch_size == 1:
+            return [[i] for i in indices]
+        # Long dialogues are judged alone; short ones are packed batch_size per prompt
+        short, groups = [], []
+        for i in indices:
+            words = sum(len(turn.get("text", "").split()) for turn in dialogues[i].get("turns", []))
+            if words <= self.batch_max_words:
+                short.append(i)
+            else:
+                groups.append([i])
+        groups += [short[start:start + self.batch_size] for start in range(0, len(short), self.batch_size)]
+        return groups
+
+    def judge_all(
+        self,
+        dialogues: Sequence[Dict[str, Any]],
+        on_progress: Optional[Callable[[int, int], None]] = None
+    ) -> List[Optional[Dict[str, int]]]:
+        """
+        Scores of every dialogue (None where judging failed), in input order.
+
+        Args:
+            dialogues: Dialogues with goal and turns
+            on_progress: Called with (dialogues scored, total) as judge calls complete
+        """
+        results: List[Optional[Dict[str, int]]] = [None] * len(dialogues)
+        keys = [JudgeScoreStore.key(d) for d in dialogues] if self.store is not None else []
+        stored = self.store.get_many(self.model, keys) if self.store is not None else {}
+        pending = []
+        for i in range(len(dialogues)):
+            cached = stored.get(keys[i]) if stored else None
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append(i)
+        if len(pending) < len(dialogues):
+            logger.info(f"LLM judge: {len(dialogues) - len(pending)} of {len(dialogues)} dialogues scored from cache")
+
+        done = len(dialogues) - len(pending)
+        # New scores of this call, written to the store in one transaction at the end
+        judged: Dict[str, Dict[str, int]] = {}
+
+        def run(group: List[int]) -> List[int]:
+            for i, scores in zip(group, self._judge_batch([dialogues[i] for i in group])):
+                results[i] = scores
+                if scores is not None and self.store is not None:
+                    judged[keys[i]] = scores
+            return group
+
+        try:
+            with ThreadPoolExecutor(max_workers=self.workers) as executor:
+                for group in executor.map(run, self._groups(pending, dialogues)):
+                    done += len(group)
+                    if on_progress:
+                        on_progress(done, len(dialogues))
+        finally:
+            if self.store is not None:
+                self.store.put_many(self.model, judged)
+        return results
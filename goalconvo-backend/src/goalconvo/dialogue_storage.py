@@ -0,0 +1,531 @@
+"""
+Storage backends for synthetic dialogues.
+
+DatasetStore keeps its public API and delegates persistence to one of these
+backends:
+
+- JSONDirectoryStorage: the original layout, one pretty-printed JSON file per
+  dialogue under <synthetic_dir>/<domain>/. Every query parses every file.
+- SQLiteDialogueStorage: a single SQLite database holding each dialogue as a
+  JSON body plus indexed columns (domain, dialogue_id, quality_score,
+  created_at, generated_at, num_turns, tags), so lookups, filters and
+  statistics are index scans instead of directory parses.
+
+Both stream records through iter(): "where" filters and "order_by" apply to
+the indexed fields (plus "tags"), and "fields" projects each record; a
+projection made only of indexed fields never parses the dialogue body.
+latest() returns the newest dialogues by generated_at; SQLite answers it from
+a (domain, generated_at) index maintained on every save.
+"""
+
+import heapq
+import json
+import logging
+import operator
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterator, Tuple
+
+from .utils import save_json, load_json, ensure_dir, dumps_compact
+
+logger = logging.getLogger(__name__)
+
+STORAGE_BACKENDS = ("sqlite", "json")
+
+# Fields stored as indexed columns by SQLiteDialogueStorage
+INDEXED_FIELDS = ("domain", "dialogue_id", "quality_score", "created_at", "generated_at", "num_turns", "goal")
+
+WHERE_OPERATORS = {
+    "=": operator.eq, "!=": operator.ne, "<": operator.lt, "<=": operator.le,
+    ">": operator.gt, ">=": operator.ge, "in": lambda value, operand: value in operand,
+}
+
+# Rows fetched per round trip while streaming from SQLite
+ITER_BATCH_SIZE = 256
+
+
+def dialogue_fields(dialogue: Dict[str, Any]) -> Dict[str, Any]:
+    """Values of the indexed fields of a dialogue."""
+    metadata = dialogue.get("metadata") or {}
+    quality_score = metadata.get("quality_score")
+    return {
+        "domain": dialogue.get("domain", "unknown"),
+        "dialogue_id": dialogue.get("dialogue_id"),
+        "quality_score": float(quality_score) if quality_score is not None else None,
+        "created_at": metadata.get("created_at"),
+        "generated_at": metadata.get("generated_at") or (dialogue.get("provenance") or {}).get("timestamp"),
+        "num_turns": len(dialogue.get("turns", [])),
+        "goal": dialogue.get("goal"),
+    }
+
+
+def parse_where(where: Optional[Dict[str, Any]]) -> Tuple[List[Tuple[str, str, Any]], List[str]]:
+    """
+    Validate a where clause.
+
+    where maps an indexed field to a value (equality) or an (operator, value) tuple,
+    e.g. {"quality_score": (">=", 0.8), "domain": ("in", ["hotel", "taxi"])};
+    "tags" maps to tags the dialogue must all carry. Records whose field is missing
+    never match a condition on it.
+
+    Returns:
+        Tuple of ([(field, operator, value)], required tags)
+    """
+    conditions, tags = [], []
+    for field_name, condition in (where or {}).items():
+        if field_name == "tags":
+            tags = [condition] if isinstance(condition, str) else list(condition)
+            continue
+        if field_name not in INDEXED_FIELDS:
+            raise ValueError(f"Cannot filter on non-indexed field: {field_name}")
+        op, value = condition if isinstance(condition, tuple) else ("=", condition)
+        if op not in WHERE_OPERATORS:
+            raise ValueError(f"Unsupported where operator: {op}")
+        conditions.append((field_name, op, list(value) if op == "in" else value))
+    return conditions, tags
+
+
+def parse_order_by(order_by: Optional[str]) -> Optional[Tuple[str, bool]]:
+    """Parse "field" / "-field" (descending) into (field, descending)."""
+    if not order_by:
+        return None
+    field_name = order_by.lstrip("-")
+    if field_name not in INDEXED_FIELDS:
+        raise ValueError(f"Cannot order by non-indexed field: {field_name}")
+    return field_name, order_by.startswith("-")
+
+
+def _latest_key(dialogue: Dict[str, Any]) -> str:
+    # Undated dialogues sort as oldest
+    return str(dialogue_fields(dialogue)["generated_at"] or "")
+
+
+def project(dialogue: Dict[str, Any], fields: Optional[List[str]]) -> Dict[str, Any]:
+    """Project a dialogue onto fields (indexed fields are computed, others are top-level keys)."""
+    if not fields:
+        return dialogue
+    indexed = dialogue_fields(dialogue)
+    return {name: indexed[name] if name in indexed else dialogue.get(name) for name in fields}
+
+
+def dialogue_tags(dialogue: Dict[str, Any]) -> List[str]:
+    """
+    Tags indexed for a dialogue: explicit "tags" (top level or metadata) plus
+    markers set by the quality pipeline (improvement mode, near-duplicate flag).
+    """
+    metadata = dialogue.get("metadata") or {}
+    tags = set(dialogue.get("tags") or []) | set(metadata.get("tags") or [])
+    if metadata.get("improvement_mode"):
+        tags.add(str(metadata["improvement_mode"]))
+    if metadata.get("near_duplicate_of"):
+        tags.add("near_duplicate")
+    return sorted(str(tag) for tag in tags)
+
+
+class JSONDirectoryStorage:
+    """One JSON file per dialogue under <root>/<domain>/<dialogue_id>.json."""
+
+    def __init__(self, root: str):
+        self.root = Path(root)
+        ensure_dir(str(self.root))
+
+    def path_for(self, domain: str, dialogue_id: str) -> Path:
+        """File path of a dialogue."""
+        return self.root / domain / f"{dialogue_id}.json"
+
+    def put(self, dialogue: Dict[str, Any]) -> None:
+        """Insert or replace a dialogue."""
+        save_json(dialogue, str(self.path_for(dialogue.get("domain", "unknown"), dialogue["dialogue_id"])))
+
+    def put_many(self, dialogues: List[Dict[str, Any]]) -> None:
+        """Insert or replace several dialogues (one file each; the layout has no batching)."""
+        for dialogue in dialogues:
+            self.put(dialogue)
+
+    def get(self, domain: str, dialogue_id: str) -> Optional[Dict[str, Any]]:
+        """Load a dialogue, or None if it does not exist."""
+        file_path = self.path_for(domain, dialogue_id)
+        if not file_path.exists():
+            return None
+        return load_json(str(file_path))
+
+    def delete(self, domain: str, dialogue_id: str) -> bool:
+        """Delete a dialogue; True if it existed."""
+        file_path = self.path_for(domain, dialogue_id)
+        if not file_path.exists():
+            return False
+        file_path.unlink()
+        return True
+
+    def clear(self, domain: str) -> int:
+        """Delete all dialogues of a domain and return how many were removed."""
+        removed_count = 0
+        domain_dir = self.root / domain
+        if domain_dir.exists():
+            for file_path in domain_dir.glob("*.json"):
+                try:
+                    file_path.unlink()
+                    removed_count += 1
+                except Exception as e:
+                    logger.error(f"Error removing {file_path}: {e}")
+        return removed_count
+
+    def domains(self) -> List[str]:
+        """Domains with a directory in the store."""
+        return sorted(p.name for p in self.root.iterdir() if p.is_dir()) if self.root.exists() else []
+
+    def _scan(self, domains: List[str], where: Optional[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        conditions, tags = parse_where(where)
+        for domain in domains:
+            domain_dir = self.root / domain
+            if not domain_dir.exists():
+                continue
+            for file_path in domain_dir.glob("*.json"):
+                try:
+                    dialogue = load_json(str(file_path))
+                except Exception as e:
+                    logger.error(f"Error loading dialogue from {file_path}: {e}")
+                    continue
+                if conditions:
+                    values = dialogue_fields(dialogue)
+                    if not all(
+                        values[name] is not None and WHERE_OPERATORS[op](values[name], value)
+                        for name, op, value in conditions
+                    ):
+                        continue
+                if tags and not set(tags) <= set(dialogue_tags(dialogue)):
+                    continue
+                yield dialogue
+
+    def iter(
+        self,
+        domains: List[str],
+        where: Optional[Dict[str, Any]] = None,
+        order_by: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream dialogues of the given domains (see parse_where / parse_order_by / project).
+
+        Files are parsed one at a time; only order_by needs the matching records in
+        memory (as projections), since the directory layout has no sort order.
+        """
+        order = parse_order_by(order_by)
+        records = self._scan(domains, where)
+        if order is not None:
+            name, descending = order
+            keyed = [(dialogue_fields(d)[name], project(d, fields)) for d in records]
+            present = sorted((k for k in keyed if k[0] is not None), key=lambda k: k[0], reverse=descending)
+            missing = [k for k in keyed if k[0] is None]
+            # NULLs first ascending, last descending (as in SQLite)
+            ordered = present + missing if descending else missing + present
+            records = (record for _, record in ordered)
+            fields = None
+        count = 0
+        for dialogue in records:
+            yield project(dialogue, fields)
+            count += 1
+            if limit and count >= limit:
+                return
+
+    def latest(self, n: int, domains: List[str]) -> List[Dict[str, Any]]:
+        """
+        The n most recently generated dialogues of the given domains, newest first.
+
+        The directory layout has no time order, so this parses every file but keeps
+        only n dialogues in memory.
+        """
+        if n <= 0:
+            return []
+        return heapq.nlargest(n, self._scan(domains, None), key=_latest_key)
+
+    def top_by_quality(self, domains: List[str], fraction: float) -> List[Tuple[Dict[str, Any], float]]:
+        """Top fraction (at least one) of dialogues with a positive quality score, best first."""
+        scored = []
+        for dialogue in self.iter(domains):
+            quality_score = (dialogue.get("metadata") or {}).get("quality_score", 0.0)
+            if quality_score and quality_score > 0:
+                scored.append((dialogue, quality_score))
+        scored.sort(key=lambda x: x[1], reverse=True)
+        return scored[:max(1, int(len(scored) * fraction))] if scored else []
+
+    def get_fields(self, domain: str, dialogue_id: str) -> Optional[Dict[str, Any]]:
+        """Indexed field values of a stored dialogue, or None if it does not exist."""
+        dialogue = self.get(domain, dialogue_id)
+        return dialogue_fields(dialogue) if dialogue is not None else None
+
+    def count(self, domain: Optional[str] = None) -> int:
+        """Number of stored dialogues (in one domain, or overall); counts files without parsing."""
+        return sum(
+            sum(1 for _ in (self.root / name).glob("*.json"))
+            for name in ([domain] if domain else self.domains())
+        )
+
+
+class SQLiteDialogueStorage:
+    """
+    SQLite-backed dialogue storage.
+
+    Dialogues are keyed by (domain, dialogue_id); the full dialogue is kept as a
+    compact JSON body next to indexed columns used for filtering, ordering and
+    statistics. The connection is shared across threads behind a lock and the
+    database runs in WAL mode so readers do not block the writer.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS dialogues (
+            domain TEXT NOT NULL,
+            dialogue_id TEXT NOT NULL,
+            quality_score REAL,
+            created_at TEXT,
+            generated_at TEXT,
+            num_turns INTEGER NOT NULL DEFAULT 0,
+            goal TEXT,
+            body TEXT NOT NULL,
+            PRIMARY KEY (domain, dialogue_id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_dialogues_quality ON dialogues (domain, quality_score);
+        CREATE INDEX IF NOT EXISTS idx_dialogues_created ON dialogues (domain, created_at);
+        CREATE INDEX IF NOT EXISTS idx_dialogues_generated ON dialogues (generated_at);
+        CREATE INDEX IF NOT EXISTS idx_dialogues_latest ON dialogues (domain, generated_at);
+        CREATE INDEX IF NOT EXISTS idx_dialogues_turns ON dialogues (domain, num_turns);
+        CREATE TABLE IF NOT EXISTS dialogue_tags (
+            domain TEXT NOT NULL,
+            dialogue_id TEXT NOT NULL,
+            tag TEXT NOT NULL,
+            PRIMARY KEY (domain, dialogue_id, tag)
+        );
+        CREATE INDEX IF NOT EXISTS idx_dialogue_tags_tag ON dialogue_tags (tag);
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        ensure_dir(str(self.path.parent))
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _row(dialogue: Dict[str, Any]) -> Tuple:
+        values = dialogue_fields(dialogue)
+        return tuple(values[name] for name in INDEXED_FIELDS) + (dumps_compact(dialogue),)
+
+    def _put(self, dialogue: Dict[str, Any]) -> None:
+        row = self._row(dialogue)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO dialogues "
+            f"({', '.join(INDEXED_FIELDS)}, body) "
+            "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            row,
+        )
+        self._conn.execute("DELETE FROM dialogue_tags WHERE domain = ? AND dialogue_id = ?", row[:2])
+        self._conn.executemany(
+            "INSERT INTO dialogue_tags (domain, dialogue_id, tag) VALUES (?, ?, ?)",
+            [(row[0], row[1], tag) for tag in dialogue_tags(dialogue)],
+        )
+
+    def put(self, dialogue: Dict[str, Any]) -> None:
+        """Insert or replace a dialogue."""
+        with self._lock, self._conn:
+            self._put(dialogue)
+
+    def put_many(self, dialogues: List[Dict[str, Any]]) -> None:
+        """Insert or replace several dialogues in one transaction (a single commit/fsync)."""
+        with self._lock, self._conn:
+            for dialogue in dialogues:
+                self._put(dialogue)
+
+    def get(self, domain: str, dialogue_id: str) -> Optional[Dict[str, Any]]:
+        """Load a dialogue, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT body FROM dialogues WHERE domain = ? AND dialogue_id = ?", (domain, dialogue_id)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, domain: str, dialogue_id: str) -> bool:
+        """Delete a dialogue; True if it existed."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "DELETE FROM dialogues WHERE domain = ? AND dialogue_id = ?", (domain, dialogue_id)
+            )
+            self._conn.execute(
+                "DELETE FROM dialogue_tags WHERE domain = ? AND dialogue_id = ?", (domain, dialogue_id)
+            )
+        return cursor.rowcount > 0
+
+    def clear(self, domain: str) -> int:
+        """Delete all dialogues of a domain and return how many were removed."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM dialogues WHERE domain = ?", (domain,))
+            self._conn.execute("DELETE FROM dialogue_tags WHERE domain = ?", (domain,))
+        return cursor.rowcount
+
+    def count(self, domain: Optional[str] = None) -> int:
+        """Number of stored dialogues (in one domain, or overall)."""
+        with self._lock:
+            if domain is None:
+                return self._conn.execute("SELECT COUNT(*) FROM dialogues").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM dialogues WHERE domain = ?", (domain,)).fetchone()[0]
+
+    def domains(self) -> List[str]:
+        """Domains with at least one stored dialogue."""
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT DISTINCT domain FROM dialogues ORDER BY domain")]
+
+    def iter(
+        self,
+        domains: List[str],
+        where: Optional[Dict[str, Any]] = None,
+        order_by: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        limit: Optional[int] = None
+    ) -> Iterator[Dict[str, Any]]:
+        """
+        Stream dialogues of the given domains (save order unless order_by is given).
+
+        Rows are fetched in batches of ITER_BATCH_SIZE over a separate read-only
+        connection, so memory stays bounded and writers are not blocked while a
+        consumer iterates.
+        """
+        if not domains:
+            return
+        conditions, tags = parse_where(where)
+        order = parse_order_by(order_by)
+        columns_only = bool(fields) and all(name in INDEXED_FIELDS for name in fields)
+        
+        sql = f"SELECT {', '.join(fields) if columns_only else 'body'} FROM dialogues"
+        sql += f" WHERE domain IN ({','.join('?' * len(domains))})"
+        params: List[Any] = list(domains)
+        for name, op, value in conditions:
+            if op == "in":
+                sql += f" AND {name} IN ({','.join('?' * len(value))})"
+                params.extend(value)
+            else:
+                sql += f" AND {name} {op} ?"
+                params.append(value)
+        for tag in tags:
+            sql += (" AND EXISTS (SELECT 1 FROM dialogue_tags t WHERE t.domain = dialogues.domain"
+                    " AND t.dialogue_id = dialogues.dialogue_id AND t.tag = ?)")
+            params.append(tag)
+        sql += f" ORDER BY {order[0]} {'DESC' if order[1] else 'ASC'}, rowid" if order else " ORDER BY rowid"
+        if limit:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        
+        conn = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, check_same_thread=False)
+        try:
+            cursor = conn.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(ITER_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    yield dict(zip(fields, row)) if columns_only else project(json.loads(row[0]), fields)
+        finally:
+            conn.close()
+
+    def latest(self, n: int, domains: List[str]) -> List[Dict[str, Any]]:
+        """
+        The n most recently generated dialogues of the given domains, newest first.
+
+        Each domain reads at most n (generated_at, rowid) keys backwards from the
+        covering idx_dialogues_latest index; the per-domain runs are merged and
+        only the n winning bodies are loaded. Ties on generated_at go to the most
+        recently saved row; undated dialogues sort as oldest.
+        """
+        if n <= 0 or not domains:
+            return []
+        with self._lock:
+            runs = [
+                [
+                    (generated_at or "", rowid)
+                    for generated_at, rowid in self._conn.execute(
+                        "SELECT generated_at, rowid FROM dialogues WHERE domain = ? "
+                        "ORDER BY generated_at DESC, rowid DESC LIMIT ?",
+                        (domain, int(n)),
+                    )
+                ]
+                for domain in dict.fromkeys(domains)
+            ]
+            rowids = [rowid for _, rowid in heapq.merge(*runs, reverse=True)][:n]
+            if not rowids:
+                return []
+            bodies = dict(self._conn.execute(
+                f"SELECT rowid, body FROM dialogues WHERE rowid IN ({','.join('?' * len(rowids))})", rowids
+            ))
+        return [json.loads(bodies[rowid]) for rowid in rowids]
+
+    def top_by_quality(self, domains: List[str], fraction: float) -> List[Tuple[Dict[str, Any], float]]:
+        """Top fraction (at least one) of dialogues with a positive quality score, best first."""
+        if not domains:
+            return []
+        placeholders = ",".join("?" * len(domains))
+        with self._lock:
+            total = self._conn.execute(
+                f"SELECT COUNT(*) FROM dialogues WHERE domain IN ({placeholders}) AND quality_score > 0", domains
+            ).fetchone()[0]
+            if not total:
+                return []
+            rows = self._conn.execute(
+                f"SELECT body, quality_score FROM dialogues WHERE domain IN ({placeholders}) AND quality_score > 0 "
+                f"ORDER BY quality_score DESC LIMIT ?",
+                list(domains) + [max(1, int(total * fraction))],
+            ).fetchall()
+        return [(json.loads(body), quality_score) for body, quality_score in rows]
+
+    def get_fields(self, domain: str, dialogue_id: str) -> Optional[Dict[str, Any]]:
+        """Indexed field values of a stored dialogue, or None if it does not exist."""
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {', '.join(INDEXED_FIELDS)} FROM dialogues WHERE domain = ? AND dialogue_id = ?",
+                (domain, dialogue_id)
+            ).fetchone()
+        return dict(zip(INDEXED_FIELDS, row)) if row else None
+
+    def import_directory(self, root: str, replace: bool = False) -> int:
+        """
+        Import a one-JSON-file-per-dialogue directory (<root>/<domain>/*.json).
+
+        Args:
+            root: Synthetic data directory
+            replace: If False, dialogues already in the database are kept as they are
+
+        Returns:
+            Number of dialogues imported
+        """
+        imported = 0
+        root_path = Path(root)
+        if not root_path.exists():
+            return 0
+        with self._lock, self._conn:
+            for domain_dir in sorted(p for p in root_path.iterdir() if p.is_dir()):
+                for file_path in sorted(domain_dir.glob("*.json")):
+                    try:
+                        dialogue = load_json(str(file_path))
+                    except Exception as e:
+                        logger.error(f"Error loading dialogue from {file_path}: {e}")
+                        continue
+                    if not dialogue:
+                        continue
+                    dialogue.setdefault("dialogue_id", file_path.stem)
+                    dialogue.setdefault("domain", domain_dir.name)
+                    if not replace and self._conn.execute(
+                        "SELECT 1 FROM dialogues WHERE domain = ? AND dialogue_id = ?",
+                        (dialogue["domain"], dialogue["dialogue_id"])
+                    ).fetchone():
+                        continue
+                    self._put(dialogue)
+                    imported += 1
+        logger.info(f"Imported {imported} dialogues from {root_path} into {self.path}")
+        return imported
@@ -0,0 +1,256 @@
+"""
+Persistent on-disk store of token-level contextual embeddings.
+
+BERTScore's cost is dominated by embedding texts, and evaluation runs embed
+the same MultiWOZ references (and often the same synthetic dialogues) again
+and again. EmbeddingStore keeps, per model, each text's token embeddings as
+float16 rows in append-only shard files that are read through NumPy memory
+maps:
+
+- shard_<n>.f16: token embeddings, one row of `hidden` float16 values per token
+- shard_<n>.w8: per-token weight (uint8, 0 for special tokens), aligned with the rows
+- index.json: hidden size, per-shard row counts and last use, the next shard
+  number, and sha1(text) -> [shard, first row, token count]
+
+Shards are capped at SHARD_MAX_BYTES; when the store grows past max_bytes, the
+least recently used shards are deleted whole (their entries are simply
+re-embedded on the next miss).
+
+Several processes (evaluation workers, the backend) may share a store. Writes
+append rows and rewrite the index while holding an inter-process lock on
+index.lock, after re-reading the index, so no rows are left unindexed for
+another writer to overwrite. Readers re-read the index when it changed on
+disk. Shard numbers are never reused, so a shard's rows never change once
+indexed and memory maps of them stay valid.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import ContextManager, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .utils import ensure_dir, file_lock, load_json
+
+logger = logging.getLogger(__name__)
+
+SHARD_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024
+
+
+def text_key(text: str) -> str:
+    """Store key of a text."""
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Size-bounded, memory-mapped float16 store of token embeddings for one model."""
+
+    def __init__(self, path: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Open (or create) a store directory.
+
+        Args:
+            path: Store directory (one per model)
+            max_bytes: Total shard size above which least recently used shards are evicted
+        """
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._maps: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        # Shard -> last use since the last flush (merged into the on-disk index by flush)
+        self._used: Dict[int, float] = {}
+        self._index_stamp: Optional[Tuple[int, int, int]] = None
+        self.hidden: Optional[int] = None
+        self.entries: Dict[str, List[int]] = {}
+        self.shards: Dict[int, Dict[str, float]] = {}
+        self.next_shard = 0
+        ensure_dir(str(self.path))
+        with self._lock, self._file_lock():
+            self._refresh()
+            self._discard_unindexed_rows()
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return len(self.entries)
+
+    def __contains__(self, text: str) -> bool:
+        with self._lock:
+            self._refresh()
+            return text_key(text) in self.entries
+
+    def _files(self, shard: int) -> Tuple[Path, Path]:
+        return self.path / f"shard_{shard:05d}.f16", self.path / f"shard_{shard:05d}.w8"
+
+    def _file_lock(self) -> ContextManager[None]:
+        return file_lock(str(self.path / "index.lock"))
+
+    def _index_file_stamp(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = (self.path / "index.json").stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+    def _refresh(self) -> None:
+        # Adopt the on-disk index if another instance or process rewrote it
+        stamp = self._index_file_stamp()
+        if stamp is None or stamp == self._index_stamp:
+            return
+        index = load_json(str(self.path / "index.json"))
+        self.hidden = index.get("hidden")
+        self.entries = index.get("entries", {})
+        self.shards = {int(k): v for k, v in index.get("shards", {}).items()}
+        self.next_shard = int(index.get("next_shard", max(self.shards, default=-1) + 1))
+        for shard in list(self._maps):
+            if shard not in self.shards:
+                del self._maps[shard]
+        self._index_stamp = stamp
+
+    def _discard_unindexed_rows(self) -> None:
+        # Rows appended after the last index write (e.g. a crash before flush) are dropped
+        for shard, info in self.shards.items():
+            embeddings_file, weights_file = self._files(shard)
+            for file_path, row_bytes in ((embeddings_file, 2 * (self.hidden or 0)), (weights_file, 1)):
+                if file_path.exists() and file_path.stat().st_size > info["rows"] * row_bytes:
+                    os.truncate(file_path, int(info["rows"] * row_bytes))
+
+    def nbytes(self) -> int:
+        """Total size of the shards."""
+        return sum(int(info["rows"]) * (2 * (self.hidden or 0) + 1) for info in self.shards.values())
+
+    def _map(self, shard: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows = int(self.shards[shard]["rows"])
+        mapped = self._maps.get(shard)
+        if mapped is None or mapped[1].shape[0] != rows:
+            embeddings_file, weights_file = self._files(shard)
+            mapped = (
+                np.memmap(embeddings_file, dtype=np.float16, mode="r", shape=(rows, self.hidden)),
+                np.memmap(weights_file, dtype=np.uint8, mode="r", shape=(rows,)),
+            )
+            self._maps[shard] = mapped
+        return mapped
+
+    def get_many(self, texts: Sequence[str]) -> Dict[str, Tuple[np.ndarray, np.ndarray]]:
+        """
+        Stored embeddings of the given texts.
+
+        Returns:
+            text -> (float16 embeddings [L, hidden], float32 weights [L]) for the texts in the store
+        """
+        found = {}
+        now = time.time()
+        with self._lock:
+            self._refresh()
+            for text in dict.fromkeys(texts):
+                entry = self.entries.get(text_key(text))
+                if entry is None:
+                    continue
+                shard, start, length = entry
+                embeddings, weights = self._map(shard)
+                found[text] = (embeddings[start:start + length], weights[start:start + length].astype(np.float32))
+                self.shards[shard]["last_used"] = now
+                self._used[shard] = now
+        return found
+
+    def put_many(self, items: Dict[str, Tuple[np.ndarray, np.ndarray]]) -> None:
+        """
+        Append embeddings (converted to float16) for texts not yet stored and write the index.
+
+        Args:
+            items: text -> (embeddings [L, hidden], weights [L])
+        """
+        with self._lock, self._file_lock():
+            self._refresh()
+            for text, (embeddings, weights) in items.items():
+                key = text_key(text)
+                if key in self.entries:
+                    continue
+                if self.hidden is None:
+                    self.hidden = int(embeddings.shape[1])
+                elif embeddings.shape[1] != self.hidden:
+                    raise ValueError(f"Embedding size {embeddings.shape[1]} does not match store ({self.hidden})")
+                shard = self._writable_shard(embeddings.shape[0])
+                embeddings_file, weights_file = self._files(shard)
+                with open(embeddings_file, "ab") as f:
+                    f.write(np.ascontiguousarray(embeddings, dtype=np.float16).tobytes())
+                with open(weights_file, "ab") as f:
+                    f.write(np.asarray(weights, dtype=np.uint8).tobytes())
+                info = self.shards[shard]
+                self.entries[key] = [shard, int(info["rows"]), int(embeddings.shape[0])]
+                info["rows"] += int(embeddings.shape[0])
+                info["last_used"] = time.time()
+            self._evict()
+            self._write_index()
+
+    def _writable_shard(self, rows: int) -> int:
+        row_bytes = 2 * self.hidden + 1
+        if self.shards:
+            shard = max(self.shards)
+            if (self.shards[shard]["rows"] + rows) * row_bytes <= SHARD_MAX_BYTES:
+                return shard
+        shard = self.next_shard
+        self.next_shard += 1
+        for file_path in self._files(shard):
+            # Left over from a run that never wrote its index
+            if file_path.exists():
+                file_path.unlink()
+        self.shards[shard] = {"rows": 0, "last_used": time.time()}
+        return shard
+
+    def _evict(self) -> None:
+        active = max(self.shards, default=None)
+        while self.nbytes() > self.max_bytes and len(self.shards) > 1:
+            shard = min((s for s in self.shards if s != active), key=lambda s: self.shards[s]["last_used"])
+            self.entries = {key: entry for key, entry in self.entries.items() if entry[0] != shard}
+            del self.shards[shard]
+            self._maps.pop(shard, None)
+            for file_path in self._files(shard):
+                if file_path.exists():
+                    file_path.unlink()
+            self._used.pop(shard, None)
+            logger.info(f"Evicted embedding shard {shard} from {self.path}")
+
+    def _write_index(self) -> None:
+        # Caller holds the file lock
+        tmp_path = self.path / "index.json.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "hidden": self.hidden,
+                "shards": {str(k): v for k, v in self.shards.items()},
+                "next_shard": self.next_shard,
+                "entries": self.entries,
+            }, f)
+        os.replace(tmp_path, self.path / "index.json")
+        self._index_stamp = self._index_file_stamp()
+
+    def flush(self) -> None:
+        """Record shard use since the last flush in the index (atomically), merged with other writers' changes."""
+        with self._lock:
+            if not self._used:
+                return
+            with self._file_lock():
+                self._refresh()
+                for shard, last_used in self._used.items():
+                    if shard in self.shards:
+                        self.shards[shard]["last_used"] = max(self.shards[shard]["last_used"], last_used)
+                self._write_index()
+            self._used = {}
+
+    def clear(self) -> None:
+        """Delete every shard and entry."""
+        with self._lock, self._file_lock():
+            self._refresh()
+            for shard in list(self.shards):
+                for file_path in self._files(shard):
+                    if file_path.exists():
+                        file_path.unlink()
+            self.entries, self.shards, self._maps, self._used = {}, {}, {}, {}
+            self.hidden = None
+            self._write_index()
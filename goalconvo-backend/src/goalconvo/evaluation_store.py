@@ -0,0 +1,151 @@
+"""
+Persistent per-dialogue evaluation contributions for incremental evaluation.
+
+Evaluation runs over the latest N dialogues, and consecutive runs mostly see
+the same dialogues. Every metric is an aggregate of per-dialogue contributions
+(GCR/TSR verdicts, Distinct-1/2 ratios and n-gram sketches, best-match
+BERTScore/BLEU, repetition rate), so EvaluationStore keeps those contributions
+in SQLite, keyed by:
+
+- metric: contribution name (bumped with a version suffix when its computation changes)
+- context: everything else the value depends on, e.g. model, top-k and a
+  fingerprint of the reference set ("" for reference-free metrics)
+- dialogue key: hash of the dialogue content the metric reads
+
+Re-evaluating then computes contributions only for dialogues not seen before
+(or edited since), and aggregates are merged from the stored values.
+"""
+
+import hashlib
+import json
+import logging
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from .utils import dumps_compact, ensure_dir
+
+logger = logging.getLogger(__name__)
+
+# Keys per SELECT ... IN (...) round trip
+QUERY_BATCH_SIZE = 500
+
+
+def dialogue_key(dialogue: Dict[str, Any]) -> str:
+    """Content hash of a dialogue: domain, goal, goal data and turn roles / texts."""
+    payload = json.dumps([
+        dialogue.get("domain", "unknown"),
+        dialogue.get("goal", ""),
+        dialogue.get("goal_data") or {},
+        [[turn.get("role", ""), turn.get("text", "")] for turn in dialogue.get("turns", [])],
+    ], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def fingerprint(dialogues: Iterable[Dict[str, Any]], *params: Any) -> str:
+    """Order-independent hash of a set of dialogues plus parameters (a context for reference-based metrics)."""
+    digest = hashlib.sha256(json.dumps([str(p) for p in params]).encode("utf-8"))
+    for key in sorted(dialogue_key(d) for d in dialogues):
+        digest.update(key.encode("ascii"))
+    return digest.hexdigest()[:32]
+
+
+class EvaluationStore:
+    """SQLite table of per-dialogue metric contributions (JSON values)."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS contributions (
+            metric TEXT NOT NULL,
+            context TEXT NOT NULL,
+            dialogue_key TEXT NOT NULL,
+            value TEXT NOT NULL,
+            updated_at REAL NOT NULL,
+            PRIMARY KEY (metric, context, dialogue_key)
+        ) WITHOUT ROWID;
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        ensure_dir(str(self.path.parent))
+        self._lock = threading.RLock()
+        # Metric worker processes open the same file: wait for their write locks instead of failing
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+        self._conn.commit()
+
+    def close(self) -> None:
+        """Close the database connection."""
+        with self._lock:
+            self._conn.close()
+
+    def get_many(self, metric: str, context: str, keys: Sequence[str]) -> Dict[str, Any]:
+        """Stored values of a metric for the given dialogue keys (missing keys are absent)."""
+        found = {}
+        unique = list(dict.fromkeys(keys))
+        with self._lock:
+            for start in range(0, len(unique), QUERY_BATCH_SIZE):
+                chunk = unique[start:start + QUERY_BATCH_SIZE]
+                rows = self._conn.execute(
+                    "SELECT dialogue_key, value FROM contributions WHERE metric = ? AND context = ? "
+                    f"AND dialogue_key IN ({', '.join('?' * len(chunk))})",
+                    [metric, context] + chunk,
+                )
+                found.update((key, json.loads(value)) for key, value in rows)
+        return found
+
+    def put_many(self, metric: str, context: str, values: Dict[str, Any]) -> None:
+        """Insert or replace values of a metric, keyed by dialogue key, in one transaction."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO contributions (metric, context, dialogue_key, value, updated_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(metric, context, key, dumps_compact(value), now) for key, value in values.items()],
+            )
+
+    def count(self, metric: Optional[str] = None) -> int:
+        """Number of stored contributions (of one metric, or all)."""
+        with self._lock:
+            if metric is None:
+                return self._conn.execute("SELECT COUNT(*) FROM contributions").fetchone()[0]
+            return self._conn.execute("SELECT COUNT(*) FROM contributions WHERE metric = ?", (metric,)).fetchone()[0]
+
+    def clear(self) -> None:
+        """Delete every contribution."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM contributions")
+
+    def contributions(
+        self,
+        metric: str,
+        context: str,
+        dialogues: Sequence[Dict[str, Any]],
+        compute: Callable[[List[Dict[str, Any]]], List[Any]]
+    ) -> List[Any]:
+        """
+        Per-dialogue values of a metric, computing (and storing) only the missing ones.
+
+        Args:
+            metric: Contribution name
+            context: Context the values depend on
+            dialogues: Dialogues to evaluate
+            compute: Computes values for a list of dialogues, in order; None values are
+                returned but not stored (they are recomputed next time)
+
+        Returns:
+            One value per dialogue, in order
+        """
+        keys = [dialogue_key(d) for d in dialogues]
+        found = self.get_many(metric, context, keys)
+        missing = [i for i, key in enumerate(keys) if key not in found]
+        computed: Dict[int, Any] = {}
+        if missing:
+            values = compute([dialogues[i] for i in missing])
+            computed = dict(zip(missing, values))
+            self.put_many(metric, context, {keys[i]: v for i, v in computed.items() if v is not None})
+        logger.debug(f"{metric}: {len(dialogues) - len(missing)} stored, {len(missing)} computed")
+        return [computed[i] if i in computed else found[key] for i, key in enumerate(keys)]
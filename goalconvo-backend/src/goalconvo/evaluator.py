@@ -8,18 +8,20 @@ as described in the research paper.
 import json
 import logging
 import math
-import re
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional
 from collections import Counter
 from pathlib import Path
 
 import numpy as np
 import pandas as pd
-from bert_score import score as bert_score
 from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import TfidfVectorizer
 
 from .config import Config
+from .bertscore_engine import best_match_f1
+from .bleu_engine import BLEUEngine
+from .dialogue_analysis import DialogueAnalyzer, DialogueAnalysis, distinct_diversity
+from .keyword_matcher import GOAL_SATISFACTION_KEYWORDS, scan_dialogue
 from .utils import load_json, save_json, ensure_dir
 
 logger = logging.getLogger(__name__)
@@ -38,6 +40,9 @@ class Evaluator:
         
         # Cache for computed metrics
         self.metrics_cache = {}
+        
+        # Per-dialogue text / token records shared by all metrics (rebuilt per evaluation)
+        self.analyzer = DialogueAnalyzer()
     
     def evaluate_synthetic_vs_real(
         self, 
@@ -55,49 +60,29 @@ class Evaluator:
             Dictionary with evaluation results
         """
         logger.info(f"Evaluating {len(synthetic_dialogues)} synthetic vs {len(real_dialogues)} real dialogues")
+        self.analyzer.clear()
         
-        results = {
-            "semantic_similarity": self._compute_semantic_similarity(synthetic_dialogues, real_dialogues),
-            "diversity_metrics": self._compute_diversity_metrics(synthetic_dialogues, real_dialogues),
-            "goal_relevance": self._compute_goal_relevance(synthetic_dialogues),
-            "domain_analysis": self._compute_domain_analysis(synthetic_dialogues, real_dialogues),
-            "statistical_analysis": self._compute_statistical_analysis(synthetic_dialogues, real_dialogues)
-        }
+        try:
+            results = {
+                "semantic_similarity": self._compute_semantic_similarity(synthetic_dialogues, real_dialogues),
+                "diversity_metrics": self._compute_diversity_metrics(synthetic_dialogues, real_dialogues),
+                "goal_relevance": self._compute_goal_relevance(synthetic_dialogues),
+                "domain_analysis": self._compute_domain_analysis(synthetic_dialogues, real_dialogues),
+                "statistical_analysis": self._compute_statistical_analysis(synthetic_dialogues, real_dialogues)
+            }
+        finally:
+            # Analysis records reference the evaluated dialogues: release them
+            self.analyzer.clear()
         
         # Save results
         self._save_evaluation_results(results)
         
         return results
     
-    BERTSCORE_FALLBACK_MODEL = "bert-base-uncased"
-
-    def _bertscore_one_pair(self, cand_text: str, ref_text: str, max_chars: int = 1000) -> Optional[float]:
-        """Compute BERTScore for one pair; retry with shorter text, then fallback model on overflow."""
-        def run_bertscore(cand: str, ref: str, model: str):
-            P, R, F1 = bert_score([cand], [ref], model_type=model, verbose=False)
-            return float(F1.item())
-
-        try:
-            return run_bertscore(cand_text, ref_text, self.bertscore_model)
-        except (OverflowError, ValueError, Exception) as e:
-            err_str = str(e).lower()
-            if "int too big to convert" not in err_str and "overflow" not in err_str:
-                logger.warning("Error computing BERTScore: %s", e)
-                return None
-        for cap in [400, 200]:
-            c = cand_text[:cap] if len(cand_text) > cap else cand_text
-            r = ref_text[:cap] if len(ref_text) > cap else ref_text
-            try:
-                return run_bertscore(c, r, self.bertscore_model)
-            except (OverflowError, ValueError, Exception):
-                continue
-        try:
-            c = cand_text[:512] if len(cand_text) > 512 else cand_text
-            r = ref_text[:512] if len(ref_text) > 512 else ref_text
-            return run_bertscore(c, r, self.BERTSCORE_FALLBACK_MODEL)
-        except Exception as e:
-            logger.warning("Error computing BERTScore (fallback model): %s", e)
-            return None
+    def _bertscore_one_pair(self, cand_text: str, ref_text: str) -> Optional[float]:
+        """Compute BERTScore F1 for one pair (uses the shared engine; falls back to bert-base-uncased)."""
+        scores = best_match_f1([cand_text], [ref_text], self.bertscore_model)
+        return float(scores[0]) if scores is not None else None
 
     def _compute_semantic_similarity(
         self, 
@@ -118,27 +103,31 @@ class Evaluator:
         bert_scores = []
         domain_scores = {}
         
+        # Truncate to keep texts within the model's 512 tokens
+        max_chars = 1000
+        synthetic_by_domain: Dict[str, List[str]] = {}
         for synthetic_dialogue in synthetic_dialogues:
             domain = synthetic_dialogue.get("domain", "unknown")
-            
-            if domain not in real_by_domain or not real_by_domain[domain]:
+            if domain in real_by_domain and real_by_domain[domain]:
+                synthetic_by_domain.setdefault(domain, []).append(self._extract_dialogue_text(synthetic_dialogue)[:max_chars])
+        
+        # Closest real dialogue in the same domain, among the top-k retrieved references
+        best_by_domain = {}
+        for domain, synthetic_texts in synthetic_by_domain.items():
+            real_texts = [self._extract_dialogue_text(d)[:max_chars] for d in real_by_domain[domain]]
+            best = best_match_f1(
+                synthetic_texts, real_texts, self.bertscore_model,
+                cache_dir=self.config.embedding_cache_dir(),
+                cache_max_bytes=self.config.embedding_cache_max_mb * 1024 * 1024,
+                top_k=self.config.reference_top_k
+            )
+            best_by_domain[domain] = iter(np.maximum(best, 0.0) if best is not None else np.zeros(len(synthetic_texts)))
+        
+        for synthetic_dialogue in synthetic_dialogues:
+            domain = synthetic_dialogue.get("domain", "unknown")
+            if domain not in best_by_domain:
                 continue
-            
-            # Find closest real dialogue in same domain
-            synthetic_text = self._extract_dialogue_text(synthetic_dialogue)
-            best_score = 0.0
-            # Truncate to avoid "int too big to convert" / overflow (DeBERTa max 512 tokens)
-            max_chars = 1000
-            syn_trunc = synthetic_text[:max_chars] if len(synthetic_text) > max_chars else synthetic_text
-            
-            for real_dialogue in real_by_domain[domain]:
-                real_text = self._extract_dialogue_text(real_dialogue)
-                ref_trunc = real_text[:max_chars] if len(real_text) > max_chars else real_text
-                
-                score = self._bertscore_one_pair(syn_trunc, ref_trunc, max_chars)
-                if score is not None:
-                    best_score = max(best_score, score)
-            
+            best_score = float(next(best_by_domain[domain]))
             bert_scores.append(best_score)
             
             # Track by domain
@@ -172,13 +161,15 @@ class Evaluator:
         """Compute lexical diversity metrics."""
         logger.info("Computing diversity metrics...")
         
-        # Extract all text from dialogues
-        synthetic_texts = [self._extract_dialogue_text(d) for d in synthetic_dialogues]
-        real_texts = [self._extract_dialogue_text(d) for d in real_dialogues]
+        synthetic_records = self.analyzer.analyze_all(synthetic_dialogues)
+        real_records = self.analyzer.analyze_all(real_dialogues)
         
         # Compute diversity metrics
-        synthetic_diversity = self._compute_dialogue_diversity(synthetic_texts)
-        real_diversity = self._compute_dialogue_diversity(real_texts)
+        synthetic_diversity = distinct_diversity(synthetic_records)
+        real_diversity = distinct_diversity(real_records)
+        if "self-bleu" in self.config.diversity_metrics:
+            synthetic_diversity["self_bleu"] = self._compute_self_bleu(synthetic_records)
+            real_diversity["self_bleu"] = self._compute_self_bleu(real_records)
         
         return {
             "synthetic_diversity": synthetic_diversity,
@@ -187,41 +178,11 @@ class Evaluator:
             "target_diversity": 0.46  # From research paper
         }
     
-    def _compute_dialogue_diversity(self, texts: List[str]) -> Dict[str, float]:
-        """Compute diversity (Distinct-1, Distinct-2). Per-dialogue average + word-level tokenization (matches comprehensive eval)."""
-        if not texts:
-            return {"distinct_1": 0.0, "distinct_2": 0.0, "combined": 0.0}
-
-        def tokenize(text: str) -> List[str]:
-            return re.findall(r'\b\w+\b', text.lower())
-
-        def distinct_for_tokens(tokens: List[str]) -> Tuple[float, float]:
-            if not tokens:
-                return 0.0, 0.0
-            uniq_1 = len(set(tokens)) / len(tokens)
-            bigrams = [f"{tokens[i]} {tokens[i+1]}" for i in range(len(tokens) - 1)]
-            uniq_2 = len(set(bigrams)) / len(bigrams) if bigrams else 0.0
-            return uniq_1, uniq_2
-
-        per_d1, per_d2 = [], []
-        for text in texts:
-            tokens = tokenize(text)
-            d1, d2 = distinct_for_tokens(tokens)
-            if tokens:
-                per_d1.append(d1)
-                per_d2.append(d2)
-
-        if not per_d1:
-            return {"distinct_1": 0.0, "distinct_2": 0.0, "combined": 0.0}
-
-        distinct_1 = float(np.mean(per_d1))
-        distinct_2 = float(np.mean(per_d2))
-        combined = (distinct_1 + distinct_2) / 2
-        return {
-            "distinct_1": distinct_1,
-            "distinct_2": distinct_2,
-            "combined": combined
-        }
+    def _compute_self_bleu(self, records: List[DialogueAnalysis]) -> float:
+        """Sampled self-BLEU over word tokens (BLEU of each text against the rest; lower = more diverse)."""
+        engine = BLEUEngine()
+        words = self.analyzer.words
+        return engine.self_bleu(engine.table([[words[i] for i in record.token_ids] for record in records]))
     
     def _compute_goal_relevance(self, synthetic_dialogues: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Compute goal relevance metrics."""
@@ -272,22 +233,14 @@ class Evaluator:
         if not turns:
             return False
         
-        # Look for completion indicators in the last few turns
+        # Look for completion indicators in the user turns among the last few
         recent_turns = turns[-3:] if len(turns) >= 3 else turns
+        user_turns = [i for i, turn in enumerate(recent_turns) if turn.get("role") == "User"]
+        if not user_turns:
+            return False
         
-        completion_keywords = [
-            "thank you", "thanks", "perfect", "great", "excellent", "that's great", "that works",
-            "sounds good", "all set", "i'm all set", "that's exactly what I needed", "that'll work",
-            "booked", "confirmed", "reserved", "done", "completed", "appreciate it", "good, thank"
-        ]
-        
-        for turn in recent_turns:
-            if turn.get("role") == "User":
-                text = turn.get("text", "").lower()
-                if any(keyword in text for keyword in completion_keywords):
-                    return True
-        
-        return False
+        scan = scan_dialogue(goal, recent_turns)
+        return any(scan.turn_has_any(i, GOAL_SATISFACTION_KEYWORDS) for i in user_turns)
     
     def _compute_domain_analysis(
         self, 
@@ -372,12 +325,8 @@ class Evaluator:
         return grouped
     
     def _extract_dialogue_text(self, dialogue: Dict[str, Any]) -> str:
-        """Extract text content from a dialogue."""
-        turns = dialogue.get("turns", [])
-        texts = []
-        for turn in turns:
-            texts.append(turn.get("text", ""))
-        return " ".join(texts)
+        """Extract text content from a dialogue (from its cached analysis record)."""
+        return self.analyzer.analyze(dialogue).text
     
     def _save_evaluation_results(self, results: Dict[str, Any]) -> None:
         """Save evaluation results to file."""
@@ -231,7 +231,8 @@ Now expand this goal with explicit constraints and requestables: {goal}"""
         # Get few-shot examples for this domain
         few_shot_examples = self.dataset_store.load_few_shot_examples(
             domain=domain, 
-            num_examples=num_examples
+            num_examples=num_examples,
+            query=normalized_goal
         )
         
         # Create prompt with few-shot examples (use override for slicing in _create_generation_prompt via instance attr or pass)
@@ -0,0 +1,207 @@
+"""
+In-memory index of the few-shot hub.
+
+DatasetStore loads each domain's hub directory into a FewShotHubIndex and keeps
+it current as it writes hub examples, so example retrieval never lists or
+parses files. Before serving a domain the index compares the hub directory's
+mtime with the one it loaded (hub files are replaced atomically, so any change
+touches the directory) and reloads the domain when another process changed it.
+Retrieval returns deep copies, so callers may modify the examples they get.
+Examples are ranked by hub_metadata.quality_score; each one also carries a
+normalized hashed bag-of-words vector so retrieval can be diversity-aware
+(maximal marginal relevance) and, given a query such as the goal being
+expanded, relevance-aware.
+"""
+
+import copy
+import logging
+import re
+import zlib
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+from .utils import load_json
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_STRATEGIES = ("top_k", "mmr")
+VECTOR_DIM = 1024  # hashed bag-of-words dimensions
+
+_TOKEN_PATTERN = re.compile(r"[a-z0-9']+")
+
+
+def _hashed_vector(text: str) -> np.ndarray:
+    vector = np.zeros(VECTOR_DIM, dtype=np.float32)
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        vector[zlib.crc32(token.encode("utf-8")) % VECTOR_DIM] += 1.0
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def example_text(example: Dict[str, Any]) -> str:
+    """Goal and turn texts of a hub example."""
+    return " ".join([example.get("goal") or ""] + [turn.get("text", "") for turn in example.get("turns", [])])
+
+
+class _DomainHub:
+    """Examples of one domain, kept sorted by quality (best first)."""
+
+    def __init__(self):
+        self.keys: List[str] = []
+        self.examples: List[Dict[str, Any]] = []
+        self.quality = np.zeros(0, dtype=np.float32)
+        self.vectors = np.zeros((0, VECTOR_DIM), dtype=np.float32)
+
+    def load(self, entries: List[Tuple[str, Dict[str, Any], float]]) -> None:
+        entries = sorted(entries, key=lambda entry: -entry[2])
+        self.keys = [key for key, _, _ in entries]
+        self.examples = [example for _, example, _ in entries]
+        self.quality = np.array([quality for _, _, quality in entries], dtype=np.float32)
+        if entries:
+            self.vectors = np.stack([_hashed_vector(example_text(example)) for example in self.examples])
+
+    def put(self, key: str, example: Dict[str, Any], quality: float) -> None:
+        if key in self.keys:
+            self.remove(key)
+        position = int(np.searchsorted(-self.quality, -quality, side="right"))
+        self.keys.insert(position, key)
+        self.examples.insert(position, example)
+        self.quality = np.insert(self.quality, position, quality)
+        self.vectors = np.insert(self.vectors, position, _hashed_vector(example_text(example)), axis=0)
+
+    def remove(self, key: str) -> None:
+        position = self.keys.index(key)
+        del self.keys[position]
+        del self.examples[position]
+        self.quality = np.delete(self.quality, position)
+        self.vectors = np.delete(self.vectors, position, axis=0)
+
+
+class FewShotHubIndex:
+    """Per-domain in-memory index of few-shot hub examples."""
+
+    def __init__(self, hub_dir: str, default_quality: float = 0.8):
+        """
+        Initialize the index (domains are loaded lazily).
+
+        Args:
+            hub_dir: Few-shot hub directory (<hub_dir>/<domain>/*.json)
+            default_quality: Score for examples without hub_metadata (e.g. curated seeds)
+        """
+        self.hub_dir = Path(hub_dir)
+        self.default_quality = default_quality
+        self._domains: Dict[str, _DomainHub] = {}
+        # Domain -> mtime of its hub directory when loaded (or last changed through this index)
+        self._stamps: Dict[str, Optional[int]] = {}
+
+    def quality_of(self, example: Dict[str, Any]) -> float:
+        """Ranking score of an example: hub_metadata.quality_score, else default_quality."""
+        quality_score = (example.get("hub_metadata") or {}).get("quality_score")
+        return float(quality_score) if quality_score is not None else self.default_quality
+
+    def _dir_stamp(self, domain: str) -> Optional[int]:
+        try:
+            return (self.hub_dir / domain).stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def _domain(self, domain: str, refresh: bool = True) -> _DomainHub:
+        if refresh and domain in self._domains and self._dir_stamp(domain) != self._stamps.get(domain):
+            logger.info(f"Few-shot hub for domain {domain} changed on disk; reloading")
+            del self._domains[domain]
+        if domain not in self._domains:
+            stamp = self._dir_stamp(domain)
+            entries = []
+            domain_dir = self.hub_dir / domain
+            if domain_dir.exists():
+                for file_path in sorted(domain_dir.glob("*.json")):
+                    try:
+                        example = load_json(str(file_path))
+                    except Exception as e:
+                        logger.error(f"Error loading example from {file_path}: {e}")
+                        continue
+                    if example:
+                        entries.append((file_path.stem, example, self.quality_of(example)))
+            hub = _DomainHub()
+            hub.load(entries)
+            self._domains[domain] = hub
+            self._stamps[domain] = stamp
+            logger.info(f"Indexed {len(hub.keys)} few-shot examples for domain {domain}")
+        return self._domains[domain]
+
+    def size(self, domain: str) -> int:
+        """Number of indexed examples in a domain."""
+        return len(self._domain(domain).keys)
+
+    def put(self, domain: str, key: str, example: Dict[str, Any]) -> None:
+        """Add or replace an example (key is its hub file stem), after its file was written."""
+        self._domain(domain, refresh=False).put(key, example, self.quality_of(example))
+        self._stamps[domain] = self._dir_stamp(domain)
+
+    def remove(self, domain: str, key: str) -> None:
+        """Remove an example if it is indexed, after its file was deleted."""
+        hub = self._domain(domain, refresh=False)
+        if key in hub.keys:
+            hub.remove(key)
+        self._stamps[domain] = self._dir_stamp(domain)
+
+    def synthetic_members(self, domain: str) -> List[Tuple[float, str]]:
+        """(quality, key) of the domain's examples promoted from the synthetic corpus."""
+        hub = self._domain(domain)
+        return [
+            (float(quality), key)
+            for key, example, quality in zip(hub.keys, hub.examples, hub.quality)
+            if (example.get("hub_metadata") or {}).get("source") == "synthetic"
+        ]
+
+    def invalidate(self, domain: Optional[str] = None) -> None:
+        """Drop cached domains so they are reloaded from disk on next access."""
+        if domain is None:
+            self._domains.clear()
+        else:
+            self._domains.pop(domain, None)
+
+    def top_k(self, domain: str, k: int) -> List[Dict[str, Any]]:
+        """Copies of the k highest-quality examples of a domain."""
+        return copy.deepcopy(self._domain(domain).examples[:max(0, k)])
+
+    def mmr(
+        self,
+        domain: str,
+        k: int,
+        query: Optional[str] = None,
+        diversity: float = 0.3
+    ) -> List[Dict[str, Any]]:
+        """
+        Pick k examples by maximal marginal relevance (returned as copies).
+
+        Relevance is the quality score, averaged with cosine similarity to the query
+        when one is given; each pick is penalized by its similarity to the examples
+        already picked.
+
+        Args:
+            domain: Target domain
+            k: Number of examples
+            query: Optional text to match (e.g. the goal being expanded)
+            diversity: Weight of the redundancy penalty (0 = pure relevance ranking)
+        """
+        hub = self._domain(domain)
+        n = len(hub.keys)
+        if k <= 0 or n == 0:
+            return []
+        relevance = hub.quality.astype(np.float64)
+        if query:
+            relevance = (relevance + hub.vectors @ _hashed_vector(query)) / 2.0
+
+        selected: List[int] = []
+        redundancy = np.zeros(n)
+        available = np.ones(n, dtype=bool)
+        for _ in range(min(k, n)):
+            scores = np.where(available, (1.0 - diversity) * relevance - diversity * redundancy, -np.inf)
+            best = int(np.argmax(scores))
+            selected.append(best)
+            available[best] = False
+            redundancy = np.maximum(redundancy, hub.vectors @ hub.vectors[best])
+        return copy.deepcopy([hub.examples[i] for i in selected])
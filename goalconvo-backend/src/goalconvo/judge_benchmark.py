@@ -0,0 +1,285 @@
+"""
+Judge calibration and score-drift benchmark for GoalConvo.
+
+Runs several quality-judge modes over a frozen set of dialogues whose LLM
+responses are recorded once and replayed afterwards, so every mode sees exactly
+the same judge outputs. For each mode it reports LLM calls and tokens per
+dialogue, verdict agreement and score drift against the reference mode, and
+Cohen's kappa against human annotations from HumanEvaluator.
+"""
+
+import hashlib
+import json
+import logging
+import random
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Callable
+
+import numpy as np
+
+from .config import Config
+from .human_evaluator import HumanEvaluator
+from .quality_judge import QualityJudge
+from .utils import estimate_tokens, load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+
+class RecordingLLMClient:
+    """
+    LLM client wrapper that records responses to a cassette file and replays them.
+
+    Responses are keyed by a hash of the prompt and sampling parameters. In replay
+    mode (no wrapped client) a prompt missing from the cassette raises KeyError,
+    so a benchmark never silently falls back to a live model. Every call, recorded
+    or replayed, is counted together with its estimated tokens. Judge tiers get
+    their own recorded responses through tier().
+    """
+
+    def __init__(
+        self,
+        cassette_path: Optional[str] = None,
+        llm_client: Any = None,
+        tier_clients: Optional[Dict[str, Any]] = None
+    ):
+        """
+        Initialize the recording client.
+
+        Args:
+            cassette_path: JSON file holding recorded responses (loaded if it exists)
+            llm_client: Live client to record from; None replays only
+            tier_clients: Live clients per judge tier to record from (default: llm_client)
+        """
+        self.cassette_path = Path(cassette_path) if cassette_path else None
+        self.llm_client = llm_client
+        self.tier_clients = tier_clients or {}
+        self.responses: Dict[str, str] = {}
+        if self.cassette_path and self.cassette_path.exists():
+            self.responses = load_json(str(self.cassette_path))
+            logger.info(f"Loaded {len(self.responses)} recorded judge responses from {self.cassette_path}")
+        self.reset_counters()
+
+    def reset_counters(self) -> None:
+        """Reset call and token counters."""
+        self.calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+
+    @staticmethod
+    def _key(prompt: str, temperature: Optional[float], max_tokens: Optional[int], tier: Optional[str] = None) -> str:
+        payload = json.dumps([prompt, temperature, max_tokens] + ([tier] if tier else []))
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def tier(self, name: str) -> "_RecordedTier":
+        """Client for one judge tier; shares this client's cassette and counters."""
+        return _RecordedTier(self, name)
+
+    def generate_completion(
+        self,
+        prompt: str,
+        temperature: Optional[float] = None,
+        top_p: Optional[float] = None,
+        max_tokens: Optional[int] = None,
+        tier: Optional[str] = None,
+        **kwargs
+    ) -> str:
+        """Return the recorded response for a prompt, recording it first when a live client is set."""
+        key = self._key(prompt, temperature, max_tokens, tier)
+        if key not in self.responses:
+            live_client = self.tier_clients.get(tier, self.llm_client) if tier else self.llm_client
+            if live_client is None:
+                raise KeyError(f"No recorded judge response for prompt {key[:12]} (re-run with --record)")
+            self.responses[key] = live_client.generate_completion(
+                prompt, temperature=temperature, top_p=top_p, max_tokens=max_tokens, **kwargs
+            )
+        response = self.responses[key]
+        self.calls += 1
+        self.prompt_tokens += estimate_tokens(prompt)
+        self.completion_tokens += estimate_tokens(response)
+        return response
+
+    def save(self) -> None:
+        """Write the cassette to disk."""
+        if self.cassette_path:
+            save_json(self.responses, str(self.cassette_path))
+            logger.info(f"Saved {len(self.responses)} judge responses to {self.cassette_path}")
+
+
+class _RecordedTier:
+    """Judge-tier view of a RecordingLLMClient."""
+
+    def __init__(self, recorder: RecordingLLMClient, name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def generate_completion(self, prompt: str, **kwargs) -> str:
+        return self.recorder.generate_completion(prompt, tier=self.name, **kwargs)
+
+
+def _judge_full(judge: QualityJudge, dialogues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return [judge.judge_dialogue(dialogue) for dialogue in dialogues]
+
+
+def _judge_sampled(judge: QualityJudge, dialogues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    return judge.judge_dialogues_sampled(dialogues)[0]
+
+
+def _judge_cascade(judge: QualityJudge, dialogues: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    judge.set_judge_tiers(judge.llm_client.tier("fast"), judge.llm_client.tier("strong"))
+    return [judge.judge_dialogue(dialogue) for dialogue in dialogues]
+
+
+# Judge mode name -> function(judge, dialogues) returning one assessment per dialogue.
+# Modes receive a judge with tiering disabled and the recording client as llm_client.
+JUDGE_MODES: Dict[str, Callable[[QualityJudge, List[Dict[str, Any]]], List[Dict[str, Any]]]] = {
+    "full": _judge_full,
+    "sampled": _judge_sampled,
+    "cascade": _judge_cascade,
+}
+
+
+def cohen_kappa(labels_a: List[bool], labels_b: List[bool]) -> Optional[float]:
+    """Cohen's kappa between two binary labelings (None when there are no pairs)."""
+    if not labels_a:
+        return None
+    a = np.array(labels_a, dtype=bool)
+    b = np.array(labels_b, dtype=bool)
+    observed = float(np.mean(a == b))
+    expected = float(np.mean(a) * np.mean(b) + np.mean(~a) * np.mean(~b))
+    if expected >= 1.0:
+        return 1.0 if observed >= 1.0 else 0.0
+    return (observed - expected) / (1.0 - expected)
+
+
+def human_verdicts(
+    human_evaluator: HumanEvaluator,
+    dimension: str = "overall_quality",
+    pass_score: float = 3.0
+) -> Dict[str, bool]:
+    """Per-dialogue human accept verdicts: mean annotation score on dimension >= pass_score."""
+    scores: Dict[str, List[float]] = {}
+    for annotation in human_evaluator.annotations.values():
+        score = annotation.dimensions.get(dimension)
+        if score is not None:
+            scores.setdefault(annotation.dialogue_id, []).append(float(score))
+    return {dialogue_id: float(np.mean(values)) >= pass_score for dialogue_id, values in scores.items()}
+
+
+class JudgeBenchmark:
+    """Compares quality-judge modes on a frozen dialogue set with recorded LLM responses."""
+
+    def __init__(
+        self,
+        config: Config,
+        llm_client: RecordingLLMClient,
+        dialogues: List[Dict[str, Any]],
+        human_evaluator: Optional[HumanEvaluator] = None,
+        seed: int = 42
+    ):
+        """
+        Initialize the benchmark.
+
+        Args:
+            config: Configuration (judge thresholds and sampling settings)
+            llm_client: Recording/replaying client shared by all modes
+            dialogues: Frozen benchmark dialogues
+            human_evaluator: Source of human annotations for kappa (optional)
+            seed: Random seed applied before each mode (sampled judging is stochastic)
+        """
+        self.config = config
+        self.llm_client = llm_client
+        self.dialogues = dialogues
+        self.human_evaluator = human_evaluator
+        self.seed = seed
+
+    def run_mode(self, mode: str) -> Dict[str, Any]:
+        """Run one judge mode and return its assessments with call/token counts."""
+        if mode not in JUDGE_MODES:
+            raise ValueError(f"Unknown judge mode: {mode} (available: {', '.join(JUDGE_MODES)})")
+        random.seed(self.seed)
+        np.random.seed(self.seed)
+        judge = QualityJudge(self.config, self.llm_client)
+        judge.set_judge_tiers(None)
+        self.llm_client.reset_counters()
+        assessments = JUDGE_MODES[mode](judge, self.dialogues)
+        n = max(1, len(self.dialogues))
+        return {
+            "assessments": assessments,
+            "tier_stats": judge.get_tier_stats() if judge.fast_llm_client is not None else None,
+            "calls_per_dialogue": self.llm_client.calls / n,
+            "tokens_per_dialogue": (self.llm_client.prompt_tokens + self.llm_client.completion_tokens) / n,
+        }
+
+    def run(self, modes: Optional[List[str]] = None, reference: str = "full") -> Dict[str, Any]:
+        """
+        Run the benchmark.
+
+        Args:
+            modes: Judge modes to compare (default: all registered modes)
+            reference: Mode the others are compared against for agreement and drift
+
+        Returns:
+            Report with per-mode cost, acceptance rate, agreement/kappa/drift vs. the
+            reference mode and kappa vs. human annotations
+        """
+        modes = list(modes or JUDGE_MODES)
+        if reference not in modes:
+            modes.insert(0, reference)
+
+        runs = {mode: self.run_mode(mode) for mode in modes}
+        humans = human_verdicts(self.human_evaluator) if self.human_evaluator else {}
+        ref_assessments = runs[reference]["assessments"]
+        ref_verdicts = [a["passed_filters"] for a in ref_assessments]
+        ref_scores = np.array([a["overall_score"] for a in ref_assessments], dtype=float)
+
+        report: Dict[str, Any] = {
+            "num_dialogues": len(self.dialogues),
+            "reference_mode": reference,
+            "human_annotated": sum(1 for d in self.dialogues if d.get("dialogue_id") in humans),
+            "modes": {},
+        }
+        for mode, run in runs.items():
+            assessments = run["assessments"]
+            verdicts = [a["passed_filters"] for a in assessments]
+            scores = np.array([a["overall_score"] for a in assessments], dtype=float)
+            drift = scores - ref_scores
+
+            human_pairs = [
+                (humans[d["dialogue_id"]], verdict)
+                for d, verdict in zip(self.dialogues, verdicts)
+                if d.get("dialogue_id") in humans
+            ]
+            kappa_human = cohen_kappa([h for h, _ in human_pairs], [v for _, v in human_pairs])
+
+            report["modes"][mode] = {
+                "calls_per_dialogue": run["calls_per_dialogue"],
+                "tokens_per_dialogue": run["tokens_per_dialogue"],
+                "acceptance_rate": float(np.mean(verdicts)) if verdicts else 0.0,
+                "agreement_with_reference": float(np.mean(np.array(verdicts) == np.array(ref_verdicts))) if verdicts else 1.0,
+                "kappa_vs_reference": cohen_kappa(ref_verdicts, verdicts),
+                "verdict_flips": int(sum(v != r for v, r in zip(verdicts, ref_verdicts))),
+                "score_drift_mean": float(np.mean(drift)) if len(drift) else 0.0,
+                "score_drift_mae": float(np.mean(np.abs(drift))) if len(drift) else 0.0,
+                "score_drift_max": float(np.max(np.abs(drift))) if len(drift) else 0.0,
+                "kappa_vs_human": kappa_human,
+                "agreement_with_human": float(np.mean([h == v for h, v in human_pairs])) if human_pairs else None,
+            }
+            if run["tier_stats"] is not None:
+                report["modes"][mode]["escalation_rate"] = run["tier_stats"]["escalation_rate"]
+                report["modes"][mode]["tiers"] = {tier: run["tier_stats"][tier] for tier in ("fast", "strong")}
+            logger.info(
+                f"Judge mode {mode}: {run['calls_per_dialogue']:.2f} calls/dialogue, "
+                f"agreement {report['modes'][mode]['agreement_with_reference']:.3f}, "
+                f"drift MAE {report['modes'][mode]['score_drift_mae']:.3f}"
+            )
+        return report
+
+
+def load_benchmark_dialogues(path: str) -> List[Dict[str, Any]]:
+    """Load a frozen benchmark set from a JSON list or a JSONL file."""
+    path = Path(path)
+    if path.suffix == ".jsonl":
+        with open(path, "r", encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+    data = load_json(str(path))
+    return data if isinstance(data, list) else data.get("dialogues", [])
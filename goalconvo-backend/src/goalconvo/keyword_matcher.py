@@ -0,0 +1,173 @@
+"""
+Keyword matching for the heuristic goal-completion and task-success metrics.
+
+GCR, TSR, goal relevance and the advanced intent / slot / state-tracking
+heuristics all check whether fixed keywords occur in a dialogue or its goal.
+Their keyword lists and goal-parsing regexes (precompiled) are collected here.
+
+A DialogueScan is built once per dialogue and shared by every metric. It holds
+the lowercased goal, the lowercased turn texts and the space-joined dialogue
+text, so each text is lowercased and joined only once. Window questions (such
+as "is there a confirmation within 200 characters of the intent keyword") are
+bounded searches in the joined text, with no slicing. Matching is plain
+substring matching, like `keyword in text`, done by CPython's string search.
+A pure-Python multi-pattern automaton was slower than that search for these
+keyword lists.
+"""
+
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# --- Goal Completion Rate ---
+# Closing phrases that mark a completed dialogue
+GOAL_COMPLETION_KEYWORDS = (
+    "thank you", "thanks", "perfect", "great", "excellent",
+    "booked", "confirmed", "reserved", "done", "completed",
+    "that's exactly what I needed", "sounds good", "that works"
+)
+# Requestables looked for in goal text when the goal has no structured data
+COMMON_REQUESTABLES = (
+    "phone", "address", "postcode", "reference number",
+    "price", "availability", "time", "date"
+)
+# Constraint values also count as mentioned when a synonym is
+SYNONYMS = {
+    "centre": ["center", "central", "downtown"],
+    "cheap": ["inexpensive", "affordable", "budget"],
+    "expensive": ["pricey", "costly", "high-end"],
+    "north": ["northern"],
+    "south": ["southern"],
+    "east": ["eastern"],
+    "west": ["western"]
+}
+# Constraints parsed from goal text when the goal has no structured data
+CONSTRAINT_PATTERNS = {
+    "area": re.compile(r"(?:area|location|in|near)\s*(?:is|:|=)?\s*([a-z]+)"),
+    "price": re.compile(r"(?:price|price range|budget)\s*(?:is|:|=)?\s*([a-z]+)"),
+    "type": re.compile(r"(?:type|kind|style)\s*(?:is|:|=)?\s*([a-z]+)"),
+}
+
+# --- Task Success Rate ---
+# (goal words, intent keywords looked for in the dialogue)
+TASK_INTENTS = (
+    (("book", "reserve"), ("book", "reserve", "booking", "reservation")),
+    (("find", "search"), ("find", "search", "looking for")),
+    (("information", "details"), ("information", "details", "tell me")),
+)
+# Confirmation words expected within CONFIRMATION_WINDOW characters of an intent keyword
+CONFIRMATION_WORDS = ("yes", "confirmed", "done", "booked", "found")
+CONFIRMATION_WINDOW = 200
+# Completion words when the goal has no recognizable intent
+GENERAL_COMPLETION_WORDS = ("thank", "perfect", "great", "excellent")
+# User satisfaction in the last user turn
+SATISFACTION_WORDS = (
+    "thank", "thanks", "perfect", "great", "excellent", "good", "sounds good",
+    "all set", "that works", "that'll work", "appreciate it", "that's great"
+)
+
+# --- Goal relevance (Evaluator) ---
+GOAL_SATISFACTION_KEYWORDS = (
+    "thank you", "thanks", "perfect", "great", "excellent", "that's great", "that works",
+    "sounds good", "all set", "i'm all set", "that's exactly what I needed", "that'll work",
+    "booked", "confirmed", "reserved", "done", "completed", "appreciate it", "good, thank"
+)
+
+# --- Advanced evaluation heuristics ---
+# Intent categories based on goal text, time-like slot words and phrases that
+# signal a state-tracking contradiction
+INTENT_CATEGORIES = {
+    "booking": ["book", "reserve", "reservation", "ticket"],
+    "search": ["find", "search", "looking for", "look for"],
+    "info": ["information", "details", "tell me", "explain"],
+}
+SLOT_TIME_WORDS = ["morning", "evening", "tonight", "today", "tomorrow"]
+CONTRADICTION_PHRASES = [
+    "i thought you said",
+    "you already told me",
+    "that contradicts",
+    "earlier you said",
+]
+
+
+class KeywordHits:
+    """Keyword lookups in one (lowercased) text."""
+
+    def __init__(self, text: str):
+        self.text = text
+
+    def first(self, keyword: str) -> Optional[int]:
+        """Position of the first occurrence of keyword, or None."""
+        position = self.text.find(keyword)
+        return position if position >= 0 else None
+
+    def has(self, keyword: str) -> bool:
+        """Whether keyword occurs in the text."""
+        return keyword in self.text
+
+    def has_any(self, keywords: Iterable[str]) -> bool:
+        """Whether any of the keywords occurs."""
+        text = self.text
+        return any(keyword in text for keyword in keywords)
+
+    def has_any_within(self, keywords: Iterable[str], start: int, end: int) -> bool:
+        """Whether any of the keywords occurs entirely inside text[start:end] (without slicing it)."""
+        return any(self.text.find(keyword, start, end) >= 0 for keyword in keywords)
+
+
+class DialogueScan:
+    """Keyword hits in a dialogue's goal and in its lowercased, space-joined turn texts."""
+
+    def __init__(self, goal: str, turn_texts: Sequence[str]):
+        self.goal = KeywordHits(goal.lower())
+        self.turn_texts = [text.lower() for text in turn_texts]
+        self.dialogue = KeywordHits(" ".join(self.turn_texts))
+
+    def turn_has_any(self, index: int, keywords: Iterable[str]) -> bool:
+        """Whether any of the keywords occurs in turn index."""
+        text = self.turn_texts[index]
+        return any(keyword in text for keyword in keywords)
+
+    def synonym_mentioned(self, word: str) -> bool:
+        """Whether word, or a synonym from a SYNONYMS list that contains it, occurs in the dialogue."""
+        if self.dialogue.has(word):
+            return True
+        for synonym_list in SYNONYMS.values():
+            if word in synonym_list and self.dialogue.has_any(synonym_list):
+                return True
+        return False
+
+
+def scan_dialogue(goal: str, turns: Sequence[Dict[str, str]]) -> DialogueScan:
+    """Keyword scan of a goal and its dialogue turns."""
+    return DialogueScan(goal or "", [turn.get("text", "") for turn in turns])
+
+
+class DialogueScanCache:
+    """DialogueScans cached by dialogue object, so every metric of one evaluation shares a scan."""
+
+    def __init__(self):
+        self._scans: Dict[int, Tuple[Dict[str, Any], DialogueScan]] = {}
+
+    def __len__(self) -> int:
+        return len(self._scans)
+
+    def scan(self, dialogue: Dict[str, Any]) -> DialogueScan:
+        """Keyword scan of a dialogue (built on first request)."""
+        cached = self._scans.get(id(dialogue))
+        if cached is not None and cached[0] is dialogue:
+            return cached[1]
+        scan = scan_dialogue(dialogue.get("goal") or "", dialogue.get("turns", []))
+        # Keep the dialogue referenced so its id() is not reused while cached
+        self._scans[id(dialogue)] = (dialogue, scan)
+        return scan
+
+    def discard(self, dialogues: Iterable[Dict[str, Any]]) -> None:
+        """Drop the scans of some dialogues (e.g. a finished evaluation chunk)."""
+        for dialogue in dialogues:
+            cached = self._scans.get(id(dialogue))
+            if cached is not None and cached[0] is dialogue:
+                del self._scans[id(dialogue)]
+
+    def clear(self) -> None:
+        """Drop every cached scan."""
+        self._scans.clear()
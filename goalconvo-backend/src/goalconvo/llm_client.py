@@ -19,10 +19,14 @@ logger = logging.getLogger(__name__)
 class LLMClient:
     """Client for interfacing with language model APIs."""
     
-    def __init__(self, config: Config):
-        """Initialize the LLM client with configuration."""
+    def __init__(self, config: Config, api_config: Optional[Dict[str, Any]] = None):
+        """Initialize the LLM client with configuration.
+        
+        api_config overrides the provider selected by config.get_api_config()
+        (e.g. a judge tier from config.get_judge_api_config()).
+        """
         self.config = config
-        self.api_config = config.get_api_config()
+        self.api_config = api_config or config.get_api_config()
         self.session = self._create_session()
         # Simple in-memory cache for prompt responses (per-process, best-effort)
         # Key: (provider, model, prompt, temperature, top_p, max_tokens)
@@ -0,0 +1,239 @@
+"""
+Dependency-ordered parallel execution of evaluation metrics.
+
+Most evaluation metrics are independent of each other. MetricExecutor runs a
+small DAG of MetricTasks: as soon as a task's dependencies have finished it is
+started on the pool matching its kind, so total wall time is bounded by the
+slowest chain of metrics rather than their sum.
+
+- "cpu": CPU-bound metrics (BERTScore, BLEU, diversity) run in a process pool
+  (function and arguments must be picklable). The pool is shared by every run,
+  so per-process state such as a loaded model or an LRU cache is reused. When
+  eventlet has monkey-patched threading (backend server) the pool's manager
+  thread would be a green thread that never gets to run, so cpu tasks then run
+  in the calling thread instead
+- "io": I/O-bound metrics (LLM judge calls) run in a thread pool
+- "inline": cheap metrics run in the calling thread while the pools work
+
+The calling thread only waits on futures, in short polls that call an optional
+wait callback, so event loops such as eventlet's hub keep running.
+"""
+
+import logging
+import pickle
+import sys
+import threading
+import time
+from concurrent.futures import (
+    FIRST_COMPLETED, BrokenExecutor, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+)
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+TASK_KINDS = ("cpu", "io", "inline")
+WAIT_POLL_SECONDS = 0.05
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+_process_pool_workers = 0
+_process_pool_lock = threading.Lock()
+
+
+@dataclass
+class MetricTask:
+    """One metric: a callable, its arguments, the pool it runs on and the tasks it waits for."""
+
+    name: str
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...] = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    kind: str = "cpu"
+    depends_on: Sequence[str] = ()
+
+
+def processes_available() -> bool:
+    """Whether cpu tasks can run in worker processes (not under eventlet-patched threading)."""
+    eventlet = sys.modules.get("eventlet")
+    if eventlet is None:
+        return True
+    from eventlet import patcher
+    return not patcher.is_monkey_patched("thread")
+
+
+def _shared_process_pool(workers: int) -> ProcessPoolExecutor:
+    """The process pool shared across runs, (re)created when missing, broken or resized."""
+    global _process_pool, _process_pool_workers
+    with _process_pool_lock:
+        pool = _process_pool
+        if pool is None or _process_pool_workers != workers:
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+            pool = _process_pool = ProcessPoolExecutor(max_workers=workers)
+            _process_pool_workers = workers
+        return pool
+
+
+def _discard_process_pool(pool: ProcessPoolExecutor) -> None:
+    """Forget a broken shared pool so the next run starts a new one."""
+    global _process_pool
+    with _process_pool_lock:
+        if _process_pool is pool:
+            _process_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _picklable(fn: Callable[..., Any]) -> bool:
+    """Whether a task function can be sent to a worker process (arguments are checked on send)."""
+    try:
+        pickle.dumps(fn)
+    except (pickle.PicklingError, AttributeError, TypeError):
+        return False
+    return True
+
+
+def _timed_call(fn: Callable[..., Any], args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> Tuple[Any, float]:
+    # Module-level so it can be sent to worker processes; timing excludes queueing
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+class MetricExecutor:
+    """Runs a DAG of MetricTasks across a process pool, a thread pool and the calling thread."""
+
+    def __init__(self, workers: int = 1):
+        """
+        Args:
+            workers: Size of each pool; 1 runs every task sequentially in the calling thread
+        """
+        self.workers = max(1, workers)
+
+    def run(
+        self,
+        tasks: List[MetricTask],
+        on_start: Optional[Callable[[str], None]] = None,
+        on_done: Optional[Callable[[str, float], None]] = None,
+        on_wait: Optional[Callable[[], None]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Run the tasks, each once all of its dependencies have finished.
+
+        The first exception raised by a task is re-raised (after running tasks
+        finish); tasks not yet started are dropped.
+
+        Args:
+            tasks: Tasks with unique names
+            on_start: Called with a task name when it is started
+            on_done: Called with a task name and its run time (seconds) when it finishes
+            on_wait: Called between polls while waiting on pooled tasks
+
+        Returns:
+            (task name -> result, task name -> run time in seconds)
+        """
+        by_name = {task.name: task for task in tasks}
+        if len(by_name) != len(tasks):
+            raise ValueError("Metric task names must be unique")
+        for task in tasks:
+            if task.kind not in TASK_KINDS:
+                raise ValueError(f"Unknown metric task kind '{task.kind}' for {task.name}")
+            missing = [dep for dep in task.depends_on if dep not in by_name]
+            if missing:
+                raise ValueError(f"Metric task {task.name} depends on unknown tasks: {missing}")
+
+        results: Dict[str, Any] = {}
+        timings: Dict[str, float] = {}
+        waiting = list(tasks)
+
+        def ready() -> List[MetricTask]:
+            runnable = [t for t in waiting if all(dep in results for dep in t.depends_on)]
+            for task in runnable:
+                waiting.remove(task)
+            return runnable
+
+        def finish(name: str, result: Any, seconds: float) -> None:
+            results[name] = result
+            timings[name] = seconds
+            if on_done:
+                on_done(name, seconds)
+
+        def run_inline(task: MetricTask) -> None:
+            if on_start:
+                on_start(task.name)
+            finish(task.name, *_timed_call(task.fn, task.args, task.kwargs))
+
+        if self.workers == 1:
+            while waiting:
+                runnable = ready()
+                if not runnable:
+                    raise ValueError(f"Metric tasks have cyclic dependencies: {[t.name for t in waiting]}")
+                for task in runnable:
+                    run_inline(task)
+                    if on_wait:
+                        on_wait()
+            return results, timings
+
+        use_processes = any(t.kind == "cpu" for t in tasks) and processes_available()
+        if not use_processes and any(t.kind == "cpu" for t in tasks):
+            logger.info("Worker processes unavailable (eventlet-patched threading); running cpu metrics in-process")
+        process_pool = _shared_process_pool(self.workers) if use_processes else None
+        thread_pool = ThreadPoolExecutor(max_workers=self.workers) if any(t.kind == "io" for t in tasks) else None
+        running: Dict[Future, MetricTask] = {}
+        try:
+            while waiting or running:
+                inline = []
+                for task in ready():
+                    if task.kind == "inline" or (task.kind == "cpu" and (process_pool is None or not _picklable(task.fn))):
+                        inline.append(task)
+                        continue
+                    pool = process_pool if task.kind == "cpu" else thread_pool
+                    try:
+                        future = pool.submit(_timed_call, task.fn, task.args, task.kwargs)
+                    except BrokenExecutor as e:
+                        logger.warning(f"Process pool unavailable ({e}); running metric {task.name} in-process")
+                        _discard_process_pool(process_pool)
+                        process_pool = None
+                        inline.append(task)
+                        continue
+                    if on_start:
+                        on_start(task.name)
+                    running[future] = task
+                # Cheap metrics run here while the pools work on the expensive ones
+                for task in inline:
+                    run_inline(task)
+                if not running:
+                    if waiting and not inline:
+                        raise ValueError(f"Metric tasks have cyclic dependencies: {[t.name for t in waiting]}")
+                    continue
+
+                done, _ = wait(list(running), timeout=WAIT_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    task = running.pop(future)
+                    try:
+                        result, seconds = future.result()
+                    except Exception as e:
+                        if task.kind != "cpu" or not _is_transfer_error(e):
+                            raise
+                        # Task could not be sent to / run in a worker process: compute it here
+                        logger.warning(f"Metric {task.name} failed in the process pool ({e}); running it in-process")
+                        if isinstance(e, BrokenExecutor) and process_pool is not None:
+                            _discard_process_pool(process_pool)
+                            process_pool = None
+                        result, seconds = _timed_call(task.fn, task.args, task.kwargs)
+                    finish(task.name, result, seconds)
+                if on_wait:
+                    on_wait()
+        finally:
+            for future in running:
+                future.cancel()
+            if running:
+                # Wait for started tasks so a failed run leaves the shared pool idle
+                wait(list(running))
+            if thread_pool is not None:
+                thread_pool.shutdown(wait=True, cancel_futures=True)
+        return results, timings
+
+
+def _is_transfer_error(error: BaseException) -> bool:
+    """Whether a process-pool failure came from the pool itself or from pickling, not from the metric."""
+    return isinstance(error, (BrokenExecutor, pickle.PicklingError))
@@ -467,6 +467,61 @@ Respond with only "YES" if the goal is COMPLETELY achieved with clear evidence;
         
         logger.info(f"Generated dialogue {dialogue_id} with {len(turns)} turns (minimum required: {min_turns_required}) in {generation_duration:.2f}s")
         return dialogue_data
+
+    def regenerate_turns(
+        self,
+        dialogue: Dict[str, Any],
+        turn_indices: List[int],
+    ) -> List[Dict[str, Any]]:
+        """
+        Regenerate only the turns at the given indices, keeping every other turn as-is.
+
+        Turns are regenerated in order with the conversation up to that point as context,
+        so a repaired turn also sees earlier repairs. The role of each regenerated turn is
+        reset to the alternating User/SupportBot order.
+
+        Args:
+            dialogue: Dialogue data (goal, domain, context, turns, metadata)
+            turn_indices: Indices of the turns to regenerate
+
+        Returns:
+            New list of turns with the requested turns replaced
+        """
+        goal = dialogue.get("goal", "")
+        domain = dialogue.get("domain", "general")
+        context = dialogue.get("context", "")
+        user_persona = dialogue.get("user_persona", "General user")
+        metadata = dialogue.get("metadata", {}) or {}
+        experience_data = {
+            "user_persona_traits": metadata.get("user_persona_traits", ""),
+            "supportbot_style": metadata.get("supportbot_style", ""),
+        }
+        turns = [dict(turn) for turn in dialogue.get("turns", [])]
+
+        for index in sorted(set(turn_indices)):
+            if index < 0 or index >= len(turns):
+                continue
+            role = "User" if index % 2 == 0 else "SupportBot"
+            history = [{"role": "System", "text": f"Domain: {domain}\nUser Goal: {goal}"}] + turns[:index]
+            try:
+                if role == "User":
+                    text = self._generate_user_turn(goal, context, user_persona, history, domain, experience_data)
+                else:
+                    text = self._generate_supportbot_turn(goal, context, history, domain, experience_data)
+            except Exception as e:
+                logger.warning(f"Regenerating turn {index} failed: {e}; using fallback.")
+                if role == "User":
+                    text = self._get_fallback_user_response(history, goal, domain)
+                else:
+                    text = self._get_fallback_supportbot_response(goal, history, domain)
+            turns[index] = {
+                **turns[index],
+                "role": role,
+                "text": text,
+                "timestamp": datetime.now().isoformat()
+            }
+
+        return turns
     
     def _format_structured_goal(self, experience_data: Optional[Dict[str, Any]] = None) -> str:
         """Format optional subgoals and constraints for injection into prompts."""
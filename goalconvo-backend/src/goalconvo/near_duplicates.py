@@ -0,0 +1,204 @@
+"""
+Near-duplicate detection for synthetic dialogues.
+
+Dialogues are reduced to MinHash signatures over word 3-gram shingles and
+bucketed with LSH banding, so finding dialogues whose estimated Jaccard
+similarity exceeds a threshold only looks at the few dialogues sharing a band
+bucket instead of the whole corpus.
+"""
+
+import logging
+import os
+import re
+import struct
+import zlib
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# 2^31 - 1 (Mersenne prime); keeps (a * x + b) inside uint64 for 31-bit a and x
+MERSENNE_PRIME = (1 << 31) - 1
+DEFAULT_NUM_PERM = 128
+DEFAULT_BANDS = 16  # 16 bands x 8 rows: ~0.7 Jaccard before a pair is likely to share a bucket
+SHINGLE_SIZE = 3
+
+
+def dialogue_shingle_text(dialogue: Dict[str, Any]) -> str:
+    """Text used for near-duplicate comparison: all turn texts, lowercased."""
+    return " ".join(turn.get("text", "") for turn in dialogue.get("turns", [])).lower()
+
+
+class MinHasher:
+    """Computes MinHash signatures with a fixed set of seeded hash permutations."""
+
+    def __init__(self, num_perm: int = DEFAULT_NUM_PERM, seed: int = 1):
+        rng = np.random.RandomState(seed)
+        self.num_perm = num_perm
+        self._a = rng.randint(1, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, MERSENNE_PRIME, size=num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature (uint32 array of length num_perm) of the word shingles of text."""
+        words = re.findall(r"\w+", text.lower())
+        if len(words) < SHINGLE_SIZE:
+            shingles = {" ".join(words)} if words else set()
+        else:
+            shingles = {" ".join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+        if not shingles:
+            return np.full(self.num_perm, MERSENNE_PRIME, dtype=np.uint32)
+        hashes = np.fromiter(
+            (zlib.crc32(s.encode("utf-8")) & MERSENNE_PRIME for s in shingles),
+            dtype=np.uint64,
+            count=len(shingles),
+        )
+        permuted = (self._a[:, None] * hashes[None, :] + self._b[:, None]) % MERSENNE_PRIME
+        return permuted.min(axis=1).astype(np.uint32)
+
+
+def estimate_jaccard(sig1: np.ndarray, sig2: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    return float(np.mean(sig1 == sig2))
+
+
+class NearDuplicateIndex:
+    """
+    MinHash/LSH index of dialogue signatures.
+
+    When a path is given the index is persisted as an append-only binary log
+    (one record per add), so incremental updates never rewrite existing entries.
+    A later record for the same key replaces the earlier one on load.
+    """
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        threshold: float = 0.8,
+        num_perm: int = DEFAULT_NUM_PERM,
+        bands: int = DEFAULT_BANDS,
+        hasher: Optional[MinHasher] = None,
+    ):
+        if num_perm % bands != 0:
+            raise ValueError("num_perm must be divisible by bands")
+        self.path = Path(path) if path else None
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.hasher = hasher or MinHasher(num_perm)
+        self._signatures: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, List[str]]] = [{} for _ in range(bands)]
+        if self.path and self.path.exists():
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._signatures
+
+    def signature(self, dialogue: Dict[str, Any]) -> np.ndarray:
+        """MinHash signature of a dialogue."""
+        return self.hasher.signature(dialogue_shingle_text(dialogue))
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def _insert(self, key: str, signature: np.ndarray) -> None:
+        if key in self._signatures:
+            self._unlink(key)
+        self._signatures[key] = signature
+        for band, band_key in enumerate(self._band_keys(signature)):
+            self._buckets[band].setdefault(band_key, []).append(key)
+
+    def _unlink(self, key: str) -> None:
+        signature = self._signatures.pop(key)
+        for band, band_key in enumerate(self._band_keys(signature)):
+            bucket = self._buckets[band].get(band_key, [])
+            if key in bucket:
+                bucket.remove(key)
+
+    def add(self, key: str, signature: np.ndarray, persist: bool = True) -> None:
+        """Add (or replace) a signature; appends it to the on-disk log when persisted."""
+        self._insert(key, signature)
+        if persist and self.path:
+            self._append(key, signature)
+
+    def add_many(self, items: List[Tuple[str, np.ndarray]], persist: bool = True) -> None:
+        """Add (or replace) several signatures with a single append to the on-disk log."""
+        for key, signature in items:
+            self._insert(key, signature)
+        if persist and self.path and items:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.write(b"".join(self._encode(key, signature) for key, signature in items))
+
+    def query(
+        self,
+        signature: np.ndarray,
+        threshold: Optional[float] = None,
+        exclude: Optional[str] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Find indexed entries similar to a signature.
+
+        Returns:
+            List of (key, estimated Jaccard similarity) at or above the threshold, most similar first
+        """
+        threshold = self.threshold if threshold is None else threshold
+        candidates = set()
+        for band, band_key in enumerate(self._band_keys(signature)):
+            candidates.update(self._buckets[band].get(band_key, ()))
+        candidates.discard(exclude)
+        matches = []
+        for key in candidates:
+            similarity = estimate_jaccard(signature, self._signatures[key])
+            if similarity >= threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda m: m[1], reverse=True)
+        return matches
+
+    def clear(self) -> None:
+        """Drop all entries and the on-disk log."""
+        self._signatures.clear()
+        self._buckets = [{} for _ in range(self.bands)]
+        if self.path and self.path.exists():
+            self.path.unlink()
+
+    def rewrite(self) -> None:
+        """Compact the on-disk log to exactly the current entries."""
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "wb") as f:
+            for key, signature in self._signatures.items():
+                f.write(self._encode(key, signature))
+        os.replace(tmp_path, self.path)
+
+    def _encode(self, key: str, signature: np.ndarray) -> bytes:
+        key_bytes = key.encode("utf-8")
+        return struct.pack("<H", len(key_bytes)) + key_bytes + signature.astype("<u4").tobytes()
+
+    def _append(self, key: str, signature: np.ndarray) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "ab") as f:
+            f.write(self._encode(key, signature))
+
+    def _load(self) -> None:
+        data = self.path.read_bytes()
+        record_sig_bytes = self.num_perm * 4
+        offset = 0
+        while offset + 2 <= len(data):
+            (key_len,) = struct.unpack_from("<H", data, offset)
+            end = offset + 2 + key_len + record_sig_bytes
+            if end > len(data):
+                logger.warning(f"Truncated record in near-duplicate index {self.path}; ignoring tail")
+                break
+            key = data[offset + 2:offset + 2 + key_len].decode("utf-8")
+            signature = np.frombuffer(data, dtype="<u4", count=self.num_perm, offset=offset + 2 + key_len).astype(np.uint32)
+            self._insert(key, signature)
+            offset = end
+        logger.info(f"Loaded {len(self._signatures)} signatures from {self.path}")
@@ -6,26 +6,69 @@ high-quality synthetic dialogues.
 """
 
 import logging
+import math
+import random
 import re
+import time
 from typing import Dict, List, Any, Optional, Tuple
 from datetime import datetime
 
+import numpy as np
+
 from .config import Config
 from .llm_client import LLMClient
+from .dataset_store import DatasetStore
+from .multi_agent_simulator import DialogueSimulator
+from .near_duplicates import NearDuplicateIndex
 from .utils import (
-    detect_repeated_utterances, calculate_similarity,
-    clean_text, is_profane, truncate_text, validate_dialogue_format,
+    find_repeated_utterances, calculate_similarity,
+    clean_text, estimate_tokens, is_profane, truncate_text, validate_dialogue_format,
 )
 
 logger = logging.getLogger(__name__)
 
+# LLM judge tiers (see Config.judge_fast_provider)
+JUDGE_TIERS = ("fast", "strong")
+
+# Heuristic checks, in the order they appear in an assessment
+HEURISTIC_CHECKS = (
+    "length_check", "repetition_check", "profanity_check",
+    "coherence_check", "goal_mention_check", "empty_response_check",
+)
+
 class QualityJudge:
     """Evaluates and filters dialogues for quality."""
     
-    def __init__(self, config: Config, llm_client: LLMClient):
-        """Initialize the quality judge."""
+    def __init__(
+        self,
+        config: Config,
+        llm_client: LLMClient,
+        simulator: Optional[DialogueSimulator] = None,
+        dataset_store: Optional[DatasetStore] = None,
+        fast_llm_client: Optional[LLMClient] = None,
+        strong_llm_client: Optional[LLMClient] = None
+    ):
+        """Initialize the quality judge.
+
+        When a simulator is given, failed dialogues with local problems are repaired by
+        regenerating only the affected turns (see plan_repair / repair_dialogue). When a
+        dataset store is given, candidates are checked for near-duplicates of saved dialogues.
+        Judge tier clients default to the tiers in config (see Config.get_judge_api_config);
+        without a fast tier every LLM judgement uses llm_client.
+        """
         self.config = config
         self.llm_client = llm_client
+        self.simulator = simulator
+        self.dataset_store = dataset_store
+        
+        # Report of the last sampled filter_dialogues run (None when every dialogue was LLM-judged)
+        self.last_sampling_report: Optional[Dict[str, Any]] = None
+        
+        if fast_llm_client is None and config.get_judge_api_config("fast") is not None:
+            fast_llm_client = LLMClient(config, api_config=config.get_judge_api_config("fast"))
+        if strong_llm_client is None and config.get_judge_api_config("strong") is not None:
+            strong_llm_client = LLMClient(config, api_config=config.get_judge_api_config("strong"))
+        self.set_judge_tiers(fast_llm_client, strong_llm_client)
         
         # Quality assessment prompts
         self.quality_prompts = self._create_quality_prompts()
@@ -159,36 +202,165 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
         # Apply heuristic filters
         heuristic_results = self._apply_heuristic_filters(dialogue_data)
         
+        if self.fast_llm_client is not None:
+            return self._judge_tiered(dialogue_data, heuristic_results)
+        
         # Apply LLM-based evaluation
         llm_results = self._apply_llm_evaluation(dialogue_data)
         
-        # Combine results
-        quality_assessment = {
+        return self._build_assessment(dialogue_data, heuristic_results, llm_results)
+    
+    def set_judge_tiers(
+        self,
+        fast_llm_client: Optional[LLMClient],
+        strong_llm_client: Optional[LLMClient] = None
+    ) -> None:
+        """Set (or, with fast_llm_client=None, disable) tiered judging and reset tier stats."""
+        self.fast_llm_client = fast_llm_client
+        self.strong_llm_client = strong_llm_client or self.llm_client
+        self._judge_client = self.llm_client
+        self._judge_tier: Optional[str] = None
+        # First judge call failure on the active tier (the _evaluate_* helpers fall back to defaults)
+        self._judge_tier_error: Optional[str] = None
+        self.reset_tier_stats()
+    
+    def reset_tier_stats(self) -> None:
+        """Reset per-tier call, latency and token counters."""
+        self.tier_stats: Dict[str, Dict[str, float]] = {
+            tier: {"dialogues": 0, "calls": 0, "latency_s": 0.0, "tokens": 0} for tier in JUDGE_TIERS
+        }
+    
+    def get_tier_stats(self) -> Dict[str, Any]:
+        """
+        Tiered judging statistics since the last reset.
+        
+        Returns:
+            Dictionary with the escalation rate and, per tier, dialogues judged, LLM calls,
+            total/average latency, estimated tokens and cost
+        """
+        judged = self.tier_stats["fast"]["dialogues"]
+        stats: Dict[str, Any] = {
+            "enabled": self.fast_llm_client is not None,
+            "dialogues_judged": judged,
+            "escalation_rate": self.tier_stats["strong"]["dialogues"] / judged if judged else 0.0,
+        }
+        for tier in JUDGE_TIERS:
+            counters = self.tier_stats[tier]
+            cost_per_1k = getattr(self.config, f"judge_{tier}_cost_per_1k_tokens", 0.0)
+            stats[tier] = {
+                "dialogues": counters["dialogues"],
+                "calls": counters["calls"],
+                "latency_s": round(counters["latency_s"], 3),
+                "avg_latency_s": round(counters["latency_s"] / counters["dialogues"], 3) if counters["dialogues"] else 0.0,
+                "tokens": counters["tokens"],
+                "cost": round(counters["tokens"] / 1000.0 * cost_per_1k, 6),
+            }
+        return stats
+    
+    def _judge_tiered(self, dialogue_data: Dict[str, Any], heuristic_results: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Judge with the fast tier, escalating to the strong tier when the fast tier failed or
+        its verdict could flip with LLM scores judge_escalation_margin points away (see
+        _verdict_could_flip).
+        """
+        llm_results = self._apply_llm_evaluation_on_tier(dialogue_data, "fast")
+        if self._judge_tier_error is not None and "error" not in llm_results:
+            # Default scores stood in for a failed call: never let them decide on their own
+            llm_results["error"] = f"Fast judge tier failed: {self._judge_tier_error}"
+        assessment = self._build_assessment(dialogue_data, heuristic_results, llm_results)
+        borderline = self._verdict_could_flip(heuristic_results, llm_results, self.config.judge_escalation_margin)
+        if "error" in llm_results or borderline:
+            fast_score = assessment["overall_score"]
+            llm_results = self._apply_llm_evaluation_on_tier(dialogue_data, "strong")
+            assessment = self._build_assessment(dialogue_data, heuristic_results, llm_results)
+            assessment["judge_tier"] = "strong"
+            assessment["fast_tier_score"] = fast_score
+        else:
+            assessment["judge_tier"] = "fast"
+        return assessment
+    
+    def _apply_llm_evaluation_on_tier(self, dialogue_data: Dict[str, Any], tier: str) -> Dict[str, Any]:
+        """Run the LLM evaluation on one judge tier, recording its calls, latency and tokens."""
+        self._judge_client = self.fast_llm_client if tier == "fast" else self.strong_llm_client
+        self._judge_tier = tier
+        self._judge_tier_error = None
+        start = time.perf_counter()
+        try:
+            return self._apply_llm_evaluation(dialogue_data)
+        finally:
+            self.tier_stats[tier]["dialogues"] += 1
+            self.tier_stats[tier]["latency_s"] += time.perf_counter() - start
+            self._judge_client = self.llm_client
+            self._judge_tier = None
+    
+    def _judge_completion(self, prompt: str) -> str:
+        """Short, low-temperature judge completion on the active judge tier."""
+        try:
+            response = self._judge_client.generate_completion(
+                prompt,
+                temperature=0.1,  # Low temperature for consistent scoring
+                max_tokens=10
+            )
+        except Exception as e:
+            if self._judge_tier is not None and self._judge_tier_error is None:
+                self._judge_tier_error = str(e)
+            raise
+        if self._judge_tier is not None:
+            self.tier_stats[self._judge_tier]["calls"] += 1
+            self.tier_stats[self._judge_tier]["tokens"] += estimate_tokens(prompt) + estimate_tokens(response)
+        return response
+    
+    def _build_assessment(
+        self,
+        dialogue_data: Dict[str, Any],
+        heuristic_results: Dict[str, Any],
+        llm_results: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """Combine heuristic and LLM results into a quality assessment."""
+        return {
             "dialogue_id": dialogue_data.get("dialogue_id", "unknown"),
-            "domain": domain,
+            "domain": dialogue_data.get("domain", "unknown"),
             "heuristic_filters": heuristic_results,
             "llm_evaluation": llm_results,
             "overall_score": self._calculate_overall_score(heuristic_results, llm_results),
             "passed_filters": self._determine_if_passed(heuristic_results, llm_results),
             "assessment_timestamp": datetime.now().isoformat()
         }
-        
-        return quality_assessment
     
-    def _apply_heuristic_filters(self, dialogue_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Apply heuristic quality filters."""
+    def _apply_heuristic_filters(
+        self,
+        dialogue_data: Dict[str, Any],
+        only: Optional[List[str]] = None,
+        previous: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        """
+        Apply heuristic quality filters.
+        
+        Args:
+            dialogue_data: Dialogue to check
+            only: If set, run only these checks and copy the rest from `previous`
+            previous: Heuristic results of an earlier assessment of the same dialogue
+        """
         turns = dialogue_data.get("turns", [])
         goal = dialogue_data.get("goal", "")
+        previous = previous or {}
         
-        results = {
-            "length_check": self._check_length(turns),
-            "repetition_check": self._check_repetition(turns),
-            "profanity_check": self._check_profanity(turns),
-            "coherence_check": self._check_coherence(turns),
-            "goal_mention_check": self._check_goal_mention(goal, turns),
-            "empty_response_check": self._check_empty_responses(turns)
+        check_fns = {
+            "length_check": lambda: self._check_length(turns),
+            "repetition_check": lambda: self._check_repetition(turns),
+            "profanity_check": lambda: self._check_profanity(turns),
+            "coherence_check": lambda: self._check_coherence(turns),
+            "goal_mention_check": lambda: self._check_goal_mention(goal, turns),
+            "empty_response_check": lambda: self._check_empty_responses(turns)
         }
         
+        results = {}
+        for name in HEURISTIC_CHECKS:
+            if only is not None and name not in only and name in previous:
+                results[name] = previous[name]
+            else:
+                results[name] = check_fns[name]()
+        
         # Calculate heuristic score
         passed_checks = sum(1 for result in results.values() if result["passed"])
         total_checks = len(results)
@@ -214,11 +386,13 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
     
     def _check_repetition(self, turns: List[Dict[str, str]]) -> Dict[str, Any]:
         """Check for repeated utterances."""
-        has_repetition = detect_repeated_utterances(turns, threshold=0.6)
+        repeated_turns = find_repeated_utterances(turns, threshold=0.6)
+        has_repetition = len(repeated_turns) > 0
         
         return {
             "passed": not has_repetition,
             "has_repetition": has_repetition,
+            "repeated_turns": repeated_turns,
             "message": "No repeated utterances detected" if not has_repetition else "Repeated utterances detected"
         }
     
@@ -251,6 +425,7 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
             expected_roles.append("User")
         
         role_coherence = roles == expected_roles
+        role_breaks = [i for i, (role, expected) in enumerate(zip(roles, expected_roles)) if role != expected]
         
         # Check for non-empty responses
         empty_responses = any(
@@ -262,6 +437,7 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
         return {
             "passed": passed,
             "role_coherence": role_coherence,
+            "role_breaks": role_breaks,
             "has_empty_responses": empty_responses,
             "message": "Dialogue structure is coherent" if passed else "Dialogue structure issues detected"
         }
@@ -356,11 +532,7 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
         prompt = self.quality_prompts["coherence"].format(history=history)
         
         try:
-            response = self.llm_client.generate_completion(
-                prompt,
-                temperature=0.1,  # Low temperature for consistent scoring
-                max_tokens=10
-            )
+            response = self._judge_completion(prompt)
             
             # Extract numeric score
             score_match = re.search(r'\b([1-5])\b', response)
@@ -382,11 +554,7 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
         prompt = self.quality_prompts["goal_relevance"].format(goal=goal, history=history)
         
         try:
-            response = self.llm_client.generate_completion(
-                prompt,
-                temperature=0.1,
-                max_tokens=10
-            )
+            response = self._judge_completion(prompt)
             
             return "YES" in response.upper()
             
@@ -403,11 +571,7 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
         prompt = self.quality_prompts["overall_quality"].format(goal=goal, history=history)
         
         try:
-            response = self.llm_client.generate_completion(
-                prompt,
-                temperature=0.1,
-                max_tokens=10
-            )
+            response = self._judge_completion(prompt)
             
             # Extract numeric score
             score_match = re.search(r'\b([1-5])\b', response)
@@ -475,6 +639,26 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
         
         return heuristic_passed or llm_passed
 
+    def _verdict_could_flip(
+        self,
+        heuristic_results: Dict[str, Any],
+        llm_results: Dict[str, Any],
+        margin: float
+    ) -> bool:
+        """
+        Whether the _determine_if_passed verdict changes when the LLM coherence and overall
+        scores move up to margin points (1-5 scale) against it.
+        
+        The verdict is monotone in both scores, so moving both by the full margin is the
+        only case to check. A verdict the heuristic check decides on its own never flips.
+        """
+        passed = self._determine_if_passed(heuristic_results, llm_results)
+        shift = -margin if passed else margin
+        shifted = dict(llm_results)
+        for key in ("coherence_score", "overall_score"):
+            shifted[key] = llm_results.get(key, 0.0) + shift
+        return self._determine_if_passed(heuristic_results, shifted) != passed
+
     def _heuristic_summary_one_line(self, assessment: Dict[str, Any]) -> str:
         """One-line summary of heuristic results for rejection reason prompt."""
         heur = assessment.get("heuristic_filters", {})
@@ -608,6 +792,286 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
             return None
         return improved
 
+    def plan_repair(self, dialogue: Dict[str, Any], assessment: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Map a failed assessment to the minimal set of turns to regenerate.
+
+        Local failures map to turn indices: empty/short turns, profane turns, turns repeating
+        the previous one, role-order breaks, and (when the LLM says the goal was not achieved)
+        the closing SupportBot/User pair that should carry the confirmation.
+
+        Returns:
+            {"turn_indices": [...], "checks": [...], "issues": {check: [indices]}} naming the turns
+            to regenerate and the checks to re-run afterwards, or None when nothing turn-level can
+            be fixed or too many turns are affected for a targeted repair.
+        """
+        turns = dialogue.get("turns", [])
+        heur = assessment.get("heuristic_filters") or {}
+        llm = assessment.get("llm_evaluation") or {}
+        if not turns or not heur:
+            return None
+
+        issues: Dict[str, List[int]] = {}
+        if heur.get("empty_response_check", {}).get("passed") is False:
+            issues["empty_response_check"] = list(heur["empty_response_check"].get("empty_turns", []))
+        if heur.get("profanity_check", {}).get("passed") is False:
+            issues["profanity_check"] = list(heur["profanity_check"].get("profane_turns", []))
+        if heur.get("repetition_check", {}).get("passed") is False:
+            issues["repetition_check"] = list(heur["repetition_check"].get("repeated_turns", []))
+        if heur.get("coherence_check", {}).get("passed") is False:
+            blank_turns = [i for i, turn in enumerate(turns) if not turn.get("text", "").strip()]
+            issues["coherence_check"] = list(heur["coherence_check"].get("role_breaks", [])) + blank_turns
+        if llm.get("goal_relevance") is False and "error" not in llm and len(turns) >= 2:
+            # Missing confirmation: regenerate the last SupportBot turn and the user reply after it
+            last_bot = len(turns) - 1 if (len(turns) - 1) % 2 == 1 else len(turns) - 2
+            issues["goal_relevance"] = [i for i in (last_bot, last_bot + 1) if i < len(turns)]
+
+        issues = {check: indices for check, indices in issues.items() if indices}
+        turn_indices = sorted({i for indices in issues.values() for i in indices if 0 <= i < len(turns)})
+        if not turn_indices:
+            return None
+
+        max_fraction = getattr(self.config, "max_repair_fraction", 0.5)
+        if len(turn_indices) > max(1, int(len(turns) * max_fraction)):
+            logger.info(
+                f"Dialogue {dialogue.get('dialogue_id', '?')}: {len(turn_indices)}/{len(turns)} turns need repair; "
+                "using full rewrite instead"
+            )
+            return None
+
+        # A regenerated turn can repeat its neighbour, so repetition is always re-checked
+        checks = sorted(set(issues) | {"repetition_check"})
+        return {"turn_indices": turn_indices, "checks": checks, "issues": issues}
+
+    def repair_dialogue(
+        self,
+        dialogue: Dict[str, Any],
+        assessment: Dict[str, Any],
+        plan: Optional[Dict[str, Any]] = None,
+    ) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+        """
+        Targeted repair: regenerate only the turns named by plan_repair via the simulator and
+        re-run only the affected checks, reusing all other results from the original assessment.
+
+        Returns:
+            (repaired_dialogue, re_assessment), or None if no simulator is configured, the
+            failure is not local, or regeneration fails.
+        """
+        if self.simulator is None:
+            return None
+        plan = plan or self.plan_repair(dialogue, assessment)
+        if plan is None:
+            return None
+        try:
+            new_turns = self.simulator.regenerate_turns(dialogue, plan["turn_indices"])
+        except Exception as e:
+            logger.warning(f"Targeted repair failed: {e}")
+            return None
+
+        repaired = dict(dialogue)
+        repaired["turns"] = new_turns
+        repaired["metadata"] = dict(dialogue.get("metadata") or {})
+        repaired["metadata"]["improved_by_quality_judge"] = True
+        repaired["metadata"]["improvement_mode"] = "targeted_repair"
+        repaired["metadata"]["repaired_turns"] = plan["turn_indices"]
+        repaired["metadata"]["improvement_timestamp"] = datetime.now().isoformat()
+        if not validate_dialogue_format(repaired):
+            logger.warning("Repaired dialogue failed format validation; skipping.")
+            return None
+
+        heuristic_results = self._apply_heuristic_filters(
+            repaired,
+            only=[c for c in plan["checks"] if c in HEURISTIC_CHECKS],
+            previous=assessment.get("heuristic_filters"),
+        )
+        llm_results = dict(assessment.get("llm_evaluation") or {})
+        if "goal_relevance" in plan["checks"]:
+            history = self._format_history_for_llm(new_turns)
+            llm_results["goal_relevance"] = self._evaluate_goal_relevance(repaired.get("goal", ""), history)
+        re_assessment = self._build_assessment(repaired, heuristic_results, llm_results)
+        re_assessment["rechecked"] = plan["checks"]
+        return repaired, re_assessment
+
+    def _sampling_stratum(self, dialogue: Dict[str, Any]) -> Tuple[str, str, str]:
+        """Stratum key (domain, persona, assistant style); free-text traits are reduced to their first word."""
+        metadata = dialogue.get("metadata") or {}
+
+        def first_word(value: Any) -> str:
+            words = str(value or "").lower().split()
+            return words[0].strip(",.;:") if words else "default"
+
+        return (
+            dialogue.get("domain", "unknown"),
+            first_word(metadata.get("user_persona_traits")),
+            first_word(metadata.get("supportbot_style")),
+        )
+
+    def _sampling_features(self, heuristic_results: Dict[str, Any], num_turns: int) -> List[float]:
+        """Cheap per-dialogue features used by the sampling-mode score predictor."""
+        features = [1.0, heuristic_results.get("heuristic_score", 0.0)]
+        features.extend(1.0 if heuristic_results[name]["passed"] else 0.0 for name in HEURISTIC_CHECKS)
+        features.append(num_turns / max(1, self.config.max_turns))
+        return features
+
+    @staticmethod
+    def _fit_ridge(rows: List[List[float]], targets: List[float]) -> Optional[np.ndarray]:
+        """Ridge regression weights, or None when there are too few rows to fit them."""
+        if not rows or len(rows) <= len(rows[0]):
+            return None
+        features = np.array(rows)
+        return np.linalg.solve(features.T @ features + 1e-3 * np.eye(features.shape[1]), features.T @ np.array(targets))
+
+    def judge_dialogues_sampled(
+        self,
+        dialogues: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+        """
+        Judge a large batch with statistical sampling instead of one full LLM judgement per dialogue.
+        
+        Heuristic filters run on every dialogue. The full judge runs on a stratified random sample
+        per (domain, persona, style), and ridge regressions on heuristic features predict the rest:
+        one fitted to the sample's overall scores, one to its verdicts. Dialogues whose heuristics
+        pass are accepted without further calls, as _determine_if_passed would. For the others
+        the verdict model is fitted on the sampled dialogues the LLM decided, and predictions
+        within quality_sampling_margin of the 0.5 decision boundary are escalated to the full judge.
+        
+        Args:
+            dialogues: Dialogues to judge
+            
+        Returns:
+            Tuple of (assessments in input order, sampling report including a 95% confidence
+            interval on the acceptance rate)
+        """
+        n = len(dialogues)
+        margin = self.config.quality_sampling_margin
+        
+        strata: Dict[Tuple[str, str, str], List[int]] = {}
+        for i, dialogue in enumerate(dialogues):
+            strata.setdefault(self._sampling_stratum(dialogue), []).append(i)
+        
+        assessments: List[Optional[Dict[str, Any]]] = [None] * n
+        samples: Dict[Tuple[str, str, str], List[int]] = {}
+        for key, indices in strata.items():
+            sample_size = min(
+                len(indices),
+                max(self.config.quality_sample_min_per_stratum, math.ceil(len(indices) * self.config.quality_sample_rate))
+            )
+            samples[key] = random.sample(indices, sample_size)
+            for i in samples[key]:
+                assessments[i] = self.judge_dialogue(dialogues[i])
+        
+        sampled = [i for sample in samples.values() for i in sample]
+        rows = {
+            i: self._sampling_features(assessments[i]["heuristic_filters"], len(dialogues[i].get("turns", [])))
+            for i in sampled
+        }
+        score_weights = self._fit_ridge([rows[i] for i in sampled], [assessments[i]["overall_score"] for i in sampled])
+        predictor_mae = None
+        if score_weights is not None:
+            predictor_mae = float(np.mean([
+                abs(np.dot(rows[i], score_weights) - assessments[i]["overall_score"]) for i in sampled
+            ]))
+        else:
+            logger.warning(f"Sample of {len(sampled)} dialogues too small to calibrate predictor; judging all")
+        # Verdicts of dialogues that pass the heuristic gate are known; the model learns the LLM-decided ones
+        llm_decided = [i for i in sampled if assessments[i]["heuristic_filters"]["heuristic_score"] < 0.5]
+        verdict_weights = self._fit_ridge(
+            [rows[i] for i in llm_decided],
+            [1.0 if assessments[i]["passed_filters"] else 0.0 for i in llm_decided]
+        )
+        verdict_accuracy = None
+        if verdict_weights is not None:
+            verdict_accuracy = float(np.mean([
+                (np.dot(rows[i], verdict_weights) > 0.5) == assessments[i]["passed_filters"] for i in llm_decided
+            ]))
+        
+        escalated = 0
+        predicted = 0
+        for i, dialogue in enumerate(dialogues):
+            if assessments[i] is not None:
+                continue
+            heuristic_results = self._apply_heuristic_filters(dialogue)
+            row = self._sampling_features(heuristic_results, len(dialogue.get("turns", [])))
+            score = float(np.clip(np.dot(row, score_weights), 0.0, 1.0)) if score_weights is not None else None
+            pass_probability = None
+            passed: Optional[bool] = None
+            if heuristic_results["heuristic_score"] >= 0.5:
+                # Decided by the heuristic gate whatever the LLM would say: never escalated
+                passed = True
+            elif verdict_weights is not None:
+                pass_probability = float(np.clip(np.dot(row, verdict_weights), 0.0, 1.0))
+                passed = pass_probability > 0.5
+            uncertain = pass_probability is not None and abs(pass_probability - 0.5) <= margin
+            if score is None or passed is None or uncertain:
+                assessments[i] = self.judge_dialogue(dialogue)
+                escalated += 1
+                continue
+            predicted += 1
+            llm_evaluation = {"predicted": True, "predicted_score": round(score, 4)}
+            if pass_probability is not None:
+                llm_evaluation["pass_probability"] = round(pass_probability, 4)
+            assessments[i] = {
+                "dialogue_id": dialogue.get("dialogue_id", "unknown"),
+                "domain": dialogue.get("domain", "unknown"),
+                "heuristic_filters": heuristic_results,
+                "llm_evaluation": llm_evaluation,
+                "overall_score": score,
+                "passed_filters": passed,
+                "assessment_timestamp": datetime.now().isoformat()
+            }
+        
+        # Stratified estimate of the acceptance rate from the random sample (escalations are not random)
+        estimate = 0.0
+        variance = 0.0
+        strata_report = {}
+        for key, indices in strata.items():
+            sample = samples[key]
+            stratum_size, sample_size = len(indices), len(sample)
+            accept_rate = sum(1 for i in sample if assessments[i]["passed_filters"]) / sample_size
+            weight = stratum_size / n
+            estimate += weight * accept_rate
+            if sample_size > 1:
+                fpc = (stratum_size - sample_size) / (stratum_size - 1)
+                variance += weight ** 2 * accept_rate * (1 - accept_rate) / (sample_size - 1) * fpc
+            elif stratum_size > 1:
+                variance += weight ** 2 * 0.25
+            strata_report["/".join(key)] = {
+                "size": stratum_size,
+                "sampled": sample_size,
+                "accept_rate": round(accept_rate, 4)
+            }
+        half_width = 1.96 * math.sqrt(variance)
+        
+        report = {
+            "total": n,
+            "sampled": len(sampled),
+            "escalated": escalated,
+            "predicted": predicted,
+            "llm_judged_fraction": round((len(sampled) + escalated) / n, 4) if n else 0.0,
+            "acceptance_rate": round(sum(1 for a in assessments if a["passed_filters"]) / n, 4) if n else 0.0,
+            "estimated_acceptance_rate": round(estimate, 4),
+            "acceptance_rate_ci95": [round(max(0.0, estimate - half_width), 4), round(min(1.0, estimate + half_width), 4)],
+            "predictor_mae": round(predictor_mae, 4) if predictor_mae is not None else None,
+            "verdict_predictor_accuracy": round(verdict_accuracy, 4) if verdict_accuracy is not None else None,
+            "strata": strata_report
+        }
+        logger.info(
+            f"Sampled judging: {len(sampled)} sampled, {escalated} escalated, {predicted} predicted of {n}; "
+            f"acceptance {estimate:.1%} (95% CI {report['acceptance_rate_ci95'][0]:.1%}-{report['acceptance_rate_ci95'][1]:.1%})"
+        )
+        return assessments, report
+
+    def _find_near_duplicate(
+        self,
+        dialogue: Dict[str, Any],
+        batch_index: NearDuplicateIndex
+    ) -> Optional[Tuple[str, float]]:
+        """Best near-duplicate match of a candidate among saved dialogues and dialogues accepted earlier in the batch."""
+        matches = batch_index.query(batch_index.signature(dialogue), exclude=dialogue.get("dialogue_id"))
+        if self.dataset_store is not None:
+            matches += self.dataset_store.find_near_duplicates(dialogue, threshold=batch_index.threshold)
+        return max(matches, key=lambda m: m[1]) if matches else None
+
     def filter_dialogues(
         self,
         dialogues: List[Dict[str, Any]],
@@ -615,9 +1079,14 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
         improve_on_fail: Optional[bool] = None,
     ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
         """
-        Filter dialogues based on quality assessment. When a dialogue fails and
-        improve_on_fail is True, the LLM is used to improve it; the improved
-        version is re-judged and accepted if it passes.
+        Filter dialogues based on quality assessment. Batches of at least
+        config.quality_sampling_min_batch are judged with judge_dialogues_sampled when
+        config.quality_sampling is on (report in self.last_sampling_report). Near-duplicates are
+        flagged or rejected before judging, per config.near_duplicate_action; only accepted
+        dialogues count as earlier batch candidates for that check. When a dialogue fails and
+        improve_on_fail is True, local failures are first fixed by targeted repair
+        (regenerating only the affected turns); otherwise, or if that does not pass,
+        the LLM rewrites the whole dialogue, which is re-judged and accepted if it passes.
         
         Args:
             dialogues: List of dialogues to filter
@@ -631,25 +1100,72 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
         do_improve = improve_on_fail if improve_on_fail is not None else getattr(
             self.config, "quality_improve_on_fail", True
         )
+        do_repair = getattr(self.config, "quality_targeted_repair", True)
         
         accepted = []
         rejected = []
         
-        for dialogue in dialogues:
-            assessment = self.judge_dialogue(dialogue)
+        # Near-duplicates of saved dialogues (or of dialogues accepted earlier in this batch)
+        # are flagged, or rejected before spending any LLM calls on them
+        duplicate_action = getattr(self.config, "near_duplicate_action", "off")
+        batch_index = None
+        if duplicate_action in ("flag", "reject"):
+            batch_index = NearDuplicateIndex(threshold=self.config.near_duplicate_threshold)
+        
+        def accept(dialogue: Dict[str, Any]) -> None:
+            accepted.append(dialogue)
+            if batch_index is not None:
+                # Rejected candidates never enter the batch index, so they cannot mark later ones
+                batch_index.add(dialogue.get("dialogue_id", str(id(dialogue))), batch_index.signature(dialogue))
+        
+        assessments = None
+        self.last_sampling_report = None
+        if getattr(self.config, "quality_sampling", False) and len(dialogues) >= self.config.quality_sampling_min_batch:
+            assessments, self.last_sampling_report = self.judge_dialogues_sampled(dialogues)
+        
+        for index, dialogue in enumerate(dialogues):
+            if batch_index is not None:
+                match = self._find_near_duplicate(dialogue, batch_index)
+                if match is not None:
+                    if "metadata" not in dialogue:
+                        dialogue["metadata"] = {}
+                    dialogue["metadata"]["near_duplicate_of"] = {
+                        "dialogue_id": match[0],
+                        "similarity": round(match[1], 4)
+                    }
+                    if duplicate_action == "reject":
+                        dialogue["metadata"]["rejection_reason"] = (
+                            f"Near-duplicate of dialogue {match[0]} (Jaccard {match[1]:.2f})"
+                        )
+                        rejected.append(dialogue)
+                        continue
+            
+            assessment = assessments[index] if assessments is not None else self.judge_dialogue(dialogue)
             
             if assessment["passed_filters"]:
                 if "metadata" not in dialogue:
                     dialogue["metadata"] = {}
                 dialogue["metadata"]["quality_score"] = assessment["overall_score"]
                 dialogue["metadata"]["quality_assessment"] = assessment
-                accepted.append(dialogue)
+                accept(dialogue)
             else:
-                rejection_reason = self._get_rejection_reason(dialogue, assessment)
                 if "metadata" not in dialogue:
                     dialogue["metadata"] = {}
-                dialogue["metadata"]["rejection_reason"] = rejection_reason
                 dialogue["metadata"]["quality_assessment"] = assessment
+                if do_improve and do_repair:
+                    repair = self.repair_dialogue(dialogue, assessment)
+                    if repair is not None and repair[1]["passed_filters"]:
+                        repaired, re_assessment = repair
+                        repaired["metadata"]["quality_score"] = re_assessment["overall_score"]
+                        repaired["metadata"]["quality_assessment"] = re_assessment
+                        accept(repaired)
+                        logger.info(
+                            f"Dialogue {dialogue.get('dialogue_id', '?')} accepted after targeted repair "
+                            f"of turns {repaired['metadata']['repaired_turns']}"
+                        )
+                        continue
+                rejection_reason = self._get_rejection_reason(dialogue, assessment)
+                dialogue["metadata"]["rejection_reason"] = rejection_reason
                 if do_improve:
                     improved = self.improve_dialogue(dialogue, assessment, rejection_reason=rejection_reason)
                     if improved is not None:
@@ -659,7 +1175,7 @@ In 2-4 short, specific sentences explain WHY this dialogue was rejected and WHAT
                                 improved["metadata"] = {}
                             improved["metadata"]["quality_score"] = re_assessment["overall_score"]
                             improved["metadata"]["quality_assessment"] = re_assessment
-                            accepted.append(improved)
+                            accept(improved)
                             logger.info(f"Dialogue {dialogue.get('dialogue_id', '?')} accepted after improvement")
                             continue
                 rejected.append(dialogue)
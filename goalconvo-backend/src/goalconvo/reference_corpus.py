@@ -0,0 +1,171 @@
+"""
+Indexed, memory-mapped reader for the MultiWOZ reference corpus.
+
+download_multiwoz writes every processed dialogue into one
+processed_dialogues.json, which evaluation used to parse in full only to keep
+the first few dozen dialogues. ReferenceCorpus converts that file once into
+<multiwoz_dir>/reference/:
+
+- dialogues.jsonl: one compact JSON dialogue per line
+- offsets.npy: byte offset of every line (n + 1 entries)
+- index.json: dialogue count, row numbers per domain and the source file's
+  size and mtime (a changed source triggers a rebuild)
+
+Reads memory-map the line file and parse only the requested rows, so loading
+N dialogues of a domain costs O(N) regardless of corpus size.
+"""
+
+import json
+import logging
+import mmap
+import os
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable
+
+import numpy as np
+
+from .utils import dumps_compact, ensure_dir, load_json, save_json
+
+logger = logging.getLogger(__name__)
+
+PROCESSED_DIALOGUES_FILE = "processed_dialogues.json"
+REFERENCE_DIR = "reference"
+
+
+def _source_signature(source: Path) -> Dict[str, int]:
+    stat = source.stat()
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class ReferenceCorpus:
+    """Random access to reference dialogues by row, domain and count."""
+
+    def __init__(self, path: str):
+        """
+        Open a built reference corpus.
+
+        Args:
+            path: Corpus directory (<multiwoz_dir>/reference)
+        """
+        self.path = Path(path)
+        index = load_json(str(self.path / "index.json"))
+        self.count: int = index.get("count", 0)
+        self.domain_rows: Dict[str, List[int]] = index.get("domains", {})
+        self._offsets = np.load(str(self.path / "offsets.npy"), mmap_mode="r")
+        self._file = None
+        self._dialogues: Optional[mmap.mmap] = None
+        file_path = self.path / "dialogues.jsonl"
+        if self.count and file_path.stat().st_size > 0:
+            self._file = open(file_path, "rb")
+            self._dialogues = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def close(self) -> None:
+        """Release the memory map."""
+        if self._dialogues is not None:
+            self._dialogues.close()
+        if self._file is not None:
+            self._file.close()
+        self._dialogues = self._file = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    @staticmethod
+    def build(dialogues: Iterable[Dict[str, Any]], path: str, source: Optional[str] = None) -> "ReferenceCorpus":
+        """
+        Write the indexed corpus for the given dialogues (streamed) and open it.
+
+        Args:
+            dialogues: Reference dialogues
+            path: Corpus directory
+            source: File the dialogues came from, recorded for staleness checks
+        """
+        path = Path(path)
+        ensure_dir(str(path))
+        offsets = [0]
+        domain_rows: Dict[str, List[int]] = {}
+        with open(path / "dialogues.jsonl.tmp", "wb") as dialogues_file:
+            for row, dialogue in enumerate(dialogues):
+                line = dumps_compact(dialogue).encode("utf-8") + b"\n"
+                dialogues_file.write(line)
+                offsets.append(offsets[-1] + len(line))
+                domain_rows.setdefault(dialogue.get("domain", "unknown"), []).append(row)
+
+        os.replace(path / "dialogues.jsonl.tmp", path / "dialogues.jsonl")
+        np.save(str(path / "offsets.npy"), np.asarray(offsets, dtype=np.int64))
+        # index.json is written last: its presence marks a complete build
+        save_json({
+            "count": len(offsets) - 1,
+            "domains": domain_rows,
+            "source": _source_signature(Path(source)) if source else None,
+        }, str(path / "index.json"))
+        logger.info(f"Built reference corpus with {len(offsets) - 1} dialogues at {path}")
+        return ReferenceCorpus(str(path))
+
+    @classmethod
+    def open(cls, multiwoz_dir: str) -> Optional["ReferenceCorpus"]:
+        """
+        Open the reference corpus of a MultiWOZ directory, converting processed_dialogues.json
+        first if the corpus is missing or older than it.
+
+        Returns:
+            The corpus, or None if there is no processed MultiWOZ data
+        """
+        source = Path(multiwoz_dir) / PROCESSED_DIALOGUES_FILE
+        path = Path(multiwoz_dir) / REFERENCE_DIR
+        index_file = path / "index.json"
+        if index_file.exists():
+            recorded = load_json(str(index_file)).get("source")
+            if not source.exists() or recorded is None or recorded == _source_signature(source):
+                return cls(str(path))
+            logger.info(f"{source} changed; rebuilding reference corpus")
+        if not source.exists():
+            return None
+        logger.info(f"Converting {source} into an indexed reference corpus (one-time)")
+        dialogues = load_json(str(source))
+        return cls.build(dialogues if isinstance(dialogues, list) else [], str(path), source=str(source))
+
+    def rows(self, limit: Optional[int] = None, domains: Optional[List[str]] = None) -> List[int]:
+        """Row numbers in corpus order, optionally restricted to domains and truncated to limit."""
+        if domains:
+            selected = sorted(row for domain in dict.fromkeys(domains) for row in self.domain_rows.get(domain, []))
+        else:
+            selected = range(self.count)
+        return list(selected[:limit] if limit else selected)
+
+    def get(self, row: int) -> Dict[str, Any]:
+        """Dialogue at a row."""
+        return json.loads(self._dialogues[int(self._offsets[row]):int(self._offsets[row + 1])])
+
+    def load(self, limit: Optional[int] = None, domains: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """
+        Load reference dialogues, parsing only the selected rows.
+
+        Args:
+            limit: Maximum number of dialogues (None for all)
+            domains: Only these domains (None for all), in corpus order
+
+        Returns:
+            List of dialogue dictionaries
+        """
+        return [self.get(row) for row in self.rows(limit, domains)]
+
+
+def load_reference_dialogues(
+    multiwoz_dir: str,
+    limit: Optional[int] = None,
+    domains: Optional[List[str]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Load reference dialogues through the indexed corpus (built on first use).
+
+    Returns:
+        List of dialogue dictionaries (empty if there is no processed MultiWOZ data)
+    """
+    corpus = ReferenceCorpus.open(multiwoz_dir)
+    if corpus is None:
+        return []
+    try:
+        return corpus.load(limit=limit, domains=domains)
+    finally:
+        corpus.close()
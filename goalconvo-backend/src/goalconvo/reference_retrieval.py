@@ -0,0 +1,75 @@
+"""
+Candidate retrieval of nearest reference dialogues.
+
+Best-match metrics (BERTScore, BLEU) score each synthetic dialogue against its
+closest reference. Scoring every reference is O(S x R) expensive metric calls,
+and truncating to the first few references picks arbitrary ones. A
+ReferenceRetriever indexes the reference texts as TF-IDF vectors and returns,
+per candidate, the k references with the highest cosine similarity (exact
+search over a sparse matrix), so the expensive metric only runs on those k.
+"""
+
+import logging
+from typing import List, Sequence
+
+import numpy as np
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+logger = logging.getLogger(__name__)
+
+RETRIEVAL_BLOCK_ELEMENTS = 1 << 24  # bound on the dense candidate x reference similarity block
+
+
+class ReferenceRetriever:
+    """TF-IDF index over reference texts for top-k nearest-reference lookup."""
+
+    def __init__(self, reference_texts: Sequence[str]):
+        """
+        Index the reference texts.
+
+        Args:
+            reference_texts: Texts of the references (typically of one domain)
+        """
+        self.size = len(reference_texts)
+        self._vectorizer = TfidfVectorizer(sublinear_tf=True)
+        try:
+            self._matrix = self._vectorizer.fit_transform(reference_texts)
+        except ValueError:
+            # Empty vocabulary (e.g. only blank texts): fall back to corpus order
+            self._vectorizer = None
+            self._matrix = None
+
+    def __len__(self) -> int:
+        return self.size
+
+    def top_k(self, candidate_texts: Sequence[str], k: int) -> np.ndarray:
+        """
+        Indices of the k most similar references for each candidate.
+
+        Returns:
+            Integer array of shape (len(candidate_texts), min(k, len(references))),
+            most similar first
+        """
+        k = min(k, self.size)
+        if k <= 0 or not candidate_texts:
+            return np.zeros((len(candidate_texts), max(k, 0)), dtype=np.int64)
+        if self._vectorizer is None:
+            return np.tile(np.arange(k), (len(candidate_texts), 1))
+
+        queries = self._vectorizer.transform(candidate_texts)
+        block = max(1, RETRIEVAL_BLOCK_ELEMENTS // self.size)
+        neighbours = []
+        for start in range(0, len(candidate_texts), block):
+            similarity = (queries[start:start + block] @ self._matrix.T).toarray()
+            if k < self.size:
+                top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            else:
+                top = np.tile(np.arange(self.size), (similarity.shape[0], 1))
+            order = np.argsort(-np.take_along_axis(similarity, top, axis=1), axis=1, kind="stable")
+            neighbours.append(np.take_along_axis(top, order, axis=1))
+        return np.vstack(neighbours).astype(np.int64)
+
+
+def top_k_references(candidate_texts: Sequence[str], reference_texts: Sequence[str], k: int) -> List[List[int]]:
+    """Indices of the k nearest references (TF-IDF cosine) for each candidate text."""
+    return ReferenceRetriever(reference_texts).top_k(candidate_texts, k).tolist()
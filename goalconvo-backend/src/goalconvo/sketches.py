@@ -0,0 +1,103 @@
+"""
+Mergeable sketches for corpus-level evaluation aggregates.
+
+HyperLogLog estimates the number of distinct items (e.g. n-grams) in a set
+with a fixed number of one-byte registers. Sketches of disjoint or overlapping
+sets merge by taking the register-wise maximum, so a per-dialogue sketch can
+be computed once, stored, and combined with any other dialogues' sketches to
+estimate the distinct n-grams of whatever set of dialogues is evaluated. With
+the default precision (4096 registers) the relative error is about 1.6%.
+
+A single dialogue only touches a few registers, so sketches are stored in a
+sparse form: the touched register indices and values, base64-encoded.
+"""
+
+import base64
+import hashlib
+from typing import Iterable
+
+import numpy as np
+
+DEFAULT_PRECISION = 12
+
+
+def hash64(item: str) -> int:
+    """Stable 64-bit hash of a string (same value in every process and run)."""
+    return int.from_bytes(hashlib.blake2b(item.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _bit_length(values: np.ndarray) -> np.ndarray:
+    # Vectorized int.bit_length for uint64 values
+    values = values.copy()
+    lengths = np.zeros(values.shape, dtype=np.int64)
+    for shift in (32, 16, 8, 4, 2, 1):
+        high = values >= np.uint64(1 << shift)
+        lengths[high] += shift
+        values[high] >>= np.uint64(shift)
+    return lengths + (values > 0)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct-count sketch over 64-bit hashes."""
+
+    def __init__(self, precision: int = DEFAULT_PRECISION):
+        """
+        Args:
+            precision: log2 of the register count (4-16)
+        """
+        if not 4 <= precision <= 16:
+            raise ValueError(f"HyperLogLog precision must be between 4 and 16, got {precision}")
+        self.precision = precision
+        self.registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def add_hashes(self, hashes: Iterable[int]) -> None:
+        """Add items by their 64-bit hashes."""
+        hashes = np.asarray(list(hashes) if not isinstance(hashes, np.ndarray) else hashes, dtype=np.uint64)
+        if not len(hashes):
+            return
+        index = (hashes >> np.uint64(64 - self.precision)).astype(np.int64)
+        remainder = hashes << np.uint64(self.precision)
+        # Position of the leftmost 1-bit in the remaining 64 - precision bits
+        rank = np.minimum(64 - _bit_length(remainder), 64 - self.precision) + 1
+        np.maximum.at(self.registers, index, rank.astype(np.uint8))
+
+    def add(self, items: Iterable[str]) -> None:
+        """Add string items."""
+        self.add_hashes([hash64(item) for item in items])
+
+    def merge(self, other: "HyperLogLog") -> "HyperLogLog":
+        """Fold another sketch (same precision) into this one; returns self."""
+        if other.precision != self.precision:
+            raise ValueError("Cannot merge HyperLogLog sketches of different precision")
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
+
+    def estimate(self) -> float:
+        """Estimated number of distinct items added."""
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / float(np.sum(np.power(2.0, -self.registers.astype(np.float64))))
+        zeros = int(np.count_nonzero(self.registers == 0))
+        if raw <= 2.5 * m and zeros:
+            # Small-range correction: linear counting
+            return m * float(np.log(m / zeros))
+        return raw
+
+    def to_sparse(self) -> str:
+        """Sparse serialization: touched register indices (uint16) and values (uint8), base64."""
+        index = np.flatnonzero(self.registers).astype("<u2")
+        return base64.b64encode(index.tobytes() + self.registers[index].tobytes()).decode("ascii")
+
+    def merge_sparse(self, data: str) -> "HyperLogLog":
+        """Fold a sparse-serialized sketch (same precision) into this one; returns self."""
+        raw = base64.b64decode(data)
+        count = len(raw) // 3
+        index = np.frombuffer(raw[:2 * count], dtype="<u2").astype(np.int64)
+        values = np.frombuffer(raw[2 * count:], dtype=np.uint8)
+        np.maximum.at(self.registers, index, values)
+        return self
+
+    @classmethod
+    def from_sparse(cls, data: str, precision: int = DEFAULT_PRECISION) -> "HyperLogLog":
+        """Sketch from its sparse serialization."""
+        return cls(precision).merge_sparse(data)
@@ -0,0 +1,164 @@
+"""
+Bounded-memory building blocks for chunked (streaming) evaluation.
+
+A streaming evaluation consumes dialogues from an iterator in fixed-size
+chunks and keeps, per metric, only state whose size does not grow with the
+number of dialogues:
+
+- RunningStats: count / mean / variance (Chan et al. parallel update) and
+  min / max, mergeable across chunks; GroupedStats keeps one overall and one
+  per group (domain)
+- ReservoirSample: a uniform fixed-size sample of the stream (for metrics
+  such as self-BLEU that compare dialogues with each other)
+- ScoreSpill: per-dialogue scores appended to a JSONL file instead of held in
+  memory (optional)
+"""
+
+import json
+import math
+import random
+from itertools import islice
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from .utils import dumps_compact, ensure_dir
+
+
+def iter_chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    """Consecutive lists of up to size items."""
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class RunningStats:
+    """Mergeable count, mean, variance, min and max of a stream of numbers."""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0  # sum of squared deviations from the mean
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float) -> None:
+        """Add one value."""
+        value = float(value)
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def add_many(self, values: Iterable[float]) -> None:
+        """Add several values."""
+        for value in values:
+            self.add(value)
+
+    def merge(self, other: "RunningStats") -> "RunningStats":
+        """Fold another RunningStats into this one; returns self."""
+        if not other.count:
+            return self
+        if not self.count:
+            self.count, self.mean, self._m2 = other.count, other.mean, other._m2
+            self.min, self.max = other.min, other.max
+            return self
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self._m2 += other._m2 + delta * delta * self.count * other.count / count
+        self.count = count
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        return self
+
+    @property
+    def total(self) -> float:
+        """Sum of the values."""
+        return self.mean * self.count
+
+    def std(self, ddof: int = 0) -> float:
+        """Standard deviation (ddof=0 population, as np.std; ddof=1 sample); 0.0 when undefined."""
+        if self.count <= ddof:
+            return 0.0
+        return math.sqrt(max(self._m2, 0.0) / (self.count - ddof))
+
+
+class GroupedStats:
+    """RunningStats of all values and of each group (groups in order of first value)."""
+
+    def __init__(self):
+        self.overall = RunningStats()
+        self.groups: Dict[str, RunningStats] = {}
+
+    def add(self, group: str, value: float) -> None:
+        """Add one value of a group."""
+        self.overall.add(value)
+        if group not in self.groups:
+            self.groups[group] = RunningStats()
+        self.groups[group].add(value)
+
+    def merge(self, other: "GroupedStats") -> "GroupedStats":
+        """Fold another GroupedStats into this one; returns self."""
+        self.overall.merge(other.overall)
+        for group, stats in other.groups.items():
+            self.groups.setdefault(group, RunningStats()).merge(stats)
+        return self
+
+
+class ReservoirSample:
+    """Uniform random sample of fixed size from a stream (reservoir sampling)."""
+
+    def __init__(self, size: int, seed: Optional[int] = 0):
+        self.size = size
+        self.items: List[Any] = []
+        self.seen = 0
+        self._random = random.Random(seed)
+
+    def add(self, item: Any) -> None:
+        """Offer one item of the stream."""
+        self.seen += 1
+        if len(self.items) < self.size:
+            self.items.append(item)
+            return
+        slot = self._random.randrange(self.seen)
+        if slot < self.size:
+            self.items[slot] = item
+
+
+class ScoreSpill:
+    """Append-only JSONL file of per-dialogue scores."""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        ensure_dir(str(self.path.parent))
+        self._file = open(self.path, "w", encoding="utf-8")
+        self.rows = 0
+
+    def write(self, row: Dict[str, Any]) -> None:
+        """Append one dialogue's scores."""
+        self._file.write(dumps_compact(row) + "\n")
+        self.rows += 1
+
+    def close(self) -> None:
+        """Flush and close the file."""
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self) -> "ScoreSpill":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+
+def read_spill(path: str) -> Iterator[Dict[str, Any]]:
+    """Rows of a ScoreSpill file."""
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
@@ -7,9 +7,20 @@ import os
 import uuid
 import hashlib
 import logging
-from typing import Dict, List, Any, Optional
+from contextlib import contextmanager
+from typing import Dict, List, Any, Optional, Iterable, Iterator, IO, Tuple
 from datetime import datetime
 
+try:
+    import orjson
+except ImportError:  # optional: faster compact serialization
+    orjson = None
+
+try:
+    import fcntl
+except ImportError:  # not on Windows: file_lock then only serializes one process
+    fcntl = None
+
 logger = logging.getLogger(__name__)
 
 def generate_dialogue_id() -> str:
@@ -24,6 +35,23 @@ def ensure_dir(path: str) -> None:
     """Ensure directory exists, create if it doesn't."""
     os.makedirs(path, exist_ok=True)
 
+@contextmanager
+def file_lock(lock_path: str) -> Iterator[None]:
+    """
+    Hold an exclusive inter-process lock on lock_path (created if missing) while in the block.
+
+    Not reentrant: a second file_lock on the same path in the same process blocks.
+    """
+    ensure_dir(os.path.dirname(lock_path) or ".")
+    with open(lock_path, "a") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
 def load_json(file_path: str) -> Dict[str, Any]:
     """Load JSON data from file."""
     try:
@@ -50,6 +78,122 @@ def save_json(data: Dict[str, Any], file_path: str) -> None:
     with open(file_path, 'w', encoding='utf-8') as f:
         json.dump(data, f, indent=2, ensure_ascii=False, cls=DateTimeEncoder)
 
+def _json_default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+def dumps_compact(data: Any) -> str:
+    """Serialize data as compact UTF-8 JSON (orjson when installed, else the json module)."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_json_default).decode("utf-8")
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":"), default=_json_default)
+
+def estimate_tokens(text: str) -> int:
+    """Approximate token count of a prompt or completion (~4 characters per token)."""
+    return max(1, len(text) // 4) if text else 0
+
+def write_json_array(items: Iterable[Any], f: IO[str], indent: int = 2, level: int = 0, **dumps_kwargs) -> int:
+    """
+    Stream items to an open file as a JSON array, one item in memory at a time.
+    
+    Output is identical to json.dump(list(items), f, indent=indent) for an array
+    nested `level` containers deep (level 0 for a top-level array).
+    
+    Returns:
+        Number of items written
+    """
+    item_pad = "\n" + " " * (indent * (level + 1))
+    count = 0
+    f.write("[")
+    for item in items:
+        f.write(("," if count else "") + item_pad)
+        f.write(json.dumps(item, indent=indent, **dumps_kwargs).replace("\n", item_pad))
+        count += 1
+    f.write(("\n" + " " * (indent * level) + "]") if count else "]")
+    return count
+
+# Characters a JSON value can start with, and the longest token (a \uXXXX escape)
+# that a chunk boundary can cut short
+_JSON_VALUE_START = set('{["-0123456789tfn')
+_JSON_PARTIAL_TOKEN_CHARS = 6
+
+def iter_json_items(file_path: str, chunk_size: int = 1 << 20) -> Iterator[Tuple[Any, Any]]:
+    """
+    Stream the members of a top-level JSON array or object without loading the whole file.
+    
+    Malformed JSON raises as soon as the data read so far cannot become valid, rather
+    than after reading the rest of the file.
+    
+    Yields:
+        (index, item) for an array, (key, value) for an object
+    """
+    decoder = json.JSONDecoder()
+    with open(file_path, 'r', encoding='utf-8') as f:
+        buffer = ""
+        eof = False
+        
+        def fill() -> bool:
+            nonlocal buffer, eof
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            return bool(chunk)
+        
+        def next_char() -> str:
+            nonlocal buffer
+            while True:
+                buffer = buffer.lstrip()
+                if buffer or not fill():
+                    return buffer[:1]
+        
+        def decode() -> Any:
+            nonlocal buffer
+            if next_char() not in _JSON_VALUE_START:
+                raise json.JSONDecodeError("Expecting value", buffer, 0)
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer)
+                    # A number is only complete once a delimiter follows it (e.g. "42" of "42.5")
+                    if eof or (end < len(buffer) and buffer[end] in ",]}: \t\r\n"):
+                        buffer = buffer[end:]
+                        return value
+                except json.JSONDecodeError as e:
+                    # More data can only help if the error is where the buffer was cut off
+                    truncated = e.pos >= len(buffer) - _JSON_PARTIAL_TOKEN_CHARS or e.msg.startswith("Unterminated string")
+                    if eof or not truncated:
+                        raise
+                fill()
+        
+        opening = next_char()
+        if opening not in ("[", "{"):
+            raise ValueError(f"{file_path} is not a JSON array or object")
+        closing = "]" if opening == "[" else "}"
+        buffer = buffer[1:]
+        index = 0
+        while True:
+            char = next_char()
+            if char == closing:
+                return
+            if index:
+                if char != ",":
+                    raise ValueError(f"Expected ',' or '{closing}' after item {index - 1} in {file_path}")
+                buffer = buffer[1:]
+                char = next_char()
+            if not char:
+                raise ValueError(f"Unexpected end of JSON in {file_path}")
+            if opening == "[":
+                yield index, decode()
+            else:
+                if char != '"':
+                    raise ValueError(f"Expected a string key in {file_path}")
+                key = decode()
+                if next_char() != ":":
+                    raise ValueError(f"Expected ':' after key {key!r} in {file_path}")
+                buffer = buffer[1:]
+                yield key, decode()
+            index += 1
+
 def format_conversation_history(turns: List[Dict[str, str]]) -> str:
     """Format conversation turns into a readable string."""
     history = []
@@ -92,19 +236,24 @@ def calculate_similarity(text1: str, text2: str) -> float:
     
     return intersection / union if union > 0 else 0.0
 
-def detect_repeated_utterances(turns: List[Dict[str, str]], threshold: float = 0.7) -> bool:
-    """Detect if there are repeated utterances in the conversation."""
-    if len(turns) < 2:
-        return False
-    
+def find_repeated_utterances(turns: List[Dict[str, str]], threshold: float = 0.7) -> List[int]:
+    """Return indices of turns that repeat the turn immediately before them."""
+    repeated = []
     for i in range(1, len(turns)):
         current_text = turns[i].get("text", "")
         previous_text = turns[i-1].get("text", "")
         
         if calculate_similarity(current_text, previous_text) > threshold:
-            return True
+            repeated.append(i)
+    
+    return repeated
+
+def detect_repeated_utterances(turns: List[Dict[str, str]], threshold: float = 0.7) -> bool:
+    """Detect if there are repeated utterances in the conversation."""
+    if len(turns) < 2:
+        return False
     
-    return False
+    return len(find_repeated_utterances(turns, threshold)) > 0
 
 def validate_dialogue_format(dialogue: Dict[str, Any]) -> bool:
     """Validate that dialogue has the required format."""
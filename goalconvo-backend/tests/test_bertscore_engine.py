@@ -0,0 +1,180 @@
+"""
+Tests for the shared BERTScore engine.
+"""
+
+import pytest
+import tempfile
+import shutil
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+torch = pytest.importorskip("torch")
+pytest.importorskip("bert_score")
+
+from bert_score import score as bert_score
+from transformers import BertConfig, BertModel, BertTokenizer
+
+from goalconvo.bertscore_engine import BERTScoreEngine
+from goalconvo.embedding_store import EmbeddingStore
+
+VOCAB = (
+    "[PAD] [UNK] [CLS] [SEP] [MASK] i need a hotel room in the centre please "
+    "book taxi to station thanks you can help with that"
+).split()
+
+def text_vectors(text):
+    """Deterministic (embeddings, weights) for a text."""
+    seed = sum(map(ord, text))
+    return np.random.default_rng(seed).standard_normal((3 + seed % 5, 8)).astype(np.float32), np.ones(3 + seed % 5)
+
+
+def write_texts(store_dir, texts):
+    """Write texts to a store one at a time (run in a separate process)."""
+    for text in texts:
+        store = EmbeddingStore(store_dir)
+        store.put_many({text: text_vectors(text)})
+        store.flush()
+
+
+class TestBERTScoreEngine:
+    """Test cases for BERTScoreEngine (tiny local model, no downloads)."""
+
+    def setup_method(self):
+        """Save a small randomly initialized BERT model and tokenizer."""
+        self.temp_dir = tempfile.mkdtemp()
+        vocab_file = os.path.join(self.temp_dir, "vocab.txt")
+        with open(vocab_file, "w") as f:
+            f.write("\n".join(VOCAB))
+        BertTokenizer(vocab_file, model_max_length=512).save_pretrained(self.temp_dir)
+        torch.manual_seed(0)
+        BertModel(BertConfig(
+            vocab_size=len(VOCAB), hidden_size=32, num_hidden_layers=2,
+            num_attention_heads=2, intermediate_size=64
+        )).save_pretrained(self.temp_dir)
+
+    def teardown_method(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_matrix_matches_pairwise_bert_score(self):
+        """Test the S x R F1 matrix equals bert_score.score over all pairs."""
+        candidates = ["i need a hotel room please", "book a taxi to the station", "thanks"]
+        references = ["can you help with a hotel in the centre", "taxi to the station please"]
+        _, _, expected = bert_score(
+            [c for c in candidates for _ in references],
+            [r for _ in candidates for r in references],
+            model_type=self.temp_dir, num_layers=2
+        )
+
+        engine = BERTScoreEngine(self.temp_dir, num_layers=2, batch_size=2)
+        matrix = engine.f1_matrix(candidates, references)
+
+        assert matrix.shape == (3, 2)
+        assert matrix == pytest.approx(expected.view(3, 2).numpy(), abs=1e-5)
+
+    def test_texts_embedded_once(self):
+        """Test repeated texts reuse cached embeddings and empty texts score 0."""
+        engine = BERTScoreEngine(self.temp_dir, num_layers=2, cache_size=3)
+
+        first = engine.f1_matrix(["hotel room", "taxi"], ["hotel room"])
+        with pytest.MonkeyPatch.context() as patcher:
+            patcher.setattr(engine, "_encode_batch", lambda token_ids: pytest.fail("re-embedded a cached text"))
+            assert engine.f1_matrix(["hotel room", "taxi"], ["hotel room"]) == pytest.approx(first)
+
+        assert first[0, 0] == pytest.approx(1.0, abs=1e-5)
+        assert engine.f1_matrix([""], ["hotel room"])[0, 0] == 0.0
+        assert len(engine._cache) == 3
+
+    def test_persistent_store_skips_embedding_on_repeat_runs(self):
+        """Test a fresh engine over the same store embeds only new texts."""
+        store_dir = os.path.join(self.temp_dir, "embedding_cache")
+        texts = ["i need a hotel room please", "taxi to the station"]
+        first = BERTScoreEngine(self.temp_dir, num_layers=2, store=EmbeddingStore(store_dir))
+        expected = first.f1_matrix(texts, texts)
+
+        second = BERTScoreEngine(self.temp_dir, num_layers=2, store=EmbeddingStore(store_dir))
+        embedded = []
+        original = second._encode_batch
+        second._encode_batch = lambda token_ids: embedded.extend(token_ids) or original(token_ids)
+        scores = second.f1_matrix(texts + ["thanks"], texts)
+
+        assert len(embedded) == 1  # only "thanks"
+        assert scores[:2] == pytest.approx(expected, abs=1e-2)  # float16 storage
+        assert len(EmbeddingStore(store_dir)) == 3
+
+    def test_store_evicts_least_recently_used_shards(self):
+        """Test the store stays within its size bound by dropping old shards."""
+        store_dir = os.path.join(self.temp_dir, "bounded")
+        store = EmbeddingStore(store_dir, max_bytes=3000)
+        with pytest.MonkeyPatch.context() as patcher:
+            patcher.setattr("goalconvo.embedding_store.SHARD_MAX_BYTES", 1000)
+            for i in range(6):
+                store.put_many({f"text {i}": (np.ones((10, 32), dtype=np.float32), np.ones(10))})
+            store.flush()
+
+        assert store.nbytes() <= 3000
+        assert "text 0" not in store and "text 5" in store
+        reopened = EmbeddingStore(store_dir)
+        embeddings, weights = reopened.get_many(["text 5"])["text 5"]
+        assert embeddings.dtype == np.float16 and embeddings.shape == (10, 32)
+        assert weights.tolist() == [1.0] * 10
+
+    def test_pairs_match_full_matrix(self):
+        """Test scoring retrieved neighbours gives the same values as the full matrix."""
+        candidates = ["i need a hotel room please", "book a taxi to the station"]
+        references = ["can you help with a hotel in the centre", "taxi to the station please", "thanks"]
+        engine = BERTScoreEngine(self.temp_dir, num_layers=2)
+        neighbours = np.array([[0, 2], [1, 1]])
+
+        pairs = engine.f1_pairs(candidates, references, neighbours)
+        matrix = engine.f1_matrix(candidates, references)
+
+        assert pairs == pytest.approx(np.take_along_axis(matrix, neighbours, axis=1), abs=1e-5)
+
+
+class TestEmbeddingStoreSharing:
+    """Test cases for several writers sharing one EmbeddingStore directory."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def assert_stored(self, store, texts):
+        found = store.get_many(texts)
+        assert set(found) == set(texts)
+        for text in texts:
+            expected = text_vectors(text)[0].astype(np.float16)
+            assert np.array_equal(found[text][0], expected), text
+
+    def test_two_instances_keep_each_others_rows(self):
+        """Test instances opened before any write neither overwrite nor misread each other's shards."""
+        first, second = EmbeddingStore(self.temp_dir), EmbeddingStore(self.temp_dir)
+
+        first.put_many({"hotel": text_vectors("hotel")})
+        second.put_many({"taxi": text_vectors("taxi")})
+        first.flush()
+        second.flush()
+
+        for store in (first, second, EmbeddingStore(self.temp_dir)):
+            self.assert_stored(store, ["hotel", "taxi"])
+
+        first.clear()
+        second.put_many({"train": text_vectors("train")})
+        assert "hotel" not in second
+        self.assert_stored(first, ["train"])
+
+    def test_two_writer_processes(self):
+        """Test concurrent writer processes leave every text stored with its own vectors."""
+        texts = [[f"process {p} text {i}" for i in range(15)] for p in range(2)]
+        with ProcessPoolExecutor(max_workers=2) as pool:
+            list(pool.map(write_texts, [self.temp_dir] * 2, texts))
+
+        self.assert_stored(EmbeddingStore(self.temp_dir), texts[0] + texts[1])
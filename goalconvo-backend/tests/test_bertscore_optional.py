@@ -0,0 +1,28 @@
+"""
+Tests that BERTScore stays an optional dependency.
+"""
+
+import subprocess
+import sys
+from pathlib import Path
+
+SRC = str(Path(__file__).parent.parent / "src")
+
+
+class TestBERTScoreOptional:
+    """Test cases for importing the engine without bert-score."""
+
+    def test_import_without_bert_score(self):
+        """Test the engine (and the evaluator) import and report BERTScore unavailable."""
+        code = (
+            "import sys\n"
+            "sys.modules['bert_score'] = None\n"
+            f"sys.path.insert(0, {SRC!r})\n"
+            "from goalconvo.bertscore_engine import bertscore_available\n"
+            "import goalconvo.evaluator\n"
+            "print(bertscore_available())\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=300)
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip().splitlines()[-1] == "False"
@@ -0,0 +1,72 @@
+"""
+Tests for the vectorized BLEU engine.
+"""
+
+import pytest
+import random
+from pathlib import Path
+
+import numpy as np
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+nltk_bleu = pytest.importorskip("nltk.translate.bleu_score")
+
+from goalconvo.bleu_engine import BLEUEngine, best_match_bleu
+
+def random_texts(count, seed):
+    """Token lists over a small vocabulary (many shared n-grams, some empty texts)."""
+    rng = random.Random(seed)
+    vocabulary = "i need a hotel room in the centre please book it".split()
+    return [[rng.choice(vocabulary) for _ in range(rng.randint(0, 14))] for _ in range(count)]
+
+class TestBLEUEngine:
+    """Parity of BLEUEngine with NLTK's smoothed sentence BLEU."""
+
+    def setup_method(self):
+        """Setup texts and NLTK smoothing."""
+        self.texts = random_texts(30, seed=7)
+        self.smoothing = nltk_bleu.SmoothingFunction().method1
+        self.engine = BLEUEngine()
+        self.table = self.engine.table(self.texts)
+
+    def test_pair_bleu_identical_to_nltk(self):
+        """Test single-reference BLEU for every pair equals sentence_bleu exactly."""
+        pairs = np.array([(i, j) for i in range(30) for j in range(30)])
+
+        scores = self.engine.pair_bleu(self.table, self.table, pairs)
+
+        expected = [
+            nltk_bleu.sentence_bleu([self.texts[j]], self.texts[i], smoothing_function=self.smoothing)
+            for i, j in pairs
+        ]
+        assert scores.tolist() == expected
+
+    def test_multi_reference_and_self_bleu_identical_to_nltk(self):
+        """Test multi-reference clipping and self-BLEU equal NLTK exactly."""
+        expected = [
+            nltk_bleu.sentence_bleu(
+                [t for k, t in enumerate(self.texts) if k != i], self.texts[i], smoothing_function=self.smoothing
+            )
+            for i in range(30)
+        ]
+
+        assert [self.engine.sentence_bleu(self.table, i, self.table, [k for k in range(30) if k != i])
+                for i in range(30)] == expected
+        assert self.engine.self_bleu(self.table) == float(np.mean(expected))
+        assert self.engine.self_bleu(self.table, sample_size=5) != self.engine.self_bleu(self.table)
+
+    def test_best_match_over_neighbours(self):
+        """Test best-match BLEU over all references or over given neighbours."""
+        hypotheses, references = self.texts[:5], self.texts[5:]
+
+        best = best_match_bleu(hypotheses, references)
+        best_of_two = best_match_bleu(hypotheses, references, neighbours=np.array([[0, 1]] * 5))
+
+        assert best.tolist() == [
+            max(nltk_bleu.sentence_bleu([r], h, smoothing_function=self.smoothing) for r in references)
+            for h in hypotheses
+        ]
+        assert (best_of_two <= best).all()
+        assert best_match_bleu([], references).shape == (0,)
@@ -0,0 +1,115 @@
+"""
+Tests for the comprehensive dialogue evaluation script.
+"""
+
+import random
+import shutil
+import tempfile
+import pytest
+import unittest.mock as mock
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent.parent / "scripts"))
+
+import comprehensive_dialogue_evaluation as evaluation
+from goalconvo.config import Config
+
+WORDS = "hotel cheap north book room night parking price area please thanks yes no would like the to tomorrow".split()
+GOALS = ["book a hotel for 3 tomorrow", "find a taxi tonight", "tell me information about museums", "reserve a table"]
+
+
+def make_dialogues(count, seed):
+    """Random dialogues over a few domains, with timestamped turns."""
+    rng = random.Random(seed)
+    start = datetime(2024, 1, 1)
+    return [{
+        "dialogue_id": f"d{seed}-{i}",
+        "domain": rng.choice(["hotel", "taxi", "train"]),
+        "goal": rng.choice(GOALS),
+        "turns": [{
+            "role": "User" if t % 2 == 0 else "SupportBot",
+            "text": " ".join(rng.choice(WORDS) for _ in range(rng.randint(0, 12))),
+            "timestamp": (start + timedelta(seconds=t * rng.random() * 5)).isoformat()
+        } for t in range(rng.randint(1, 8))]
+    } for i in range(count)]
+
+
+def fake_best_match_f1(candidates, references, *args, **kwargs):
+    """Deterministic stand-in for BERTScore (no model download)."""
+    return np.array([len(text) % 7 / 10 + 0.3 for text in candidates])
+
+
+def assert_same(expected, actual, path="metrics"):
+    """Recursively compare results, numbers approximately."""
+    if isinstance(expected, dict):
+        assert set(expected) == set(actual), path
+        for key in expected:
+            assert_same(expected[key], actual[key], f"{path}/{key}")
+    elif isinstance(expected, (list, tuple)):
+        assert len(expected) == len(actual), path
+        for i, (a, b) in enumerate(zip(expected, actual)):
+            assert_same(a, b, f"{path}/{i}")
+    elif isinstance(expected, (int, float, np.number)) and not isinstance(expected, bool):
+        assert actual == pytest.approx(expected, rel=1e-9, abs=1e-12), path
+    else:
+        assert actual == expected, path
+
+
+class TestComprehensiveDialogueEvaluator:
+    """Test cases for ComprehensiveDialogueEvaluator."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        config = Config()
+        config.data_dir = self.temp_dir
+        config.eval_metric_workers = 1
+        config.eval_incremental = False
+        with mock.patch.object(evaluation, "LLMClient"), mock.patch.object(evaluation, "DatasetStore"):
+            self.evaluator = evaluation.ComprehensiveDialogueEvaluator(config)
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_stream_matches_in_memory_evaluation(self):
+        """Test small chunks give the in-memory aggregates, up to the documented shape differences."""
+        dialogues = make_dialogues(40, seed=0)
+        references = [d for d in make_dialogues(60, seed=1) if d["domain"] != "train"]
+        partials = []
+
+        with mock.patch.object(evaluation, "best_match_f1", fake_best_match_f1), \
+                mock.patch.object(evaluation, "BERTSCORE_AVAILABLE", True):
+            expected = self.evaluator.evaluate_dialogues(dialogues, references, use_llm_judge=False)
+            streamed = self.evaluator.evaluate_dialogue_stream(
+                iter(dialogues), references, use_llm_judge=False, chunk_size=3,
+                scores_file=str(Path(self.temp_dir) / "scores.jsonl"), on_partial=partials.append
+            )
+
+        expected, streamed = expected["metrics"], streamed["metrics"]
+        for metric in ("bertscore_similarity", "bleu_score"):
+            assert expected[metric].pop("individual_scores")
+            assert "individual_scores" not in streamed[metric]
+        assert streamed["lexical_diversity"].pop("self_bleu_sample") == len(dialogues)
+        assert_same(expected, streamed)
+
+        assert [p["dialogues_processed"] for p in partials][:3] == [3, 6, 9]
+        assert len(self.evaluator.analyzer) == 0 and len(self.evaluator.keyword_scans) == 0
+        with open(Path(self.temp_dir) / "scores.jsonl") as f:
+            assert sum(1 for _ in f) == len(dialogues)
+
+    def test_caches_released_after_evaluation(self):
+        """Test per-dialogue analysis records and keyword scans do not outlive an evaluation."""
+        dialogues = make_dialogues(10, seed=2)
+
+        self.evaluator.evaluate_dialogues(dialogues, None, use_llm_judge=False)
+        assert len(self.evaluator.analyzer) == 0
+        assert len(self.evaluator.keyword_scans) == 0
+
+        with mock.patch.object(self.evaluator, "_compute_repetition_rate", side_effect=RuntimeError("metric failed")):
+            with pytest.raises(RuntimeError):
+                self.evaluator.evaluate_dialogues(dialogues, None, use_llm_judge=False)
+        assert len(self.evaluator.analyzer) == 0
@@ -51,11 +51,38 @@ class TestDatasetStore:
         dialogue_id = self.store.save_dialogue(dialogue_data)
         
         assert dialogue_id == "test_123"
+        assert self.store.load_dialogue("test_123", "hotel")["goal"] == "book a hotel room"
         
-        # Check if file was created
+        # No per-dialogue JSON file unless the mirror is enabled
         file_path = Path(self.config.synthetic_dir) / "hotel" / "test_123.json"
+        assert not file_path.exists()
+        
+        self.config.storage_json_mirror = True
+        DatasetStore(self.config).save_dialogue(dialogue_data)
         assert file_path.exists()
     
+    def test_save_dialogues_batch(self):
+        """Test a batch is validated up front and saved with one commit."""
+        batch = [
+            {
+                "dialogue_id": f"batch_{i % 3}",
+                "goal": f"book hotel {i}",
+                "domain": "hotel",
+                "turns": [{"role": "User", "text": f"Hotel request {i}"}],
+                "metadata": {"quality_score": 0.5 + i / 10}
+            }
+            for i in range(4)
+        ]
+        
+        with pytest.raises(ValueError):
+            self.store.save_dialogues(batch + [{"goal": "missing turns"}])
+        assert self.store.get_statistics()["total_dialogues"] == 0
+        
+        assert self.store.save_dialogues(batch) == ["batch_0", "batch_1", "batch_2", "batch_0"]
+        assert self.store.get_statistics()["total_dialogues"] == 3
+        assert self.store.load_dialogue("batch_0", "hotel")["goal"] == "book hotel 3"
+        assert len(self.store.near_duplicate_index("hotel")) == 3
+    
     def test_load_dialogue(self):
         """Test loading a dialogue."""
         # First save a dialogue
@@ -157,6 +184,63 @@ class TestDatasetStore:
         assert stats["avg_turns"] == 2.5  # (3 + 2) / 2
         assert len(stats["quality_scores"]) == 2
     
+    def test_statistics_maintained_incrementally(self):
+        """Test the statistics view follows replaces, deletes and clears and survives a rebuild."""
+        for dialogue_id, domain, score in [("s1", "hotel", 0.85), ("s2", "hotel", 0.45), ("s3", "restaurant", 0.65)]:
+            self.store.save_dialogue({
+                "dialogue_id": dialogue_id,
+                "goal": "test goal",
+                "domain": domain,
+                "turns": [{"role": "User", "text": "Test"}] * 2,
+                "metadata": {"quality_score": score, "created_at": "2024-03-01T10:00:00"}
+            })
+        # Replacing a dialogue swaps its contribution instead of double counting
+        self.store.save_dialogue({
+            "dialogue_id": "s2",
+            "goal": "test goal",
+            "domain": "hotel",
+            "turns": [{"role": "User", "text": "Test"}] * 4,
+            "metadata": {"quality_score": 0.95, "created_at": "2024-03-02T10:00:00"}
+        })
+        
+        stats = self.store.get_statistics()
+        assert stats["total_dialogues"] == 3
+        assert stats["by_domain"] == {"hotel": 2, "restaurant": 1}
+        assert stats["avg_turns"] == pytest.approx(8 / 3)
+        assert stats["quality"]["mean"] == pytest.approx((0.85 + 0.95 + 0.65) / 3)
+        assert stats["quality"]["histogram"][8] == 1 and stats["quality"]["histogram"][9] == 1
+        assert stats["by_day"] == {"2024-03-01": 2, "2024-03-02": 1}
+        
+        self.store.delete_dialogue("s1", "hotel")
+        self.store.clear_domain("restaurant")
+        assert self.store.get_statistics()["by_domain"] == {"hotel": 1, "restaurant": 0}
+        
+        incremental = self.store.get_statistics()
+        self.store.rebuild_statistics()
+        rebuilt = self.store.get_statistics()
+        assert rebuilt["quality"]["mean"] == pytest.approx(incremental["quality"]["mean"])
+        assert rebuilt["quality"]["histogram"] == incremental["quality"]["histogram"]
+        assert {k: v for k, v in rebuilt.items() if k != "quality"} == {k: v for k, v in incremental.items() if k != "quality"}
+    
+    def test_statistics_shared_between_instances(self):
+        """Test a second store sees the first one's saves and never writes back stale counters."""
+        other = DatasetStore(self.config)
+        for store, dialogue_id in [(self.store, "a1"), (other, "b1"), (self.store, "a2")]:
+            store.save_dialogue({
+                "dialogue_id": dialogue_id,
+                "goal": "test goal",
+                "domain": "hotel",
+                "turns": [{"role": "User", "text": "Test"}] * 2,
+                "metadata": {"quality_score": 0.5}
+            })
+        
+        assert other.get_statistics()["by_domain"]["hotel"] == 3
+        assert self.store.get_statistics()["by_domain"]["hotel"] == 3
+        
+        other.delete_dialogue("a1", "hotel")
+        assert self.store.get_statistics()["by_domain"]["hotel"] == 2
+        assert DatasetStore(self.config).get_statistics()["by_domain"]["hotel"] == 2
+    
     def test_update_few_shot_hub(self):
         """Test updating few-shot hub."""
         # Save dialogues with quality scores
@@ -216,6 +300,117 @@ class TestDatasetStore:
         assert len(examples) == 1
         assert examples[0]["dialogue_id"] == "example_1"
     
+    def test_few_shot_retrieval_ranked_and_diverse(self):
+        """Test hub examples are ranked by quality and MMR skips near-identical examples."""
+        self.config.few_shot_seed_quality = 0.1
+        self.store = DatasetStore(self.config)
+        for dialogue_id, quality, text in [
+            ("best", 0.9, "I need a cheap hotel in the centre with parking"),
+            ("best_copy", 0.8, "I need a cheap hotel in the centre with parking please"),
+            ("different", 0.7, "Can you recommend a luxury spa resort near the airport")
+        ]:
+            self.store.save_dialogue({
+                "dialogue_id": dialogue_id,
+                "goal": "hotel",
+                "domain": "hotel",
+                "turns": [{"role": "User", "text": text}],
+                "metadata": {"quality_score": quality}
+            })
+        self.store.update_few_shot_hub(top_percentage=1.0)
+        
+        top = self.store.load_few_shot_examples("hotel", num_examples=3, strategy="top_k")
+        diverse = self.store.load_few_shot_examples("hotel", num_examples=2, strategy="mmr")
+        
+        assert [e["dialogue_id"] for e in top] == ["best", "best_copy", "different"]
+        assert [e["dialogue_id"] for e in diverse] == ["best", "different"]
+        assert self.store.few_shot_index.size("hotel") > 3  # seeded once, below the synthetic examples
+    
+    def test_few_shot_examples_are_copies_and_follow_other_stores(self):
+        """Test returned examples can be modified safely and hub changes by another store are served."""
+        def save(store, dialogue_id, quality):
+            store.save_dialogue({
+                "dialogue_id": dialogue_id,
+                "goal": "hotel",
+                "domain": "hotel",
+                "turns": [{"role": "User", "text": f"I need a hotel {dialogue_id}"}],
+                "metadata": {"quality_score": quality}
+            })
+        save(self.store, "first", 0.9)
+        self.store.update_few_shot_hub(top_percentage=1.0)
+        
+        examples = self.store.load_few_shot_examples("hotel", num_examples=1, strategy="top_k")
+        examples[0]["turns"][0]["text"] = "modified"
+        assert self.store.load_few_shot_examples("hotel", num_examples=1, strategy="top_k")[0]["turns"][0]["text"] == "I need a hotel first"
+        
+        other = DatasetStore(self.config)
+        save(other, "second", 0.95)
+        other.update_few_shot_hub(top_percentage=1.0)
+        
+        top = self.store.load_few_shot_examples("hotel", num_examples=2, strategy="top_k")
+        assert [e["dialogue_id"] for e in top] == ["second", "first"]
+    
+    def test_hub_maintained_incrementally_on_save(self):
+        """Test saving dialogues keeps each domain's hub at its top-K without a rescan."""
+        self.config.few_shot_hub_top_percentage = 0.5
+        self.config.few_shot_hub_max_examples = 2
+        self.store = DatasetStore(self.config)
+        for i, quality in enumerate([0.5, 0.9, 0.6, 0.8, 0.7]):
+            self.store.save_dialogue({
+                "dialogue_id": f"incremental_{i}",
+                "goal": "hotel",
+                "domain": "hotel",
+                "turns": [{"role": "User", "text": "Test"}],
+                "metadata": {"quality_score": quality}
+            })
+        
+        hub_hotel_dir = Path(self.config.few_shot_hub_dir) / "hotel"
+        assert sorted(p.stem for p in hub_hotel_dir.glob("*.json")) == ["incremental_1", "incremental_3"]
+        assert [e["dialogue_id"] for e in self.store.few_shot_index.top_k("hotel", 5)] == ["incremental_1", "incremental_3"]
+        assert self.store.statistics.domains["hotel"]["hub_count"] == 2
+    
+    def test_batch_save_updates_statistics_once(self):
+        """Test a batch's hub additions and evictions are counted in its single statistics save."""
+        self.config.few_shot_hub_top_percentage = 0.5
+        self.config.few_shot_hub_max_examples = 2
+        self.store = DatasetStore(self.config)
+        batch = [
+            {
+                "dialogue_id": f"grouped_{i}",
+                "goal": "hotel",
+                "domain": "hotel",
+                "turns": [{"role": "User", "text": "Test"}],
+                "metadata": {"quality_score": quality}
+            }
+            for i, quality in enumerate([0.5, 0.9, 0.6, 0.8, 0.7])
+        ]
+        
+        with patch.object(self.store.statistics, "save", wraps=self.store.statistics.save) as save:
+            self.store.save_dialogues(batch)
+        
+        assert save.call_count == 1
+        hub_hotel_dir = Path(self.config.few_shot_hub_dir) / "hotel"
+        assert sorted(p.stem for p in hub_hotel_dir.glob("*.json")) == ["grouped_1", "grouped_3"]
+        assert DatasetStore(self.config).get_statistics()["few_shot_hub"]["hotel"] == 2
+    
+    def test_update_few_shot_hub_respects_capacity(self):
+        """Test a full rescan trims each domain's hub to capacity and deletes evicted files."""
+        for i, quality in enumerate([0.5, 0.9, 0.6, 0.8, 0.7]):
+            self.store.save_dialogue({
+                "dialogue_id": f"rescan_{i}",
+                "goal": "hotel",
+                "domain": "hotel",
+                "turns": [{"role": "User", "text": "Test"}],
+                "metadata": {"quality_score": quality}
+            })
+        self.config.few_shot_hub_max_examples = 2
+        
+        assert self.store.update_few_shot_hub(top_percentage=1.0) == 5
+        
+        hub_hotel_dir = Path(self.config.few_shot_hub_dir) / "hotel"
+        assert sorted(p.stem for p in hub_hotel_dir.glob("rescan_*.json")) == ["rescan_1", "rescan_3"]
+        assert [e["dialogue_id"] for e in self.store.few_shot_index.top_k("hotel", 5)][:2] == ["rescan_1", "rescan_3"]
+        assert self.store.get_statistics()["few_shot_hub"]["hotel"] == len(list(hub_hotel_dir.glob("*.json")))
+    
     def test_clear_domain(self):
         """Test clearing dialogues for a domain."""
         # Save dialogues for multiple domains
@@ -263,6 +458,128 @@ class TestDatasetStore:
         assert exported_data["domain"] == "hotel"
         assert exported_data["total_dialogues"] == 1
         assert len(exported_data["dialogues"]) == 1
+    
+    def test_near_duplicates_and_dedup(self):
+        """Test saved dialogues are indexed for near-duplicate lookup and bulk dedup."""
+        texts = [
+            "I am looking for a cheap hotel in the centre of town with free parking",
+            "The Alexander guesthouse is cheap, central and has free parking",
+            "Please book it for three people for two nights from Friday",
+            "Booked, your reference number is ALEX-0042"
+        ]
+        for dialogue_id in ("dup_1", "dup_2"):
+            self.store.save_dialogue({
+                "dialogue_id": dialogue_id,
+                "goal": "book a cheap hotel",
+                "domain": "hotel",
+                "turns": [{"role": ["User", "SupportBot"][i % 2], "text": t} for i, t in enumerate(texts)]
+            })
+        
+        candidate = {"dialogue_id": "new", "domain": "hotel", "turns": [{"role": "User", "text": t} for t in texts]}
+        matches = self.store.find_near_duplicates(candidate)
+        assert sorted(m[0] for m in matches) == ["dup_1", "dup_2"]
+        
+        duplicates = self.store.deduplicate_domain("hotel", delete=True)
+        assert len(duplicates) == 1
+        assert len(self.store.load_dialogues(domain="hotel")) == 1
+    
+    def test_sqlite_backend_without_json_mirror(self):
+        """Test reads, filters and stats come from the SQLite index when no JSON files are written."""
+        self.config.storage_json_mirror = False
+        self.config.synthetic_dir = f"{self.temp_dir}/synthetic_nomirror"
+        self.config.data_dir = f"{self.temp_dir}/data_nomirror"
+        store = DatasetStore(self.config)
+        for i, score in enumerate([0.9, 0.4]):
+            store.save_dialogue({
+                "dialogue_id": f"sql_{i}",
+                "goal": "book a hotel room",
+                "domain": "hotel",
+                "turns": [{"role": "User", "text": "Test"}] * (i + 2),
+                "metadata": {"quality_score": score, "created_at": f"2024-01-0{i + 1}", "tags": ["pilot"] if i else []}
+            })
+        
+        assert not list((Path(self.config.synthetic_dir) / "hotel").glob("*.json"))
+        assert store.load_dialogue("sql_1", "hotel")["metadata"]["quality_score"] == 0.4
+        assert [d["dialogue_id"] for d in store.load_dialogues(quality_threshold=0.5)] == ["sql_0"]
+        assert [d["dialogue_id"] for d in store.iter_dialogues(where={"tags": ["pilot"]})] == ["sql_1"]
+        stats = store.get_statistics()
+        assert stats["by_domain"]["hotel"] == 2
+        assert stats["avg_turns"] == 2.5
+        assert store.list_domains() == ["hotel"]
+        assert store.delete_dialogue("sql_1", "hotel") is True
+        assert store.load_dialogue("sql_1", "hotel") is None
+    
+    def test_iter_dialogues_where_order_and_projection(self):
+        """Test streaming queries behave the same on the SQLite and JSON backends."""
+        for backend in ("sqlite", "json"):
+            self.config.storage_backend = backend
+            self.config.synthetic_dir = f"{self.temp_dir}/synthetic_{backend}"
+            self.config.data_dir = f"{self.temp_dir}/data_{backend}"
+            store = DatasetStore(self.config)
+            for i, (score, generated_at) in enumerate([(0.9, "2024-01-02"), (0.5, "2024-01-03"), (0.7, None)]):
+                metadata = {"quality_score": score}
+                if generated_at:
+                    metadata["generated_at"] = generated_at
+                store.save_dialogue({
+                    "dialogue_id": f"iter_{i}",
+                    "goal": f"goal {i}",
+                    "domain": "hotel",
+                    "turns": [{"role": "User", "text": "Test"}] * (i + 1),
+                    "metadata": metadata
+                })
+            
+            latest = list(store.iter_dialogues(order_by="-generated_at", fields=["dialogue_id", "num_turns"]))
+            assert latest == [
+                {"dialogue_id": "iter_1", "num_turns": 2},
+                {"dialogue_id": "iter_0", "num_turns": 1},
+                {"dialogue_id": "iter_2", "num_turns": 3}
+            ], backend
+            good = store.iter_dialogues(domain="hotel", where={"quality_score": (">=", 0.7)}, order_by="quality_score")
+            assert [d["dialogue_id"] for d in good] == ["iter_2", "iter_0"], backend
+            assert len(list(store.iter_dialogues(limit=2))) == 2, backend
+            with pytest.raises(ValueError):
+                list(store.iter_dialogues(where={"text": "x"}))
+    
+    def test_latest_returns_newest_across_domains(self):
+        """Test latest(n) returns exactly the newest dialogues on both backends."""
+        for backend in ("sqlite", "json"):
+            self.config.storage_backend = backend
+            self.config.synthetic_dir = f"{self.temp_dir}/synthetic_{backend}"
+            self.config.data_dir = f"{self.temp_dir}/data_{backend}"
+            store = DatasetStore(self.config)
+            for i, (domain, generated_at) in enumerate([
+                ("hotel", "2024-01-05"), ("taxi", "2024-01-01"), ("hotel", None),
+                ("restaurant", "2024-01-04"), ("taxi", "2024-01-06"), ("hotel", "2024-01-02")
+            ]):
+                metadata = {"generated_at": generated_at} if generated_at else {}
+                store.save_dialogue({
+                    "dialogue_id": f"latest_{i}",
+                    "goal": f"goal {i}",
+                    "domain": domain,
+                    "turns": [{"role": "User", "text": "Test"}],
+                    "metadata": metadata
+                })
+            
+            all_domains = ["hotel", "restaurant", "taxi"]
+            assert [d["dialogue_id"] for d in store.latest(3, domains=all_domains)] == ["latest_3", "latest_0", "latest_4"], backend
+            assert [d["dialogue_id"] for d in store.latest(2, domains=["hotel"])] == ["latest_5", "latest_0"], backend
+            assert len(store.latest(10, domains=all_domains)) == 6, backend
+            assert store.latest(0) == [], backend
+    
+    def test_sqlite_index_imports_existing_directory(self):
+        """Test a store opened on an existing JSON layout builds its index from the files."""
+        self.store.json_storage.put({
+            "dialogue_id": "legacy_1",
+            "goal": "find a restaurant",
+            "domain": "restaurant",
+            "turns": [{"role": "User", "text": "Test"}]
+        })
+        shutil.rmtree(Path(self.temp_dir) / "indexes")
+        
+        reopened = DatasetStore(self.config)
+        
+        assert reopened.storage.count() == 1
+        assert reopened.load_dialogue("legacy_1", "restaurant")["goal"] == "find a restaurant"
 
 if __name__ == "__main__":
     pytest.main([__file__])
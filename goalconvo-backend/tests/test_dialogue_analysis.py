@@ -0,0 +1,93 @@
+"""
+Tests for the shared per-dialogue analysis records.
+"""
+
+import re
+import pytest
+from pathlib import Path
+
+import numpy as np
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.dialogue_analysis import DialogueAnalyzer, distinct_diversity
+
+DIALOGUES = [
+    {"domain": "hotel", "turns": [
+        {"role": "User", "text": "I need a hotel, a cheap hotel."},
+        {"role": "SupportBot", "text": "The Acorn is a cheap hotel in the north."},
+    ]},
+    {"domain": "taxi", "turns": [
+        {"role": "User", "text": "Book a taxi to the station please"},
+        {"role": "SupportBot", "text": "Booked! A taxi to the station at 5pm."},
+    ]},
+    {"domain": "train", "turns": [{"role": "User", "text": "..."}]},
+    {"domain": "train", "turns": [{"role": "User", "text": "Hello"}]},
+    {"domain": "train", "turns": []},
+]
+
+
+def reference_distinct(texts):
+    """Distinct-1 / Distinct-2 as computed before analysis records existed."""
+    per_d1, per_d2 = [], []
+    for text in texts:
+        tokens = re.findall(r'\b\w+\b', text.lower())
+        if not tokens:
+            continue
+        per_d1.append(len(set(tokens)) / len(tokens))
+        bigrams = [f"{tokens[i]} {tokens[i+1]}" for i in range(len(tokens) - 1)]
+        per_d2.append(len(set(bigrams)) / len(bigrams) if bigrams else 0.0)
+    if not per_d1:
+        return {"distinct_1": 0.0, "distinct_2": 0.0, "combined": 0.0}
+    d1, d2 = float(np.mean(per_d1)), float(np.mean(per_d2))
+    return {"distinct_1": d1, "distinct_2": d2, "combined": (d1 + d2) / 2}
+
+
+class TestDialogueAnalyzer:
+    """Test cases for DialogueAnalyzer."""
+
+    def test_record_text_and_tokens(self):
+        """Test a record holds the joined text and its word tokens."""
+        analyzer = DialogueAnalyzer()
+
+        record = analyzer.analyze(DIALOGUES[0])
+
+        assert record.text == "I need a hotel, a cheap hotel. The Acorn is a cheap hotel in the north."
+        assert [analyzer.words[i] for i in record.token_ids] == re.findall(r'\b\w+\b', record.lower)
+        assert record.whitespace_words == len(record.text.split())
+        assert len(record.turn_token_ids) == 2
+
+    def test_records_are_cached_per_dialogue(self):
+        """Test each dialogue is analyzed once, and metric tokenizers run once per record."""
+        analyzer = DialogueAnalyzer()
+        calls = []
+
+        record = analyzer.analyze(DIALOGUES[1])
+        assert analyzer.analyze(DIALOGUES[1]) is record
+        for _ in range(3):
+            tokens = record.tokens("split", lambda text: calls.append(text) or text.split())
+
+        assert len(calls) == 1
+        assert tokens == record.lower.split()
+
+        analyzer.clear()
+        assert analyzer.analyze(DIALOGUES[1]) is not record
+
+    def test_discard_drops_only_given_dialogues(self):
+        """Test discarding a chunk keeps the other cached records."""
+        analyzer = DialogueAnalyzer()
+        kept, dropped = analyzer.analyze(DIALOGUES[0]), analyzer.analyze(DIALOGUES[1])
+
+        analyzer.discard([DIALOGUES[1], {"turns": []}])
+
+        assert analyzer.analyze(DIALOGUES[0]) is kept
+        assert analyzer.analyze(DIALOGUES[1]) is not dropped
+
+    def test_distinct_matches_per_text_implementation(self):
+        """Test Distinct-1/2 from records equal the per-text regex computation."""
+        analyzer = DialogueAnalyzer()
+
+        for subset in (DIALOGUES, DIALOGUES[:2], DIALOGUES[2:], []):
+            texts = [" ".join(turn["text"] for turn in d["turns"]) for d in subset]
+            assert distinct_diversity(analyzer.analyze_all(subset)) == pytest.approx(reference_distinct(texts))
@@ -0,0 +1,78 @@
+"""
+Tests for the columnar dialogue archive module.
+"""
+
+import pytest
+import tempfile
+import shutil
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+pytest.importorskip("pyarrow")
+
+from goalconvo.dataset_versioning import DatasetVersionManager
+from goalconvo.dialogue_archive import write_archive, iter_archive_dialogues, read_archive_table
+
+def make_dialogues(count):
+    """Build dialogues with varying domains, turn counts and extra keys."""
+    domains = ["hotel", "taxi", "train"]
+    return [
+        {
+            "dialogue_id": f"archive_{i}",
+            "goal": f"goal {i}",
+            "domain": domains[i % 3],
+            "turns": [
+                {"role": "User", "text": f"request {i}"},
+                {"role": "SupportBot", "text": "done", "intent": "inform"}
+            ][:i % 3],
+            "metadata": {"quality_score": i / 10, "created_at": "2026-01-01T00:00:00"}
+        }
+        for i in range(count)
+    ]
+
+class TestDialogueArchive:
+    """Test cases for Parquet / Arrow IPC dialogue archives."""
+
+    def setup_method(self):
+        """Setup temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    @pytest.mark.parametrize("archive_format", ["parquet", "arrow"])
+    def test_round_trip_across_batches(self, archive_format):
+        """Test dialogues survive a write/read round trip spanning several batches."""
+        dialogues = make_dialogues(23)
+        path = str(Path(self.temp_dir) / "archive")
+
+        assert write_archive(iter(dialogues), path, format=archive_format, batch_size=5) == 23
+
+        assert list(iter_archive_dialogues(path, batch_size=7)) == dialogues
+        assert read_archive_table(path, "turns").num_rows == sum(len(d["turns"]) for d in dialogues)
+
+    def test_projection_reads_only_requested_columns(self):
+        """Test column projection and dictionary-encoded domains."""
+        path = str(Path(self.temp_dir) / "archive")
+        write_archive(make_dialogues(6), path)
+
+        table = read_archive_table(path, "dialogues", columns=["domain", "quality_score"])
+
+        assert table.column_names == ["domain", "quality_score"]
+        assert str(table.schema.field("domain").type).startswith("dictionary")
+        assert table.column("quality_score").to_pylist() == [i / 10 for i in range(6)]
+
+    def test_version_written_with_archive(self):
+        """Test a dataset version also gets a columnar archive when configured."""
+        manager = DatasetVersionManager(self.temp_dir, archive_format="arrow")
+        dialogues = make_dialogues(4)
+
+        version_id = manager.create_version(iter(dialogues), description="archived")
+
+        assert manager.load_version_dialogues(version_id) == dialogues
+        assert manager.load_version_table(version_id, columns=["dialogue_id"]).column("dialogue_id").to_pylist() == [
+            d["dialogue_id"] for d in dialogues
+        ]
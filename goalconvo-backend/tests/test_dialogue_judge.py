@@ -0,0 +1,172 @@
+"""
+Tests for the concurrent LLM-as-a-Judge runner.
+"""
+
+import json
+import shutil
+import tempfile
+import threading
+import time
+import pytest
+from pathlib import Path
+from unittest.mock import patch
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.dialogue_judge import (
+    DialogueJudge, JudgeScoreStore, RateLimiter, parse_batch_judge_scores, parse_judge_scores
+)
+
+SCORES = {"task_success": 88, "coherence": 90, "diversity": 85, "fluency": 92, "groundedness": 87}
+
+
+def make_dialogue(i, words=5):
+    return {
+        "domain": "hotel",
+        "goal": f"book hotel {i}",
+        "turns": [
+            {"role": "User", "text": " ".join(["word"] * words)},
+            {"role": "SupportBot", "text": f"Booked hotel {i}."},
+        ],
+    }
+
+
+class ScriptedClient:
+    """Judge client answering from a function of the prompt, counting calls."""
+
+    def __init__(self, respond):
+        self.respond = respond
+        self.prompts = []
+        self.lock = threading.Lock()
+
+    def generate_completion(self, prompt, **kwargs):
+        with self.lock:
+            self.prompts.append(prompt)
+        return self.respond(prompt)
+
+
+class TestJudgeParsing:
+    """Test cases for judge response parsing."""
+
+    def test_parses_nested_and_wrapped_json(self):
+        """Test scores are found in surrounding text and code fences, ignoring extra keys."""
+        response = 'Here you go:\n```json\n{"task_success": 88, "coherence": "90", "diversity": 85.4, ' \
+                   '"fluency": 92, "groundedness": 87, "notes": {"why": "ok"}}\n```'
+
+        assert parse_judge_scores(response) == SCORES
+
+    def test_rejects_incomplete_or_out_of_range(self):
+        """Test missing metrics and scores outside 0-100 are invalid."""
+        assert parse_judge_scores('{"task_success": 88}') is None
+        assert parse_judge_scores(json.dumps({**SCORES, "fluency": 120})) is None
+        assert parse_judge_scores("no json here") is None
+
+    def test_parses_batch_array(self):
+        """Test a batch response yields one score dict per dialogue, in order."""
+        second = {**SCORES, "coherence": 50}
+        assert parse_batch_judge_scores(json.dumps([SCORES, second]), 2) == [SCORES, second]
+        assert parse_batch_judge_scores(json.dumps([SCORES]), 2) is None
+
+
+class TestDialogueJudge:
+    """Test cases for DialogueJudge."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_repairs_invalid_response_once(self):
+        """Test an unparseable answer triggers exactly one repair request."""
+        client = ScriptedClient(lambda prompt: json.dumps(SCORES) if "could not be parsed" in prompt else "Scores: great")
+
+        assert DialogueJudge(client).judge_dialogue(make_dialogue(0)) == SCORES
+        assert len(client.prompts) == 2
+
+        client = ScriptedClient(lambda prompt: "still not json")
+        assert DialogueJudge(client).judge_dialogue(make_dialogue(0)) is None
+        assert len(client.prompts) == 2
+
+    def test_judges_concurrently_in_order(self):
+        """Test calls overlap across workers and results keep input order."""
+        def respond(prompt):
+            time.sleep(0.1)
+            i = int(prompt.split("book hotel ")[1].split()[0])
+            return json.dumps({**SCORES, "task_success": i})
+
+        client = ScriptedClient(respond)
+        dialogues = [make_dialogue(i) for i in range(8)]
+
+        start = time.perf_counter()
+        results = DialogueJudge(client, workers=8).judge_all(dialogues)
+
+        assert time.perf_counter() - start < 0.5
+        assert [r["task_success"] for r in results] == list(range(8))
+
+    def test_batches_short_dialogues(self):
+        """Test short dialogues share one prompt while long ones are judged alone."""
+        def respond(prompt):
+            count = prompt.count("### Dialogue")
+            return json.dumps([SCORES] * count) if count else json.dumps(SCORES)
+
+        client = ScriptedClient(respond)
+        dialogues = [make_dialogue(i) for i in range(4)] + [make_dialogue(4, words=500)]
+
+        results = DialogueJudge(client, batch_size=4, batch_max_words=100).judge_all(dialogues)
+
+        assert results == [SCORES] * 5
+        assert len(client.prompts) == 2
+
+    def test_failed_batch_falls_back_to_single_prompts(self):
+        """Test a batch that cannot be parsed is re-judged dialogue by dialogue."""
+        client = ScriptedClient(lambda prompt: "oops" if "### Dialogue" in prompt or "could not" in prompt else json.dumps(SCORES))
+
+        results = DialogueJudge(client, batch_size=3).judge_all([make_dialogue(i) for i in range(3)])
+
+        assert results == [SCORES] * 3
+        assert len(client.prompts) == 2 + 3
+
+    def test_scores_persist_across_runs(self):
+        """Test a dialogue judged once is served from the store afterwards."""
+        path = str(Path(self.temp_dir) / "evaluation_store.sqlite")
+        dialogues = [make_dialogue(i) for i in range(3)]
+
+        client = ScriptedClient(lambda prompt: json.dumps(SCORES))
+        DialogueJudge(client, store=JudgeScoreStore(path)).judge_all(dialogues)
+        assert len(client.prompts) == 3
+
+        client = ScriptedClient(lambda prompt: json.dumps(SCORES))
+        changed = dialogues + [make_dialogue(9)]
+        store = JudgeScoreStore(path)
+        results = DialogueJudge(client, store=store).judge_all(changed)
+        assert results == [SCORES] * 4
+        assert len(client.prompts) == 1
+        assert len(store) == 4
+        store.close()
+
+    def test_store_reads_only_judged_keys(self):
+        """Test judging queries just the dialogues at hand and keeps judge models apart."""
+        path = str(Path(self.temp_dir) / "evaluation_store.sqlite")
+        store = JudgeScoreStore(path)
+        store.put_many("/", {JudgeScoreStore.key(make_dialogue(i)): SCORES for i in range(5)})
+
+        with patch.object(store.store, "get_many", wraps=store.store.get_many) as get_many:
+            client = ScriptedClient(lambda prompt: json.dumps(SCORES))
+            DialogueJudge(client, store=store).judge_all([make_dialogue(1), make_dialogue(7)])
+
+        assert len(get_many.call_args.args[2]) == 2
+        assert len(client.prompts) == 1
+        assert store.get_many("other/model", [JudgeScoreStore.key(make_dialogue(1))]) == {}
+        store.close()
+
+    def test_rate_limiter_spaces_calls(self):
+        """Test the limiter admits calls no faster than the configured rate."""
+        limiter = RateLimiter(requests_per_minute=600)
+
+        start = time.perf_counter()
+        for _ in range(4):
+            limiter.wait()
+
+        assert time.perf_counter() - start >= 0.29
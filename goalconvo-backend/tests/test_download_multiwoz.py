@@ -0,0 +1,85 @@
+"""
+Tests for MultiWOZ ingestion.
+"""
+
+import json
+import pytest
+import tempfile
+import shutil
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+sys.path.append(str(Path(__file__).parent.parent / "scripts"))
+
+from goalconvo.config import Config
+from goalconvo.utils import load_json
+from download_multiwoz import MultiWOZDownloader
+
+
+def make_raw_dialogue(i, service):
+    """Build a small MultiWOZ 2.2-style raw dialogue."""
+    return {
+        "dialogue_id": f"PMUL{i:04d}.json",
+        "services": [service],
+        "turns": [
+            {"speaker": "USER", "utterance": f"I need a {service} for \"{i}\" people", "turn_id": "0",
+             "frames": [{"service": service, "slots": [{"slot": "people", "value": str(i)}]}]},
+            {"speaker": "SYSTEM", "utterance": "Sure, it's booked.", "turn_id": "1", "frames": []},
+        ]
+    }
+
+
+class TestMultiWOZIngest:
+    """Test cases for MultiWOZDownloader.ingest."""
+
+    def setup_method(self):
+        """Write two MultiWOZ 2.2 data files into a temporary checkout."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = Config()
+        self.config.data_dir = self.temp_dir
+        self.config.multiwoz_dir = f"{self.temp_dir}/multiwoz"
+        self.downloader = MultiWOZDownloader(self.config)
+        self.train_dir = self.downloader.extracted_dir / "train"
+        self.train_dir.mkdir(parents=True)
+        for n, service in enumerate(["hotel", "taxi"]):
+            raw = [make_raw_dialogue(10 * n + i, service) for i in range(3)]
+            (self.train_dir / f"dialogues_00{n + 1}.json").write_text(json.dumps(raw, indent=2))
+
+    def teardown_method(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_ingest_writes_outputs(self):
+        """Test one pass writes processed dialogues, the reference corpus, seed goals and stats."""
+        stats = self.downloader.ingest(workers=1)
+
+        assert stats["cached"] is False
+        assert stats["total_dialogues"] == 6
+        processed = load_json(str(Path(self.config.multiwoz_dir) / "processed_dialogues.json"))
+        assert [d["dialogue_id"] for d in processed] == [f"PMUL{i:04d}.json" for i in (0, 1, 2, 10, 11, 12)]
+        assert processed[1]["turns"][0]["text"] == 'I need a hotel for "1" people'
+        assert set(load_json(str(Path(self.temp_dir) / "seed_goals.json"))) == {"hotel", "taxi"}
+
+    def test_unchanged_sources_skip_reingest(self, monkeypatch):
+        """Test a second run on unchanged sources is served from the cache without parsing."""
+        first = self.downloader.ingest(workers=1)
+        monkeypatch.setattr(
+            self.downloader, "iter_parsed_dialogues", lambda workers=None: pytest.fail("re-parsed sources")
+        )
+
+        second = self.downloader.ingest(workers=1)
+
+        assert second["cached"] is True
+        assert {k: v for k, v in second.items() if k != "cached"} == {k: v for k, v in first.items() if k != "cached"}
+
+    def test_force_and_changed_sources_reingest(self):
+        """Test force=True and a changed source file both re-run ingestion."""
+        self.downloader.ingest(workers=1)
+
+        assert self.downloader.ingest(workers=1, force=True)["cached"] is False
+
+        (self.train_dir / "dialogues_003.json").write_text(json.dumps([make_raw_dialogue(20, "train")]))
+        stats = self.downloader.ingest(workers=1)
+        assert stats["cached"] is False
+        assert stats["total_dialogues"] == 7
@@ -0,0 +1,81 @@
+"""
+Tests for the incremental evaluation store.
+"""
+
+import shutil
+import tempfile
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.evaluation_store import EvaluationStore, dialogue_key, fingerprint
+
+
+def make_dialogue(i, text="hello"):
+    return {"domain": "hotel", "goal": f"goal {i}", "turns": [{"role": "User", "text": f"{text} {i}"}]}
+
+
+class TestEvaluationStore:
+    """Test cases for EvaluationStore."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = str(Path(self.temp_dir) / "evaluation_store.sqlite")
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_only_new_dialogues_are_computed(self):
+        """Test stored contributions are reused and only unseen dialogues reach compute."""
+        store = EvaluationStore(self.path)
+        computed = []
+
+        def compute(batch):
+            computed.append([d["goal"] for d in batch])
+            return [len(d["goal"]) for d in batch]
+
+        first = [make_dialogue(i) for i in range(3)]
+        assert store.contributions("metric", "", first, compute) == [6, 6, 6]
+        more = first + [make_dialogue(10)]
+        assert store.contributions("metric", "", more, compute) == [6, 6, 6, 7]
+
+        assert computed == [["goal 0", "goal 1", "goal 2"], ["goal 10"]]
+        store.close()
+
+    def test_values_persist_and_none_is_not_stored(self):
+        """Test values survive reopening, while None values are recomputed."""
+        dialogues = [make_dialogue(0), make_dialogue(1)]
+        store = EvaluationStore(self.path)
+        store.contributions("metric", "", dialogues, lambda batch: [{"score": 1.5}, None])
+        store.close()
+
+        store = EvaluationStore(self.path)
+        computed = []
+        values = store.contributions("metric", "", dialogues, lambda batch: computed.extend(batch) or [2.0])
+
+        assert values == [{"score": 1.5}, 2.0]
+        assert computed == [dialogues[1]]
+        assert store.count("metric") == 2
+        store.close()
+
+    def test_context_and_content_changes_recompute(self):
+        """Test a new context (e.g. reference set) or edited dialogue misses the store."""
+        store = EvaluationStore(self.path)
+        dialogue = make_dialogue(0)
+        store.put_many("metric", "refs-a", {dialogue_key(dialogue): 1})
+
+        assert store.get_many("metric", "refs-b", [dialogue_key(dialogue)]) == {}
+        edited = make_dialogue(0, text="changed")
+        assert store.get_many("metric", "refs-a", [dialogue_key(edited)]) == {}
+        assert store.get_many("metric", "refs-a", [dialogue_key(dict(dialogue))]) == {dialogue_key(dialogue): 1}
+        store.close()
+
+    def test_fingerprint_ignores_order(self):
+        """Test reference fingerprints depend on the set of dialogues and parameters only."""
+        refs = [make_dialogue(i) for i in range(4)]
+
+        assert fingerprint(refs, "model", 10) == fingerprint(list(reversed(refs)), "model", 10)
+        assert fingerprint(refs, "model", 10) != fingerprint(refs, "model", 5)
+        assert fingerprint(refs, "model", 10) != fingerprint(refs[:3], "model", 10)
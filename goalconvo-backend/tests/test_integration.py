@@ -10,6 +10,7 @@ from unittest.mock import patch, MagicMock
 import tempfile
 import shutil
 from pathlib import Path
+import numpy as np
 
 import sys
 sys.path.append(str(Path(__file__).parent.parent / "src"))
@@ -207,9 +208,9 @@ class TestGoalConvoIntegration:
         ]
         
         # Run evaluation
-        with patch('goalconvo.evaluator.bert_score') as mock_bert_score:
-            # Mock BERTScore response
-            mock_bert_score.return_value = ([0.8], [0.8], [0.8])
+        with patch('goalconvo.evaluator.best_match_f1') as mock_best_match_f1:
+            # Mock BERTScore response (best F1 per synthetic dialogue)
+            mock_best_match_f1.side_effect = lambda cands, refs, model, **kwargs: np.full(len(cands), 0.8)
             
             results = self.evaluator.evaluate_synthetic_vs_real(synthetic_dialogues, real_dialogues)
             
@@ -218,6 +219,7 @@ class TestGoalConvoIntegration:
             assert "goal_relevance" in results
             assert "domain_analysis" in results
             assert "statistical_analysis" in results
+            assert results["semantic_similarity"]["overall_bertscore"] == pytest.approx(0.8)
     
     def test_error_handling(self):
         """Test error handling in the pipeline."""
@@ -0,0 +1,106 @@
+"""
+Tests for judge benchmark module.
+"""
+
+import pytest
+import tempfile
+import shutil
+from unittest.mock import MagicMock
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.config import Config
+from goalconvo.human_evaluator import HumanEvaluator, HumanAnnotation
+from goalconvo.judge_benchmark import JudgeBenchmark, RecordingLLMClient, cohen_kappa
+
+def make_dialogue(dialogue_id, domain="hotel"):
+    """Build a small goal-oriented dialogue."""
+    return {
+        "dialogue_id": dialogue_id,
+        "domain": domain,
+        "goal": "Book a cheap hotel in the centre",
+        "turns": [
+            {"role": "User", "text": f"I need a cheap hotel in the centre, request {dialogue_id}"},
+            {"role": "SupportBot", "text": "The Alexander is a cheap guesthouse in the centre"},
+            {"role": "User", "text": "Please book it for two nights"},
+            {"role": "SupportBot", "text": "Booked, your reference is ALEX-0042"},
+            {"role": "User", "text": "Thank you, goodbye"}
+        ]
+    }
+
+class TestJudgeBenchmark:
+    """Test cases for the judge calibration benchmark."""
+
+    def setup_method(self):
+        """Setup configuration and temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.config = Config()
+        self.config.data_dir = self.temp_dir
+        self.config.min_turns = 3
+        self.config.max_turns = 10
+        self.dialogues = [make_dialogue(f"d{i}") for i in range(6)]
+
+    def teardown_method(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_record_then_replay(self):
+        """Test responses are recorded once and replayed without a live client."""
+        cassette = str(Path(self.temp_dir) / "cassette.json")
+        live = MagicMock()
+        live.generate_completion.side_effect = lambda prompt, **kwargs: "YES" if "goal" in prompt.lower() else "4"
+
+        recorder = RecordingLLMClient(cassette, llm_client=live)
+        recorded = JudgeBenchmark(self.config, recorder, self.dialogues).run(["full"])
+        recorder.save()
+        live_calls = live.generate_completion.call_count
+
+        replayed = JudgeBenchmark(self.config, RecordingLLMClient(cassette), self.dialogues).run(["full"])
+
+        assert live_calls > 0
+        assert replayed["modes"]["full"] == recorded["modes"]["full"]
+        assert replayed["modes"]["full"]["calls_per_dialogue"] == 3.0
+        assert replayed["modes"]["full"]["tokens_per_dialogue"] > 0
+
+    def test_replay_missing_prompt_raises(self):
+        """Test replay never falls back to a live model."""
+        client = RecordingLLMClient()
+
+        with pytest.raises(KeyError):
+            client.generate_completion("unrecorded prompt")
+
+    def test_modes_compared_with_reference_and_humans(self):
+        """Test sampled and cascade modes are compared to full judging and to human verdicts."""
+        live = MagicMock()
+        live.generate_completion.return_value = "4 YES"
+        human_evaluator = HumanEvaluator(self.temp_dir)
+        for dialogue in self.dialogues[:4]:
+            human_evaluator.annotations[dialogue["dialogue_id"]] = HumanAnnotation(
+                annotation_id=dialogue["dialogue_id"],
+                dialogue_id=dialogue["dialogue_id"],
+                annotator_id="a1",
+                timestamp="2026-01-01T00:00:00",
+                dimensions={"overall_quality": 4}
+            )
+
+        benchmark = JudgeBenchmark(
+            self.config, RecordingLLMClient(llm_client=live), self.dialogues, human_evaluator=human_evaluator
+        )
+        report = benchmark.run(["full", "sampled", "cascade"])
+
+        assert report["human_annotated"] == 4
+        assert report["modes"]["full"]["agreement_with_reference"] == 1.0
+        assert report["modes"]["full"]["score_drift_mae"] == 0.0
+        assert report["modes"]["full"]["agreement_with_human"] == 1.0
+        assert "sampled" in report["modes"]
+        assert report["modes"]["sampled"]["calls_per_dialogue"] <= report["modes"]["full"]["calls_per_dialogue"]
+        assert report["modes"]["cascade"]["escalation_rate"] == 0.0
+        assert report["modes"]["cascade"]["tiers"]["fast"]["dialogues"] == 6
+
+    def test_cohen_kappa(self):
+        """Test kappa for perfect, chance-level and empty agreement."""
+        assert cohen_kappa([True, False, True, False], [True, False, True, False]) == 1.0
+        assert cohen_kappa([True, True, False, False], [True, False, True, False]) == 0.0
+        assert cohen_kappa([], []) is None
@@ -0,0 +1,69 @@
+"""
+Tests for the shared keyword scans of the heuristic evaluation metrics.
+"""
+
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.keyword_matcher import (
+    CONFIRMATION_WORDS, CONSTRAINT_PATTERNS, DialogueScanCache, scan_dialogue
+)
+
+TURNS = [
+    {"role": "User", "text": "I'd like to BOOK a cheap hotel in the centre."},
+    {"role": "SupportBot", "text": "Booked! The Acorn is in the central area."},
+    {"role": "User", "text": "Thanks, that works."},
+]
+
+
+class TestDialogueScan:
+    """Test cases for DialogueScan."""
+
+    def test_matches_lowercased_substrings(self):
+        """Test lookups behave like `keyword in text` on the lowercased goal and dialogue."""
+        scan = scan_dialogue("Book a Hotel", TURNS)
+
+        assert scan.goal.has("book")
+        assert scan.dialogue.has("booked")
+        assert scan.dialogue.has_any(["taxi", "that works"])
+        assert not scan.dialogue.has("taxi")
+        assert scan.dialogue.first("book") == scan.dialogue.text.find("book")
+        assert scan.dialogue.first("taxi") is None
+
+    def test_window_and_turn_queries(self):
+        """Test bounded searches match searching the corresponding slice."""
+        scan = scan_dialogue("", TURNS)
+        text = scan.dialogue.text
+        start = text.find("book")
+
+        for end in (start + 5, start + 60, len(text) + 10):
+            expected = any(word in text[start:end] for word in CONFIRMATION_WORDS)
+            assert scan.dialogue.has_any_within(CONFIRMATION_WORDS, start, end) == expected
+
+        assert scan.turn_has_any(2, ["thanks"])
+        assert not scan.turn_has_any(0, ["thanks"])
+
+    def test_synonyms(self):
+        """Test a constraint value counts as mentioned through a synonym of its list."""
+        scan = scan_dialogue("", [{"role": "User", "text": "somewhere downtown please"}])
+
+        assert scan.synonym_mentioned("center")
+        assert not scan.synonym_mentioned("north")
+
+    def test_constraint_patterns_are_precompiled(self):
+        """Test goal constraint patterns parse values from goal text."""
+        assert CONSTRAINT_PATTERNS["price"].search("my budget is cheap").group(1) == "cheap"
+
+    def test_cache_shares_and_discards_scans(self):
+        """Test the cache returns one scan per dialogue until it is discarded."""
+        cache = DialogueScanCache()
+        dialogue = {"goal": "Find a taxi", "turns": TURNS}
+
+        scan = cache.scan(dialogue)
+        assert cache.scan(dialogue) is scan
+
+        cache.discard([dialogue])
+        assert cache.scan(dialogue) is not scan
@@ -0,0 +1,152 @@
+"""
+Tests for the parallel metric executor.
+"""
+
+import os
+import pickle
+import subprocess
+import time
+import pytest
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo import metric_executor
+from goalconvo.metric_executor import MetricExecutor, MetricTask, _is_transfer_error
+
+
+def square_sum(values):
+    """Picklable CPU task."""
+    return sum(v * v for v in values)
+
+
+def sleep_and_return(seconds, value):
+    time.sleep(seconds)
+    return value
+
+
+def fail():
+    raise RuntimeError("metric failed")
+
+
+def fail_mentioning_pickle():
+    raise ValueError("could not load the pickle cache")
+
+
+class TestMetricExecutor:
+    """Test cases for MetricExecutor."""
+
+    def test_runs_tasks_on_every_pool(self):
+        """Test cpu, io and inline tasks all produce results and timings."""
+        tasks = [
+            MetricTask("cpu", square_sum, ([1, 2, 3],)),
+            MetricTask("io", sleep_and_return, (0.01, "judged"), kind="io"),
+            MetricTask("inline", len, ("abc",), kind="inline"),
+        ]
+
+        results, timings = MetricExecutor(workers=2).run(tasks)
+
+        assert results == {"cpu": 14, "io": "judged", "inline": 3}
+        assert set(timings) == {"cpu", "io", "inline"}
+        assert all(seconds >= 0 for seconds in timings.values())
+
+    def test_sequential_matches_parallel(self):
+        """Test workers=1 runs the same tasks in-process with the same results."""
+        tasks = [MetricTask(f"m{i}", square_sum, (list(range(i)),)) for i in range(5)]
+
+        parallel, _ = MetricExecutor(workers=3).run(tasks)
+        sequential, _ = MetricExecutor(workers=1).run(tasks)
+
+        assert parallel == sequential
+
+    def test_independent_tasks_overlap(self):
+        """Test wall time follows the slowest task, not the sum."""
+        tasks = [MetricTask(f"judge{i}", sleep_and_return, (0.3, i), kind="io") for i in range(4)]
+
+        start = time.perf_counter()
+        results, _ = MetricExecutor(workers=4).run(tasks)
+
+        assert time.perf_counter() - start < 0.9
+        assert results == {f"judge{i}": i for i in range(4)}
+
+    def test_dependencies_run_first(self):
+        """Test a task only starts after the tasks it depends on finished."""
+        order = []
+        tasks = [
+            MetricTask("summary", order.append, ("summary",), kind="inline", depends_on=("slow",)),
+            MetricTask("slow", sleep_and_return, (0.1, "slow"), kind="io"),
+        ]
+
+        results, _ = MetricExecutor(workers=2).run(
+            tasks, on_start=order.append, on_done=lambda name, seconds: order.append(f"{name} done")
+        )
+
+        assert results["slow"] == "slow"
+        assert order.index("slow done") < order.index("summary")
+
+    def test_unpicklable_cpu_task_runs_in_process(self):
+        """Test a task that cannot be sent to a worker process is computed locally."""
+        offset = 10
+        tasks = [MetricTask("closure", lambda x: x + offset, (1,))]
+
+        results, _ = MetricExecutor(workers=2).run(tasks)
+
+        assert results == {"closure": 11}
+
+    def test_process_pool_is_shared_across_runs(self):
+        """Test worker processes (and their loaded models / caches) are reused by later runs."""
+        executor = MetricExecutor(workers=2)
+        executor.run([MetricTask("first", os.getpid)])
+        pool = metric_executor._process_pool
+
+        results, _ = executor.run([MetricTask("second", os.getpid)])
+
+        assert metric_executor._process_pool is pool
+        assert results["second"] != os.getpid()
+
+    def test_eventlet_patched_threads_run_cpu_tasks_in_process(self):
+        """Test cpu tasks finish, in the calling process, when eventlet has patched threading."""
+        pytest.importorskip("eventlet")
+        code = (
+            "import eventlet; eventlet.monkey_patch()\n"
+            "import os, sys\n"
+            f"sys.path.insert(0, {str(Path(__file__).parent.parent / 'src')!r})\n"
+            "from goalconvo.metric_executor import MetricExecutor, MetricTask, processes_available\n"
+            "assert not processes_available()\n"
+            "tasks = [MetricTask('cpu', os.getpid), MetricTask('io', len, ('ab',), kind='io')]\n"
+            "results, _ = MetricExecutor(workers=2).run(tasks)\n"
+            "assert results == {'cpu': os.getpid(), 'io': 2}, results\n"
+            "print('ok')\n"
+        )
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, timeout=120)
+
+        assert result.returncode == 0, result.stderr
+        assert result.stdout.strip().endswith("ok")
+
+    def test_only_transfer_errors_fall_back(self):
+        """Test metric errors that merely mention pickling are raised, not recomputed."""
+        assert _is_transfer_error(pickle.PicklingError("cannot pickle"))
+        assert _is_transfer_error(BrokenProcessPool("worker died"))
+        assert not _is_transfer_error(ValueError("could not load the pickle cache"))
+
+        with pytest.raises(ValueError, match="pickle cache"):
+            MetricExecutor(workers=2).run([MetricTask("bad", fail_mentioning_pickle)])
+
+    def test_task_error_is_raised(self):
+        """Test metric exceptions propagate to the caller."""
+        with pytest.raises(RuntimeError, match="metric failed"):
+            MetricExecutor(workers=2).run([MetricTask("bad", fail, kind="io")])
+
+    def test_invalid_graphs_are_rejected(self):
+        """Test unknown dependencies and cycles raise ValueError."""
+        with pytest.raises(ValueError):
+            MetricExecutor(workers=2).run([MetricTask("a", len, ("x",), depends_on=("missing",))])
+        cycle = [
+            MetricTask("a", len, ("x",), kind="inline", depends_on=("b",)),
+            MetricTask("b", len, ("y",), kind="inline", depends_on=("a",)),
+        ]
+        for workers in (1, 2):
+            with pytest.raises(ValueError, match="cyclic"):
+                MetricExecutor(workers=workers).run(cycle)
@@ -0,0 +1,84 @@
+"""
+Tests for near-duplicate detection module.
+"""
+
+import pytest
+import tempfile
+import shutil
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.near_duplicates import NearDuplicateIndex, estimate_jaccard
+
+def make_dialogue(dialogue_id, texts):
+    """Build a minimal dialogue from turn texts."""
+    roles = ["User", "SupportBot"]
+    return {
+        "dialogue_id": dialogue_id,
+        "domain": "hotel",
+        "turns": [{"role": roles[i % 2], "text": text} for i, text in enumerate(texts)]
+    }
+
+BASE_TEXTS = [
+    "I am looking for a cheap hotel in the centre of town with free parking",
+    "The Alexander Bed and Breakfast is a cheap guesthouse in the centre with free parking",
+    "Great, please book it for three people for two nights starting on Friday",
+    "Your booking is confirmed, the reference number is ALEX-0042",
+    "Thank you, that is everything I needed today"
+]
+
+class TestNearDuplicateIndex:
+    """Test cases for the MinHash/LSH index."""
+    
+    def setup_method(self):
+        """Setup temporary directory."""
+        self.temp_dir = tempfile.mkdtemp()
+    
+    def teardown_method(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+    
+    def test_query_finds_near_duplicate(self):
+        """Test a lightly edited dialogue is found and an unrelated one is not."""
+        index = NearDuplicateIndex(threshold=0.7)
+        original = make_dialogue("a", BASE_TEXTS)
+        index.add("a", index.signature(original))
+        
+        edited_texts = list(BASE_TEXTS)
+        edited_texts[-1] = "Thank you, that is everything I needed"
+        edited = make_dialogue("b", edited_texts)
+        unrelated = make_dialogue("c", [
+            "I need a taxi to the train station at seven",
+            "A blue Toyota will pick you up at seven, reference TAXI-11"
+        ])
+        
+        matches = index.query(index.signature(edited))
+        assert [key for key, _ in matches] == ["a"]
+        assert matches[0][1] >= 0.7
+        assert index.query(index.signature(unrelated)) == []
+    
+    def test_identical_signatures(self):
+        """Test identical dialogues have Jaccard estimate 1.0."""
+        index = NearDuplicateIndex()
+        dialogue = make_dialogue("a", BASE_TEXTS)
+        assert estimate_jaccard(index.signature(dialogue), index.signature(dialogue)) == 1.0
+    
+    def test_persistence_round_trip(self):
+        """Test the append-only log reloads the same entries."""
+        path = f"{self.temp_dir}/hotel.minhash"
+        index = NearDuplicateIndex(path=path)
+        dialogue = make_dialogue("a", BASE_TEXTS)
+        index.add("a", index.signature(dialogue))
+        index.add("a", index.signature(dialogue))  # replaced, not duplicated
+        
+        reloaded = NearDuplicateIndex(path=path)
+        assert len(reloaded) == 1
+        assert reloaded.query(reloaded.signature(dialogue)) == [("a", 1.0)]
+        
+        reloaded.clear()
+        assert not Path(path).exists()
+
+if __name__ == "__main__":
+    pytest.main([__file__])
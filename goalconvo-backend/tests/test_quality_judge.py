@@ -11,7 +11,7 @@ from pathlib import Path
 sys.path.append(str(Path(__file__).parent.parent / "src"))
 
 from goalconvo.config import Config
-from goalconvo.quality_judge import QualityJudge
+from goalconvo.quality_judge import HEURISTIC_CHECKS, QualityJudge
 from goalconvo.llm_client import LLMClient
 
 class TestQualityJudge:
@@ -216,6 +216,262 @@ class TestQualityJudge:
             assert len(rejected) == 1
             assert accepted[0]["dialogue_id"] == "test_1"
             assert rejected[0]["dialogue_id"] == "test_2"
+    
+    def _repairable_dialogue(self):
+        return {
+            "dialogue_id": "test_repair",
+            "goal": "book a hotel room",
+            "domain": "hotel",
+            "turns": [
+                {"role": "User", "text": "I need to book a hotel room"},
+                {"role": "SupportBot", "text": ""},
+                {"role": "User", "text": "Something in the centre please"},
+                {"role": "SupportBot", "text": "The Acorn Guest House has a room, reference ACG-001."},
+                {"role": "User", "text": "Thank you, that's perfect!"},
+                {"role": "SupportBot", "text": "You're welcome, enjoy your stay."}
+            ]
+        }
+    
+    def test_plan_repair_targets_local_failures(self):
+        """Test repair planner maps an empty turn to a single-turn repair."""
+        dialogue = self._repairable_dialogue()
+        assessment = {
+            "heuristic_filters": self.judge._apply_heuristic_filters(dialogue),
+            "llm_evaluation": {"coherence_score": 2.0, "goal_relevance": True, "overall_score": 2.0}
+        }
+        
+        plan = self.judge.plan_repair(dialogue, assessment)
+        
+        assert plan is not None
+        assert plan["turn_indices"] == [1]
+        assert "empty_response_check" in plan["checks"]
+        assert "repetition_check" in plan["checks"]
+    
+    def test_plan_repair_too_many_turns(self):
+        """Test repair planner declines when most turns need regenerating."""
+        dialogue = self._repairable_dialogue()
+        for turn in dialogue["turns"]:
+            turn["text"] = ""
+        assessment = {
+            "heuristic_filters": self.judge._apply_heuristic_filters(dialogue),
+            "llm_evaluation": {"coherence_score": 1.0, "goal_relevance": False, "overall_score": 1.0}
+        }
+        
+        assert self.judge.plan_repair(dialogue, assessment) is None
+    
+    def test_filter_dialogues_targeted_repair(self):
+        """Test failed dialogues are repaired turn-by-turn instead of rewritten."""
+        mock_simulator = MagicMock()
+        judge = QualityJudge(self.config, self.mock_llm_client, simulator=mock_simulator)
+        dialogue = self._repairable_dialogue()
+        repaired_turns = [dict(t) for t in dialogue["turns"]]
+        repaired_turns[1]["text"] = "Certainly, do you prefer the centre or the north?"
+        mock_simulator.regenerate_turns.return_value = repaired_turns
+        
+        assessment = {
+            "passed_filters": False,
+            "overall_score": 0.3,
+            "heuristic_filters": judge._apply_heuristic_filters(dialogue),
+            "llm_evaluation": {"coherence_score": 2.0, "goal_relevance": True, "overall_score": 2.0}
+        }
+        # Force the heuristic gate to fail so only the repaired checks can flip the verdict
+        for name in ("length_check", "goal_mention_check", "profanity_check"):
+            assessment["heuristic_filters"][name]["passed"] = False
+        
+        with patch.object(judge, 'judge_dialogue', return_value=assessment), \
+                patch.object(judge, 'improve_dialogue') as mock_improve:
+            accepted, rejected = judge.filter_dialogues([dialogue], target_discard_rate=0.0001)
+        
+        mock_simulator.regenerate_turns.assert_called_once_with(dialogue, [1])
+        mock_improve.assert_not_called()
+        self.mock_llm_client.generate_completion.assert_not_called()
+        assert len(accepted) == 1
+        assert accepted[0]["metadata"]["improvement_mode"] == "targeted_repair"
+        assert accepted[0]["metadata"]["repaired_turns"] == [1]
+    
+    def test_filter_dialogues_sampled(self):
+        """Test sampling mode LLM-judges only a stratified sample and reports a CI."""
+        self.config.quality_sampling = True
+        self.config.quality_sampling_min_batch = 20
+        self.config.quality_sample_rate = 0.2
+        self.config.quality_sample_min_per_stratum = 6
+        self.config.quality_sampling_margin = 0.0
+        good_turns = [
+            {"role": "User", "text": "I need to book a hotel room"},
+            {"role": "SupportBot", "text": "Sure, which area do you prefer?"},
+            {"role": "User", "text": "The centre, two nights please"},
+            {"role": "SupportBot", "text": "Booked at the Acorn, reference ACG-001."}
+        ]
+        dialogues = [
+            {
+                "dialogue_id": f"d{i}",
+                "goal": "book a hotel room",
+                "domain": "hotel" if i % 2 else "restaurant",
+                "turns": [dict(t) for t in good_turns]
+            }
+            for i in range(60)
+        ]
+        
+        def fake_judge(dialogue):
+            return self.judge._build_assessment(
+                dialogue,
+                self.judge._apply_heuristic_filters(dialogue),
+                {"coherence_score": 4.0, "goal_relevance": True, "overall_score": 4.0}
+            )
+        
+        with patch.object(self.judge, 'judge_dialogue', side_effect=fake_judge) as mock_judge:
+            accepted, rejected = self.judge.filter_dialogues(dialogues, target_discard_rate=0.0001)
+        
+        report = self.judge.last_sampling_report
+        assert mock_judge.call_count == report["sampled"] == 12
+        assert report["predicted"] == 48
+        assert len(accepted) == 60
+        assert report["estimated_acceptance_rate"] == 1.0
+        assert report["acceptance_rate_ci95"] == [1.0, 1.0]
+        assert set(report["strata"]) == {"hotel/default/default", "restaurant/default/default"}
+    
+    def test_sampled_verdicts_follow_llm_cutoffs(self):
+        """Test sampling mode predicts the judge's verdict, not a threshold on the blended score."""
+        self.config.quality_sampling = True
+        self.config.quality_sampling_min_batch = 20
+        self.config.quality_sample_rate = 0.2
+        self.config.quality_sample_min_per_stratum = 10
+        dialogues = [
+            {"dialogue_id": f"low{i}", "goal": "book a hotel room", "domain": "hotel",
+             "turns": [{"role": "User", "text": "I need a hotel"}, {"role": "SupportBot", "text": "Booked."}]}
+            for i in range(40)
+        ]
+        
+        def low_heuristics(dialogue, *args, **kwargs):
+            # Two of six checks pass: heuristic score 1/3, below the heuristic gate
+            results = {name: {"passed": index < 2} for index, name in enumerate(HEURISTIC_CHECKS)}
+            results["heuristic_score"] = 2 / 6
+            return results
+        
+        def fake_judge(dialogue):
+            # LLM 4/4/YES passes the real judge although the blended score is only ~0.66
+            return self.judge._build_assessment(
+                dialogue, low_heuristics(dialogue), {"coherence_score": 4.0, "goal_relevance": True, "overall_score": 4.0}
+            )
+        
+        with patch.object(self.judge, '_apply_heuristic_filters', side_effect=low_heuristics), \
+                patch.object(self.judge, 'judge_dialogue', side_effect=fake_judge) as mock_judge:
+            accepted, rejected = self.judge.filter_dialogues(dialogues, target_discard_rate=0.0001)
+        
+        report = self.judge.last_sampling_report
+        assert fake_judge(dialogues[0])["overall_score"] < self.config.quality_threshold
+        assert mock_judge.call_count == report["sampled"] == 10
+        assert report["escalated"] == 0
+        assert len(accepted) == 40
+        assert report["verdict_predictor_accuracy"] == 1.0
+    
+    def test_filter_dialogues_rejects_near_duplicates(self):
+        """Test near-duplicates within a batch are rejected before judging."""
+        self.config.near_duplicate_action = "reject"
+        first = self._repairable_dialogue()
+        second = self._repairable_dialogue()
+        second["dialogue_id"] = "test_repair_copy"
+        
+        with patch.object(self.judge, 'judge_dialogue', return_value={"passed_filters": True, "overall_score": 0.8}) as mock_judge:
+            accepted, rejected = self.judge.filter_dialogues([first, second], target_discard_rate=0.0001)
+        
+        assert mock_judge.call_count == 1
+        assert [d["dialogue_id"] for d in accepted] == ["test_repair"]
+        assert rejected[0]["metadata"]["near_duplicate_of"]["dialogue_id"] == "test_repair"
+    
+    def test_rejected_dialogues_do_not_mark_near_duplicates(self):
+        """Test a candidate rejected by the judge does not make a later near-duplicate a duplicate."""
+        self.config.near_duplicate_action = "reject"
+        first = self._repairable_dialogue()
+        second = self._repairable_dialogue()
+        second["dialogue_id"] = "test_repair_copy"
+        third = self._repairable_dialogue()
+        third["dialogue_id"] = "test_repair_copy_2"
+        verdicts = iter([False, True, True])
+        
+        def fake_judge(dialogue):
+            return {"passed_filters": next(verdicts), "overall_score": 0.8}
+        
+        with patch.object(self.judge, 'judge_dialogue', side_effect=fake_judge), \
+                patch.object(self.judge, '_get_rejection_reason', return_value="low quality"):
+            accepted, rejected = self.judge.filter_dialogues(
+                [first, second, third], target_discard_rate=0.0001, improve_on_fail=False
+            )
+        
+        assert [d["dialogue_id"] for d in accepted] == ["test_repair_copy"]
+        assert "near_duplicate_of" not in second["metadata"]
+        assert [d["dialogue_id"] for d in rejected] == ["test_repair", "test_repair_copy_2"]
+        assert third["metadata"]["near_duplicate_of"]["dialogue_id"] == "test_repair_copy"
+    
+    def test_tiered_judging_escalates_borderline(self):
+        """Test only fast-tier verdicts one score point from flipping are re-judged by the strong tier."""
+        fast_client = MagicMock()
+        strong_client = MagicMock()
+        strong_client.generate_completion.return_value = "4 YES"
+        judge = QualityJudge(self.config, self.mock_llm_client, fast_llm_client=fast_client, strong_llm_client=strong_client)
+        dialogue = {
+            "dialogue_id": "tier_test",
+            "goal": "Book a hotel",
+            "turns": [
+                {"role": "User", "text": "I need to book a hotel for tonight"},
+                {"role": "SupportBot", "text": "The Grand has a double room available for tonight"},
+                {"role": "User", "text": "Please book it"},
+                {"role": "SupportBot", "text": "Booked, your reference is GR-12"}
+            ]
+        }
+        
+        # Passing heuristics decide the verdict: no escalation even at the LLM cutoff
+        fast_client.generate_completion.return_value = "3 YES"
+        decided = judge.judge_dialogue(dialogue)
+        
+        low_heuristics = {"heuristic_score": 1 / 3}
+        with patch.object(judge, '_apply_heuristic_filters', return_value=low_heuristics):
+            # Clear pass and clear fail on the fast tier: no escalation
+            fast_client.generate_completion.return_value = "5 YES"
+            clear_pass = judge.judge_dialogue(dialogue)
+            fast_client.generate_completion.return_value = "1 YES"
+            clear_fail = judge.judge_dialogue(dialogue)
+            # One point below the LLM cutoff of 3: escalated, and the strong tier accepts it
+            fast_client.generate_completion.return_value = "2 YES"
+            borderline = judge.judge_dialogue(dialogue)
+        stats = judge.get_tier_stats()
+        
+        assert decided["judge_tier"] == "fast" and decided["passed_filters"]
+        assert clear_pass["judge_tier"] == "fast" and clear_pass["passed_filters"]
+        assert clear_fail["judge_tier"] == "fast" and not clear_fail["passed_filters"]
+        assert borderline["judge_tier"] == "strong"
+        assert borderline["passed_filters"]
+        assert borderline["overall_score"] < self.config.quality_threshold
+        assert borderline["overall_score"] > borderline["fast_tier_score"]
+        assert strong_client.generate_completion.call_count == 3
+        self.mock_llm_client.generate_completion.assert_not_called()
+        assert stats["escalation_rate"] == 0.25
+        assert stats["fast"]["calls"] == 12
+        assert stats["strong"]["dialogues"] == 1
+    
+    def test_tiered_judging_escalates_fast_tier_failure(self):
+        """Test a failing fast-tier client escalates even though its scores fall back to defaults."""
+        self.config.judge_escalation_margin = 0.0  # default scores alone would not be borderline
+        fast_client = MagicMock()
+        fast_client.generate_completion.side_effect = Exception("fast judge unavailable")
+        strong_client = MagicMock()
+        strong_client.generate_completion.return_value = "5 YES"
+        judge = QualityJudge(self.config, self.mock_llm_client, fast_llm_client=fast_client, strong_llm_client=strong_client)
+        dialogue = {
+            "dialogue_id": "tier_failure",
+            "goal": "Book a hotel",
+            "turns": [
+                {"role": "User", "text": "I need to book a hotel for tonight"},
+                {"role": "SupportBot", "text": "Booked, your reference is GR-12"}
+            ]
+        }
+        
+        assessment = judge.judge_dialogue(dialogue)
+        
+        assert assessment["judge_tier"] == "strong"
+        assert "error" not in assessment["llm_evaluation"]
+        assert assessment["llm_evaluation"]["overall_score"] == 5.0
+        assert strong_client.generate_completion.call_count == 3
 
 if __name__ == "__main__":
     pytest.main([__file__])
@@ -0,0 +1,74 @@
+"""
+Tests for the indexed MultiWOZ reference corpus.
+"""
+
+import pytest
+import tempfile
+import shutil
+import os
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.reference_corpus import ReferenceCorpus, load_reference_dialogues
+from goalconvo.utils import save_json
+
+def make_reference(i, domain):
+    """Build a small MultiWOZ-style dialogue."""
+    return {
+        "dialogue_id": f"MUL{i:04d}.json",
+        "goal": f"Find a {domain} ({i})",
+        "domain": domain,
+        "turns": [
+            {"role": "User", "text": f"I need a {domain} Number {i}"},
+            {"role": "SupportBot", "text": "Sure, café booked"}
+        ],
+        "metadata": {"source": "MultiWOZ"}
+    }
+
+class TestReferenceCorpus:
+    """Test cases for ReferenceCorpus."""
+
+    def setup_method(self):
+        """Write a processed_dialogues.json into a temporary MultiWOZ directory."""
+        self.temp_dir = tempfile.mkdtemp()
+        self.dialogues = [make_reference(i, ["hotel", "taxi", "train"][i % 3]) for i in range(10)]
+        self.source = Path(self.temp_dir) / "processed_dialogues.json"
+        save_json(self.dialogues, str(self.source))
+
+    def teardown_method(self):
+        """Clean up temporary directory."""
+        shutil.rmtree(self.temp_dir)
+
+    def test_converts_once_and_reads_by_domain_and_count(self):
+        """Test the corpus is built on first open and rows are selected by domain and limit."""
+        corpus = ReferenceCorpus.open(self.temp_dir)
+        try:
+            assert len(corpus) == 10
+            assert corpus.load(limit=4) == self.dialogues[:4]
+            assert corpus.load(limit=3, domains=["taxi", "train"]) == [self.dialogues[i] for i in (1, 2, 4)]
+            assert corpus.get(9) == self.dialogues[9]
+        finally:
+            corpus.close()
+
+        assert (Path(self.temp_dir) / "reference" / "index.json").exists()
+        assert load_reference_dialogues(self.temp_dir, domains=["missing"]) == []
+
+    def test_rebuilds_when_source_changes(self):
+        """Test a changed processed_dialogues.json invalidates the built corpus."""
+        assert len(load_reference_dialogues(self.temp_dir)) == 10
+
+        save_json(self.dialogues[:2], str(self.source))
+        stat = self.source.stat()
+        os.utime(self.source, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+        assert load_reference_dialogues(self.temp_dir) == self.dialogues[:2]
+
+    def test_missing_source_returns_none(self):
+        """Test there is no corpus without processed MultiWOZ data."""
+        empty_dir = Path(self.temp_dir) / "empty"
+        empty_dir.mkdir()
+
+        assert ReferenceCorpus.open(str(empty_dir)) is None
+        assert load_reference_dialogues(str(empty_dir)) == []
@@ -0,0 +1,39 @@
+"""
+Tests for nearest-reference retrieval.
+"""
+
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.reference_retrieval import ReferenceRetriever, top_k_references
+
+REFERENCES = [
+    "i want to book a taxi to the train station",
+    "find me a cheap hotel in the north with free parking",
+    "is there an italian restaurant in the centre",
+    "book a table for two at the indian restaurant",
+    "i need a hotel with wifi and parking for three nights",
+]
+
+class TestReferenceRetriever:
+    """Test cases for ReferenceRetriever."""
+
+    def test_top_k_returns_most_similar_first(self):
+        """Test the nearest references are found anywhere in the corpus, best first."""
+        retriever = ReferenceRetriever(REFERENCES)
+
+        neighbours = retriever.top_k(["cheap hotel with parking", "a restaurant table for two"], 2)
+
+        assert neighbours.shape == (2, 2)
+        assert sorted(neighbours[0].tolist()) == [1, 4]
+        assert neighbours[1][0] == 3
+
+    def test_k_larger_than_corpus_and_blank_texts(self):
+        """Test k is capped at the corpus size and blank corpora fall back to corpus order."""
+        assert sorted(top_k_references(["taxi"], REFERENCES[:3], 10)[0]) == [0, 1, 2]
+        assert top_k_references(["taxi"], REFERENCES[:3], 10)[0][0] == 0
+        assert top_k_references(["anything"], ["", " "], 1) == [[0]]
+        assert ReferenceRetriever(REFERENCES).top_k([], 3).shape == (0, 3)
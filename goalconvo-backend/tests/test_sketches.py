@@ -0,0 +1,52 @@
+"""
+Tests for mergeable evaluation sketches.
+"""
+
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.sketches import HyperLogLog
+
+
+class TestHyperLogLog:
+    """Test cases for HyperLogLog."""
+
+    @pytest.mark.parametrize("count", [0, 1, 50, 2000, 100000])
+    def test_estimate_is_close(self, count):
+        """Test estimates stay within a few percent of the true distinct count."""
+        sketch = HyperLogLog()
+        sketch.add(f"item-{i}" for i in range(count))
+
+        assert sketch.estimate() == pytest.approx(count, rel=0.05, abs=1)
+
+    def test_duplicates_do_not_count(self):
+        """Test adding the same items again leaves the estimate unchanged."""
+        sketch = HyperLogLog()
+        sketch.add(str(i) for i in range(500))
+        before = sketch.estimate()
+        sketch.add(str(i) for i in range(500))
+
+        assert sketch.estimate() == before
+
+    def test_sparse_merge_equals_union(self):
+        """Test merging serialized sketches of overlapping sets equals sketching the union."""
+        parts = [range(0, 600), range(400, 1000), range(900, 1500)]
+        union = HyperLogLog()
+        union.add(str(i) for part in parts for i in part)
+
+        merged = HyperLogLog()
+        for part in parts:
+            sketch = HyperLogLog()
+            sketch.add(str(i) for i in part)
+            merged.merge_sparse(sketch.to_sparse())
+
+        assert (merged.registers == union.registers).all()
+        assert merged.estimate() == pytest.approx(1500, rel=0.05)
+
+    def test_precision_mismatch_is_rejected(self):
+        """Test sketches of different precision cannot be merged."""
+        with pytest.raises(ValueError):
+            HyperLogLog(10).merge(HyperLogLog(12))
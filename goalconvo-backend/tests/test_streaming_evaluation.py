@@ -0,0 +1,101 @@
+"""
+Tests for the bounded-memory streaming evaluation building blocks.
+"""
+
+import random
+import shutil
+import tempfile
+import numpy as np
+import pytest
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo.streaming_evaluation import (
+    GroupedStats, ReservoirSample, RunningStats, ScoreSpill, iter_chunks, read_spill
+)
+
+
+class TestRunningStats:
+    """Test cases for RunningStats and GroupedStats."""
+
+    def test_matches_numpy(self):
+        """Test mean, std and range match numpy over the same values."""
+        values = [random.Random(1).uniform(-5, 50) for _ in range(1000)]
+        stats = RunningStats()
+        stats.add_many(values)
+
+        assert stats.count == 1000
+        assert stats.mean == pytest.approx(np.mean(values))
+        assert stats.std() == pytest.approx(np.std(values))
+        assert stats.std(ddof=1) == pytest.approx(np.std(values, ddof=1))
+        assert stats.total == pytest.approx(sum(values))
+        assert (stats.min, stats.max) == (min(values), max(values))
+
+    def test_merged_chunks_equal_whole(self):
+        """Test merging per-chunk stats gives the stats of all values."""
+        values = [float(i % 17) for i in range(500)]
+        merged = RunningStats()
+        for chunk in iter_chunks(values, 64):
+            part = RunningStats()
+            part.add_many(chunk)
+            merged.merge(part)
+        merged.merge(RunningStats())
+
+        assert merged.count == 500
+        assert merged.mean == pytest.approx(np.mean(values))
+        assert merged.std() == pytest.approx(np.std(values))
+
+    def test_empty_and_single(self):
+        """Test undefined deviations are 0.0."""
+        stats = RunningStats()
+        assert stats.std() == 0.0
+        stats.add(3)
+        assert stats.std(ddof=1) == 0.0
+
+    def test_grouped_stats(self):
+        """Test values are tracked overall and per group, in first-seen order."""
+        stats = GroupedStats()
+        for group, value in [("taxi", 1), ("hotel", 3), ("taxi", 5)]:
+            stats.add(group, value)
+
+        assert stats.overall.mean == 3
+        assert list(stats.groups) == ["taxi", "hotel"]
+        assert stats.groups["taxi"].mean == 3
+
+
+class TestStreamHelpers:
+    """Test cases for chunking, reservoir sampling and score spill files."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_iter_chunks(self):
+        """Test an iterator is split into consecutive chunks."""
+        assert list(iter_chunks(iter(range(7)), 3)) == [[0, 1, 2], [3, 4, 5], [6]]
+        assert list(iter_chunks([], 3)) == []
+
+    def test_reservoir_is_bounded_and_uniform(self):
+        """Test the sample never exceeds its size and covers the whole stream."""
+        sample = ReservoirSample(100)
+        for i in range(10000):
+            sample.add(i)
+
+        assert len(sample.items) == 100
+        assert sample.seen == 10000
+        assert 3000 < np.mean(sample.items) < 7000
+
+    def test_spill_roundtrip(self):
+        """Test spilled rows are read back in order."""
+        path = str(Path(self.temp_dir) / "scores" / "scores.jsonl")
+        rows = [{"dialogue_id": f"d{i}", "bleu": i / 10, "llm_judge": None} for i in range(3)]
+        with ScoreSpill(path) as spill:
+            for row in rows:
+                spill.write(row)
+
+        assert spill.rows == 3
+        assert list(read_spill(path)) == rows
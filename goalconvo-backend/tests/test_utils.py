@@ -0,0 +1,86 @@
+"""
+Tests for the utility functions.
+"""
+
+import json
+import pytest
+import tempfile
+import shutil
+import os
+from pathlib import Path
+
+import sys
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from goalconvo import utils
+from goalconvo.utils import iter_json_items
+
+ITEMS = [
+    {"text": 'She said "hi" \\ bye', "values": [1.5, -2e3, 42, True, None, False], "nested": {}},
+    "café 😀",
+    12345.678,
+    [],
+]
+
+
+class TestIterJsonItems:
+    """Test cases for iter_json_items."""
+
+    def setup_method(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.temp_dir, "data.json")
+
+    def teardown_method(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, text):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write(text)
+
+    @pytest.mark.parametrize("chunk_size", [1, 2, 7, 1 << 20])
+    def test_array_across_chunk_boundaries(self, chunk_size):
+        """Test array items (escaped quotes, unicode, numbers) survive every chunk boundary."""
+        for text in (json.dumps(ITEMS), json.dumps(ITEMS, indent=2, ensure_ascii=False)):
+            self.write(text)
+            assert list(iter_json_items(self.path, chunk_size=chunk_size)) == list(enumerate(ITEMS))
+
+    def test_object_members(self):
+        """Test a top-level object yields (key, value) pairs, including escaped keys."""
+        data = {'say "hi"': ITEMS[0], "second": [1, 2], "number": 10}
+        self.write(json.dumps(data, indent=2))
+
+        assert list(iter_json_items(self.path, chunk_size=1)) == list(data.items())
+
+    def test_empty_containers(self):
+        """Test empty top-level arrays and objects yield nothing."""
+        for text in ("[]", " { } "):
+            self.write(text)
+            assert list(iter_json_items(self.path, chunk_size=1)) == []
+
+    def test_rejects_scalars_and_truncation(self):
+        """Test a scalar document and a truncated file raise."""
+        self.write("42")
+        with pytest.raises(ValueError):
+            list(iter_json_items(self.path))
+        self.write('[{"a": 1}, {"b": ')
+        with pytest.raises(ValueError):
+            list(iter_json_items(self.path, chunk_size=3))
+
+    @pytest.mark.parametrize("malformed", ['{"a": @}', '{"a": 1 "b": 2}', "{'a': 1}", '{"a": tru}', "nope"])
+    def test_malformed_item_fails_before_end_of_file(self, malformed, monkeypatch):
+        """Test malformed JSON raises without reading the rest of a large file."""
+        self.write("[" + malformed + "," + ",".join(['{"filler": 1}'] * 20000) + "]")
+        read = []
+        real_open = open
+
+        def counting_open(*args, **kwargs):
+            f = real_open(*args, **kwargs)
+            real_read = f.read
+            f.read = lambda size=-1: read.append(size) or real_read(size)
+            return f
+
+        monkeypatch.setattr(utils, "open", counting_open, raising=False)
+        with pytest.raises(ValueError):
+            list(iter_json_items(self.path, chunk_size=64))
+
+        assert sum(read) < 64 * 10